@@ -143,3 +143,25 @@ WEBAUTHN_ORIGIN = config('WEBAUTHN_ORIGIN', default='http://localhost:8000')
 # Session / auto-logout: expire after 30 days of inactivity
 SESSION_COOKIE_AGE = 60 * 60 * 24 * 30  # 30 days in seconds
 SESSION_SAVE_EVERY_REQUEST = True  # reset the timer on each request
+
+# Learned vendor -> category model (written by `manage.py train_vendor_model`)
+VENDOR_MODEL_PATH = config('VENDOR_MODEL_PATH', default=str(BASE_DIR / 'artifacts' / 'vendor_model.json.gz'))
+
+# Background CSV import jobs (see home/jobs.py): "thread" parses uploads in an
+# in-process pool, "queue" leaves them for `manage.py process_import_jobs`,
+# "sync" parses inside the upload request.
+IMPORT_JOB_RUNNER = config('IMPORT_JOB_RUNNER', default='thread')
+IMPORT_JOB_WORKERS = config('IMPORT_JOB_WORKERS', default=2, cast=int)
+
+# Month-end backups (see home/backups.py): a content-addressed store of
+# deduplicated blobs plus one manifest per backup
+BACKUP_ROOT = config('BACKUP_ROOT', default=str(BASE_DIR / 'backups'))
+# Month-end backups run as background jobs, like CSV imports ("thread", "queue"
+# for `manage.py process_backup_jobs`, or "sync"); a failed attempt is requeued
+# to retry after BACKUP_JOB_RETRY_DELAY seconds, doubling each time
+BACKUP_JOB_RUNNER = config('BACKUP_JOB_RUNNER', default=IMPORT_JOB_RUNNER)
+BACKUP_JOB_RETRY_DELAY = config('BACKUP_JOB_RETRY_DELAY', default=5, cast=int)
+
+# Dropdown reference data (see home/refdata.py) is cached per process; name a
+# CACHES alias here to also share the built copy between worker processes
+REFDATA_CACHE = config('REFDATA_CACHE', default='')
@@ -0,0 +1,287 @@
+"""
+Per-account transaction ledger, one page at a time.
+
+The account page lists incomes, expenses, transfers in/out and balance
+adjustments together, newest first. Rather than loading the whole date range
+into Python, ledger_page() reads one page with a single UNION ALL query over
+the five sources, ordered by (date, kind, id) and continued from a keyset
+cursor. The cursor also carries the running balance at the point it stopped
+(the "anchor"), so the next page needs nothing but its own rows.
+
+Month subtotals for the headers come from one grouped UNION query
+(ledger_month_totals()).
+"""
+
+from datetime import date
+from decimal import Decimal
+
+from django.db.models import (
+    BooleanField, Case, CharField, DateField, DecimalField, ExpressionWrapper, F, IntegerField, Q, Sum, Value, When,
+)
+from django.db.models.functions import TruncMonth
+from django.urls import reverse
+
+from .models import BankAccount
+
+
+ZERO = Decimal("0.00")
+
+PAGE_SIZE = 100
+
+# Order within a day (same as before pagination: income, transfer, expense, adjustment)
+KIND_ORDER = {"income": 0, "transfer": 1, "expense": 2, "adjustment": 3}
+
+EDIT_URLS = {
+    "income": "income_edit",
+    "expense": "expense_edit",
+    "transfer": "transfer_edit",
+    "adjustment": "balance_adjustment_edit",
+}
+
+_AMOUNT = DecimalField(max_digits=12, decimal_places=2)
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+def _blank():
+    return Value("", output_field=CharField())
+
+
+def _sources(account, first_day, last_day):
+    """
+    The five ledger sources as (kind, queryset, columns, totals).
+
+    `columns` are the page annotations, identical names in identical order for
+    every source so the querysets can be UNIONed; `totals` are the month
+    aggregates (inflow, outflow) for ledger_month_totals().
+    """
+    in_range = Q(date__range=(first_day, last_day))
+    # A transfer from this account to itself has no net effect
+    self_transfer = Q(from_account=account, to_account=account)
+
+    def columns(kind, signed_amount, is_inflow, text, category=None, unit=False, counterparty=None,
+                bucket=None, fallback=None):
+        return {
+            "entry_date": F("date"),
+            "kind_order": Value(KIND_ORDER[kind], output_field=IntegerField()),
+            "row_id": F("id"),
+            "signed_amount": ExpressionWrapper(signed_amount, output_field=_AMOUNT),
+            "is_inflow": is_inflow,
+            "text": F(text),
+            "category_name": F(category) if category else _blank(),
+            "property_name": F("rental_unit__property__name") if unit else _blank(),
+            "unit_name": F("rental_unit__name") if unit else _blank(),
+            "counterparty_id": F(counterparty) if counterparty else Value(None, output_field=IntegerField()),
+            "bucket_name": F(bucket) if bucket else _blank(),
+            "fallback": F(fallback) if fallback else _blank(),
+            "entry_notes": F("notes"),
+        }
+
+    inflow = Value(True, output_field=BooleanField())
+    outflow = Value(False, output_field=BooleanField())
+    zero = Value(ZERO, output_field=_AMOUNT)
+    money_in = {"inflow": Sum("amount"), "outflow": zero}
+    money_out = {"inflow": zero, "outflow": Sum("amount")}
+
+    return [
+        ("income", account.incomes.filter(in_range), columns(
+            "income", F("amount"), inflow, "income_category__name", unit=True, fallback="category",
+        ), money_in),
+        ("transfer", account.incoming_transfers.filter(in_range).exclude(self_transfer), columns(
+            "transfer", F("amount"), inflow, "description",
+            counterparty="from_account_id", bucket="withholding_category__name",
+        ), money_in),
+        ("transfer", account.outgoing_transfers.filter(in_range).exclude(self_transfer), columns(
+            "transfer", -F("amount"), outflow, "description",
+            counterparty="to_account_id", bucket="withholding_category__name",
+        ), money_out),
+        ("expense", account.expenses.filter(in_range), columns(
+            "expense", -F("amount"), outflow, "vendor_name", category="category__name", unit=True,
+        ), money_out),
+        ("adjustment", account.balance_adjustments.filter(in_range), columns(
+            "adjustment", F("amount"),
+            Case(When(amount__gte=0, then=Value(True)), default=Value(False), output_field=BooleanField()),
+            "reason",
+        ), {
+            "inflow": Sum(Case(When(amount__gte=0, then=F("amount")), default=zero, output_field=_AMOUNT)),
+            "outflow": Sum(Case(When(amount__lt=0, then=-F("amount")), default=zero, output_field=_AMOUNT)),
+        }),
+    ]
+
+
+def _before(kind, cursor_date, cursor_order, cursor_id):
+    """Rows of `kind` that come after the cursor in newest-first order."""
+    order = KIND_ORDER[kind]
+    if order < cursor_order:
+        return Q(date__lte=cursor_date)
+    if order > cursor_order:
+        return Q(date__lt=cursor_date)
+    return Q(date__lt=cursor_date) | Q(date=cursor_date, id__lt=cursor_id)
+
+
+def encode_cursor(entry_date, kind_order, row_id, anchor):
+    return f"{entry_date.isoformat()}_{kind_order}_{row_id}_{'' if anchor is None else anchor}"
+
+
+def decode_cursor(cursor):
+    """
+    Returns:
+        (date, kind_order, row_id, anchor or None)
+
+    Raises:
+        InvalidCursor
+    """
+    try:
+        day, kind_order, row_id, anchor = cursor.split("_")
+        return date.fromisoformat(day), int(kind_order), int(row_id), Decimal(anchor) if anchor else None
+    except (ValueError, ArithmeticError):
+        raise InvalidCursor(cursor)
+
+
+def _describe(row, accounts):
+    kind = next(k for k, order in KIND_ORDER.items() if order == row["kind_order"])
+    unit = f"{row['property_name']} / {row['unit_name']}" if row["unit_name"] else ""
+
+    if kind == "income":
+        desc = row["text"] or row["fallback"] or "Income"
+        if unit:
+            desc = f"{desc} – {unit}"
+    elif kind == "expense":
+        desc = row["text"] or ""
+        if row["category_name"]:
+            desc = f"{desc} – {row['category_name']}" if desc else row["category_name"]
+        if unit:
+            desc = f"{desc} ({unit})" if desc else unit
+        desc = desc or "Expense"
+    elif kind == "transfer":
+        counterparty = accounts.get(row["counterparty_id"])
+        if row["is_inflow"]:
+            desc = f"{row['text'] or 'Transfer in'} (from {counterparty or 'external'})"
+        else:
+            desc = f"{row['text'] or 'Transfer out'} (to {counterparty or 'external'})"
+        if row["bucket_name"]:
+            desc = f"{desc} [Bucket: {row['bucket_name']}]"
+    else:
+        desc = f"Balance Adjustment: {row['text']}"
+
+    return kind, desc
+
+
+def ledger_page(account, first_day, last_day, closing_balance, cursor=None, page_size=PAGE_SIZE):
+    """
+    One page of the account's ledger, newest first.
+
+    Args:
+        account: BankAccount
+        first_day, last_day: date range shown
+        closing_balance: balance at the end of last_day (the first page's anchor)
+        cursor: value of "next_cursor" from the previous page, or None
+        page_size: rows per page
+
+    Returns:
+        dict: "entries" (same keys as the old list-based view plus "edit_url")
+              and "next_cursor" (None on the last page)
+
+    Raises:
+        InvalidCursor: the cursor couldn't be decoded
+    """
+    anchor = closing_balance
+    sources = _sources(account, first_day, last_day)
+
+    if cursor:
+        cursor_date, cursor_order, cursor_id, anchor = decode_cursor(cursor)
+        sources = [
+            (kind, queryset.filter(_before(kind, cursor_date, cursor_order, cursor_id)), columns, totals)
+            for kind, queryset, columns, totals in sources
+        ]
+
+    querysets = [
+        queryset.order_by().annotate(**columns).values(*columns)
+        for _, queryset, columns, _ in sources
+    ]
+    page = list(
+        querysets[0].union(*querysets[1:], all=True)
+        .order_by("-entry_date", "-kind_order", "-row_id")[:page_size + 1]
+    )
+    has_more = len(page) > page_size
+    page = page[:page_size]
+
+    counterparty_ids = {row["counterparty_id"] for row in page if row["counterparty_id"]}
+    accounts = BankAccount.objects.in_bulk(counterparty_ids) if counterparty_ids else {}
+
+    tracking_start = account.balance_tracking_start_date if account.balance_tracking_enabled else None
+
+    entries = []
+    for row in page:
+        kind, description = _describe(row, accounts)
+        signed_amount = row["signed_amount"]
+
+        balance = None
+        counts = tracking_start is None or row["entry_date"] >= tracking_start
+        if counts and anchor is not None:
+            # Newest first: the anchor is the balance after this row
+            balance = anchor
+            anchor -= signed_amount
+
+        entries.append({
+            "date": row["entry_date"],
+            "kind": kind,
+            "is_inflow": row["is_inflow"],
+            "raw_amount": abs(signed_amount),
+            "signed_amount": signed_amount,
+            "description": description,
+            "notes": row["entry_notes"] or "",
+            "balance": balance,
+            "edit_url": reverse(EDIT_URLS[kind], args=[row["row_id"]]),
+            "row_id": row["row_id"],
+        })
+
+    next_cursor = None
+    if has_more and page:
+        last = page[-1]
+        next_cursor = encode_cursor(last["entry_date"], last["kind_order"], last["row_id"], anchor)
+
+    return {"entries": entries, "next_cursor": next_cursor}
+
+
+def ledger_month_totals(account, first_day, last_day, tracked_since=None):
+    """
+    Inflow/outflow/net per month in the range, newest month first, from one
+    grouped UNION query.
+
+    Args:
+        tracked_since: optional date; also sum the net change of rows on or
+                       after it ("tracked_net"), for the balance figures
+
+    Returns:
+        list of {"month": date, "inflow", "outflow", "net", "tracked_net": Decimal}
+    """
+    zero = Value(ZERO, output_field=_AMOUNT)
+    querysets = []
+    for _, queryset, columns, totals in _sources(account, first_day, last_day):
+        if tracked_since is None:
+            tracked_net = zero
+        else:
+            tracked_net = Sum(Case(
+                When(date__gte=tracked_since, then=columns["signed_amount"]), default=zero, output_field=_AMOUNT,
+            ))
+        querysets.append(
+            queryset.order_by()
+            .annotate(month=TruncMonth("date", output_field=DateField()))
+            .values("month")
+            .annotate(**totals, tracked_net=tracked_net)
+            .values("month", "inflow", "outflow", "tracked_net")
+        )
+
+    months = {}
+    for row in querysets[0].union(*querysets[1:], all=True):
+        month = months.setdefault(row["month"], {"month": row["month"], "inflow": ZERO, "outflow": ZERO, "tracked_net": ZERO})
+        for key in ("inflow", "outflow", "tracked_net"):
+            month[key] += row[key] or ZERO
+
+    months = sorted(months.values(), key=lambda m: m["month"], reverse=True)
+    for month in months:
+        month["net"] = month["inflow"] - month["outflow"]
+    return months
@@ -20,6 +20,10 @@ from .models import (
     MonthEndIncomeCategorySnapshot,
     UserProfile,
     WebAuthnCredential,
+    VendorRule,
+    ImportJob,
+    BackupJob,
+    BalanceLedgerEntry,
 )
 
 
@@ -32,6 +36,25 @@ class CategoryAdmin(admin.ModelAdmin):
     search_fields = ("name",)
 
 
+# ---------- VENDOR RULES ----------
+
+@admin.register(VendorRule)
+class VendorRuleAdmin(admin.ModelAdmin):
+    list_display = ("keyword", "category", "priority", "is_active", "updated_at")
+    list_filter = ("is_active", "category")
+    search_fields = ("keyword", "category__name")
+
+
+# ---------- IMPORT JOBS ----------
+
+@admin.register(ImportJob)
+class ImportJobAdmin(admin.ModelAdmin):
+    list_display = ("id", "filename", "bank_account", "status", "rows_done", "rows_total", "created_at", "finished_at")
+    list_filter = ("status",)
+    search_fields = ("filename",)
+    readonly_fields = ("result",)
+
+
 # ---------- INCOME CATEGORY ----------
 
 @admin.register(IncomeCategory)
@@ -470,6 +493,29 @@ class MonthEndIncomeCategorySnapshotAdmin(admin.ModelAdmin):
     readonly_fields = ("month_close", "income_category", "monthly_target", "actual_received")
 
 
+# ---------- BACKUP JOBS ----------
+
+@admin.register(BackupJob)
+class BackupJobAdmin(admin.ModelAdmin):
+    list_display = ("id", "month", "month_close", "status", "attempts", "manifest", "created_at", "finished_at")
+    list_filter = ("status",)
+    search_fields = ("month", "manifest")
+    readonly_fields = ("result",)
+
+
+# ---------- BALANCE LEDGER ----------
+
+@admin.register(BalanceLedgerEntry)
+class BalanceLedgerEntryAdmin(admin.ModelAdmin):
+    list_display = ("date", "bank_account", "source_type", "source_id", "amount", "running_balance", "is_reversal")
+    list_filter = ("bank_account", "source_type", "is_reversal")
+    ordering = ("-date", "-id")
+    readonly_fields = (
+        "bank_account", "date", "amount", "running_balance",
+        "source_type", "source_id", "is_reversal", "created_at",
+    )
+
+
 # ---------- USER PROFILES ----------
 
 @admin.register(UserProfile)
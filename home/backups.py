@@ -0,0 +1,443 @@
+"""
+Content-addressed backup store for month-end closes.
+
+settings.BACKUP_ROOT (default BASE_DIR/backups) holds:
+
+    store/blobs/ab/abcdef...     every distinct file ever backed up, named by
+                                 its SHA-256 and written once
+    store/manifests/<name>.json  one per backup: what it contains, and which
+                                 blob holds each file
+    store/media-index.json       path -> (size, mtime, sha256) for MEDIA_ROOT,
+                                 so unchanged receipts aren't hashed again
+
+Receipts never change once uploaded, so after the first backup a month-end
+close only hashes new uploads and writes their blobs, plus the database
+(taken with SQLite's online backup API, consistent even while the app is
+writing) and a compact data export (home/native_export.py), streamed
+straight into blobs as they're produced. Unchanged data exports to identical
+bytes, so a quiet month adds no new data blob.
+restore_backup() rebuilds the usual database/data/media layout from a
+manifest; write_backup_archive() streams one backup into a zip for offsite
+copies, entry by entry with no staging directory, storing already-compressed
+receipts (images, PDFs) as-is.
+"""
+
+import hashlib
+import json
+import os
+import shutil
+import sqlite3
+import tempfile
+import zipfile
+from contextlib import contextmanager
+from datetime import datetime
+from pathlib import Path
+
+from django.conf import settings
+from django.db import connection
+
+from .native_export import export_home_data
+
+
+CHUNK_SIZE = 1024 * 1024
+
+# Zip compression by name, for write_backup_archive() / export_backup --compression
+ARCHIVE_COMPRESSION = {
+    "deflate": zipfile.ZIP_DEFLATED,
+    "bzip2": zipfile.ZIP_BZIP2,
+    "lzma": zipfile.ZIP_LZMA,
+    "stored": zipfile.ZIP_STORED,
+}
+
+# Already compressed: deflating these again costs CPU and saves nothing
+STORED_EXTENSIONS = {
+    ".jpg", ".jpeg", ".png", ".gif", ".webp", ".heic", ".pdf",
+    ".zip", ".gz", ".bz2", ".xz", ".zst", ".7z",
+}
+
+
+class BackupError(Exception):
+    pass
+
+
+def backup_root():
+    return Path(getattr(settings, "BACKUP_ROOT", Path(settings.BASE_DIR) / "backups"))
+
+
+class BackupStore:
+    """Blobs and manifests under one directory."""
+
+    def __init__(self, root=None):
+        self.root = Path(root) if root else backup_root() / "store"
+        self.blobs = self.root / "blobs"
+        self.manifests = self.root / "manifests"
+        self.tmp = self.root / "tmp"
+        for path in (self.blobs, self.manifests, self.tmp):
+            path.mkdir(parents=True, exist_ok=True)
+
+    def blob_path(self, digest):
+        return self.blobs / digest[:2] / digest
+
+    def has_blob(self, digest):
+        return self.blob_path(digest).exists()
+
+    def temp_path(self, suffix=""):
+        fd, path = tempfile.mkstemp(dir=self.tmp, suffix=suffix)
+        os.close(fd)
+        return Path(path)
+
+    def add_temp_file(self, path):
+        """
+        Move a finished temporary file (from temp_path()) into the store.
+
+        Returns:
+            (digest, size, written): written is False if the blob already existed
+        """
+        path = Path(path)
+        size = path.stat().st_size
+        digest = hash_file(path)
+
+        target = self.blob_path(digest)
+        if target.exists():
+            path.unlink()
+            return digest, size, False
+
+        target.parent.mkdir(exist_ok=True)
+        os.replace(path, target)
+        return digest, size, True
+
+    @contextmanager
+    def open_blob(self):
+        """
+        Write a blob as a stream, hashing as it goes (no second read).
+
+            with store.open_blob() as blob:
+                blob.write(...)
+            blob.digest, blob.size, blob.written
+        """
+        writer = _BlobWriter(self.temp_path())
+        try:
+            yield writer
+        except BaseException:
+            writer.close()
+            writer.path.unlink(missing_ok=True)
+            raise
+        writer.close()
+        writer.digest = writer.hash.hexdigest()
+        target = self.blob_path(writer.digest)
+        writer.written = not target.exists()
+        if writer.written:
+            target.parent.mkdir(exist_ok=True)
+            os.replace(writer.path, target)
+        else:
+            writer.path.unlink()
+
+    def write_manifest(self, name, manifest):
+        staging = self.temp_path(".json")
+        staging.write_text(json.dumps(manifest, indent=2))
+        os.replace(staging, self.manifests / f"{name}.json")
+
+    def read_manifest(self, name):
+        path = self.manifests / (name if name.endswith(".json") else f"{name}.json")
+        if not path.exists():
+            raise BackupError(f"No backup manifest named {name}")
+        return json.loads(path.read_text())
+
+
+class _BlobWriter:
+    """File-like sink for BackupStore.open_blob(); accepts str (as UTF-8) or bytes."""
+
+    def __init__(self, path):
+        self.path = path
+        self.file = open(path, "wb")
+        self.hash = hashlib.sha256()
+        self.size = 0
+        self.digest = None
+        self.written = False
+
+    def write(self, data):
+        if isinstance(data, str):
+            data = data.encode("utf-8")
+        self.hash.update(data)
+        self.size += len(data)
+        return self.file.write(data)
+
+    def flush(self):
+        self.file.flush()
+
+    def isatty(self):
+        return False
+
+    def close(self):
+        if not self.file.closed:
+            self.file.close()
+
+
+def hash_file(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(CHUNK_SIZE), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def iter_media_files(media_root):
+    """(relative posix path, os.stat_result) for every file, in one directory walk."""
+    stack = [Path(media_root)]
+    while stack:
+        directory = stack.pop()
+        with os.scandir(directory) as entries:
+            for entry in entries:
+                if entry.is_dir(follow_symlinks=False):
+                    stack.append(Path(entry.path))
+                elif entry.is_file(follow_symlinks=False):
+                    yield Path(entry.path).relative_to(media_root).as_posix(), entry.stat()
+
+
+def backup_media(store, media_root, progress=None):
+    """
+    Add MEDIA_ROOT to the store, hashing only files whose size/mtime changed
+    since the last backup. progress(), if given, is called after each file.
+
+    Returns:
+        (files, stats): files is [{"path", "sha256", "size"}]; stats counts
+        hashed/new files and new bytes
+    """
+    index_path = store.root / "media-index.json"
+    try:
+        index = json.loads(index_path.read_text())
+    except (FileNotFoundError, ValueError):
+        index = {}
+
+    files = []
+    new_index = {}
+    stats = {"hashed": 0, "new_files": 0, "new_bytes": 0}
+    if os.path.isdir(media_root):
+        for rel_path, stat in sorted(iter_media_files(media_root)):
+            cached = index.get(rel_path)
+            if cached and cached[0] == stat.st_size and cached[1] == stat.st_mtime_ns and store.has_blob(cached[2]):
+                digest, size = cached[2], stat.st_size
+            else:
+                # New or changed: hash and copy in the same pass
+                stats["hashed"] += 1
+                with open(Path(media_root) / rel_path, "rb") as source, store.open_blob() as blob:
+                    shutil.copyfileobj(source, blob, CHUNK_SIZE)
+                digest, size = blob.digest, blob.size
+                if blob.written:
+                    stats["new_files"] += 1
+                    stats["new_bytes"] += size
+            new_index[rel_path] = [stat.st_size, stat.st_mtime_ns, digest]
+            files.append({"path": rel_path, "sha256": digest, "size": size})
+            if progress:
+                progress()
+
+    staging = store.temp_path(".json")
+    staging.write_text(json.dumps(new_index))
+    os.replace(staging, index_path)
+    return files, stats
+
+
+def snapshot_database(store):
+    """
+    Copy the live SQLite database with the online backup API.
+
+    Returns:
+        path of a temporary copy, or None if the database isn't SQLite
+    """
+    if connection.vendor != "sqlite":
+        return None
+
+    connection.ensure_connection()
+    target_path = store.temp_path(".sqlite3")
+    target = sqlite3.connect(target_path)
+    try:
+        connection.connection.backup(target)
+    finally:
+        target.close()
+    return target_path
+
+
+def create_backup(month_str, description="Month-end close", store=None, progress=None):
+    """
+    Back up the data export, the database and MEDIA_ROOT into the store.
+
+    progress(), if given, is called between steps and after each media file
+    (the backup job uses it as a heartbeat).
+
+    Returns:
+        (manifest_name, backup_info): backup_info has "components", "total_size"
+        (everything the backup references) and "new_bytes" (what this backup
+        actually added to disk)
+    """
+    store = store or BackupStore()
+    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+    name = f"monthend_{month_str}_{timestamp}"
+
+    manifest = {
+        "name": name,
+        "timestamp": timestamp,
+        "created": datetime.now().isoformat(timespec="seconds"),
+        "month": month_str,
+        "description": description,
+        "files": {},
+        "media": [],
+        "components": [],
+    }
+    new_bytes = 0
+
+    def add_component(label, filename, digest, size, written, **extra):
+        nonlocal new_bytes
+        manifest["files"][filename] = {"sha256": digest, "size": size}
+        manifest["components"].append({"name": label, "filename": filename, "size": size, **extra})
+        if written:
+            new_bytes += size
+
+    # 1. Data export (gzip'd NDJSON, see home/native_export.py)
+    print(f"[BACKUP] Step 1/3: Creating data export...")
+    with store.open_blob() as blob:
+        export_home_data(blob)
+    data_filename = f"data_{month_str}_{timestamp}.ndjson.gz"
+    add_component("Data Export", data_filename, blob.digest, blob.size, blob.written)
+
+    if progress:
+        progress()
+
+    # 2. SQLite database (online backup: consistent without stopping the app)
+    print(f"[BACKUP] Step 2/3: Snapshotting database...")
+    db_path = snapshot_database(store)
+    if db_path is not None:
+        db_filename = f"database_{month_str}_{timestamp}.sqlite3"
+        add_component("SQLite Database", db_filename, *store.add_temp_file(db_path))
+
+    if progress:
+        progress()
+
+    # 3. Media files (receipts/attachments): only new ones are hashed and written
+    print(f"[BACKUP] Step 3/3: Adding media files (receipts)...")
+    media_files, media_stats = backup_media(store, settings.MEDIA_ROOT, progress=progress)
+    if media_files:
+        manifest["media"] = media_files
+        media_size = sum(f["size"] for f in media_files)
+        manifest["components"].append({
+            "name": "Media Files (Receipts)",
+            "filename": "media/",
+            "size": media_size,
+            "count": len(media_files),
+            "new_count": media_stats["new_files"],
+        })
+        new_bytes += media_stats["new_bytes"]
+        print(
+            f"[BACKUP] Media files: {len(media_files)} files, {media_size/1024/1024:.1f} MB "
+            f"({media_stats['hashed']} hashed, {media_stats['new_files']} new)"
+        )
+
+    manifest["total_size"] = sum(c["size"] for c in manifest["components"])
+    manifest["new_bytes"] = new_bytes
+    store.write_manifest(name, manifest)
+
+    print(f"[BACKUP] ✅ Backup complete: {name} ({new_bytes/1024/1024:.1f} MB new)")
+    return name, {
+        "timestamp": timestamp,
+        "month": month_str,
+        "description": description,
+        "components": manifest["components"],
+        "total_size": manifest["total_size"],
+        "new_bytes": new_bytes,
+        "manifest": name,
+    }
+
+
+def restore_backup(name, target_dir, store=None):
+    """
+    Rebuild a backup's files (data export, database, media/) in target_dir.
+
+    Restoring is then the same as before: copy the database to the project
+    root as db.sqlite3 (or migrate + import_data the export) and copy media/.
+    """
+    store = store or BackupStore()
+    manifest = store.read_manifest(name)
+    target_dir = Path(target_dir)
+
+    for rel_path, digest in _archive_entries(manifest):
+        source = store.blob_path(digest)
+        if not source.exists():
+            raise BackupError(f"Backup {name} is missing blob {digest} ({rel_path})")
+        destination = target_dir / rel_path
+        destination.parent.mkdir(parents=True, exist_ok=True)
+        shutil.copyfile(source, destination)
+    return manifest
+
+
+def _archive_entries(manifest):
+    """(archive name, sha256) for every file in a backup."""
+    entries = [(filename, info["sha256"]) for filename, info in manifest["files"].items()]
+    entries += [(f"media/{f['path']}", f["sha256"]) for f in manifest["media"]]
+    return entries
+
+
+def backup_readme(manifest):
+    """README.txt for an exported archive."""
+    database = next((name for name in manifest["files"] if name.endswith(".sqlite3")), "database_*.sqlite3")
+    data = next((name for name in manifest["files"] if name.endswith(".ndjson.gz")), "data_*.ndjson.gz")
+
+    lines = [
+        f"FinchFinance Backup - {manifest['month']}",
+        f"Created: {manifest['created'].replace('T', ' ')}",
+        f"Description: {manifest['description']}",
+        "",
+        "CONTENTS:",
+        "-" * 60,
+    ]
+    for comp in manifest["components"]:
+        lines.append(f"- {comp['name']}: {comp['filename']}")
+        lines.append(f"  Size: {comp['size']:,} bytes ({comp['size']/1024/1024:.2f} MB)")
+        if "count" in comp:
+            lines.append(f"  Files: {comp['count']}")
+    lines += [
+        "",
+        "RESTORE INSTRUCTIONS:",
+        "-" * 60,
+        "1. Extract this zip file",
+        "2. Quick restore (database file):",
+        f"   - Copy {database} to project root as db.sqlite3",
+        "   - Copy media/ folder to project root",
+        "3. OR Data-only restore:",
+        "   - python manage.py migrate",
+        f"   - python manage.py import_data {data}",
+        "   - Copy media/ folder to project root",
+    ]
+    return "\n".join(lines) + "\n"
+
+
+def write_backup_archive(name, fileobj, compression="deflate", level=None, store=None):
+    """
+    Stream one backup into a zip, entry by entry, straight from the blobs.
+
+    fileobj can be unseekable (a pipe, an HTTP response): nothing is staged
+    on disk and memory use is one chunk per entry.
+
+    Args:
+        name: manifest name
+        fileobj: binary file-like object to write the zip to
+        compression: key of ARCHIVE_COMPRESSION; files in STORED_EXTENSIONS
+                     are always stored uncompressed
+        level: compression level (deflate 0-9, bzip2 1-9); None for the default
+
+    Returns:
+        manifest dict
+    """
+    if compression not in ARCHIVE_COMPRESSION:
+        raise BackupError(f"Unknown compression {compression!r}; choose from {', '.join(ARCHIVE_COMPRESSION)}")
+    store = store or BackupStore()
+    manifest = store.read_manifest(name)
+    default_type = ARCHIVE_COMPRESSION[compression]
+
+    with zipfile.ZipFile(fileobj, "w", compression=default_type, compresslevel=level, allowZip64=True) as archive:
+        archive.writestr("README.txt", backup_readme(manifest))
+        for arcname, digest in _archive_entries(manifest):
+            source = store.blob_path(digest)
+            if not source.exists():
+                raise BackupError(f"Backup {name} is missing blob {digest} ({arcname})")
+            compress_type = zipfile.ZIP_STORED if Path(arcname).suffix.lower() in STORED_EXTENSIONS else default_type
+            archive.write(source, arcname, compress_type=compress_type, compresslevel=level)
+    return manifest
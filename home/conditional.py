@@ -0,0 +1,88 @@
+"""
+Conditional GET (ETag / Last-Modified) for month-scoped pages.
+
+A page decorated with @month_page is rebuilt from the same data until one of
+the DataVersion counters it depends on (see home/versions.py) is bumped, so a
+reload can be answered from the browser's copy: the decorator looks the
+counters up in one indexed query, sends them as an ETag (and their newest
+updated_at as Last-Modified), and returns 304 Not Modified when the browser's
+If-None-Match still matches.
+
+The ETag also covers the user, their CSRF token and today's date (pages
+default to the current month and show days remaining). Responses with queued
+flash messages, and anything but GET/HEAD, are always rendered in full.
+"""
+
+import hashlib
+from datetime import date
+from functools import wraps
+
+from django.contrib.messages import get_messages
+from django.utils.cache import patch_cache_control
+from django.views.decorators.http import condition
+
+from .refdata import REFDATA
+from .versions import ALL_MONTHS, PROFILES, current_versions, month_key
+
+
+def selected_month(request):
+    """First day of the ?month=YYYY-MM the page shows (this month if missing or invalid)."""
+    today = date.today()
+    try:
+        year, month = map(int, request.GET["month"].split("-"))
+        return date(year, month, 1)
+    except (KeyError, ValueError):
+        return date(today.year, today.month, 1)
+
+
+def _page_state(request, all_months):
+    """(etag, last_modified) for the request, or None to skip conditional handling."""
+    if not hasattr(request, "_month_page_state"):
+        state = None
+        if request.method in ("GET", "HEAD") and not len(get_messages(request)):
+            keys = [month_key(selected_month(request)), REFDATA, PROFILES]
+            if all_months:
+                keys.append(ALL_MONTHS)
+            versions = current_versions(keys)
+            token = "|".join([
+                str(request.user.pk),
+                request.META.get("CSRF_COOKIE", ""),
+                date.today().isoformat(),
+                *(f"{key}={versions.get(key, (0, None))[0]}" for key in keys),
+            ])
+            last_modified = max((updated_at for _, updated_at in versions.values()), default=None)
+            state = (hashlib.sha1(token.encode()).hexdigest(), last_modified)
+        request._month_page_state = state
+    return request._month_page_state
+
+
+def month_page(all_months=False):
+    """
+    Answer repeat GETs of a month page with 304 while its data is unchanged.
+
+    Args:
+        all_months: the page also uses other months' data (all-time balances,
+                    the list of months), so any transaction change counts
+    """
+    def etag(request, *args, **kwargs):
+        state = _page_state(request, all_months)
+        return state and state[0]
+
+    def last_modified(request, *args, **kwargs):
+        state = _page_state(request, all_months)
+        return state and state[1]
+
+    def decorator(view):
+        conditional_view = condition(etag_func=etag, last_modified_func=last_modified)(view)
+
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            response = conditional_view(request, *args, **kwargs)
+            if response.has_header("ETag"):
+                # Revalidate every time instead of letting the browser guess a lifetime
+                patch_cache_control(response, private=True, no_cache=True)
+            return response
+
+        return wrapper
+
+    return decorator
@@ -13,6 +13,8 @@ from .models import (
     Transfer,
     BalanceAdjustment,
 )
+from .importers import format_choices
+from .refdata import get_reference_data, use_snapshot_choices
 
 
 
@@ -34,209 +36,13 @@ class CSVUploadForm(forms.Form):
         label="Bank account",
         widget=forms.Select(attrs={"class": "form-select"}),
     )
-
-class TransactionImportForm(forms.Form):
-    """
-    Represents ONE row from the CSV during the review step.
-
-    - entry_type: income or expense
-    - For income: choose one of the 4 Income sources
-    - For expense: choose a Category (FK)
-    - skip: internal flag so a row can be 'deleted' in the UI and ignored on save
-    - split_group_id: ID so multiple rows can represent parts of one original transaction
-    - is_split_child: marker to indicate a row was created by splitting
-
-    NEW:
-    - apply_to_withholding: treat this expense as a contribution into a withholding bucket
-    - is_withholding_payout: treat this row as a payout from withholding ONLY
-                             (no Expense will be created)
-    - withholding_category: which withholding bucket to adjust
-    """
-    ENTRY_TYPE_CHOICES = [
-        ("expense", "Expense"),
-        ("income", "Income"),
-        ("transfer", "Transfer"),
-    ]
-
-    # Hidden flag used when you click "Skip" in the UI (wired in the template)
-    skip = forms.BooleanField(required=False, widget=forms.HiddenInput())
-
-    # Hidden split metadata (used by JS & potentially the backend later)
-    split_group_id = forms.CharField(required=False, widget=forms.HiddenInput())
-    is_split_child = forms.BooleanField(required=False, widget=forms.HiddenInput())
-
-    entry_type = forms.ChoiceField(
-        choices=ENTRY_TYPE_CHOICES,
-        widget=forms.Select(attrs={
-            "class": "form-select",
-            # make the type box wider so you can see the full text
-            "style": "min-width: 10rem;",
-        }),
-    )
-
-    date = forms.DateField(
-        widget=forms.DateInput(attrs={
-            "type": "date",
-            "class": "form-control",
-        })
-    )
-
-    vendor_name = forms.CharField(
-        max_length=255,
-        widget=forms.TextInput(attrs={"class": "form-control"}),
-        help_text="Description / payee as shown on the bank statement.",
-    )
-
-    amount = forms.DecimalField(
-        max_digits=10,
-        decimal_places=2,
-        widget=forms.NumberInput(attrs={"class": "form-control"}),
-        help_text="Use positive numbers; we'll treat income vs expense based on entry type.",
-    )
-
-    # Expense side: FK to Category
-    expense_category = forms.ModelChoiceField(
-        queryset=Category.objects.all(),
-        required=False,
-        empty_label="(Select expense category)",
-        widget=forms.Select(attrs={"class": "form-select"}),
-    )
-
-
-    income_source = forms.ModelChoiceField(
-        queryset=IncomeCategory.objects.all().order_by("name"),
-        required=False,
-        empty_label="(Select income category)",
-        widget=forms.Select(attrs={"class": "form-select"}),
-    )
-
-    income_rental_unit = forms.ModelChoiceField(
-        queryset=RentalUnit.objects.select_related("property").order_by("property__name", "name"),
-        required=False,
-        empty_label="(Auto from income source)",
-        widget=forms.Select(attrs={"class": "form-select"}),
-    )
-
-    expense_rental_unit = forms.ModelChoiceField(
-        queryset=RentalUnit.objects.select_related("property").order_by("property__name", "name"),
-        required=False,
-        empty_label="(None)",
-        widget=forms.Select(attrs={"class": "form-select"}),
-    )
-
-    from_account = forms.ModelChoiceField(
-        queryset=BankAccount.objects.all().order_by("institution", "name"),
-        required=False,
-        empty_label="(From account)",
-        widget=forms.Select(attrs={"class": "form-select"}),
-    )
-
-    to_account = forms.ModelChoiceField(
-        queryset=BankAccount.objects.all().order_by("institution", "name"),
-        required=False,
-        empty_label="(To account)",
-        widget=forms.Select(attrs={"class": "form-select"}),
-    )
-
-    location = forms.CharField(
-        max_length=100,
-        required=False,
-        initial="Ottawa",
-        widget=forms.TextInput(attrs={"class": "form-control"}),
-    )
-
-    notes = forms.CharField(
-        required=False,
-        widget=forms.Textarea(attrs={
-            "rows": 1,
-            "class": "form-control",
-        }),
-    )
-
-    # NEW withholding fields
-    apply_to_withholding = forms.BooleanField(
-        required=False,
-        label="Contribution",
-        help_text="Also add this amount into a withholding bucket.",
-    )
-    is_withholding_payout = forms.BooleanField(
-        required=False,
-        label="Payout (no expense)",
-        help_text="Treat this as using funds from a withholding bucket only.",
-    )
-    withholding_category = forms.ModelChoiceField(
-        queryset=WithholdingCategory.objects.select_related("account")
-        .all()
-        .order_by("account__name", "name"),
+    statement_format = forms.ChoiceField(
+        label="File format",
         required=False,
-        empty_label="(Choose withholding bucket)",
+        choices=lambda: [("", "Auto-detect")] + format_choices(),
         widget=forms.Select(attrs={"class": "form-select"}),
     )
 
-    def clean(self):
-        """
-        Ensure that depending on entry_type, the right category/source is provided.
-
-        If skip is True, we don't enforce any of these constraints because the row
-        is going to be ignored by the view.
-        """
-        cleaned = super().clean()
-
-        if cleaned.get("skip"):
-            # Row is being skipped; don't validate category/source
-            return cleaned
-
-        entry_type = cleaned.get("entry_type")
-        expense_category = cleaned.get("expense_category")
-        income_source = cleaned.get("income_source")
-
-        apply_to_withholding = cleaned.get("apply_to_withholding")
-        is_withholding_payout = cleaned.get("is_withholding_payout")
-        withholding_category = cleaned.get("withholding_category")
-
-        # Expense vs income validations
-        if entry_type == "expense":
-            # For payout-only rows we do NOT require an expense_category
-            if not is_withholding_payout and not expense_category:
-                self.add_error("expense_category", "Please select an expense category.")
-        elif entry_type == "income":
-            if not income_source:
-                self.add_error("income_source", "Please select an income source.")
-
-            # For now we don't support withholding adjustments on income rows
-            if apply_to_withholding or is_withholding_payout:
-                self.add_error(
-                    "entry_type",
-                    "Withholding adjustments are only supported on expense rows.",
-                )
-
-        elif entry_type == "transfer":
-            from_account = cleaned.get("from_account")
-            to_account = cleaned.get("to_account")
-
-            # At least one account required
-            if not from_account and not to_account:
-                self.add_error(None, "Transfer requires at least one account (from or to).")
-
-            # Prevent same-account transfers
-            if from_account and to_account and from_account == to_account:
-                self.add_error(None, "From and To accounts cannot be the same.")
-
-        # Withholding-specific validations
-        if (apply_to_withholding or is_withholding_payout) and not withholding_category:
-            self.add_error(
-                "withholding_category",
-                "Select a withholding bucket when adjusting withholding.",
-            )
-
-        if apply_to_withholding and is_withholding_payout:
-            self.add_error(
-                "is_withholding_payout",
-                "Choose either a contribution OR a payout, not both.",
-            )
-
-        return cleaned
-
 class ExpenseEditForm(forms.ModelForm):
     class Meta:
         model = Expense
@@ -459,8 +265,9 @@ class TransactionForm(forms.Form):
         required=False,
     )
 
-    def __init__(self, *args, **kwargs):
+    def __init__(self, *args, refdata=None, **kwargs):
         super().__init__(*args, **kwargs)
+        refdata = refdata or get_reference_data()
 
         # Expense categories
         self.fields["category"].queryset = Category.objects.all().order_by("name")
@@ -471,16 +278,20 @@ class TransactionForm(forms.Form):
             .order_by("account__name", "name")
         )
 
-        # Bank accounts for transfers and income/expense
-        self.fields["from_account"].queryset = BankAccount.objects.all().order_by(
-            "institution", "name"
-        )
-        self.fields["to_account"].queryset = BankAccount.objects.all().order_by(
-            "institution", "name"
-        )
-        self.fields["bank_account"].queryset = BankAccount.objects.all().order_by(
-            "institution", "name"
-        )
+        # Options render from the cached reference data; the querysets above
+        # are only queried to validate a submitted choice
+        for name, objects in (
+            ("category", refdata.categories),
+            ("rental_unit", refdata.rental_units),
+            ("cra_category", refdata.cra_categories),
+            ("source", refdata.income_categories),
+            ("income_rental_unit", refdata.rental_units),
+            ("from_account", refdata.bank_accounts),
+            ("to_account", refdata.bank_accounts),
+            ("bank_account", refdata.bank_accounts),
+            ("withholding_category", refdata.withholding_categories),
+        ):
+            use_snapshot_choices(self.fields[name], objects)
 
         # Default taxable behaviour comes from IncomeCategory.taxable_default
         entry_type_value = (
@@ -492,12 +303,9 @@ class TransactionForm(forms.Form):
 
         taxable_default = True
         if selected_source:
-            try:
-                cat_obj = IncomeCategory.objects.get(pk=selected_source)
-                if hasattr(cat_obj, "taxable_default"):
-                    taxable_default = cat_obj.taxable_default
-            except IncomeCategory.DoesNotExist:
-                taxable_default = True
+            cat_obj = refdata.income_category(selected_source)
+            if cat_obj is not None:
+                taxable_default = cat_obj.taxable_default
 
         if entry_type_value == "income":
             self.fields["taxable"].initial = taxable_default
@@ -0,0 +1,328 @@
+"""
+CSV import, step 1: turn an uploaded statement into review rows.
+
+build_import_preview() parses the file (home/importers), applies the income
+rules, vendor rules, learned vendor model and hydro split, and returns plain
+JSON-serialisable rows (pks, ISO dates, string amounts). The rows are stored
+on an ImportJob and become the review grid's rows (see home/import_review.py:
+pack_review_rows() sends them to the page, validate_review_rows() checks what
+comes back).
+
+Runs in a background worker (home/jobs.py), so nothing here touches the request.
+"""
+
+from datetime import date
+from decimal import Decimal
+
+from django.contrib import messages
+
+from .importers import parse_statement
+from .models import Category, IncomeCategory, ImportBatch, RentalUnit
+from .vendor_model import get_vendor_model, MIN_CONFIDENCE as VENDOR_MODEL_MIN_CONFIDENCE
+from .vendor_rules import get_vendor_matcher
+
+
+# --- Auto-mapping rules ---
+
+# Vendor keyword -> category mappings live in the VendorRule table (see vendor_rules.py).
+
+EXACT_ETFR_SNOW_REMOVAL_AMOUNT = Decimal("180.80")
+
+# How often (in rows) to report progress while parsing
+PROGRESS_EVERY = 250
+
+# Line numbers listed in the "skipped lines" warning
+SKIPPED_LINES_SHOWN = 10
+
+
+def get_category_cached(name, cache, missing_set):
+    if not name:
+        return None
+
+    if name in cache:
+        return cache[name]
+    if name in missing_set:
+        return None
+
+    try:
+        cat = Category.objects.get(name=name)
+        cache[name] = cat
+        return cat
+    except Category.DoesNotExist:
+        missing_set.add(name)
+        return None
+
+
+def get_category_by_id_cached(category_id, cache):
+    # Cached by pk alongside the by-name entries in the same dict
+    if category_id not in cache:
+        cache[category_id] = Category.objects.filter(pk=category_id).first()
+    return cache[category_id]
+
+
+def apply_income_rules(desc_upper, amount, entry_type_default, parsed_date=None):
+    """
+    Income inference rules used only during import parsing.
+
+    Important safety constraints:
+    - Only runs when entry_type_default is already 'income' (deposit column)
+    - E-TRANSFER heuristic triggers only when 'E-TRANSFER' is in description
+    - GLOBALIZATION is always Employment Income
+    """
+    entry_type = entry_type_default
+    income_source = ""
+
+    # Employment income (explicit)
+    if "GLOBALIZATION" in desc_upper:
+        return "income", "Employment Income"
+
+    # Only infer rental income on deposits that contain E-TRANSFER (substring match; unique codes ok)
+    if "E-TRANSFER" in desc_upper and entry_type_default == "income":
+        # If we have a date, enforce "around the 1st of month" window (± ~1.5 weeks)
+        in_window = True
+        if parsed_date:
+            first_of_month = date(parsed_date.year, parsed_date.month, 1)
+            in_window = abs((parsed_date - first_of_month).days) <= 11  # ~1.5 weeks
+
+        if in_window:
+            # Amount heuristics (±5%)
+            main_target = Decimal("2500")
+            loft_target = Decimal("1600")
+
+            main_low = main_target * Decimal("0.95")
+            main_high = main_target * Decimal("1.05")
+
+            loft_low = loft_target * Decimal("0.95")
+            loft_high = loft_target * Decimal("1.05")
+
+            if main_low <= amount <= main_high:
+                return "income", "Arnprior Rental Income (MAIN)"
+            if loft_low <= amount <= loft_high:
+                return "income", "Arnprior Rental Income (LOFT)"
+
+        # Fallback (your existing loose thresholds) — still only for E-TRANSFER deposits
+        if Decimal("2000") <= amount <= Decimal("2700"):
+            return "income", "Arnprior Rental Income (MAIN)"
+        elif amount < Decimal("2000"):
+            return "income", "Arnprior Rental Income (LOFT)"
+
+    return entry_type, income_source
+
+def apply_expense_rules(desc_upper, amount, category_cache, missing_categories, vendor_matcher=None):
+    if "E-TFR" in desc_upper and amount == EXACT_ETFR_SNOW_REMOVAL_AMOUNT:
+        return get_category_cached("Arnprior Snow Removal", category_cache, missing_categories)
+
+    if vendor_matcher is None:
+        vendor_matcher = get_vendor_matcher()
+
+    category_id = vendor_matcher.match(desc_upper)
+    if category_id is None:
+        return None
+    return get_category_by_id_cached(category_id, category_cache)
+
+def get_arnprior_shared_unit_id():
+    """
+    Best-effort lookup for the Arnprior shared/common unit.
+    Returns RentalUnit.id or None (never raises).
+    SQLite-safe: uses icontains instead of regex.
+    """
+    qs = RentalUnit.objects.select_related("property").filter(property__name__iexact="Arnprior")
+    unit = (
+        qs.filter(name__icontains="shared").order_by("name").first()
+        or qs.filter(name__icontains="common").order_by("name").first()
+    )
+    return unit.id if unit else None
+
+def get_foxview_shared_unit_id():
+    """
+    Best-effort lookup for the Foxview shared/common unit.
+    Returns RentalUnit.id or None (never raises).
+    """
+    qs = RentalUnit.objects.select_related("property").filter(property__name__iexact="Foxview")
+    unit = (
+        qs.filter(name__icontains="shared").order_by("name").first()
+        or qs.filter(name__icontains="common").order_by("name").first()
+    )
+    return unit.id if unit else None
+
+
+def build_import_preview(fileobj, bank_account=None, format_key=None, progress=None):
+    """
+    Parse an uploaded statement into review rows.
+
+    Args:
+        fileobj: binary file-like object, read line by line
+        bank_account: BankAccount the statement belongs to (for the overlap warning)
+        format_key: optional statement format key (auto-detected if omitted)
+        progress: optional callable(rows_done), called every PROGRESS_EVERY rows
+
+    Returns:
+        dict with "rows" (review-grid rows for home/import_review.py, JSON-safe), "messages"
+        ([level, text] pairs for the review page), "format", "earliest_date"
+        and "latest_date"
+
+    Raises:
+        UnsupportedStatementFormat: the file layout wasn't recognised
+    """
+    skipped_lines = []
+    statement_format, statement_rows = parse_statement(fileobj, format_key, skipped=skipped_lines)
+
+    initial_rows = []
+    notices = []
+    category_cache = {}
+    missing_categories = set()
+    vendor_matcher = get_vendor_matcher()
+    vendor_model = get_vendor_model()
+    hydro_candidates = []
+    earliest_date_in_file = None
+    latest_date_in_file = None
+
+    income_cat_cache = {c.name: c for c in IncomeCategory.objects.all()}
+    arnprior_shared_unit_id = get_arnprior_shared_unit_id()
+    foxview_shared_unit_id = get_foxview_shared_unit_id()
+
+    # Rows arrive already normalized (date parsed, amount positive,
+    # withdrawal -> expense / deposit -> income) from the format parser.
+    for rows_done, row in enumerate(statement_rows, start=1):
+        if progress and rows_done % PROGRESS_EVERY == 0:
+            progress(rows_done)
+
+        raw_desc = row.description
+        desc_upper = raw_desc.upper()
+
+        if "TFR-TO C/C" in desc_upper:
+            continue
+
+        parsed_date = row.date
+        amount = row.amount
+        entry_type_default = row.entry_type
+
+        if earliest_date_in_file is None or parsed_date < earliest_date_in_file:
+            earliest_date_in_file = parsed_date
+        if latest_date_in_file is None or parsed_date > latest_date_in_file:
+            latest_date_in_file = parsed_date
+
+        entry_type, income_source_name = apply_income_rules(desc_upper, amount, entry_type_default, parsed_date=parsed_date)
+
+
+        income_source_obj = None
+        if entry_type == "income" and income_source_name:
+            income_source_obj = income_cat_cache.get(income_source_name)
+            if income_source_obj is None:
+                income_source_obj, _ = IncomeCategory.objects.get_or_create(name=income_source_name)
+                income_cat_cache[income_source_name] = income_source_obj
+
+        expense_category = None
+        if entry_type == "expense":
+            expense_category = apply_expense_rules(
+                desc_upper, amount, category_cache, missing_categories, vendor_matcher
+            )
+
+        # No rule matched: fall back to the learned model (hydro is assigned below)
+        suggested_category = None
+        category_confidence = None
+        if (
+            entry_type == "expense"
+            and expense_category is None
+            and vendor_model is not None
+            and "HYDRO ONE" not in desc_upper
+        ):
+            predicted_id, confidence = vendor_model.predict(raw_desc, amount)
+            if predicted_id is not None:
+                suggested_category = get_category_by_id_cached(predicted_id, category_cache)
+                category_confidence = round(confidence * 100)
+                if suggested_category and confidence >= VENDOR_MODEL_MIN_CONFIDENCE:
+                    expense_category = suggested_category
+
+        if "HYDRO ONE" in desc_upper and entry_type == "expense":
+            hydro_candidates.append((len(initial_rows), amount))
+
+        expense_rental_unit_id = None
+        if entry_type == "expense" and expense_category:
+            category_upper = (expense_category.name or "").upper()
+
+            if "ARNPRIOR" in category_upper:
+                if arnprior_shared_unit_id:
+                    expense_rental_unit_id = arnprior_shared_unit_id
+
+            elif "FOXVIEW" in category_upper:
+                if foxview_shared_unit_id:
+                    expense_rental_unit_id = foxview_shared_unit_id
+
+        initial_rows.append({
+            "entry_type": entry_type,
+            "date": parsed_date.isoformat(),
+            "vendor_name": raw_desc or "Unknown Vendor",
+            "amount": str(amount),
+            "location": "Ottawa",
+            "notes": "",
+            "expense_category": expense_category.pk if expense_category else None,
+            "income_source": income_source_obj.pk if income_source_obj else None,
+            "income_rental_unit": (
+                income_source_obj.default_rental_unit_id if income_source_obj and income_source_obj.default_rental_unit_id else None),
+            "apply_to_withholding": False,
+            "is_withholding_payout": False,
+            "withholding_category": None,
+            "expense_rental_unit": expense_rental_unit_id,
+            # Display only (not form fields): learned-model guess for the review table
+            "suggested_category": suggested_category.pk if suggested_category else None,
+            "suggested_category_name": suggested_category.name if suggested_category else "",
+            "category_confidence": category_confidence,
+        })
+
+    if bank_account and earliest_date_in_file and latest_date_in_file:
+        overlapping = ImportBatch.objects.filter(
+            bank_account=bank_account,
+            earliest_date__lte=latest_date_in_file,
+            latest_date__gte=earliest_date_in_file,
+        )
+        if overlapping.exists():
+            ranges = "; ".join(f"{b.earliest_date} to {b.latest_date}" for b in overlapping)
+            notices.append([
+                messages.WARNING,
+                f"This CSV covers {earliest_date_in_file} to {latest_date_in_file}, "
+                f"which overlaps with existing imports for this account: {ranges}. "
+                f"Duplicates will be skipped where detected."
+            ])
+
+    if hydro_candidates:
+        if len(hydro_candidates) == 1:
+            idx, amt = hydro_candidates[0]
+            cat_name = "Foxview Hydro" if amt > Decimal("200.00") else "Arnprior Hydro"
+            cat = get_category_cached(cat_name, category_cache, missing_categories)
+            if cat:
+                initial_rows[idx]["expense_category"] = cat.pk
+        else:
+            sorted_by_amount = sorted(hydro_candidates, key=lambda x: x[1])
+            for idx, amt in sorted_by_amount:
+                if len(sorted_by_amount) == 2:
+                    cat_name = "Arnprior Hydro" if (idx, amt) == sorted_by_amount[0] else "Foxview Hydro"
+                else:
+                    cat_name = "Foxview Hydro" if amt > Decimal("200.00") else "Arnprior Hydro"
+                cat = get_category_cached(cat_name, category_cache, missing_categories)
+                if cat:
+                    initial_rows[idx]["expense_category"] = cat.pk
+
+    if skipped_lines:
+        shown = ", ".join(str(line) for line in skipped_lines[:SKIPPED_LINES_SHOWN])
+        more = len(skipped_lines) - SKIPPED_LINES_SHOWN
+        notices.append([
+            messages.WARNING,
+            f"Skipped {len(skipped_lines)} line(s) whose date couldn't be read: "
+            f"{shown}" + (f" and {more} more" if more > 0 else "") + "."
+        ])
+
+    if missing_categories:
+        missing_list = ", ".join(sorted(missing_categories))
+        notices.append([
+            messages.WARNING,
+            f"The following auto-mapped categories were not found in your database and were skipped: {missing_list}."
+        ])
+
+    return {
+        "format": statement_format.key,
+        "rows": initial_rows,
+        "messages": notices,
+        "earliest_date": earliest_date_in_file.isoformat() if earliest_date_in_file else None,
+        "latest_date": latest_date_in_file.isoformat() if latest_date_in_file else None,
+    }
@@ -0,0 +1,258 @@
+"""
+CSV import, step 2: the review grid.
+
+The review page ships every dropdown's options once (review_options()) plus the
+rows as a compact column/array payload (pack_review_rows()); the browser builds
+the grid and posts all rows back as a single JSON document. validate_review_rows()
+checks that document in one pass with one query per lookup table, no matter
+how many rows there are, and returns rows shaped like the old per-row form's
+cleaned_data so the commit code didn't have to change.
+"""
+
+import json
+from datetime import date
+from decimal import Decimal, InvalidOperation
+
+from .models import BankAccount, Category, IncomeCategory, RentalUnit, WithholdingCategory
+
+
+ENTRY_TYPE_CHOICES = [
+    ("expense", "Expense"),
+    ("income", "Income"),
+    ("transfer", "Transfer"),
+]
+
+# Row fields exchanged with the grid, in payload column order
+REVIEW_COLUMNS = (
+    "entry_type",
+    "date",
+    "vendor_name",
+    "amount",
+    "expense_category",
+    "expense_rental_unit",
+    "income_source",
+    "income_rental_unit",
+    "from_account",
+    "to_account",
+    "apply_to_withholding",
+    "is_withholding_payout",
+    "withholding_category",
+    "location",
+    "notes",
+    "split_group_id",
+    "is_split_child",
+    "skip",
+    # Display only: learned-model guess (see import_preview.py)
+    "suggested_category",
+    "suggested_category_name",
+    "category_confidence",
+)
+
+# Foreign-key columns -> model they point at
+_LOOKUPS = {
+    "expense_category": Category,
+    "expense_rental_unit": RentalUnit,
+    "income_source": IncomeCategory,
+    "income_rental_unit": RentalUnit,
+    "from_account": BankAccount,
+    "to_account": BankAccount,
+    "withholding_category": WithholdingCategory,
+}
+
+
+class ReviewPayloadError(ValueError):
+    """The posted review document couldn't be read at all."""
+
+
+def review_options():
+    """Every dropdown's [id, label] pairs, sent to the page once."""
+    return {
+        "entry_types": ENTRY_TYPE_CHOICES,
+        "categories": list(Category.objects.order_by("name").values_list("id", "name")),
+        "income_categories": list(IncomeCategory.objects.order_by("name").values_list("id", "name")),
+        "rental_units": [
+            [unit.id, str(unit)]
+            for unit in RentalUnit.objects.select_related("property").order_by("property__name", "name")
+        ],
+        "bank_accounts": [
+            [account.id, str(account)]
+            for account in BankAccount.objects.order_by("institution", "name")
+        ],
+        "withholding_categories": [
+            [bucket.id, str(bucket)]
+            for bucket in WithholdingCategory.objects.select_related("account").order_by("account__name", "name")
+        ],
+    }
+
+
+def pack_review_rows(rows):
+    """[{field: value}, ...] -> {"columns": [...], "rows": [[...], ...]}"""
+    return {
+        "columns": REVIEW_COLUMNS,
+        "rows": [[row.get(column) for column in REVIEW_COLUMNS] for row in rows],
+    }
+
+
+def review_payload(rows, errors=None):
+    """Everything the review grid needs, for json_script."""
+    payload = pack_review_rows(rows)
+    payload["options"] = review_options()
+    payload["errors"] = errors or []
+    return payload
+
+
+def parse_review_payload(text):
+    """Decode the posted grid: {"rows": [{field: value}, ...]}."""
+    try:
+        data = json.loads(text or "")
+    except ValueError:
+        raise ReviewPayloadError("The review data could not be read. Please start the import again.")
+
+    rows = data.get("rows") if isinstance(data, dict) else None
+    if not isinstance(rows, list) or not all(isinstance(row, dict) for row in rows):
+        raise ReviewPayloadError("The review data could not be read. Please start the import again.")
+    return rows
+
+
+def _text(value):
+    return "" if value is None else str(value).strip()
+
+
+def _flag(value):
+    if isinstance(value, str):
+        return value.lower() in ("1", "true", "on", "yes")
+    return bool(value)
+
+
+def _clean_amount(value):
+    """Same limits as the model fields: max 10 digits, 2 decimal places."""
+    try:
+        amount = Decimal(_text(value).replace(",", ""))
+    except InvalidOperation:
+        return None, "Enter a number."
+    if not amount.is_finite():
+        return None, "Enter a number."
+    sign, digits, exponent = amount.as_tuple()
+    decimals = max(0, -exponent)
+    if decimals > 2:
+        return None, "Ensure that there are no more than 2 decimal places."
+    if len(digits) - decimals > 8:
+        return None, "Ensure that there are no more than 10 digits in total."
+    return amount, None
+
+
+def validate_review_rows(rows):
+    """
+    Validate every posted row in one pass.
+
+    Args:
+        rows: list of {field: value} dicts from parse_review_payload()
+
+    Returns:
+        (cleaned, errors):
+            cleaned: list of dicts (model instances for foreign keys, date,
+                     Decimal amount, bools) in posted order; skipped rows are
+                     included with skip=True
+            errors: list of {"row": index, "field": name or None, "message": text}
+    """
+    lookups = {}
+    for model in set(_LOOKUPS.values()):
+        queryset = model.objects.all()
+        if model is WithholdingCategory:
+            queryset = queryset.select_related("account")
+        lookups[model] = queryset.in_bulk()
+
+    valid_entry_types = {value for value, _ in ENTRY_TYPE_CHOICES}
+    cleaned_rows = []
+    errors = []
+
+    for index, row in enumerate(rows):
+        def error(field, message):
+            errors.append({"row": index, "field": field, "message": message})
+
+        cd = {"skip": _flag(row.get("skip"))}
+        cleaned_rows.append(cd)
+        if cd["skip"]:
+            continue
+
+        entry_type = _text(row.get("entry_type"))
+        if entry_type not in valid_entry_types:
+            error("entry_type", "Select a valid choice.")
+        cd["entry_type"] = entry_type
+
+        raw_date = _text(row.get("date"))
+        try:
+            cd["date"] = date.fromisoformat(raw_date)
+        except ValueError:
+            cd["date"] = None
+            error("date", "Enter a valid date." if raw_date else "This field is required.")
+
+        vendor_name = _text(row.get("vendor_name"))
+        if not vendor_name:
+            error("vendor_name", "This field is required.")
+        elif len(vendor_name) > 255:
+            error("vendor_name", "Ensure this value has at most 255 characters.")
+        cd["vendor_name"] = vendor_name
+
+        cd["amount"], amount_error = _clean_amount(row.get("amount"))
+        if amount_error:
+            error("amount", amount_error if _text(row.get("amount")) else "This field is required.")
+
+        for field, model in _LOOKUPS.items():
+            raw = _text(row.get(field))
+            cd[field] = None
+            if not raw:
+                continue
+            try:
+                cd[field] = lookups[model].get(int(raw))
+            except ValueError:
+                pass
+            if cd[field] is None:
+                error(field, "Select a valid choice. That choice is not one of the available choices.")
+
+        location = _text(row.get("location")) or "Ottawa"
+        if len(location) > 100:
+            error("location", "Ensure this value has at most 100 characters.")
+        cd["location"] = location
+        cd["notes"] = _text(row.get("notes"))
+        cd["split_group_id"] = _text(row.get("split_group_id"))
+        cd["is_split_child"] = _flag(row.get("is_split_child"))
+        cd["apply_to_withholding"] = _flag(row.get("apply_to_withholding"))
+        cd["is_withholding_payout"] = _flag(row.get("is_withholding_payout"))
+
+        # Cross-field rules (formerly TransactionImportForm.clean)
+        apply_to_withholding = cd["apply_to_withholding"]
+        is_withholding_payout = cd["is_withholding_payout"]
+
+        if entry_type == "expense":
+            # For payout-only rows we do NOT require an expense_category
+            if not is_withholding_payout and not cd["expense_category"]:
+                error("expense_category", "Please select an expense category.")
+        elif entry_type == "income":
+            if not cd["income_source"]:
+                error("income_source", "Please select an income source.")
+
+            # For now we don't support withholding adjustments on income rows
+            if apply_to_withholding or is_withholding_payout:
+                error("entry_type", "Withholding adjustments are only supported on expense rows.")
+
+        elif entry_type == "transfer":
+            from_account = cd["from_account"]
+            to_account = cd["to_account"]
+
+            # At least one account required
+            if not from_account and not to_account:
+                error(None, "Transfer requires at least one account (from or to).")
+
+            # Prevent same-account transfers
+            if from_account and to_account and from_account == to_account:
+                error(None, "From and To accounts cannot be the same.")
+
+        # Withholding-specific validations
+        if (apply_to_withholding or is_withholding_payout) and not cd["withholding_category"]:
+            error("withholding_category", "Select a withholding bucket when adjusting withholding.")
+
+        if apply_to_withholding and is_withholding_payout:
+            error("is_withholding_payout", "Choose either a contribution OR a payout, not both.")
+
+    return cleaned_rows, errors
@@ -0,0 +1,85 @@
+"""
+Bank statement importers.
+
+    statement_format, rows = parse_statement(uploaded_file)
+    for row in rows:          # StatementRow(line_number, date, description, amount, entry_type, balance)
+        ...
+
+Formats register themselves in FORMATS (see td.py, generic.py). Pass a
+format key to force one, otherwise it's detected from the first row.
+"""
+
+from itertools import chain
+
+from .base import (
+    FORMATS,
+    BankFormat,
+    StatementRow,
+    UnsupportedStatementFormat,
+    date_parser,
+    format_choices,
+    iter_csv_rows,
+    parse_amount,
+    register_format,
+)
+from . import generic, td  # noqa: F401  (registers the built-in formats)
+
+
+def detect_format(first_row):
+    """Return the first registered format that recognises this row, or None."""
+    # Header-based formats first: a header row never looks like a TD data row
+    for fmt in sorted(FORMATS.values(), key=lambda f: f.key != generic.GenericHeaderFormat.key):
+        if fmt.sniff(first_row):
+            return fmt
+    return None
+
+
+def parse_statement(fileobj, format_key=None, skipped=None):
+    """
+    Start parsing an uploaded statement.
+
+    Args:
+        fileobj: binary file-like object (e.g. an UploadedFile), read line by line
+        format_key: optional FORMATS key; auto-detected when omitted
+        skipped: optional list that collects the line numbers of rows the
+                 format couldn't read (filled in as the rows are consumed)
+
+    Returns:
+        (BankFormat, generator of StatementRow)
+
+    Raises:
+        UnsupportedStatementFormat: empty file, unknown key, or unrecognised layout
+    """
+    rows = iter_csv_rows(fileobj)
+    try:
+        first = next(rows)
+    except StopIteration:
+        raise UnsupportedStatementFormat("The file is empty.")
+
+    if format_key:
+        statement_format = FORMATS.get(format_key)
+        if statement_format is None:
+            raise UnsupportedStatementFormat(f"Unknown statement format '{format_key}'.")
+    else:
+        statement_format = detect_format(first[1])
+        if statement_format is None:
+            raise UnsupportedStatementFormat(
+                "Couldn't recognise this CSV layout. Pick the bank format explicitly, "
+                "or export with a header row (Date, Description, Amount or Debit/Credit)."
+            )
+
+    return statement_format, statement_format.parse(chain([first], rows), skipped)
+
+
+__all__ = [
+    "FORMATS",
+    "BankFormat",
+    "StatementRow",
+    "UnsupportedStatementFormat",
+    "date_parser",
+    "detect_format",
+    "format_choices",
+    "parse_amount",
+    "parse_statement",
+    "register_format",
+]
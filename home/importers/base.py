@@ -0,0 +1,177 @@
+"""
+Shared building blocks for bank statement parsers.
+
+A statement format is a BankFormat subclass registered with @register_format.
+Each one knows how to recognise its own files (sniff) and turns csv rows into
+normalized StatementRow tuples with a generator (parse), so an upload is read
+one line at a time no matter how large it is.
+"""
+
+import csv
+from datetime import date, datetime
+from decimal import Decimal, InvalidOperation
+from functools import lru_cache
+from typing import NamedTuple, Optional
+
+
+class UnsupportedStatementFormat(ValueError):
+    """Raised when no registered format recognises an uploaded file."""
+
+
+class StatementRow(NamedTuple):
+    """One normalized transaction line from a bank statement."""
+    line_number: int
+    date: date
+    description: str
+    amount: Decimal              # always positive
+    entry_type: str              # "expense" (money out) or "income" (money in)
+    balance: Optional[Decimal]   # running balance if the bank provides one
+
+
+# =============================================================================
+# FORMAT REGISTRY
+# =============================================================================
+
+FORMATS = {}
+
+
+def register_format(cls):
+    """Class decorator: make a BankFormat available for upload/detection."""
+    FORMATS[cls.key] = cls()
+    return cls
+
+
+def format_choices():
+    return [(key, fmt.label) for key, fmt in FORMATS.items()]
+
+
+class BankFormat:
+    key = ""
+    label = ""
+
+    def sniff(self, first_row):
+        """Return True if a file whose first non-empty row is `first_row` is in this format."""
+        raise NotImplementedError
+
+    def parse(self, rows, skipped=None):
+        """
+        Yield StatementRow for each transaction in an iterable of (line_number, cells).
+
+        skipped: optional list; line numbers of rows whose date couldn't be
+                 read are appended to it so the review page can list them
+        """
+        raise NotImplementedError
+
+
+# =============================================================================
+# LINE DECODING
+# =============================================================================
+
+def iter_text_lines(fileobj):
+    """
+    Yield decoded text lines from a binary upload, one line at a time.
+
+    Each line is decoded as UTF-8 and falls back to latin-1 on its own, so one
+    stray accented vendor name (common in TD exports) doesn't force the whole
+    file into the wrong encoding. A leading UTF-8 BOM is dropped.
+    """
+    first = True
+    for raw in fileobj:
+        if isinstance(raw, str):
+            line = raw
+        else:
+            try:
+                line = raw.decode("utf-8")
+            except UnicodeDecodeError:
+                line = raw.decode("latin-1")
+        if first:
+            line = line.lstrip("\ufeff")
+            first = False
+        yield line
+
+
+def iter_csv_rows(fileobj):
+    """Yield (line_number, cells) for each non-blank csv row of a binary upload."""
+    reader = csv.reader(iter_text_lines(fileobj))
+    for cells in reader:
+        if not cells or all(not cell.strip() for cell in cells):
+            continue
+        yield reader.line_num, [cell.strip() for cell in cells]
+
+
+# =============================================================================
+# VALUE PARSING
+# =============================================================================
+
+def _parse_iso(value):
+    return date.fromisoformat(value)
+
+
+def _parse_mdy(value):
+    month, day, year = value.split("/")
+    return date(int(year), int(month), int(day))
+
+
+def _parse_dmy(value):
+    day, month, year = value.split("/")
+    return date(int(year), int(month), int(day))
+
+
+# Hand-written parsers for the common layouts; anything else goes through strptime.
+_FAST_DATE_PARSERS = {
+    "%Y-%m-%d": _parse_iso,
+    "%m/%d/%Y": _parse_mdy,
+    "%d/%m/%Y": _parse_dmy,
+}
+
+
+@lru_cache(maxsize=None)
+def date_parser(fmt):
+    """
+    Return a cached parser for one date format: str -> date, or None if the
+    value doesn't match. Results are memoized per format since a statement
+    repeats the same few dozen dates over thousands of rows.
+    """
+    fast = _FAST_DATE_PARSERS.get(fmt)
+
+    @lru_cache(maxsize=4096)
+    def parse(value):
+        try:
+            if fast is not None:
+                return fast(value)
+            return datetime.strptime(value, fmt).date()
+        except (ValueError, TypeError):
+            return None
+
+    return parse
+
+
+def parse_amount(value):
+    """
+    Parse a bank amount string ("1,234.56", "$12.00", "(45.10)") into a Decimal.
+    Returns None for blanks or anything unparseable.
+    """
+    value = (value or "").strip()
+    if not value:
+        return None
+    negative = value.startswith("(") and value.endswith(")")
+    value = value.strip("()").replace(",", "").replace("$", "").strip()
+    try:
+        amount = Decimal(value)
+    except InvalidOperation:
+        return None
+    return -amount if negative else amount
+
+
+def split_columns(withdrawal, deposit):
+    """
+    Normalize a withdrawal/deposit column pair into (amount, entry_type).
+
+    Same rules the importer has always used: a withdrawal wins if both are
+    filled in, and rows with neither are skipped (returns (None, None)).
+    """
+    if withdrawal is not None:
+        return abs(withdrawal), "expense"
+    if deposit is not None:
+        return abs(deposit), "income"
+    return None, None
@@ -0,0 +1,126 @@
+"""
+Generic CSV with a header row.
+
+Columns are matched by name, so most bank exports work as long as the first
+row names a date column, a description column and either a signed amount
+column or separate debit/credit columns. The date format is the one that
+reads the file's dates (see GenericHeaderFormat.parse); rows whose date it
+can't read are reported through `skipped`.
+"""
+
+from .base import (
+    BankFormat,
+    StatementRow,
+    date_parser,
+    parse_amount,
+    register_format,
+    split_columns,
+)
+
+
+HEADER_ALIASES = {
+    "date": ("date", "transaction date", "posted date", "posting date", "trans date"),
+    "description": ("description", "desc", "payee", "details", "memo", "name", "merchant", "transaction"),
+    "withdrawal": ("withdrawal", "withdrawals", "debit", "debits", "money out", "paid out"),
+    "deposit": ("deposit", "deposits", "credit", "credits", "money in", "paid in"),
+    "amount": ("amount", "transaction amount", "cad$", "cad"),
+    "balance": ("balance", "running balance"),
+}
+
+DATE_FORMATS = ("%Y-%m-%d", "%m/%d/%Y", "%d/%m/%Y", "%Y/%m/%d", "%d-%b-%Y", "%b %d, %Y", "%Y%m%d")
+
+
+def map_header(cells):
+    """Return {field: column index} for a header row, or None if it isn't one."""
+    columns = {}
+    for index, cell in enumerate(cells):
+        name = cell.strip().lower()
+        for field, aliases in HEADER_ALIASES.items():
+            if field not in columns and name in aliases:
+                columns[field] = index
+                break
+
+    has_amounts = "amount" in columns or "withdrawal" in columns or "deposit" in columns
+    if "date" in columns and "description" in columns and has_amounts:
+        return columns
+    return None
+
+
+@register_format
+class GenericHeaderFormat(BankFormat):
+    key = "generic_header"
+    label = "Other bank (CSV with header row)"
+
+    def sniff(self, first_row):
+        return map_header(first_row) is not None
+
+    def parse(self, rows, skipped=None):
+        rows = iter(rows)
+        columns = None
+        for _, cells in rows:
+            columns = map_header(cells)
+            if columns is not None:
+                break
+        if columns is None:
+            return
+
+        # Keep every format that fits all dates seen so far, holding rows back
+        # until one is left (e.g. 01/02/2025 fits both MM/DD and DD/MM, a later
+        # 13/02/2025 settles it). Dates no candidate can read don't narrow it.
+        candidates = DATE_FORMATS
+        held = []
+        for line_number, cells in rows:
+            if len(candidates) > 1:
+                raw_date = cell(cells, columns, "date")
+                candidates = tuple(fmt for fmt in candidates if date_parser(fmt)(raw_date) is not None) or candidates
+                held.append((line_number, cells))
+                if len(candidates) > 1:
+                    continue
+                yield from statement_rows(held, columns, date_parser(candidates[0]), skipped)
+                held = []
+            else:
+                yield from statement_rows([(line_number, cells)], columns, date_parser(candidates[0]), skipped)
+
+        # Still ambiguous at the end: the first format in DATE_FORMATS wins
+        yield from statement_rows(held, columns, date_parser(candidates[0]), skipped)
+
+
+def cell(cells, columns, field):
+    index = columns.get(field)
+    return cells[index] if index is not None and index < len(cells) else ""
+
+
+def statement_rows(rows, columns, parse_date, skipped=None):
+    """Yield a StatementRow per (line_number, cells); lines with an unreadable date go to `skipped`."""
+    for line_number, cells in rows:
+        parsed_date = parse_date(cell(cells, columns, "date"))
+        if parsed_date is None:
+            if skipped is not None:
+                skipped.append(line_number)
+            continue
+
+        if "amount" in columns:
+            # Signed amount: negative = money out
+            signed = parse_amount(cell(cells, columns, "amount"))
+            if signed is None:
+                continue
+            amount, entry_type = split_columns(
+                signed if signed < 0 else None,
+                signed if signed >= 0 else None,
+            )
+        else:
+            amount, entry_type = split_columns(
+                parse_amount(cell(cells, columns, "withdrawal")),
+                parse_amount(cell(cells, columns, "deposit")),
+            )
+        if amount is None:
+            continue
+
+        yield StatementRow(
+            line_number=line_number,
+            date=parsed_date,
+            description=cell(cells, columns, "description"),
+            amount=amount,
+            entry_type=entry_type,
+            balance=parse_amount(cell(cells, columns, "balance")),
+        )
@@ -0,0 +1,61 @@
+"""
+TD Canada Trust "account activity" CSV exports.
+
+Both exports have no header row and the same five columns:
+    date, description, withdrawal, deposit, balance
+Chequing uses ISO dates (sometimes quoted), the Aeroplan Visa uses MM/DD/YYYY.
+See import_statements/ for samples.
+"""
+
+from .base import (
+    BankFormat,
+    StatementRow,
+    date_parser,
+    parse_amount,
+    register_format,
+    split_columns,
+)
+
+
+class TDActivityFormat(BankFormat):
+    date_format = ""
+
+    def sniff(self, first_row):
+        return len(first_row) >= 4 and date_parser(self.date_format)(first_row[0]) is not None
+
+    def parse(self, rows, skipped=None):
+        parse_date = date_parser(self.date_format)
+
+        for line_number, cells in rows:
+            parsed_date = parse_date(cells[0]) if len(cells) >= 4 else None
+            if parsed_date is None:
+                if skipped is not None:
+                    skipped.append(line_number)
+                continue
+
+            amount, entry_type = split_columns(parse_amount(cells[2]), parse_amount(cells[3]))
+            if amount is None:
+                continue
+
+            yield StatementRow(
+                line_number=line_number,
+                date=parsed_date,
+                description=cells[1],
+                amount=amount,
+                entry_type=entry_type,
+                balance=parse_amount(cells[4]) if len(cells) > 4 else None,
+            )
+
+
+@register_format
+class TDChequingFormat(TDActivityFormat):
+    key = "td_chequing"
+    label = "TD chequing / savings"
+    date_format = "%Y-%m-%d"
+
+
+@register_format
+class TDAeroplanVisaFormat(TDActivityFormat):
+    key = "td_aeroplan_visa"
+    label = "TD Aeroplan Visa"
+    date_format = "%m/%d/%Y"
@@ -0,0 +1,309 @@
+"""
+Background runner for ImportJob (CSV statement parsing) and BackupJob
+(month-end backups).
+
+settings.IMPORT_JOB_RUNNER (BACKUP_JOB_RUNNER for backups) picks where jobs run:
+- "thread": a small in-process thread pool (IMPORT_JOB_WORKERS threads); the
+            upload request returns as soon as the file is saved
+- "queue":  jobs wait in the database for `python manage.py process_import_jobs`
+            (process_backup_jobs for backups)
+- "sync":   run inside the request (tests, debugging)
+
+Whichever runs a job first claims it with a conditional UPDATE, so a thread
+pool and the management command can safely share one queue.
+"""
+
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import close_old_connections, transaction
+from django.db.models import F, Q, TextField, Value
+from django.db.models.functions import Concat
+from django.utils import timezone
+
+from .backups import create_backup
+from .importers import UnsupportedStatementFormat
+from .import_preview import build_import_preview
+from .models import BackupJob, BackupJobStatus, ImportJob, ImportJobStatus, MonthEndClose
+
+logger = logging.getLogger(__name__)
+
+HEARTBEAT_INTERVAL = 30  # seconds between heartbeat_at writes while a backup runs
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def _get_executor():
+    global _executor
+
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=getattr(settings, "IMPORT_JOB_WORKERS", 2),
+                thread_name_prefix="import-job",
+            )
+        return _executor
+
+
+def enqueue_import_job(job):
+    """Hand a freshly created QUEUED job to the configured runner."""
+    runner = getattr(settings, "IMPORT_JOB_RUNNER", "thread")
+
+    if runner == "sync":
+        run_import_job(job.pk)
+    elif runner == "thread":
+        # Wait for the job row (and upload) to be committed before a worker looks for it
+        transaction.on_commit(lambda: _get_executor().submit(_run_in_thread, job.pk))
+    # "queue": process_import_jobs picks it up
+
+
+def _run_in_thread(job_id):
+    try:
+        run_import_job(job_id)
+    except Exception:
+        logger.exception("Import job %s crashed", job_id)
+    finally:
+        # Worker threads get their own DB connection; don't leak it
+        close_old_connections()
+
+
+def claim_job(job_id):
+    """Move a job from QUEUED to RUNNING. Returns False if someone else got it first."""
+    return bool(
+        ImportJob.objects.filter(pk=job_id, status=ImportJobStatus.QUEUED).update(
+            status=ImportJobStatus.RUNNING,
+            started_at=timezone.now(),
+            updated_at=timezone.now(),
+            rows_done=0,
+        )
+    )
+
+
+def count_lines(fileobj):
+    """Cheap line count used as the progress denominator."""
+    lines = 0
+    last = b""
+    for chunk in iter(lambda: fileobj.read(1 << 16), b""):
+        lines += chunk.count(b"\n")
+        last = chunk
+    if last and not last.endswith(b"\n"):
+        lines += 1
+    fileobj.seek(0)
+    return lines
+
+
+def run_import_job(job_id):
+    """
+    Parse one queued import job into review rows.
+
+    Returns:
+        bool: True if this call ran the job (False if it was already claimed)
+    """
+    if not claim_job(job_id):
+        return False
+
+    job = ImportJob.objects.select_related("bank_account").get(pk=job_id)
+
+    def report(rows_done):
+        ImportJob.objects.filter(pk=job_id).update(rows_done=rows_done, updated_at=timezone.now())
+
+    try:
+        with job.upload.open("rb") as fileobj:
+            total = count_lines(fileobj)
+            ImportJob.objects.filter(pk=job_id).update(rows_total=total)
+            result = build_import_preview(
+                fileobj,
+                bank_account=job.bank_account,
+                format_key=job.statement_format or None,
+                progress=report,
+            )
+    except UnsupportedStatementFormat as e:
+        _finish(job_id, ImportJobStatus.FAILED, error=str(e))
+        return True
+    except Exception as e:
+        logger.exception("Import job %s failed", job_id)
+        _finish(job_id, ImportJobStatus.FAILED, error=f"Unexpected error while reading the file: {e}")
+        return True
+
+    if not result["rows"]:
+        _finish(job_id, ImportJobStatus.FAILED, error="No valid transactions were found in the CSV (check the file format).")
+        return True
+
+    _finish(job_id, ImportJobStatus.READY, result=result, rows_done=total)
+    return True
+
+
+def _finish(job_id, status, **fields):
+    now = timezone.now()
+    ImportJob.objects.filter(pk=job_id).update(status=status, finished_at=now, updated_at=now, **fields)
+
+
+def requeue_stale_jobs(older_than):
+    """
+    Put RUNNING jobs that haven't reported progress since `older_than` back in
+    the queue (their worker process died, e.g. a gunicorn restart).
+    """
+    return ImportJob.objects.filter(
+        status=ImportJobStatus.RUNNING,
+        updated_at__lt=older_than,
+    ).update(status=ImportJobStatus.QUEUED, started_at=None, rows_done=0, updated_at=timezone.now())
+
+
+# =============================================================================
+# MONTH-END BACKUPS
+# =============================================================================
+
+def enqueue_backup_job(job):
+    """
+    Hand a freshly created QUEUED backup job to the configured runner.
+
+    Always deferred until the surrounding transaction commits: the backup
+    must see the MonthEndClose it belongs to, and SQLite's backup API can't
+    copy the database while this connection is mid-write.
+    """
+    runner = getattr(settings, "BACKUP_JOB_RUNNER", getattr(settings, "IMPORT_JOB_RUNNER", "thread"))
+
+    if runner == "sync":
+        transaction.on_commit(lambda: _run_backup_sync(job.pk))
+    elif runner == "thread":
+        transaction.on_commit(lambda: _submit_backup(job.pk))
+    # "queue": process_backup_jobs picks it up
+
+
+def _submit_backup(job_id):
+    _get_executor().submit(_run_backup_in_thread, job_id)
+
+
+def _run_backup_sync(job_id):
+    # Retries follow straight away rather than sleeping inside the request
+    while run_backup_job(job_id, ignore_delay=True):
+        pass
+
+
+def _run_backup_in_thread(job_id):
+    try:
+        run_backup_job(job_id)
+        _schedule_backup_retry(job_id)
+    except Exception:
+        logger.exception("Backup job %s crashed", job_id)
+    finally:
+        close_old_connections()
+
+
+def _schedule_backup_retry(job_id):
+    """
+    If the attempt just run put the job back in the queue, submit it again
+    once it's due; the wait happens on a timer, not on a pool worker.
+    """
+    next_attempt_at = (
+        BackupJob.objects.filter(pk=job_id, status=BackupJobStatus.QUEUED)
+        .values_list("next_attempt_at", flat=True)
+        .first()
+    )
+    if next_attempt_at:
+        delay = max((next_attempt_at - timezone.now()).total_seconds(), 0)
+        timer = threading.Timer(delay, _submit_backup, args=[job_id])
+        timer.daemon = True
+        timer.start()
+
+
+def run_backup_job(job_id, ignore_delay=False):
+    """
+    Run one attempt of a queued backup job.
+
+    A failed attempt puts the job back in the queue with next_attempt_at
+    BACKUP_JOB_RETRY_DELAY seconds ahead (doubling each time), until
+    job.max_attempts attempts have failed. Nothing sleeps in between: the
+    thread runner resubmits the job from a timer, process_backup_jobs picks
+    it up once it's due. While the backup runs, heartbeat_at is touched every
+    HEARTBEAT_INTERVAL seconds so requeue_stale_backup_jobs leaves it alone.
+
+    Args:
+        ignore_delay: claim a retry before its next_attempt_at (sync runner)
+
+    Returns:
+        bool: True if this call ran the job (False if it was already claimed,
+        finished or not due yet)
+    """
+    now = timezone.now()
+    queued = BackupJob.objects.filter(pk=job_id, status=BackupJobStatus.QUEUED)
+    if not ignore_delay:
+        queued = queued.filter(Q(next_attempt_at__isnull=True) | Q(next_attempt_at__lte=now))
+    claimed = queued.update(
+        status=BackupJobStatus.RUNNING,
+        attempts=F("attempts") + 1,
+        next_attempt_at=None,
+        started_at=now,
+        heartbeat_at=now,
+        updated_at=now,
+    )
+    if not claimed:
+        return False
+
+    job = BackupJob.objects.get(pk=job_id)
+    last_beat = time.monotonic()
+
+    def heartbeat():
+        nonlocal last_beat
+        if time.monotonic() - last_beat >= HEARTBEAT_INTERVAL:
+            BackupJob.objects.filter(pk=job_id).update(heartbeat_at=timezone.now())
+            last_beat = time.monotonic()
+
+    try:
+        manifest, info = create_backup(job.month, description=job.description, progress=heartbeat)
+    except Exception as e:
+        logger.exception("Backup job %s attempt %s failed", job_id, job.attempts)
+        error = "\n".join(filter(None, [job.error, f"Attempt {job.attempts}: {e}"]))
+        now = timezone.now()
+        if job.attempts < job.max_attempts:
+            delay = getattr(settings, "BACKUP_JOB_RETRY_DELAY", 5) * 2 ** (job.attempts - 1)
+            BackupJob.objects.filter(pk=job_id).update(
+                status=BackupJobStatus.QUEUED,
+                error=error,
+                next_attempt_at=now + timedelta(seconds=delay),
+                started_at=None,
+                updated_at=now,
+            )
+        else:
+            BackupJob.objects.filter(pk=job_id).update(
+                status=BackupJobStatus.FAILED,
+                error=error,
+                finished_at=now,
+                updated_at=now,
+            )
+        return True
+
+    now = timezone.now()
+    with transaction.atomic():
+        BackupJob.objects.filter(pk=job_id).update(
+            status=BackupJobStatus.DONE,
+            manifest=manifest,
+            result=info,
+            finished_at=now,
+            updated_at=now,
+        )
+        if job.month_close_id:
+            MonthEndClose.objects.filter(pk=job.month_close_id).update(backup_file=manifest)
+    return True
+
+
+def requeue_stale_backup_jobs(older_than):
+    """
+    Put RUNNING backup jobs with no heartbeat since `older_than` (their worker
+    died) back in the queue; the interrupted run counts as an attempt, so a
+    job that was on its last one is marked FAILED instead.
+    """
+    stale = BackupJob.objects.filter(status=BackupJobStatus.RUNNING, heartbeat_at__lt=older_than)
+    now = timezone.now()
+    stale.filter(attempts__gte=F("max_attempts")).update(
+        status=BackupJobStatus.FAILED,
+        error=Concat("error", Value("\nWorker stopped during the last attempt."), output_field=TextField()),
+        finished_at=now,
+        updated_at=now,
+    )
+    return stale.update(status=BackupJobStatus.QUEUED, started_at=None, updated_at=now)
@@ -0,0 +1,281 @@
+"""
+Balance ledger service.
+
+Every change to a tracked account's balance is journalled in
+BalanceLedgerEntry with the running balance after it, so:
+
+- balance_as_of(account, day) is one indexed lookup (latest entry on or
+  before the day), however much history the account has
+- a page of transactions gets its opening balance from that lookup and only
+  sums the rows on the page
+
+The signal handlers in home/signals.py append entries as transactions are
+created, edited (a reversal plus the new values) and deleted.
+rebuild_balance_ledger() regenerates the journal from the raw rows.
+"""
+
+from collections import defaultdict
+from datetime import timedelta
+from decimal import Decimal
+from operator import attrgetter
+
+from django.apps import apps as global_apps
+from django.db import transaction
+from django.db.models import CharField, F, Q, Sum, Value
+
+from .models import BalanceLedgerEntry, BankAccount, LedgerSource
+
+
+ZERO = Decimal("0.00")
+
+
+def balance_as_of(account_id, as_of):
+    """
+    Tracked balance of an account at the end of `as_of`.
+
+    Returns:
+        Decimal, or None if the account has no ledger (tracking disabled or
+        not rebuilt yet) or `as_of` is before its opening balance
+    """
+    return (
+        BalanceLedgerEntry.objects
+        .filter(bank_account_id=account_id, date__lte=as_of)
+        .order_by("-date", "-id")
+        .values_list("running_balance", flat=True)
+        .first()
+    )
+
+
+def append_ledger_entries(entries):
+    """
+    Insert new (unsaved) BalanceLedgerEntry rows and fix up running balances.
+
+    Entries on the same day as existing ones go after them. Per account this is
+    two reads, one bulk insert, a bulk update of existing entries inside the new
+    entries' date span and one UPDATE for everything after it, so back-dated
+    entries don't rewrite the tail row by row.
+
+    Each account's fixup runs in its own transaction with the BankAccount row
+    locked (select_for_update), so a failure can't leave half-shifted running
+    balances and concurrent appends to one account don't interleave.
+
+    Accounts with no ledger yet are skipped; rebuild_balance_ledger() starts one.
+
+    Returns:
+        int: number of entries written
+    """
+    by_account = defaultdict(list)
+    for entry in entries:
+        if entry.amount:
+            by_account[entry.bank_account_id].append(entry)
+
+    written = 0
+    # Accounts in id order, so two writers lock them in the same order
+    for account_id in sorted(by_account):
+        new_entries = by_account[account_id]
+        with transaction.atomic():
+            # Serialise writers per account: the fixup reads running balances
+            # and writes them back, so a concurrent append must wait
+            list(BankAccount.objects.select_for_update().filter(pk=account_id).values_list("pk", flat=True))
+            new_entries.sort(key=attrgetter("date"))  # stable: keeps arrival order within a day
+            first_date, last_date = new_entries[0].date, new_entries[-1].date
+            account_entries = BalanceLedgerEntry.objects.filter(bank_account_id=account_id)
+
+            base = (
+                account_entries.filter(date__lt=first_date)
+                .order_by("-date", "-id")
+                .values_list("running_balance", flat=True)
+                .first()
+            )
+            window = list(
+                account_entries.filter(date__range=(first_date, last_date))
+                .order_by("date", "id")
+                .only("id", "date", "amount", "running_balance")
+            )
+            if base is None and not window and not account_entries.exists():
+                continue
+
+            # Walk existing and new entries in ledger order
+            running = base if base is not None else ZERO
+            added = ZERO
+            shifted = []
+            pending = iter(new_entries)
+            entry = next(pending)
+            for existing in window + [None]:
+                while entry is not None and (existing is None or entry.date < existing.date):
+                    running += entry.amount
+                    added += entry.amount
+                    entry.running_balance = running
+                    entry = next(pending, None)
+                if existing is None:
+                    break
+                running += existing.amount
+                if added:
+                    existing.running_balance += added
+                    shifted.append(existing)
+
+            BalanceLedgerEntry.objects.bulk_create(new_entries, batch_size=500)
+            BalanceLedgerEntry.objects.bulk_update(shifted, ["running_balance"], batch_size=500)
+            account_entries.filter(date__gt=last_date).update(running_balance=F("running_balance") + added)
+            written += len(new_entries)
+
+    return written
+
+
+def net_changes_by_account(windows, apps=None):
+    """
+    Per-account totals of everything that moves a tracked balance, in one
+    UNION ALL query grouped by account and source.
+
+    Args:
+        windows: {account_id: (from_date, to_date)}; to_date may be None (no
+                 upper bound). Both ends are inclusive.
+        apps: app registry (for data migrations); defaults to the live one
+
+    Returns:
+        {account_id: {"income", "expenses", "transfers_in", "transfers_out",
+                      "adjustments", "net_change": Decimal}}; every account in
+        `windows` is present, with zeros if nothing matched
+    """
+    apps = apps or global_apps
+    Income = apps.get_model("home", "Income")
+    Expense = apps.get_model("home", "Expense")
+    Transfer = apps.get_model("home", "Transfer")
+    BalanceAdjustment = apps.get_model("home", "BalanceAdjustment")
+
+    sources = (
+        ("income", Income, "bank_account_id"),
+        ("expenses", Expense, "bank_account_id"),
+        ("transfers_in", Transfer, "to_account_id"),
+        ("transfers_out", Transfer, "from_account_id"),
+        ("adjustments", BalanceAdjustment, "bank_account_id"),
+    )
+    totals = {
+        account_id: {**{source: ZERO for source, _, _ in sources}, "net_change": ZERO}
+        for account_id in windows
+    }
+    if not windows:
+        return totals
+
+    querysets = []
+    for source, model, account_field in sources:
+        in_window = Q()
+        for account_id, (from_date, to_date) in windows.items():
+            window = Q(**{account_field: account_id, "date__gte": from_date})
+            if to_date is not None:
+                window &= Q(date__lte=to_date)
+            in_window |= window
+        querysets.append(
+            model.objects.filter(in_window)
+            .order_by()
+            .annotate(account=F(account_field), source=Value(source, output_field=CharField()))
+            .values("account", "source")
+            .annotate(total=Sum("amount"))
+            .values_list("account", "source", "total")
+        )
+
+    for account_id, source, total in querysets[0].union(*querysets[1:], all=True):
+        totals[account_id][source] += total or ZERO
+
+    for row in totals.values():
+        row["net_change"] = (
+            row["income"] - row["expenses"] + row["transfers_in"] - row["transfers_out"] + row["adjustments"]
+        )
+    return totals
+
+
+def tracking_baseline(account, net_change, apps=None):
+    """
+    Balance just before balance_tracking_start_date.
+
+    Same rule as recalculate_balances: the locked month-end snapshot for the
+    month before tracking started, else current_balance minus everything
+    tracked since.
+    """
+    apps = apps or global_apps
+    AccountSnapshot = apps.get_model("home", "AccountSnapshot")
+
+    prev_month_first = (account.balance_tracking_start_date.replace(day=1) - timedelta(days=1)).replace(day=1)
+    snapshot = (
+        AccountSnapshot.objects
+        .filter(month_close__month=prev_month_first, month_close__is_locked=True, bank_account_id=account.pk)
+        .values_list("balance", flat=True)
+        .first()
+    )
+    if snapshot is not None:
+        return snapshot
+    return account.current_balance - net_change
+
+
+def rebuild_balance_ledger(apps=None, account_ids=None):
+    """
+    Regenerate BalanceLedgerEntry from the raw Income/Expense/Transfer/
+    BalanceAdjustment rows: an opening entry the day before tracking starts,
+    then one entry per transaction leg in (date, kind, id) order.
+
+    Args:
+        apps: app registry to load models from (pass the migration's `apps`
+              when called from a data migration). Defaults to the live registry.
+        account_ids: optional iterable of BankAccount ids; defaults to all.
+                     Accounts without balance tracking end up with no entries.
+
+    Returns:
+        int: number of ledger entries written
+    """
+    apps = apps or global_apps
+    BankAccount = apps.get_model("home", "BankAccount")
+    Income = apps.get_model("home", "Income")
+    Expense = apps.get_model("home", "Expense")
+    Transfer = apps.get_model("home", "Transfer")
+    BalanceAdjustment = apps.get_model("home", "BalanceAdjustment")
+    Ledger = apps.get_model("home", "BalanceLedgerEntry")
+
+    accounts = BankAccount.objects.all()
+    if account_ids is not None:
+        accounts = accounts.filter(pk__in=list(account_ids))
+
+    Ledger.objects.filter(bank_account__in=accounts).delete()
+
+    written = 0
+    for account in accounts.filter(balance_tracking_enabled=True, balance_tracking_start_date__isnull=False):
+        start = account.balance_tracking_start_date
+
+        # (date, kind order, id, amount, source type); kind order matches bank_account_detail
+        legs = []
+        for queryset, sign, kind_order, source_type in (
+            (Income.objects.filter(bank_account=account), 1, 0, LedgerSource.INCOME),
+            (Transfer.objects.filter(to_account=account), 1, 1, LedgerSource.TRANSFER),
+            (Transfer.objects.filter(from_account=account), -1, 1, LedgerSource.TRANSFER),
+            (Expense.objects.filter(bank_account=account), -1, 2, LedgerSource.EXPENSE),
+            (BalanceAdjustment.objects.filter(bank_account=account), 1, 3, LedgerSource.ADJUSTMENT),
+        ):
+            for pk, day, amount in queryset.filter(date__gte=start).values_list("id", "date", "amount"):
+                if amount:
+                    legs.append((day, kind_order, pk, sign * amount, source_type))
+        legs.sort(key=lambda leg: leg[:3])
+
+        net_change = sum((leg[3] for leg in legs), ZERO)
+        running = tracking_baseline(account, net_change, apps=apps)
+
+        rows = [Ledger(
+            bank_account_id=account.pk,
+            date=start - timedelta(days=1),
+            amount=running,
+            running_balance=running,
+            source_type=LedgerSource.OPENING,
+        )]
+        for day, _, pk, amount, source_type in legs:
+            running += amount
+            rows.append(Ledger(
+                bank_account_id=account.pk,
+                date=day,
+                amount=amount,
+                running_balance=running,
+                source_type=source_type,
+                source_id=pk,
+            ))
+
+        Ledger.objects.bulk_create(rows, batch_size=500)
+        written += len(rows)
+
+    return written
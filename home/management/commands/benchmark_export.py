@@ -0,0 +1,140 @@
+"""
+Management command to compare export_data/import_data with dumpdata/loaddata.
+
+This command:
+1. Optionally seeds synthetic transactions (--rows) on top of the current data
+2. Times `dumpdata home --indent 2` (what backups used) and export_data, and
+   reports the size of each output
+3. Restores each output over the same data (loaddata vs import_data --replace)
+   and times it
+4. Rolls everything back, so the database is left exactly as it was
+"""
+
+import gzip
+import os
+import random
+import tempfile
+import time
+from datetime import date, timedelta
+from decimal import Decimal
+from io import BytesIO, StringIO
+
+from django.core.management import call_command
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from home.models import BankAccount, Category, Expense
+from home.native_export import export_home_data, import_home_data
+
+
+class BenchmarkRollback(Exception):
+    """Raised to abort the benchmark transaction once results are collected."""
+
+
+class Command(BaseCommand):
+    help = 'Compare size and speed of export_data/import_data against dumpdata/loaddata'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--rows',
+            type=int,
+            default=0,
+            help='Synthetic expenses to add before measuring (rolled back afterwards)',
+        )
+        parser.add_argument(
+            '--seed',
+            type=int,
+            default=42,
+            help='Random seed for reproducible data',
+        )
+
+    def handle(self, *args, **options):
+        results = {}
+        try:
+            with transaction.atomic():
+                if options['rows']:
+                    self._seed(options['rows'], random.Random(options['seed']))
+                results = self._measure()
+                raise BenchmarkRollback()
+        except BenchmarkRollback:
+            pass
+
+        self.stdout.write(self.style.MIGRATE_HEADING("\n=== SUMMARY ==="))
+        self.stdout.write(f"{'format':<28} {'size':>12} {'export s':>10} {'restore s':>10}")
+        for name, (size, export_seconds, restore_seconds) in results.items():
+            self.stdout.write(f"{name:<28} {size/1024:>10.1f}KB {export_seconds:>10.3f} {restore_seconds:>10.3f}")
+
+        dump_size, dump_export, dump_restore = results['dumpdata (indent=2)']
+        native_size, native_export, native_restore = results['export_data (ndjson.gz)']
+        self.stdout.write(
+            f"\nexport_data is {dump_size / max(native_size, 1):.1f}x smaller, "
+            f"{dump_export / max(native_export, 1e-9):.1f}x faster to export and "
+            f"{dump_restore / max(native_restore, 1e-9):.1f}x faster to restore"
+        )
+        self.stdout.write(self.style.SUCCESS("\nOK Benchmark complete, all changes rolled back"))
+
+    def _seed(self, rows, rng):
+        self.stdout.write(f"Seeding {rows:,} synthetic expenses...")
+        categories = Category.objects.bulk_create([
+            Category(name=f"Bench category {i}", monthly_limit=Decimal("250.00")) for i in range(20)
+        ])
+        accounts = BankAccount.objects.bulk_create([BankAccount(name=f"Bench account {i}") for i in range(4)])
+        start = date.today() - timedelta(days=5 * 365)
+        Expense.objects.bulk_create(
+            (
+                Expense(
+                    date=start + timedelta(days=rng.randrange(5 * 365)),
+                    vendor_name=f"Bench vendor {rng.randrange(500)}",
+                    category=rng.choice(categories),
+                    amount=Decimal(rng.randrange(100, 50_000)) / 100,
+                    bank_account=rng.choice(accounts),
+                    notes="Synthetic row for benchmark_export",
+                )
+                for _ in range(rows)
+            ),
+            batch_size=2000,
+        )
+
+    def _measure(self):
+        results = {}
+
+        # dumpdata / loaddata, as the old month-end backup did
+        self.stdout.write("Running dumpdata...")
+        started = time.perf_counter()
+        dump = StringIO()
+        call_command('dumpdata', 'home', indent=2, stdout=dump)
+        dump_export = time.perf_counter() - started
+        dump_bytes = dump.getvalue().encode('utf-8')
+
+        with tempfile.TemporaryDirectory() as tmp:
+            fixture = os.path.join(tmp, 'benchmark.json')
+            with open(fixture, 'wb') as f:
+                f.write(dump_bytes)
+
+            self.stdout.write("Running loaddata...")
+            with transaction.atomic():
+                started = time.perf_counter()
+                call_command('loaddata', fixture, verbosity=0)
+                dump_restore = time.perf_counter() - started
+                transaction.set_rollback(True)
+
+        results['dumpdata (indent=2)'] = (len(dump_bytes), dump_export, dump_restore)
+        results['dumpdata gzipped'] = (len(gzip.compress(dump_bytes)), dump_export, dump_restore)
+
+        # export_data / import_data
+        self.stdout.write("Running export_data...")
+        started = time.perf_counter()
+        native = BytesIO()
+        export_home_data(native)
+        native_export = time.perf_counter() - started
+
+        self.stdout.write("Running import_data --replace...")
+        with transaction.atomic():
+            native.seek(0)
+            started = time.perf_counter()
+            import_home_data(native, replace=True)
+            native_restore = time.perf_counter() - started
+            transaction.set_rollback(True)
+
+        results['export_data (ndjson.gz)'] = (len(native.getvalue()), native_export, native_restore)
+        return results
@@ -0,0 +1,284 @@
+"""
+Management command to benchmark the date-range indexes on Expense, Income and Transfer.
+
+This command:
+1. Seeds ~200k synthetic transactions (configurable with --rows) spread over
+   five years, dozens of categories, accounts, buckets and rental units
+2. Runs the filters behind the busiest views (month listings, category and
+   income category history, account detail, bucket detail, rental property
+   detail) and reports the query plan and timings with the indexes in place
+3. Drops the indexes and repeats the same queries
+4. Rolls everything back - seeded rows and dropped indexes included - so the
+   database is left exactly as it was
+
+Dropping the indexes happens inside the benchmark transaction, so this needs a
+backend with transactional DDL (SQLite, PostgreSQL).
+"""
+
+import random
+import time
+from datetime import date, timedelta
+from decimal import Decimal
+from statistics import median
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+
+from home.models import (
+    BankAccount,
+    Category,
+    Expense,
+    Income,
+    IncomeCategory,
+    RentalProperty,
+    RentalUnit,
+    Transfer,
+    WithholdingCategory,
+)
+
+
+class BenchmarkRollback(Exception):
+    """Raised to abort the benchmark transaction once results are collected."""
+
+
+INDEXED_MODELS = (Expense, Income, Transfer)
+
+
+class Command(BaseCommand):
+    help = 'Seed synthetic transactions and compare query plans/timings with and without date-range indexes'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--rows',
+            type=int,
+            default=200_000,
+            help='Total synthetic transactions to seed (split across expenses, income and transfers)',
+        )
+        parser.add_argument(
+            '--repeat',
+            type=int,
+            default=5,
+            help='Times to run each query per phase (median is reported)',
+        )
+        parser.add_argument(
+            '--seed',
+            type=int,
+            default=42,
+            help='Random seed for reproducible data',
+        )
+        parser.add_argument(
+            '--no-plans',
+            action='store_true',
+            help='Only report timings, skip EXPLAIN output',
+        )
+
+    def handle(self, *args, **options):
+        if not connection.features.can_rollback_ddl:
+            raise CommandError(
+                f"{connection.vendor} cannot roll back DDL; refusing to drop indexes on this database."
+            )
+
+        self.repeat = max(1, options['repeat'])
+        self.show_plans = not options['no_plans']
+        self.rng = random.Random(options['seed'])
+
+        try:
+            with transaction.atomic():
+                fixtures = self._seed(options['rows'])
+                queries = self._queries(fixtures)
+
+                self.stdout.write(self.style.MIGRATE_HEADING("\n=== WITH INDEXES ==="))
+                with_indexes = self._run(queries, phase=1)
+
+                dropped = self._drop_indexes()
+                self.stdout.write(self.style.MIGRATE_HEADING(f"\n=== WITHOUT INDEXES ({dropped} dropped) ==="))
+                without_indexes = self._run(queries, phase=2)
+
+                raise BenchmarkRollback()
+        except BenchmarkRollback:
+            pass
+
+        self.stdout.write(self.style.MIGRATE_HEADING("\n=== SUMMARY (median ms) ==="))
+        self.stdout.write(f"{'query':<34} {'no index':>10} {'indexed':>10} {'speedup':>8}")
+        for name, _ in queries:
+            before = without_indexes[name]
+            after = with_indexes[name]
+            speedup = f"{before / after:.1f}x" if after else "-"
+            self.stdout.write(f"{name:<34} {before:>10.2f} {after:>10.2f} {speedup:>8}")
+
+        self.stdout.write(self.style.SUCCESS("\nOK Benchmark complete, all seeded data and index changes rolled back"))
+
+    # ------------------------------------------------------------------
+    # Seeding
+    # ------------------------------------------------------------------
+
+    def _seed(self, rows):
+        rng = self.rng
+        self.stdout.write(f"Seeding {rows:,} synthetic transactions...")
+        started = time.perf_counter()
+
+        categories = Category.objects.bulk_create([
+            Category(name=f"Bench category {i}", monthly_limit=Decimal("250.00")) for i in range(40)
+        ])
+        income_categories = IncomeCategory.objects.bulk_create([
+            IncomeCategory(name=f"Bench income {i}") for i in range(10)
+        ])
+        accounts = BankAccount.objects.bulk_create([
+            BankAccount(name=f"Bench account {i}") for i in range(8)
+        ])
+        bucket_account = BankAccount.objects.create(name="Bench withholding", is_withholding_account=True)
+        buckets = WithholdingCategory.objects.bulk_create([
+            WithholdingCategory(account=bucket_account, name=f"Bench bucket {i}") for i in range(12)
+        ])
+        properties = RentalProperty.objects.bulk_create([
+            RentalProperty(name=f"Bench property {i}") for i in range(3)
+        ])
+        units = RentalUnit.objects.bulk_create([
+            RentalUnit(property=prop, name=f"Unit {j}") for prop in properties for j in range(2)
+        ])
+
+        end = date.today()
+        start = end - timedelta(days=5 * 365)
+        span = (end - start).days
+
+        def random_date():
+            return start + timedelta(days=rng.randrange(span))
+
+        def random_amount():
+            return Decimal(rng.randrange(100, 50_000)) / 100
+
+        expense_rows = rows * 6 // 10
+        income_rows = rows * 2 // 10
+        transfer_rows = rows - expense_rows - income_rows
+
+        Expense.objects.bulk_create(
+            (
+                Expense(
+                    date=random_date(),
+                    vendor_name="Bench vendor",
+                    category=rng.choice(categories),
+                    amount=random_amount(),
+                    bank_account=rng.choice(accounts),
+                    withholding_category=rng.choice(buckets) if rng.random() < 0.05 else None,
+                    rental_unit=rng.choice(units) if rng.random() < 0.1 else None,
+                )
+                for _ in range(expense_rows)
+            ),
+            batch_size=2000,
+        )
+        Income.objects.bulk_create(
+            (
+                Income(
+                    date=random_date(),
+                    amount=random_amount(),
+                    income_category=rng.choice(income_categories),
+                    bank_account=rng.choice(accounts),
+                    rental_unit=rng.choice(units) if rng.random() < 0.2 else None,
+                )
+                for _ in range(income_rows)
+            ),
+            batch_size=2000,
+        )
+        Transfer.objects.bulk_create(
+            (
+                Transfer(
+                    date=random_date(),
+                    amount=random_amount(),
+                    from_account=rng.choice(accounts),
+                    to_account=bucket_account if rng.random() < 0.3 else rng.choice(accounts),
+                    withholding_category=rng.choice(buckets) if rng.random() < 0.3 else None,
+                )
+                for _ in range(transfer_rows)
+            ),
+            batch_size=2000,
+        )
+
+        # Refresh planner statistics so the plans reflect the seeded volume
+        if connection.vendor in ("sqlite", "postgresql"):
+            with connection.cursor() as cursor:
+                cursor.execute("ANALYZE")
+
+        self.stdout.write(self.style.SUCCESS(
+            f"OK Seeded {expense_rows:,} expenses, {income_rows:,} income, {transfer_rows:,} transfers "
+            f"in {time.perf_counter() - started:.1f}s"
+        ))
+
+        month_start = date(end.year, end.month, 1) - timedelta(days=90)
+        month_start = date(month_start.year, month_start.month, 1)
+        month_end = (month_start + timedelta(days=32)).replace(day=1) - timedelta(days=1)
+
+        return {
+            "month": (month_start, month_end),
+            "year": (date(end.year - 1, 1, 1), date(end.year - 1, 12, 31)),
+            "category": categories[0],
+            "income_category": income_categories[0],
+            "account": accounts[0],
+            "bucket": buckets[0],
+            "property": properties[0],
+        }
+
+    # ------------------------------------------------------------------
+    # Queries (mirroring the filters in home/views.py)
+    # ------------------------------------------------------------------
+
+    def _queries(self, f):
+        month = f["month"]
+        year = f["year"]
+        return [
+            ("dashboard expenses (month)",
+             lambda: Expense.objects.filter(date__range=month).order_by("date", "id")),
+            ("dashboard transfers (month)",
+             lambda: Transfer.objects.filter(date__range=month, parent_transfer__isnull=True)),
+            ("category_expense_list (month)",
+             lambda: Expense.objects.filter(category=f["category"], date__range=month).order_by("-date", "-id")),
+            ("income_category_list (year)",
+             lambda: Income.objects.filter(income_category=f["income_category"], date__range=year)),
+            ("bank_account_detail expenses",
+             lambda: Expense.objects.filter(bank_account=f["account"], date__range=year)),
+            ("bank_account_detail transfers out",
+             lambda: Transfer.objects.filter(from_account=f["account"], date__range=year)),
+            ("withholding bucket expenses",
+             lambda: Expense.objects.filter(withholding_category=f["bucket"], date__range=year)),
+            ("withholding bucket transfers",
+             lambda: Transfer.objects.filter(withholding_category=f["bucket"], date__range=year)),
+            ("rental_property_detail income",
+             lambda: Income.objects.filter(rental_unit__property=f["property"], date__range=month)),
+            ("rental_property_detail expenses",
+             lambda: Expense.objects.filter(rental_unit__property=f["property"], date__range=month)),
+        ]
+
+    def _run(self, queries, phase):
+        # The sqlite3 driver caches prepared statements by SQL text and keeps
+        # reusing their plans after DROP INDEX on the same connection, so make
+        # each phase's SQL distinct with a no-op predicate.
+        def build_for_phase(build):
+            return build().extra(where=[f"{phase} = {phase}"])
+
+        timings = {}
+        for name, build in queries:
+            qs = build_for_phase(build)
+            if self.show_plans:
+                self.stdout.write(self.style.HTTP_INFO(f"\n{name}"))
+                for line in qs.explain().splitlines():
+                    self.stdout.write(f"    {line}")
+
+            samples = []
+            for _ in range(self.repeat):
+                started = time.perf_counter()
+                list(build_for_phase(build))
+                samples.append((time.perf_counter() - started) * 1000)
+            timings[name] = median(samples)
+            self.stdout.write(f"  {name:<34} {timings[name]:>8.2f} ms")
+        return timings
+
+    def _drop_indexes(self):
+        # Not used as a context manager: the SQLite editor refuses to enter inside
+        # an atomic block, but plain DROP INDEX statements are safe here and are
+        # undone by the surrounding rollback.
+        editor = connection.schema_editor(atomic=False)
+        dropped = 0
+        for model in INDEXED_MODELS:
+            for index in model._meta.indexes:
+                editor.remove_index(model, index)
+                dropped += 1
+        return dropped
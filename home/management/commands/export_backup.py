@@ -0,0 +1,74 @@
+"""
+Management command to export a month-end backup as a single zip archive.
+
+This command:
+1. Reads the backup's manifest from the backup store (home/backups.py)
+2. Streams README.txt, the JSON export, the database and media/ into a zip,
+   entry by entry from the stored blobs (no staging directory)
+3. Stores images/PDFs uncompressed; everything else uses --compression/--level
+
+Use this for offsite copies: `export_backup --latest -o - | ssh host 'cat > backup.zip'`
+"""
+
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+
+from home.backups import ARCHIVE_COMPRESSION, BackupError, BackupStore, write_backup_archive
+
+
+class Command(BaseCommand):
+    help = 'Export a month-end backup from the backup store as a zip archive'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'backup',
+            nargs='?',
+            help='Manifest name (MonthEndClose.backup_file), e.g. monthend_2025-01_20250201_093000',
+        )
+        parser.add_argument(
+            '--latest',
+            action='store_true',
+            help='Export the most recent backup',
+        )
+        parser.add_argument(
+            '-o', '--output',
+            help='Zip file to write, or - for stdout. Defaults to <backup>.zip in the current directory.',
+        )
+        parser.add_argument(
+            '--compression',
+            choices=sorted(ARCHIVE_COMPRESSION),
+            default='deflate',
+            help='Compression for files that are not already compressed (default: deflate)',
+        )
+        parser.add_argument(
+            '--level',
+            type=int,
+            help='Compression level (deflate 0-9, bzip2 1-9)',
+        )
+
+    def handle(self, *args, **options):
+        store = BackupStore()
+        name = options['backup']
+
+        if options['latest']:
+            manifests = sorted(store.manifests.glob('*.json'), key=lambda path: path.stat().st_mtime)
+            if not manifests:
+                raise CommandError("No backups in the store yet.")
+            name = manifests[-1].stem
+        elif not name:
+            raise CommandError("Give a backup name or --latest.")
+
+        output = options['output'] or f'{name}.zip'
+        try:
+            if output == '-':
+                write_backup_archive(name, sys.stdout.buffer, options['compression'], options['level'], store=store)
+                return
+            with open(output, 'wb') as f:
+                manifest = write_backup_archive(name, f, options['compression'], options['level'], store=store)
+        except BackupError as e:
+            raise CommandError(str(e))
+
+        self.stdout.write(self.style.SUCCESS(
+            f"OK Exported {name} ({manifest['total_size']/1024/1024:.1f} MB of files) to {output}"
+        ))
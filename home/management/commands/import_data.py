@@ -0,0 +1,49 @@
+"""
+Management command to restore an export_data file.
+
+This command:
+1. Checks the home tables are empty (or deletes their rows with --replace)
+2. Inserts each model's rows in batches, in one transaction, without running
+   model code: signals don't fire and timestamps are kept as exported
+3. Resets primary key sequences (PostgreSQL)
+
+Run `python manage.py migrate` first on a fresh database.
+"""
+
+import sys
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from home.native_export import ExportFormatError, import_home_data
+
+
+class Command(BaseCommand):
+    help = 'Restore the home app from an export_data file'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'path',
+            help='File written by export_data (or - for stdin)',
+        )
+        parser.add_argument(
+            '--replace',
+            action='store_true',
+            help='Delete all existing home data first',
+        )
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        try:
+            if options['path'] == '-':
+                counts = import_home_data(sys.stdin.buffer, replace=options['replace'])
+            else:
+                with open(options['path'], 'rb') as f:
+                    counts = import_home_data(f, replace=options['replace'])
+        except (ExportFormatError, OSError) as e:
+            raise CommandError(str(e))
+
+        self.stdout.write(self.style.SUCCESS(
+            f"OK Restored {sum(counts.values()):,} rows into {len(counts)} tables "
+            f"in {time.perf_counter() - started:.2f}s"
+        ))
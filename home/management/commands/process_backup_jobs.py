@@ -0,0 +1,82 @@
+"""
+Management command to run queued month-end backup jobs.
+
+This command:
+1. Requeues RUNNING backup jobs whose heartbeat stopped (dead worker)
+2. Claims QUEUED jobs that are due oldest first and runs one attempt of each
+   (a failed attempt goes back in the queue until its next_attempt_at)
+3. Repeats every --poll-interval seconds unless --once is given
+
+Use it with BACKUP_JOB_RUNNER=queue to keep backups out of the web workers
+entirely, e.g. as a separate process next to gunicorn.
+"""
+
+import time
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.db.models import Q
+from django.utils import timezone
+
+from home.jobs import requeue_stale_backup_jobs, run_backup_job
+from home.models import BackupJob, BackupJobStatus
+
+
+class Command(BaseCommand):
+    help = 'Process queued month-end backup jobs'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--once',
+            action='store_true',
+            help='Process whatever is queued, then exit',
+        )
+        parser.add_argument(
+            '--poll-interval',
+            type=float,
+            default=5.0,
+            help='Seconds to wait between queue checks (default: 5)',
+        )
+        parser.add_argument(
+            '--stale-after',
+            type=int,
+            default=60,
+            help='Requeue RUNNING jobs with no heartbeat for this many minutes (default: 60)',
+        )
+
+    def handle(self, *args, **options):
+        processed = 0
+
+        while True:
+            requeued = requeue_stale_backup_jobs(timezone.now() - timedelta(minutes=options['stale_after']))
+            if requeued:
+                self.stdout.write(self.style.WARNING(f"Requeued {requeued} stalled backup job(s)"))
+
+            queued = list(
+                BackupJob.objects.filter(status=BackupJobStatus.QUEUED)
+                .filter(Q(next_attempt_at__isnull=True) | Q(next_attempt_at__lte=timezone.now()))
+                .order_by('created_at')
+                .values_list('pk', flat=True)
+            )
+            for job_id in queued:
+                if not run_backup_job(job_id):
+                    continue  # another worker claimed it
+                processed += 1
+                job = BackupJob.objects.get(pk=job_id)
+                if job.status == BackupJobStatus.DONE:
+                    self.stdout.write(self.style.SUCCESS(
+                        f"Backup job {job.pk} ({job.month}): {job.manifest} after {job.attempts} attempt(s)"
+                    ))
+                elif job.status == BackupJobStatus.QUEUED:
+                    self.stdout.write(self.style.WARNING(
+                        f"Backup job {job.pk} ({job.month}) attempt {job.attempts} failed, "
+                        f"retrying at {job.next_attempt_at:%H:%M:%S}"
+                    ))
+                else:
+                    self.stdout.write(self.style.WARNING(f"Backup job {job.pk} ({job.month}) failed: {job.error}"))
+
+            if options['once']:
+                break
+            time.sleep(options['poll_interval'])
+
+        self.stdout.write(self.style.SUCCESS(f"Processed {processed} backup job(s)"))
@@ -0,0 +1,75 @@
+"""
+Management command to run queued CSV import jobs.
+
+This command:
+1. Requeues RUNNING jobs that stopped reporting progress (dead worker)
+2. Claims QUEUED jobs oldest first and parses each into review rows
+3. Repeats every --poll-interval seconds unless --once is given
+
+Use it with IMPORT_JOB_RUNNER=queue to keep parsing out of the web workers
+entirely, e.g. as a separate process next to gunicorn. It is also safe to run
+alongside the default in-process thread pool.
+"""
+
+import time
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from home.jobs import requeue_stale_jobs, run_import_job
+from home.models import ImportJob, ImportJobStatus
+
+
+class Command(BaseCommand):
+    help = 'Process queued CSV import jobs'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--once',
+            action='store_true',
+            help='Process whatever is queued, then exit',
+        )
+        parser.add_argument(
+            '--poll-interval',
+            type=float,
+            default=2.0,
+            help='Seconds to wait between queue checks (default: 2)',
+        )
+        parser.add_argument(
+            '--stale-after',
+            type=int,
+            default=15,
+            help='Requeue RUNNING jobs with no progress for this many minutes (default: 15)',
+        )
+
+    def handle(self, *args, **options):
+        processed = 0
+
+        while True:
+            requeued = requeue_stale_jobs(timezone.now() - timedelta(minutes=options['stale_after']))
+            if requeued:
+                self.stdout.write(self.style.WARNING(f"Requeued {requeued} stalled job(s)"))
+
+            queued = list(
+                ImportJob.objects.filter(status=ImportJobStatus.QUEUED)
+                .order_by('created_at')
+                .values_list('pk', flat=True)
+            )
+            for job_id in queued:
+                if not run_import_job(job_id):
+                    continue  # another worker claimed it
+                processed += 1
+                job = ImportJob.objects.get(pk=job_id)
+                if job.status == ImportJobStatus.READY:
+                    self.stdout.write(self.style.SUCCESS(
+                        f"Job {job.pk} ({job.filename}): {len(job.result.get('rows', []))} rows ready for review"
+                    ))
+                else:
+                    self.stdout.write(self.style.WARNING(f"Job {job.pk} ({job.filename}) failed: {job.error}"))
+
+            if options['once']:
+                break
+            time.sleep(options['poll_interval'])
+
+        self.stdout.write(self.style.SUCCESS(f"Processed {processed} import job(s)"))
@@ -0,0 +1,58 @@
+"""
+Management command to regenerate the BalanceLedgerEntry journal.
+
+This command:
+1. Deletes the ledger entries of the selected accounts
+2. Writes an opening entry (the balance before balance_tracking_start_date)
+   for each tracked account, then one entry per transaction leg since
+3. Reports each account's ledger balance against current_balance
+
+Signals keep the ledger current during normal use; run this after bulk edits
+made outside the ORM (raw SQL, queryset.update()).
+"""
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from home.ledger import rebuild_balance_ledger
+from home.models import BankAccount
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the per-account balance ledger from raw transactions'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--account',
+            type=int,
+            action='append',
+            help='Only rebuild this account ID (can be repeated). Defaults to all.',
+        )
+
+    def handle(self, *args, **options):
+        account_ids = options['account']
+
+        try:
+            with transaction.atomic():
+                written = rebuild_balance_ledger(account_ids=account_ids)
+        except Exception as e:
+            raise CommandError(f"Ledger rebuild failed: {e}")
+
+        accounts = BankAccount.objects.filter(balance_tracking_enabled=True).order_by('name')
+        if account_ids:
+            accounts = accounts.filter(pk__in=account_ids)
+
+        for account in accounts:
+            ledger_balance = account.ledger_entries.order_by('-date', '-id').values_list(
+                'running_balance', flat=True
+            ).first()
+            if ledger_balance is None:
+                self.stdout.write(self.style.WARNING(f"  {account.name}: no tracking start date, skipped"))
+                continue
+
+            line = f"  {account.name[:30]:<30} ledger ${ledger_balance:>12,.2f}  current ${account.current_balance:>12,.2f}"
+            if ledger_balance != account.current_balance:
+                line = self.style.WARNING(line + "  (run recalculate_balances)")
+            self.stdout.write(line)
+
+        self.stdout.write(self.style.SUCCESS(f"\nWrote {written} ledger entries"))
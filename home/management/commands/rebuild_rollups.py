@@ -0,0 +1,84 @@
+"""
+Management command to regenerate the MonthlyCategoryRollup table.
+
+This command:
+1. Runs one grouped query per rollup dimension over all Expense, Income and
+   Transfer rows
+2. Replaces the existing rollup rows for those dimensions in a single transaction
+3. Bumps every month's data version so cached month pages are rebuilt
+4. Reports any months whose totals differed from what was stored
+
+Signals keep the table current during normal use; run this after bulk edits made
+outside the ORM (raw SQL, queryset.update()) or if the totals ever look off.
+"""
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from home.models import MonthlyCategoryRollup, RollupDimension
+from home.rollups import rebuild_monthly_rollups
+from home.versions import bump_all_month_versions
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the monthly rollup totals from raw transactions'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--dimension',
+            action='append',
+            choices=RollupDimension.values,
+            help='Only rebuild this dimension (can be repeated). Defaults to all.',
+        )
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Show what would change without saving',
+        )
+
+    def handle(self, *args, **options):
+        dimensions = options['dimension'] or RollupDimension.values
+        dry_run = options['dry_run']
+
+        def snapshot():
+            return {
+                (row.month, row.dimension, row.key_id): (row.total, row.count)
+                for row in MonthlyCategoryRollup.objects.filter(dimension__in=dimensions)
+            }
+
+        before = snapshot()
+
+        try:
+            with transaction.atomic():
+                written = rebuild_monthly_rollups(dimensions=dimensions)
+                after = snapshot()
+                if dry_run:
+                    transaction.set_rollback(True)
+                else:
+                    # The rebuild bypasses the signals, so cached month pages must be told
+                    bump_all_month_versions()
+        except Exception as e:
+            raise CommandError(f"Rollup rebuild failed: {e}")
+
+        changed = sorted(
+            key for key in set(before) | set(after)
+            if before.get(key) != after.get(key)
+        )
+
+        for month, dimension, key_id in changed[:50]:
+            old_total = before.get((month, dimension, key_id), ('0.00', 0))[0]
+            new_total = after.get((month, dimension, key_id), ('0.00', 0))[0]
+            self.stdout.write(
+                f"  {month:%Y-%m} {dimension:<22} #{key_id:<6} ${old_total} -> ${new_total}"
+            )
+        if len(changed) > 50:
+            self.stdout.write(f"  ... and {len(changed) - 50} more")
+
+        if dry_run:
+            self.stdout.write(self.style.WARNING(
+                f"\nDRY RUN: {written} rollup rows would be written, {len(changed)} differ from stored values"
+            ))
+        else:
+            self.stdout.write(self.style.SUCCESS(
+                f"\nRebuilt {written} rollup rows ({len(changed)} corrected)"
+            ))
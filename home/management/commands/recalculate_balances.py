@@ -2,24 +2,39 @@
 Management command to recalculate account balances from existing transactions.
 
 This command:
-1. For each account with balance_tracking_enabled
-2. Starts from balance_tracking_start_date baseline
-3. Applies all existing transactions dated on/after the start date
-4. Updates current_balance to reflect all historical transactions
+1. Picks a baseline for each account with balance_tracking_enabled:
+   - default: the locked snapshot for the month before balance_tracking_start_date
+     (or current_balance minus everything tracked since, if there isn't one)
+   - --since-last-close: the latest locked AccountSnapshot on/after that, so
+     only transactions since the last month-end close are summed
+2. Sums income, expenses, transfers in/out and adjustments after the baseline
+   for all accounts in one grouped query (up to --as-of, if given)
+3. Reports drift between the recorded and calculated balance (--json for a
+   machine-readable report)
+4. Updates current_balance where they differ (not with --dry-run or --as-of;
+   with --as-of the recorded figure is the balance ledger's, for checking only)
+   and bumps the "months" data version so cached pages show the new balances
 
 Use this after:
 - Initial setup of balance tracking
 - Bulk imports of historical data
 - Any manual database changes to transactions
+- Nightly, as a drift check: recalculate_balances --since-last-close --dry-run --json
 """
 
-from django.core.management.base import BaseCommand
+import json
+from datetime import date, datetime, timedelta
+
+from django.core.management.base import BaseCommand, CommandError
 from django.db import transaction
-from django.db.models import Sum, Q
-from datetime import date
-from decimal import Decimal
 
-from home.models import BankAccount, Income, Expense, Transfer, BalanceAdjustment
+from home.ledger import balance_as_of, net_changes_by_account
+from home.models import AccountSnapshot, BankAccount
+from home.versions import ALL_MONTHS, bump_version
+
+
+def month_end(month_first):
+    return (month_first.replace(day=28) + timedelta(days=4)).replace(day=1) - timedelta(days=1)
 
 
 class Command(BaseCommand):
@@ -36,147 +51,231 @@ class Command(BaseCommand):
             type=int,
             help='Only recalculate for specific account ID',
         )
+        parser.add_argument(
+            '--as-of',
+            help='Calculate balances at the end of this date (YYYY-MM-DD) and compare with the balance ledger; '
+                 'never updates current_balance',
+        )
+        parser.add_argument(
+            '--since-last-close',
+            action='store_true',
+            help='Start from the latest locked month-end snapshot instead of the tracking start date',
+        )
+        parser.add_argument(
+            '--json',
+            action='store_true',
+            help='Print the drift report as JSON',
+        )
 
     def handle(self, *args, **options):
         dry_run = options['dry_run']
         account_id = options.get('account')
+        as_json = options['json']
+
+        as_of = None
+        if options.get('as_of'):
+            try:
+                as_of = datetime.strptime(options['as_of'], '%Y-%m-%d').date()
+            except ValueError:
+                raise CommandError(f"Invalid --as-of date: {options['as_of']} (expected YYYY-MM-DD)")
 
         # Get accounts with balance tracking enabled
-        accounts_qs = BankAccount.objects.filter(balance_tracking_enabled=True)
+        accounts_qs = BankAccount.objects.filter(balance_tracking_enabled=True).order_by('name')
 
         if account_id:
             accounts_qs = accounts_qs.filter(pk=account_id)
 
-        if not accounts_qs.exists():
-            self.stdout.write(self.style.WARNING("No accounts with balance tracking enabled."))
+        accounts = list(accounts_qs)
+        skipped = [account for account in accounts if not account.balance_tracking_start_date]
+        accounts = [account for account in accounts if account.balance_tracking_start_date]
+
+        results = self.calculate(accounts, as_of, options['since_last_close'])
+
+        updated_count = 0
+        if not dry_run and as_of is None:
+            updated_count = self.apply(results)
+
+        if as_json:
+            self.stdout.write(json.dumps({
+                'as_of': as_of.isoformat() if as_of else None,
+                'mode': 'since_last_close' if options['since_last_close'] else 'full',
+                'dry_run': dry_run,
+                'accounts': [self.result_json(result) for result in results],
+                'skipped': [{'id': account.pk, 'name': account.name, 'reason': 'no tracking start date'}
+                            for account in skipped],
+                'drifted': sum(1 for result in results if result['difference']),
+                'updated': updated_count,
+            }, indent=2))
             return
 
-        self.stdout.write(f"\nRecalculating balances for {accounts_qs.count()} account(s)...\n")
-
-        results = []
+        if not accounts and not skipped:
+            self.stdout.write(self.style.WARNING("No accounts with balance tracking enabled."))
+            return
 
-        for account in accounts_qs:
-            if not account.balance_tracking_start_date:
+        self.stdout.write(f"\nRecalculating balances for {len(accounts) + len(skipped)} account(s)...\n")
+        for account in skipped:
+            self.stdout.write(self.style.WARNING(
+                f"  Skipping {account.name}: no tracking start date set"
+            ))
+        for result in results:
+            if result['baseline_source'] == 'current_balance':
                 self.stdout.write(self.style.WARNING(
-                    f"  Skipping {account.name}: no tracking start date set"
+                    f"  WARNING: Could not find snapshot for {result['account'].name}, using current balance as baseline"
                 ))
-                continue
 
-            # Start with the baseline balance (what was set during init)
-            # We need to go back to the tracking start and recalculate
-            start_date = account.balance_tracking_start_date
+        self.print_report(results)
 
-            # Get the baseline by finding what the balance was BEFORE any March transactions
-            # This should be the value set by init_balance_tracking
-            baseline_balance = account.current_balance
-
-            # Calculate net change from all transactions since start_date
-            # Income: increases balance
-            income_total = Income.objects.filter(
-                bank_account=account,
-                date__gte=start_date
-            ).aggregate(total=Sum('amount'))['total'] or Decimal('0.00')
-
-            # Expenses: decreases balance
-            expense_total = Expense.objects.filter(
-                bank_account=account,
-                date__gte=start_date
-            ).aggregate(total=Sum('amount'))['total'] or Decimal('0.00')
-
-            # Transfers out: decreases balance
-            transfers_out = Transfer.objects.filter(
-                from_account=account,
-                date__gte=start_date
-            ).aggregate(total=Sum('amount'))['total'] or Decimal('0.00')
-
-            # Transfers in: increases balance
-            transfers_in = Transfer.objects.filter(
-                to_account=account,
-                date__gte=start_date
-            ).aggregate(total=Sum('amount'))['total'] or Decimal('0.00')
-
-            # Balance adjustments: can be positive or negative
-            adjustments_total = BalanceAdjustment.objects.filter(
-                bank_account=account,
-                date__gte=start_date
-            ).aggregate(total=Sum('amount'))['total'] or Decimal('0.00')
-
-            # But wait - we need to recalculate from the ORIGINAL baseline
-            # The current balance might already have some updates applied
-            # Let's calculate what the balance SHOULD be from the baseline
-
-            # We need to find the original baseline from init
-            # For now, let's calculate the net change and show what needs to happen
-
-            net_change = (
-                income_total
-                - expense_total
-                - transfers_out
-                + transfers_in
-                + adjustments_total
-            )
-
-            # The correct balance should be baseline + net_change
-            # But we need the baseline from BEFORE signals started firing
-            # For safety, let's use the tracking_start_date to reconstruct
-
-            # Actually, let me recalculate from the beginning properly:
-            # We need to reset to the baseline and recalculate
-            # The baseline should have been set by init_balance_tracking
+        if dry_run:
+            self.stdout.write(self.style.WARNING(
+                "\n[DRY RUN] No changes made. Remove --dry-run to update balances."
+            ))
+        elif as_of is not None:
+            self.stdout.write(self.style.WARNING(
+                f"\n[AS OF {as_of}] Balances are only compared with the balance ledger; nothing was updated."
+            ))
+        else:
+            self.stdout.write(self.style.SUCCESS(
+                f"\nOK Successfully updated {updated_count} account balance(s)"
+            ))
 
-            # Let's get the AccountSnapshot for the previous month
-            from home.models import AccountSnapshot, MonthEndClose
-            from datetime import timedelta
+    def calculate(self, accounts, as_of, since_last_close):
+        """
+        Baseline, per-source totals and calculated balance for each account.
+
+        One query for the locked snapshots and one grouped query for the
+        transaction totals, however many accounts there are.
+        """
+        # Locked month-end snapshots, oldest first
+        snapshots = {}
+        for account_pk, month, balance in (
+            AccountSnapshot.objects
+            .filter(month_close__is_locked=True, bank_account__in=[account.pk for account in accounts])
+            .order_by('month_close__month')
+            .values_list('bank_account_id', 'month_close__month', 'balance')
+        ):
+            snapshots.setdefault(account_pk, []).append((month_end(month), balance))
+
+        baselines = {}
+        windows = {}
+        for account in accounts:
+            start_date = account.balance_tracking_start_date
+            usable = [
+                (closed_on, balance) for closed_on, balance in snapshots.get(account.pk, [])
+                # The snapshot must be inside the tracked period (or its eve) and not after --as-of
+                if closed_on >= start_date - timedelta(days=1) and (as_of is None or closed_on <= as_of)
+            ]
+            # The month before tracking started is the baseline for a full recalculation
+            opening = [
+                (closed_on, balance) for closed_on, balance in snapshots.get(account.pk, [])
+                if closed_on.replace(day=1) == (start_date.replace(day=1) - timedelta(days=1)).replace(day=1)
+            ]
+
+            if since_last_close and usable:
+                closed_on, balance = usable[-1]
+                baselines[account.pk] = (balance, f'snapshot {closed_on:%Y-%m}')
+                windows[account.pk] = (max(closed_on + timedelta(days=1), start_date), as_of)
+            elif opening:
+                closed_on, balance = opening[-1]
+                baselines[account.pk] = (balance, f'snapshot {closed_on:%Y-%m}')
+                windows[account.pk] = (start_date, as_of)
+            else:
+                # Filled in below: current balance minus everything tracked since the start
+                baselines[account.pk] = (None, 'current_balance')
+                windows[account.pk] = (start_date, as_of)
 
-            # Find the month close just before the tracking start date
-            prev_month = start_date.replace(day=1) - timedelta(days=1)
-            prev_month_first = prev_month.replace(day=1)
+        totals = net_changes_by_account(windows)
 
-            try:
-                month_close = MonthEndClose.objects.get(month=prev_month_first, is_locked=True)
-                snapshot = AccountSnapshot.objects.get(month_close=month_close, bank_account=account)
-                baseline_balance = snapshot.balance
-            except (MonthEndClose.DoesNotExist, AccountSnapshot.DoesNotExist):
-                self.stdout.write(self.style.WARNING(
-                    f"  WARNING: Could not find snapshot for {account.name}, using current balance as baseline"
-                ))
-                # Fall back to using current balance minus calculated changes
-                baseline_balance = account.current_balance - net_change
+        # No snapshot: current_balance less every tracked change (to date, not just up to --as-of)
+        fallback = [pk for pk, (balance, _) in baselines.items() if balance is None]
+        if fallback:
+            to_date = totals if as_of is None else net_changes_by_account(
+                {pk: (windows[pk][0], None) for pk in fallback}
+            )
+            current = {account.pk: account.current_balance for account in accounts}
+            for pk in fallback:
+                baselines[pk] = (current[pk] - to_date[pk]['net_change'], 'current_balance')
 
-            # Calculate what the balance should be
-            calculated_balance = baseline_balance + net_change
+        results = []
+        for account in accounts:
+            baseline, baseline_source = baselines[account.pk]
+            account_totals = totals[account.pk]
+            calculated_balance = baseline + account_totals['net_change']
+
+            # What the app currently believes the balance is
+            if as_of is None:
+                recorded = account.current_balance
+            else:
+                recorded = balance_as_of(account.pk, as_of)
 
             results.append({
                 'account': account,
-                'baseline': baseline_balance,
-                'income': income_total,
-                'expenses': expense_total,
-                'transfers_out': transfers_out,
-                'transfers_in': transfers_in,
-                'adjustments': adjustments_total,
-                'net_change': net_change,
-                'current_balance': account.current_balance,
+                'baseline': baseline,
+                'baseline_source': baseline_source,
+                'from_date': windows[account.pk][0],
+                **account_totals,
+                'current_balance': recorded,
                 'calculated_balance': calculated_balance,
-                'difference': calculated_balance - account.current_balance,
+                'difference': None if recorded is None else calculated_balance - recorded,
             })
+        return results
 
+    def apply(self, results):
+        """Write the calculated balance wherever it drifted."""
+        updated_count = 0
+        with transaction.atomic():
+            for result in results:
+                if result['difference']:
+                    BankAccount.objects.filter(pk=result['account'].pk).update(
+                        current_balance=result['calculated_balance'],
+                        last_updated=date.today(),
+                    )
+                    updated_count += 1
+            if updated_count:
+                # update() skips the signals; balances show on every month's pages
+                bump_version(ALL_MONTHS)
+        return updated_count
+
+    def result_json(self, result):
+        def money(value):
+            return None if value is None else str(value)
+
+        return {
+            'id': result['account'].pk,
+            'name': result['account'].name,
+            'baseline': money(result['baseline']),
+            'baseline_source': result['baseline_source'],
+            'from_date': result['from_date'].isoformat(),
+            'income': money(result['income']),
+            'expenses': money(result['expenses']),
+            'transfers_in': money(result['transfers_in']),
+            'transfers_out': money(result['transfers_out']),
+            'adjustments': money(result['adjustments']),
+            'net_change': money(result['net_change']),
+            'recorded_balance': money(result['current_balance']),
+            'calculated_balance': money(result['calculated_balance']),
+            'drift': money(result['difference']),
+        }
+
+    def print_report(self, results):
         # Display results
         self.stdout.write("\n" + "="*120)
         self.stdout.write(f"{'Account':<30} {'Baseline':>12} {'Net Change':>12} {'Current':>12} {'Calculated':>12} {'Diff':>12}")
         self.stdout.write("="*120)
 
         for result in results:
-            diff_str = f"${result['difference']:,.2f}"
-            if result['difference'] != 0:
-                diff_str = self.style.WARNING(diff_str)
+            if result['difference'] is None:
+                diff_str = self.style.WARNING("no ledger")
+                current_str = f"{'—':>12}"
             else:
-                diff_str = self.style.SUCCESS(diff_str)
+                diff_str = f"${result['difference']:,.2f}"
+                diff_str = self.style.WARNING(diff_str) if result['difference'] else self.style.SUCCESS(diff_str)
+                current_str = f"${result['current_balance']:>11,.2f}"
 
             self.stdout.write(
                 f"{result['account'].name[:30]:<30} "
                 f"${result['baseline']:>11,.2f} "
                 f"${result['net_change']:>11,.2f} "
-                f"${result['current_balance']:>11,.2f} "
+                f"{current_str} "
                 f"${result['calculated_balance']:>11,.2f} "
                 f"{diff_str:>12}"
             )
@@ -184,33 +283,10 @@ class Command(BaseCommand):
         self.stdout.write("\nTransaction breakdown:")
         for result in results:
             if result['net_change'] != 0:
-                self.stdout.write(f"\n{result['account'].name}:")
+                self.stdout.write(f"\n{result['account'].name} (since {result['from_date']}, baseline: {result['baseline_source']}):")
                 self.stdout.write(f"  Income:        +${result['income']:,.2f}")
                 self.stdout.write(f"  Expenses:      -${result['expenses']:,.2f}")
                 self.stdout.write(f"  Transfers out: -${result['transfers_out']:,.2f}")
                 self.stdout.write(f"  Transfers in:  +${result['transfers_in']:,.2f}")
                 self.stdout.write(f"  Adjustments:   ${result['adjustments']:>+,.2f}")
                 self.stdout.write(f"  Net change:    ${result['net_change']:>+,.2f}")
-
-        if dry_run:
-            self.stdout.write(self.style.WARNING(
-                "\n[DRY RUN] No changes made. Remove --dry-run to update balances."
-            ))
-            return
-
-        # Apply updates
-        self.stdout.write("\nApplying balance updates...")
-
-        with transaction.atomic():
-            updated_count = 0
-            for result in results:
-                if result['difference'] != 0:
-                    account = result['account']
-                    account.current_balance = result['calculated_balance']
-                    account.last_updated = date.today()
-                    account.save(update_fields=['current_balance', 'last_updated'])
-                    updated_count += 1
-
-            self.stdout.write(self.style.SUCCESS(
-                f"\nOK Successfully updated {updated_count} account balance(s)"
-            ))
@@ -0,0 +1,104 @@
+"""
+Management command to complete the snapshots of month-end closes made before
+closes froze every figure the month views show.
+
+This command:
+1. Finds locked MonthEndClose rows without a full snapshot (or the --month given)
+2. Recomputes the month with MonthCloseCalculator (a locked month's
+   transactions can't change, so this matches what was closed)
+3. Fills in the new snapshot fields (withholding-funded spending, bucket
+   payouts and balances, partner transfers) and adds rows for categories and
+   buckets the old close skipped, keeping the limits and targets stored at
+   close time
+4. Marks the close as fully snapshotted, so category_progress and
+   withholding_overview stop reading its transactions
+"""
+
+from datetime import date
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from home.models import (
+    MonthEndClose,
+    MonthEndExpenseCategorySnapshot,
+    MonthEndIncomeCategorySnapshot,
+    MonthEndWithholdingCategorySnapshot,
+)
+from home.month_close import MonthCloseCalculator, close_snapshots
+
+
+class Command(BaseCommand):
+    help = 'Complete the frozen snapshots of locked month-end closes'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--month',
+            help='Only this month (YYYY-MM), even if it already has a full snapshot',
+        )
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Show what would change without saving',
+        )
+
+    def handle(self, *args, **options):
+        closes = MonthEndClose.objects.filter(is_locked=True).order_by('month')
+        if options['month']:
+            try:
+                year, month = map(int, options['month'].split('-'))
+                closes = closes.filter(month=date(year, month, 1))
+            except ValueError:
+                raise CommandError(f"Invalid month {options['month']!r}, expected YYYY-MM")
+        else:
+            closes = closes.filter(has_full_snapshot=False)
+
+        if not closes:
+            self.stdout.write(self.style.SUCCESS("All locked months already have full snapshots"))
+            return
+
+        for month_close in closes:
+            with transaction.atomic():
+                added = self._complete(month_close)
+                if options['dry_run']:
+                    transaction.set_rollback(True)
+            self.stdout.write(f"  {month_close.month:%Y-%m}: {added} snapshot rows added")
+
+        if options['dry_run']:
+            self.stdout.write(self.style.WARNING(f"\nDRY RUN: {len(closes)} closes would be completed"))
+        else:
+            self.stdout.write(self.style.SUCCESS(f"\nCompleted {len(closes)} month-end close snapshots"))
+
+    def _complete(self, month_close):
+        """Update and add snapshot rows for one close; returns the number of rows added."""
+        close = MonthCloseCalculator(month_close.month)
+        expense_snapshots, withholding_snapshots, income_snapshots = close_snapshots(close)
+        added = 0
+
+        for model, key, snapshots, refreshed in (
+            (MonthEndExpenseCategorySnapshot, 'category_id', expense_snapshots, ['withholding_funded']),
+            (MonthEndWithholdingCategorySnapshot, 'withholding_category_id', withholding_snapshots,
+             ['actual_paid_out', 'balance', 'target_amount']),
+            (MonthEndIncomeCategorySnapshot, 'income_category_id', income_snapshots, []),
+        ):
+            existing = {getattr(row, key): row for row in model.objects.filter(month_close=month_close)}
+            updated, missing = [], []
+            for snapshot in snapshots:
+                row = existing.get(getattr(snapshot, key))
+                if row is None:
+                    snapshot.month_close = month_close
+                    missing.append(snapshot)
+                elif refreshed:
+                    # Keep the limit/target stored at close time
+                    for field in refreshed:
+                        setattr(row, field, getattr(snapshot, field))
+                    updated.append(row)
+            if updated:
+                model.objects.bulk_update(updated, refreshed)
+            model.objects.bulk_create(missing)
+            added += len(missing)
+
+        month_close.partner_transfers = close.partner_transfers
+        month_close.has_full_snapshot = True
+        month_close.save(update_fields=['partner_transfers', 'has_full_snapshot'])
+        return added
@@ -0,0 +1,125 @@
+"""
+Management command to train the vendor -> category model used by CSV imports.
+
+This command:
+1. Counts the categorised expenses per category to pick the trainable ones
+2. Optionally holds out every 5th row to report accuracy on unseen rows
+   (this loads the expenses into memory)
+3. Streams every Expense (vendor_name, amount, category) from the database
+   into a naive Bayes model (see home/vendor_model.py)
+4. Writes it as gzipped JSON to settings.VENDOR_MODEL_PATH (or --output)
+
+The importer picks up the new file on its next upload; no restart needed.
+Re-run it whenever a batch of imports has been categorised by hand.
+"""
+
+import os
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Count
+
+from home.models import Category, Expense
+from home.vendor_model import MIN_CONFIDENCE, VendorModel
+
+
+class Command(BaseCommand):
+    help = 'Train the vendor auto-categorization model from existing expenses'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--output',
+            default=settings.VENDOR_MODEL_PATH,
+            help='Where to write the model (default: settings.VENDOR_MODEL_PATH)',
+        )
+        parser.add_argument(
+            '--min-examples',
+            type=int,
+            default=2,
+            help='Skip categories with fewer expenses than this (default: 2)',
+        )
+        parser.add_argument(
+            '--alpha',
+            type=float,
+            default=0.5,
+            help='Additive smoothing (default: 0.5)',
+        )
+        parser.add_argument(
+            '--evaluate',
+            action='store_true',
+            help='Hold out every 5th expense and report accuracy before training on everything',
+        )
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Train and report without writing the model file',
+        )
+
+    def handle(self, *args, **options):
+        categories = dict(Category.objects.filter(is_archived=False).values_list('id', 'name'))
+
+        rows = (
+            Expense.objects
+            .filter(category_id__in=list(categories))
+            .exclude(vendor_name__in=['', 'Unknown Vendor'])
+            .order_by('id')
+            .values_list('id', 'vendor_name', 'amount', 'category_id')
+        )
+        counts = dict(
+            rows.order_by().values('category_id').annotate(n=Count('id')).values_list('category_id', 'n')
+        )
+        trainable = {cid: name for cid, name in categories.items() if counts.get(cid, 0) >= options['min_examples']}
+
+        if not trainable:
+            raise CommandError('Not enough categorised expenses to train on.')
+
+        if options['evaluate']:
+            self._evaluate(list(rows), trainable, options['alpha'])
+
+        # Rows of untrainable categories are skipped by VendorModel.train
+        model = VendorModel.train(
+            ((vendor, amount, category_id) for _, vendor, amount, category_id in rows.iterator(chunk_size=2000)),
+            trainable,
+            alpha=options['alpha'],
+        )
+
+        self.stdout.write(
+            f"Trained on {model.n_examples} expenses across {len(model.category_ids)} categories "
+            f"({len(model.weights)} features)"
+        )
+
+        if options['dry_run']:
+            self.stdout.write(self.style.WARNING('Dry run: model not written'))
+            return
+
+        output = options['output']
+        try:
+            model.save(output)
+        except OSError as e:
+            raise CommandError(f"Could not write model to {output}: {e}")
+
+        size_kb = os.path.getsize(output) / 1024
+        self.stdout.write(self.style.SUCCESS(f"Saved vendor model to {output} ({size_kb:.1f} KB)"))
+
+    def _evaluate(self, examples, categories, alpha):
+        train = [(v, a, c) for pk, v, a, c in examples if pk % 5]
+        test = [(v, a, c) for pk, v, a, c in examples if not pk % 5]
+        if not test:
+            self.stdout.write(self.style.WARNING('Too few expenses to hold any out; skipping evaluation'))
+            return
+
+        model = VendorModel.train(train, categories, alpha=alpha)
+        correct = confident = confident_correct = 0
+        for vendor, amount, category_id in test:
+            predicted, confidence = model.predict(vendor, amount)
+            correct += predicted == category_id
+            if confidence >= MIN_CONFIDENCE:
+                confident += 1
+                confident_correct += predicted == category_id
+
+        self.stdout.write(f"Held-out accuracy: {correct}/{len(test)} ({correct / len(test):.0%})")
+        if confident:
+            self.stdout.write(
+                f"  at >= {MIN_CONFIDENCE:.0%} confidence: {confident_correct}/{confident} correct, "
+                f"{confident / len(test):.0%} of rows pre-filled"
+            )
@@ -0,0 +1,30 @@
+# Generated by Django 4.2.30 on 2026-10-16 23:08
+
+from decimal import Decimal
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('home', '0035_forecastworksheet'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MonthlyCategoryRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('month', models.DateField(help_text='First day of the month')),
+                ('dimension', models.CharField(choices=[('expense_category', 'Expenses by category'), ('expense_category_wf', 'Bucket-funded expenses by category'), ('income_category', 'Income by income category'), ('bucket_in', 'Bucket contributions'), ('bucket_out', 'Bucket payouts'), ('account_transfer_out', 'Transfers out of account'), ('rental_income', 'Income by rental unit'), ('rental_expense', 'Expenses by rental unit')], max_length=32)),
+                ('key_id', models.BigIntegerField()),
+                ('total', models.DecimalField(decimal_places=2, default=Decimal('0.00'), max_digits=14)),
+                ('count', models.IntegerField(default=0)),
+            ],
+            options={
+                'ordering': ['month', 'dimension', 'key_id'],
+                'indexes': [models.Index(fields=['month', 'dimension'], name='rollup_month_dim_idx')],
+                'unique_together': {('dimension', 'key_id', 'month')},
+            },
+        ),
+    ]
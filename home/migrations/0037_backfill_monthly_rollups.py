@@ -0,0 +1,27 @@
+"""
+Data migration: populate MonthlyCategoryRollup from existing Expense, Income
+and Transfer rows. Signals keep it current from here on.
+"""
+from django.db import migrations
+
+
+def backfill_monthly_rollups(apps, schema_editor):
+    from home.rollups import rebuild_monthly_rollups
+
+    rebuild_monthly_rollups(apps=apps)
+
+
+def reverse_backfill(apps, schema_editor):
+    MonthlyCategoryRollup = apps.get_model('home', 'MonthlyCategoryRollup')
+    MonthlyCategoryRollup.objects.all().delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('home', '0036_monthlycategoryrollup'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_monthly_rollups, reverse_backfill),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 4.2.30 on 2026-10-16 23:17
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('home', '0038_date_range_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='VendorRule',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('keyword', models.CharField(help_text="Matched anywhere in the bank description, e.g. 'TIM HORTONS'.", max_length=100, unique=True)),
+                ('priority', models.IntegerField(default=0, help_text='When several keywords match one description, the highest priority wins.')),
+                ('is_active', models.BooleanField(default=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('category', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='vendor_rules', to='home.category')),
+            ],
+            options={
+                'ordering': ['-priority', 'keyword'],
+            },
+        ),
+    ]
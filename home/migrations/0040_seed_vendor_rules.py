@@ -0,0 +1,64 @@
+"""
+Data migration: turn the keyword map that used to be hard-coded in views.py
+(EXPLICIT_EXPENSE_KEYWORD_CATEGORY_NAMES) into VendorRule rows. Keywords whose
+category doesn't exist yet are skipped; add them from the Vendor Rules page.
+"""
+from django.db import migrations
+
+
+INITIAL_VENDOR_RULES = {
+    "GORE MUTUAL": "Subaru Insurance",
+    "TD INS": "Arnprior Insurance",
+    "FIDO MOBILE": "Cell Phone",
+    "BELL CANADA": "Arnprior Internet",
+    "LOBLAWS": "Groceries",
+    "FOODLAND": "Groceries",
+    "COSTCO": "Groceries",
+    "ULTRAMAR": "Gas",
+    "TIM HORTONS": "Restaurants",
+    "STARBUCKS": "Restaurants",
+    "TST-HUNTERS": "Restaurants",
+    "WAL-MART": "Groceries",
+    "PIZZA": "Restaurants",
+    "MCDONALD": "Restaurants",
+    "NO GO COFFEE": "Restaurants",
+    "SHAWARMA": "Restaurants",
+    "STINSON": "Foxview Heat",      # covers "STINSON AND SON"
+    "FAT LES": "Restaurants",
+    "ENBRIDGE": "Arnprior Heat",
+    "NETFLIX": "Digital Subscriptions",
+    "CHATGPT": "Digital Subscriptions",
+    "SPOTIFY": "Digital Subscriptions",
+    "NOTION": "Digital Subscriptions",
+    "CARLETON": "Golf",
+    "FARM BOY": "Groceries",
+    "AMAZON": "Miscellaneous",
+}
+
+
+def seed_vendor_rules(apps, schema_editor):
+    Category = apps.get_model('home', 'Category')
+    VendorRule = apps.get_model('home', 'VendorRule')
+
+    categories = Category.objects.in_bulk(set(INITIAL_VENDOR_RULES.values()), field_name='name')
+    for keyword, category_name in INITIAL_VENDOR_RULES.items():
+        category = categories.get(category_name)
+        if category is None:
+            continue
+        VendorRule.objects.get_or_create(keyword=keyword, defaults={'category': category})
+
+
+def unseed_vendor_rules(apps, schema_editor):
+    VendorRule = apps.get_model('home', 'VendorRule')
+    VendorRule.objects.filter(keyword__in=list(INITIAL_VENDOR_RULES)).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('home', '0039_vendorrule'),
+    ]
+
+    operations = [
+        migrations.RunPython(seed_vendor_rules, unseed_vendor_rules),
+    ]
@@ -0,0 +1,40 @@
+# Generated by Django 4.2.30 on 2026-10-16 23:21
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('home', '0040_seed_vendor_rules'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ImportJob',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('upload', models.FileField(upload_to='import_jobs/%Y/%m/')),
+                ('filename', models.CharField(blank=True, max_length=255)),
+                ('statement_format', models.CharField(blank=True, help_text='Requested statement format key; blank means auto-detect.', max_length=32)),
+                ('status', models.CharField(choices=[('queued', 'Queued'), ('running', 'Parsing'), ('ready', 'Ready for review'), ('failed', 'Failed'), ('imported', 'Imported')], db_index=True, default='queued', max_length=16)),
+                ('rows_total', models.IntegerField(default=0)),
+                ('rows_done', models.IntegerField(default=0)),
+                ('result', models.JSONField(blank=True, default=dict)),
+                ('error', models.TextField(blank=True, default='')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('started_at', models.DateTimeField(blank=True, null=True)),
+                ('finished_at', models.DateTimeField(blank=True, null=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('bank_account', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='import_jobs', to='home.bankaccount')),
+                ('created_by', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, to=settings.AUTH_USER_MODEL)),
+                ('import_batch', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='import_jobs', to='home.importbatch')),
+            ],
+            options={
+                'ordering': ['-created_at'],
+            },
+        ),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 4.2.30 on 2026-10-16 23:31
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('home', '0041_importjob'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='BalanceLedgerEntry',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('amount', models.DecimalField(decimal_places=2, max_digits=12)),
+                ('running_balance', models.DecimalField(decimal_places=2, max_digits=14)),
+                ('source_type', models.CharField(choices=[('opening', 'Opening balance'), ('income', 'Income'), ('expense', 'Expense'), ('transfer', 'Transfer'), ('balanceadjustment', 'Balance adjustment')], max_length=20)),
+                ('source_id', models.BigIntegerField(blank=True, null=True)),
+                ('is_reversal', models.BooleanField(default=False)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('bank_account', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='ledger_entries', to='home.bankaccount')),
+            ],
+            options={
+                'verbose_name_plural': 'Balance ledger entries',
+                'ordering': ['bank_account', 'date', 'id'],
+                'indexes': [models.Index(fields=['bank_account', 'date', 'id'], name='ledger_account_date_seq_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,27 @@
+"""
+Data migration: build BalanceLedgerEntry for every tracked account from its
+existing transactions. Signals keep it current from here on.
+"""
+from django.db import migrations
+
+
+def backfill_balance_ledger(apps, schema_editor):
+    from home.ledger import rebuild_balance_ledger
+
+    rebuild_balance_ledger(apps=apps)
+
+
+def reverse_backfill(apps, schema_editor):
+    BalanceLedgerEntry = apps.get_model('home', 'BalanceLedgerEntry')
+    BalanceLedgerEntry.objects.all().delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('home', '0042_balanceledgerentry'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_balance_ledger, reverse_backfill),
+    ]
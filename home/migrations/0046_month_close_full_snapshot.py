@@ -0,0 +1,43 @@
+# Generated by Django 4.2.30 on 2026-10-17 00:06
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('home', '0045_dataversion'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='monthendclose',
+            name='has_full_snapshot',
+            field=models.BooleanField(default=False, help_text='Every figure the month views show was frozen at close, so they never read live transactions'),
+        ),
+        migrations.AddField(
+            model_name='monthendclose',
+            name='partner_transfers',
+            field=models.DecimalField(blank=True, decimal_places=2, help_text='Transfers from the partner account (counted as income); empty if there was no partner account', max_digits=12, null=True),
+        ),
+        migrations.AddField(
+            model_name='monthendexpensecategorysnapshot',
+            name='withholding_funded',
+            field=models.DecimalField(decimal_places=2, default=0, help_text='Part of actual_spent paid out of withholding buckets', max_digits=10),
+        ),
+        migrations.AddField(
+            model_name='monthendwithholdingcategorysnapshot',
+            name='actual_paid_out',
+            field=models.DecimalField(decimal_places=2, default=0, help_text="Bucket-funded expenses plus transfers out of the bucket's account", max_digits=12),
+        ),
+        migrations.AddField(
+            model_name='monthendwithholdingcategorysnapshot',
+            name='balance',
+            field=models.DecimalField(decimal_places=2, default=0, help_text='Bucket balance at close', max_digits=12),
+        ),
+        migrations.AddField(
+            model_name='monthendwithholdingcategorysnapshot',
+            name='target_amount',
+            field=models.DecimalField(decimal_places=2, default=0, help_text='Overall bucket target at close', max_digits=12),
+        ),
+    ]
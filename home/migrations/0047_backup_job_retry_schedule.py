@@ -0,0 +1,23 @@
+# Generated by Django 4.2.30 on 2026-10-17 00:18
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('home', '0046_month_close_full_snapshot'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='backupjob',
+            name='heartbeat_at',
+            field=models.DateTimeField(blank=True, help_text='Touched while a worker runs the backup.', null=True),
+        ),
+        migrations.AddField(
+            model_name='backupjob',
+            name='next_attempt_at',
+            field=models.DateTimeField(blank=True, help_text='A retry waits in the queue until then.', null=True),
+        ),
+    ]
@@ -264,6 +264,166 @@ class ImportBatch(models.Model):
         )
 
 
+class ImportJobStatus(models.TextChoices):
+    QUEUED = "queued", "Queued"
+    RUNNING = "running", "Parsing"
+    READY = "ready", "Ready for review"
+    FAILED = "failed", "Failed"
+    IMPORTED = "imported", "Imported"
+
+
+class ImportJob(models.Model):
+    """
+    A statement upload parsed in the background (see home/jobs.py).
+
+    Once READY, `result` holds the review rows built by
+    home.import_preview.build_import_preview(); committing the review links the
+    ImportBatch it created and marks the job IMPORTED.
+    """
+    bank_account = models.ForeignKey(
+        "BankAccount",
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name="import_jobs",
+    )
+    upload = models.FileField(upload_to="import_jobs/%Y/%m/")
+    filename = models.CharField(max_length=255, blank=True)
+    statement_format = models.CharField(
+        max_length=32,
+        blank=True,
+        help_text="Requested statement format key; blank means auto-detect.",
+    )
+
+    status = models.CharField(
+        max_length=16,
+        choices=ImportJobStatus.choices,
+        default=ImportJobStatus.QUEUED,
+        db_index=True,
+    )
+    rows_total = models.IntegerField(default=0)
+    rows_done = models.IntegerField(default=0)
+    result = models.JSONField(default=dict, blank=True)
+    error = models.TextField(blank=True, default="")
+
+    import_batch = models.ForeignKey(
+        ImportBatch,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name="import_jobs",
+    )
+    created_by = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        ordering = ["-created_at"]
+
+    def __str__(self):
+        return f"Import job {self.pk} – {self.filename} ({self.get_status_display()})"
+
+    @property
+    def is_finished(self):
+        return self.status in (ImportJobStatus.READY, ImportJobStatus.FAILED, ImportJobStatus.IMPORTED)
+
+    @property
+    def progress_percent(self):
+        if self.is_finished:
+            return 100
+        if not self.rows_total:
+            return 0
+        return min(99, round(100 * self.rows_done / self.rows_total))
+
+
+class BackupJobStatus(models.TextChoices):
+    QUEUED = "queued", "Queued"
+    RUNNING = "running", "Backing up"
+    DONE = "done", "Done"
+    FAILED = "failed", "Failed"
+
+
+class BackupJob(models.Model):
+    """
+    A month-end backup run in the background (see home/jobs.py).
+
+    The MonthEndClose is saved first; when the job finishes its manifest name
+    is written to month_close.backup_file. A failed attempt puts the job back
+    in the queue until next_attempt_at, up to max_attempts times, before it is
+    marked FAILED.
+    """
+    month_close = models.ForeignKey(
+        "MonthEndClose",
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name="backup_jobs",
+    )
+    month = models.CharField(max_length=7, help_text="Month being closed, YYYY-MM.")
+    description = models.CharField(max_length=255, blank=True)
+
+    status = models.CharField(
+        max_length=16,
+        choices=BackupJobStatus.choices,
+        default=BackupJobStatus.QUEUED,
+        db_index=True,
+    )
+    attempts = models.IntegerField(default=0)
+    max_attempts = models.IntegerField(default=3)
+    next_attempt_at = models.DateTimeField(null=True, blank=True, help_text="A retry waits in the queue until then.")
+    heartbeat_at = models.DateTimeField(null=True, blank=True, help_text="Touched while a worker runs the backup.")
+    manifest = models.CharField(max_length=255, blank=True, help_text="Backup store manifest name once done.")
+    result = models.JSONField(default=dict, blank=True)
+    error = models.TextField(blank=True, default="")
+
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        ordering = ["-created_at"]
+
+    def __str__(self):
+        return f"Backup job {self.pk} – {self.month} ({self.get_status_display()})"
+
+    @property
+    def is_finished(self):
+        return self.status in (BackupJobStatus.DONE, BackupJobStatus.FAILED)
+
+
+class VendorRule(models.Model):
+    """
+    Import auto-categorisation: any bank description containing `keyword`
+    (case-insensitive) is filed under `category`. Compiled into a single
+    matcher by home/vendor_rules.py.
+    """
+    keyword = models.CharField(
+        max_length=100,
+        unique=True,
+        help_text="Matched anywhere in the bank description, e.g. 'TIM HORTONS'.",
+    )
+    category = models.ForeignKey(Category, on_delete=models.CASCADE, related_name="vendor_rules")
+    priority = models.IntegerField(
+        default=0,
+        help_text="When several keywords match one description, the highest priority wins.",
+    )
+    is_active = models.BooleanField(default=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        ordering = ["-priority", "keyword"]
+
+    def save(self, *args, **kwargs):
+        self.keyword = (self.keyword or "").strip().upper()
+        super().save(*args, **kwargs)
+
+    def __str__(self):
+        return f"{self.keyword} → {self.category.name}"
+
+
 class Expense(models.Model):
     date = models.DateField(default=dt_date.today)
     vendor_name = models.CharField(max_length=100, default="Unknown Vendor")
@@ -329,6 +489,16 @@ class Expense(models.Model):
         ),
     )
 
+    class Meta:
+        # Nearly every view filters by date range, usually combined with one FK.
+        indexes = [
+            models.Index(fields=["date"], name="expense_date_idx"),
+            models.Index(fields=["category", "date"], name="expense_category_date_idx"),
+            models.Index(fields=["bank_account", "date"], name="expense_account_date_idx"),
+            models.Index(fields=["withholding_category", "date"], name="expense_bucket_date_idx"),
+            models.Index(fields=["rental_unit", "date"], name="expense_unit_date_idx"),
+        ]
+
     def __str__(self):
         return f"{self.date} | {self.vendor_name} | {self.amount}"
 
@@ -484,6 +654,13 @@ class Transfer(models.Model):
 
     class Meta:
         ordering = ["date", "id"]
+        indexes = [
+            # Month listings exclude split children (parent_transfer IS NULL)
+            models.Index(fields=["date", "parent_transfer"], name="transfer_date_parent_idx"),
+            models.Index(fields=["from_account", "date"], name="transfer_from_date_idx"),
+            models.Index(fields=["to_account", "date"], name="transfer_to_date_idx"),
+            models.Index(fields=["withholding_category", "date"], name="transfer_bucket_date_idx"),
+        ]
 
     def __str__(self):
         parts = [str(self.date), f"${self.amount}"]
@@ -637,6 +814,14 @@ class Income(models.Model):
             # else: leave whatever default/explicit value is already set
         super().save(*args, **kwargs)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=["date"], name="income_date_idx"),
+            models.Index(fields=["income_category", "date"], name="income_category_date_idx"),
+            models.Index(fields=["bank_account", "date"], name="income_account_date_idx"),
+            models.Index(fields=["rental_unit", "date"], name="income_unit_date_idx"),
+        ]
+
     def __str__(self):
         cat = self.income_category.name if self.income_category else self.category
         return f"{self.date} | {cat} | {self.amount}"
@@ -1278,6 +1463,15 @@ class MonthEndClose(models.Model):
         default=0,
         help_text="Amount saved to Excess/Surplus bucket"
     )
+    partner_transfers = models.DecimalField(
+        max_digits=12, decimal_places=2,
+        null=True, blank=True,
+        help_text="Transfers from the partner account (counted as income); empty if there was no partner account"
+    )
+    has_full_snapshot = models.BooleanField(
+        default=False,
+        help_text="Every figure the month views show was frozen at close, so they never read live transactions"
+    )
 
     # Lock control
     is_locked = models.BooleanField(
@@ -1404,6 +1598,10 @@ class MonthEndExpenseCategorySnapshot(models.Model):
     )
     monthly_limit = models.DecimalField(max_digits=10, decimal_places=2)
     actual_spent = models.DecimalField(max_digits=10, decimal_places=2, default=0)
+    withholding_funded = models.DecimalField(
+        max_digits=10, decimal_places=2, default=0,
+        help_text="Part of actual_spent paid out of withholding buckets"
+    )
 
     class Meta:
         unique_together = ['month_close', 'category']
@@ -1415,7 +1613,7 @@ class MonthEndExpenseCategorySnapshot(models.Model):
 
 class MonthEndWithholdingCategorySnapshot(models.Model):
     """
-    Snapshot of each withholding bucket's monthly_target and actual contributions at month-end.
+    Snapshot of each withholding bucket's monthly_target, contributions, payouts and balance at month-end.
     Preserves historical target values so changing a target today does not corrupt closed-month views.
     """
     month_close = models.ForeignKey(
@@ -1428,6 +1626,18 @@ class MonthEndWithholdingCategorySnapshot(models.Model):
     )
     monthly_target = models.DecimalField(max_digits=12, decimal_places=2)
     actual_contributed = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    actual_paid_out = models.DecimalField(
+        max_digits=12, decimal_places=2, default=0,
+        help_text="Bucket-funded expenses plus transfers out of the bucket's account"
+    )
+    balance = models.DecimalField(
+        max_digits=12, decimal_places=2, default=0,
+        help_text="Bucket balance at close"
+    )
+    target_amount = models.DecimalField(
+        max_digits=12, decimal_places=2, default=0,
+        help_text="Overall bucket target at close"
+    )
 
     class Meta:
         unique_together = ['month_close', 'withholding_category']
@@ -1478,6 +1688,102 @@ class ForecastWorksheet(models.Model):
         return f"Forecast {self.month.strftime('%B %Y')}"
 
 
+class RollupDimension(models.TextChoices):
+    EXPENSE_CATEGORY = "expense_category", "Expenses by category"
+    EXPENSE_CATEGORY_WITHHOLDING = "expense_category_wf", "Bucket-funded expenses by category"
+    INCOME_CATEGORY = "income_category", "Income by income category"
+    BUCKET_CONTRIBUTION = "bucket_in", "Bucket contributions"
+    BUCKET_PAYOUT = "bucket_out", "Bucket payouts"
+    ACCOUNT_TRANSFER_OUT = "account_transfer_out", "Transfers out of account"
+    RENTAL_UNIT_INCOME = "rental_income", "Income by rental unit"
+    RENTAL_UNIT_EXPENSE = "rental_expense", "Expenses by rental unit"
+
+
+class MonthlyCategoryRollup(models.Model):
+    """
+    Precomputed month totals for reporting views.
+
+    One row per (month, dimension, key). key_id is the PK of the category,
+    income category, bucket, account or rental unit the dimension is keyed on
+    (0 = uncategorised income). Kept in step by home/signals.py; rebuild from
+    scratch with `manage.py rebuild_rollups`.
+    """
+    month = models.DateField(help_text="First day of the month")
+    dimension = models.CharField(max_length=32, choices=RollupDimension.choices)
+    key_id = models.BigIntegerField()
+    total = models.DecimalField(max_digits=14, decimal_places=2, default=Decimal("0.00"))
+    count = models.IntegerField(default=0)
+
+    class Meta:
+        unique_together = ['dimension', 'key_id', 'month']
+        indexes = [
+            models.Index(fields=['month', 'dimension'], name='rollup_month_dim_idx'),
+        ]
+        ordering = ['month', 'dimension', 'key_id']
+
+    def __str__(self):
+        return f"{self.month.strftime('%Y-%m')} {self.dimension} #{self.key_id}: ${self.total}"
+
+
+class DataVersion(models.Model):
+    """
+    A change counter shared by every worker process.
+
+    Caches key their entries on a counter (e.g. "refdata" for the dropdown
+    reference tables, see home/refdata.py); the signal handlers in
+    home/signals.py bump it when the underlying rows change, so stale copies
+    in any process are simply never read again.
+    """
+    key = models.CharField(max_length=64, unique=True)
+    version = models.PositiveBigIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.key} v{self.version}"
+
+
+class LedgerSource(models.TextChoices):
+    OPENING = "opening", "Opening balance"
+    INCOME = "income", "Income"
+    EXPENSE = "expense", "Expense"
+    TRANSFER = "transfer", "Transfer"
+    ADJUSTMENT = "balanceadjustment", "Balance adjustment"
+
+
+class BalanceLedgerEntry(models.Model):
+    """
+    Append-only journal of changes to a tracked account's balance.
+
+    One row per balance-affecting event (a transaction leg being created, or
+    reversed when it is edited or deleted), with running_balance holding the
+    account balance after the entry in (date, id) order. The id doubles as the
+    sequence number within a day. Only accounts with balance tracking enabled
+    have entries; the first one is the opening balance before
+    balance_tracking_start_date.
+
+    Kept in step by home/signals.py; rebuild from scratch with
+    `manage.py rebuild_balance_ledger`.
+    """
+    bank_account = models.ForeignKey(BankAccount, on_delete=models.CASCADE, related_name="ledger_entries")
+    date = models.DateField()
+    amount = models.DecimalField(max_digits=12, decimal_places=2)
+    running_balance = models.DecimalField(max_digits=14, decimal_places=2)
+    source_type = models.CharField(max_length=20, choices=LedgerSource.choices)
+    source_id = models.BigIntegerField(null=True, blank=True)
+    is_reversal = models.BooleanField(default=False)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['bank_account', 'date', 'id'], name='ledger_account_date_seq_idx'),
+        ]
+        ordering = ['bank_account', 'date', 'id']
+        verbose_name_plural = "Balance ledger entries"
+
+    def __str__(self):
+        return f"{self.date} {self.bank_account.name}: {self.amount:+} -> ${self.running_balance}"
+
+
 class WebAuthnCredential(models.Model):
     user = models.ForeignKey(User, on_delete=models.CASCADE, related_name="webauthn_credentials")
     credential_id = models.BinaryField(unique=True)
@@ -0,0 +1,447 @@
+"""
+Month-end close figures.
+
+MonthCloseCalculator loads one month's income, expenses and transfers (one
+values() query each, plus the small category/bucket tables) and works out
+every figure the close needs in memory: income by category (with partner
+transfers counted as income), planned and unplanned spending, withholding
+contributions and payouts, Business Expense/Reimbursement, surplus and
+excess. Wizard
+step 2, the step 5 close commit and month_forecast_worksheet all read from
+it, so the three can't drift apart.
+
+Sign conventions follow home/rollups.py: a transfer tagged to a bucket is a
+contribution when it lands in the bucket's account.
+
+Between wizard steps the calculator is kept in the Django cache (see
+get_month_close()). Each entry carries a fingerprint of the month's
+MonthlyCategoryRollup rows and of its month and reference-data DataVersion
+counters (home/versions.py), which the signals keep current, so any
+income/expense/transfer change in the month (including the excess transfer
+saved in step 2), or a change to a category limit or bucket/income target,
+makes the next step recompute.
+"""
+
+import hashlib
+from collections import defaultdict
+
+from django.core.cache import cache
+from django.db.models import Sum
+
+from .models import (
+    BankAccount,
+    Category,
+    Expense,
+    Income,
+    IncomeCategory,
+    MonthEndExpenseCategorySnapshot,
+    MonthEndIncomeCategorySnapshot,
+    MonthEndWithholdingCategorySnapshot,
+    MonthlyCategoryRollup,
+    Transfer,
+    WithholdingCategory,
+    WithholdingTransaction,
+)
+from .refdata import REFDATA
+from .rollups import ZERO, month_bounds, month_start
+from .versions import current_versions, month_key
+
+
+BUSINESS_EXPENSE = "Business Expense"
+BUSINESS_REIMBURSEMENT = "Business Reimbursement"
+EXCESS_BUCKET = "Excess/Surplus"
+EXCESS_DESCRIPTION = "Month-end excess savings"
+PARTNER_ACCOUNT = "Jenna (EXT)"
+
+CACHE_TIMEOUT = 60 * 60  # the wizard is normally finished within minutes
+
+
+def _status(variance):
+    return 'over' if variance > 0 else 'under' if variance < 0 else 'on_target'
+
+
+class MonthCloseCalculator:
+    """
+    Every month-end figure for one calendar month, computed in one pass.
+
+    Attributes hold plain values (dicts, lists, Decimals), so a calculator
+    can be cached and reused by later wizard steps.
+    """
+
+    def __init__(self, month):
+        self.month = month_start(month)
+        self.first_day, self.last_day = month_bounds(self.month.year, self.month.month)
+        self._load()
+        self._compute()
+
+    # ------------------------------------------------------------------
+    # Loading
+    # ------------------------------------------------------------------
+
+    def _load(self):
+        month_range = (self.first_day, self.last_day)
+
+        self.categories = list(Category.objects.order_by("id").values("id", "name", "monthly_limit", "is_archived"))
+        self.income_categories = list(IncomeCategory.objects.order_by("id").values("id", "name", "monthly_target"))
+        self.buckets = list(
+            WithholdingCategory.objects.order_by("id").values("id", "name", "account_id", "monthly_target", "target_amount")
+        )
+        self.partner_account_id = (
+            BankAccount.objects.filter(name=PARTNER_ACCOUNT).values_list("id", flat=True).first()
+        )
+
+        self.income = list(
+            Income.objects.filter(date__range=month_range)
+            .order_by("date", "id")
+            .values("id", "date", "amount", "income_category_id", "category", "notes")
+        )
+        self.expenses = list(
+            Expense.objects.filter(date__range=month_range)
+            .order_by("date", "id")
+            .values("id", "date", "amount", "vendor_name", "category_id", "withholding_category_id")
+        )
+        self.transfers = list(
+            Transfer.objects.filter(date__range=month_range)
+            .order_by("date", "id")
+            .values(
+                "id", "date", "amount", "description", "from_account_id", "to_account_id",
+                "withholding_category_id", "parent_transfer_id",
+            )
+        )
+
+    # ------------------------------------------------------------------
+    # Figures
+    # ------------------------------------------------------------------
+
+    def _compute(self):
+        self.categories_by_id = {c["id"]: c for c in self.categories}
+        self.income_categories_by_id = {c["id"]: c for c in self.income_categories}
+        buckets_by_id = {b["id"]: b for b in self.buckets}
+
+        # Raw totals
+        spent = defaultdict(lambda: ZERO)
+        withholding_funded = defaultdict(lambda: ZERO)
+        bucket_names = defaultdict(dict)  # category id -> {bucket name: None}, insertion ordered
+        for e in self.expenses:
+            spent[e["category_id"]] += e["amount"]
+            if e["withholding_category_id"]:
+                withholding_funded[e["category_id"]] += e["amount"]
+                bucket = buckets_by_id.get(e["withholding_category_id"])
+                if bucket:
+                    bucket_names[e["category_id"]][bucket["name"]] = None
+
+        received = defaultdict(lambda: ZERO)
+        for i in self.income:
+            received[i["income_category_id"]] += i["amount"]
+
+        contributions = defaultdict(lambda: ZERO)
+        payouts = defaultdict(lambda: ZERO)
+        for e in self.expenses:
+            if e["withholding_category_id"]:
+                payouts[e["withholding_category_id"]] += e["amount"]
+        self.partner_total = ZERO
+        for t in self.transfers:
+            bucket = buckets_by_id.get(t["withholding_category_id"])
+            if bucket and t["to_account_id"] == bucket["account_id"]:
+                contributions[bucket["id"]] += t["amount"]
+            elif bucket and t["from_account_id"] == bucket["account_id"]:
+                payouts[bucket["id"]] += t["amount"]
+            if self.partner_account_id and t["from_account_id"] == self.partner_account_id:
+                self.partner_total += t["amount"]
+
+        self.spent_by_category = dict(spent)
+        self.received_by_income_category = dict(received)
+        self.withholding_funded_by_category = dict(withholding_funded)
+        self.bucket_contributions = dict(contributions)
+        self.bucket_payouts = dict(payouts)
+
+        # Counts and headline totals
+        self.income_count = len(self.income)
+        self.expense_count = len(self.expenses)
+        self.transfer_count = len(self.transfers)
+        self.transaction_count = self.income_count + self.expense_count + self.transfer_count
+
+        reimbursement_ids = {c["id"] for c in self.income_categories if c["name"] == BUSINESS_REIMBURSEMENT}
+        self.total_income = sum(
+            (amount for key, amount in received.items() if key not in reimbursement_ids), ZERO
+        ) + self.partner_total
+        self.total_expenses = sum(spent.values(), ZERO)
+        self.total_transfers = sum((t["amount"] for t in self.transfers), ZERO)
+        self.net_savings = self.total_income - self.total_expenses
+
+        # Income breakdown (Business Reimbursement shown separately)
+        self.income_breakdown = []
+        self.business_reimbursement_total = ZERO
+        for inc_category in self.income_categories:
+            amount = received.get(inc_category["id"], ZERO)
+            if amount > 0:
+                if inc_category["name"] == BUSINESS_REIMBURSEMENT:
+                    self.business_reimbursement_total = amount
+                else:
+                    self.income_breakdown.append({"name": inc_category["name"], "amount": amount})
+        if self.partner_total > 0:
+            self.income_breakdown.append({"name": "Jenna Transfers", "amount": self.partner_total})
+
+        # Planned spending: active categories with a monthly limit
+        self.planned_categories = [
+            c for c in self.categories
+            if not c["is_archived"] and c["monthly_limit"] and c["monthly_limit"] > 0 and c["name"] != BUSINESS_EXPENSE
+        ]
+        self.planned_breakdown = []
+        self.total_planned_budget = ZERO
+        self.total_planned_spent = ZERO
+        for category in self.planned_categories:
+            category_spent = spent.get(category["id"], ZERO)
+            variance = category_spent - category["monthly_limit"]
+            self.planned_breakdown.append({
+                "name": category["name"],
+                "budget": category["monthly_limit"],
+                "spent": category_spent,
+                "variance": variance,
+                "status": _status(variance),
+            })
+            self.total_planned_budget += category["monthly_limit"]
+            self.total_planned_spent += category_spent
+        self.planned_variance = self.total_planned_spent - self.total_planned_budget
+
+        # Unplanned spending: active categories without a limit, split into
+        # bucket-funded and out of pocket
+        self.unplanned_breakdown = []
+        self.total_unplanned_spent = ZERO
+        self.total_true_unplanned_spent = ZERO
+        self.total_withholding_funded_unplanned = ZERO
+        for category in self.categories:
+            if category["is_archived"] or category["name"] == BUSINESS_EXPENSE:
+                continue
+            if category["monthly_limit"] and category["monthly_limit"] != 0:
+                continue
+            category_spent = spent.get(category["id"], ZERO)
+            if category_spent <= 0:
+                continue
+            funded = withholding_funded.get(category["id"], ZERO)
+            self.unplanned_breakdown.append({
+                "name": category["name"],
+                "spent": category_spent,
+                "withholding_funded": funded,
+                "out_of_pocket": category_spent - funded,
+                "bucket_names": list(bucket_names[category["id"]]) if funded > 0 else [],
+                "has_withholding": funded > 0,
+            })
+            self.total_unplanned_spent += category_spent
+            self.total_true_unplanned_spent += category_spent - funded
+            self.total_withholding_funded_unplanned += funded
+
+        business_expense = next((c for c in self.categories if c["name"] == BUSINESS_EXPENSE), None)
+        self.business_expense_total = spent.get(business_expense["id"], ZERO) if business_expense else ZERO
+
+        # Withholding: buckets with a monthly target
+        self.target_buckets = [b for b in self.buckets if b["monthly_target"] is not None]
+        self.withholding_breakdown = []
+        self.total_withholding_target = ZERO
+        self.total_withholding_actual = ZERO
+        for bucket in self.target_buckets:
+            actual = contributions.get(bucket["id"], ZERO)
+            variance = actual - bucket["monthly_target"]
+            self.withholding_breakdown.append({
+                "name": bucket["name"],
+                "target": bucket["monthly_target"],
+                "actual": actual,
+                "variance": variance,
+                "status": _status(variance),
+            })
+            self.total_withholding_target += bucket["monthly_target"]
+            self.total_withholding_actual += actual
+        self.withholding_variance = self.total_withholding_actual - self.total_withholding_target
+
+        # Surplus: income - (planned + out-of-pocket unplanned + withholding);
+        # Business Expense is left out, net_surplus keeps it for reference
+        self.true_surplus = (
+            self.total_income - self.total_planned_spent - self.total_true_unplanned_spent
+            - self.total_withholding_actual
+        )
+        self.net_surplus = self.total_income - self.total_expenses
+        if self.true_surplus > 0:
+            self.planned_under_spend = sum(
+                (item["budget"] - item["spent"] for item in self.planned_breakdown if item["variance"] < 0), ZERO
+            )
+            self.excess_to_save = self.true_surplus
+            self.deficit_amount = ZERO
+        else:
+            self.planned_under_spend = ZERO
+            self.excess_to_save = ZERO
+            self.deficit_amount = abs(self.true_surplus)
+
+        # Excess already saved by wizard step 2
+        self.excess_saved = ZERO
+        excess_bucket = next((b for b in self.buckets if b["name"] == EXCESS_BUCKET), None)
+        if self.net_surplus > 0 and excess_bucket:
+            excess_transfer = next(
+                (
+                    t for t in self.transfers
+                    if t["withholding_category_id"] == excess_bucket["id"]
+                    and EXCESS_DESCRIPTION.lower() in (t["description"] or "").lower()
+                ),
+                None,
+            )
+            if excess_transfer:
+                self.excess_saved = excess_transfer["amount"]
+
+    # ------------------------------------------------------------------
+    # Lookups
+    # ------------------------------------------------------------------
+
+    def spent(self, category_id):
+        return self.spent_by_category.get(category_id, ZERO)
+
+    def received(self, income_category_id):
+        return self.received_by_income_category.get(income_category_id, ZERO)
+
+    def withholding_funded(self, category_id):
+        return self.withholding_funded_by_category.get(category_id, ZERO)
+
+    def bucket_contribution(self, bucket_id):
+        return self.bucket_contributions.get(bucket_id, ZERO)
+
+    def bucket_payout(self, bucket_id):
+        return self.bucket_payouts.get(bucket_id, ZERO)
+
+    @property
+    def partner_transfers(self):
+        """Partner transfers as stored on MonthEndClose (None without a partner account)."""
+        return self.partner_total if self.partner_account_id else None
+
+    def summary_context(self):
+        """The step 2 template variables."""
+        return {
+            'total_income': self.total_income,
+            'total_expenses': self.total_expenses,
+            'net_savings': self.net_savings,
+            'total_transfers': self.total_transfers,
+            'transaction_count': self.transaction_count,
+            'income_count': self.income_count,
+            'expense_count': self.expense_count,
+            'transfer_count': self.transfer_count,
+
+            'income_breakdown': self.income_breakdown,
+            'business_reimbursement_total': self.business_reimbursement_total,
+
+            'planned_breakdown': self.planned_breakdown,
+            'total_planned_budget': self.total_planned_budget,
+            'total_planned_spent': self.total_planned_spent,
+            'planned_variance': self.planned_variance,
+
+            'unplanned_breakdown': self.unplanned_breakdown,
+            'total_unplanned_spent': self.total_unplanned_spent,
+            'total_true_unplanned_spent': self.total_true_unplanned_spent,
+            'total_withholding_funded_unplanned': self.total_withholding_funded_unplanned,
+
+            'business_expense_total': self.business_expense_total,
+
+            'withholding_breakdown': self.withholding_breakdown,
+            'total_withholding_target': self.total_withholding_target,
+            'total_withholding_actual': self.total_withholding_actual,
+            'withholding_variance': self.withholding_variance,
+
+            'net_surplus': self.net_surplus,
+            'true_surplus': self.true_surplus,
+            'has_surplus': self.true_surplus > 0,
+            'excess_to_save': self.excess_to_save,
+            'planned_under_spend': self.planned_under_spend,
+            'deficit_amount': self.deficit_amount,
+        }
+
+
+# ----------------------------------------------------------------------
+# Close snapshots
+# ----------------------------------------------------------------------
+
+def close_snapshots(close):
+    """
+    Unsaved expense, withholding and income snapshot rows for a close (without
+    month_close set), holding everything category_progress and
+    withholding_overview show for the month so a locked month never has to
+    read its transactions again.
+
+    Every active category with a limit, every bucket and every income category
+    gets a row. Bucket balances are the legacy ledger balance as of month end.
+    """
+    bucket_balances = dict(
+        WithholdingTransaction.objects.filter(date__lte=close.last_day)
+        .values("category_id")
+        .annotate(total=Sum("amount"))
+        .values_list("category_id", "total")
+    )
+    expense_snapshots = [
+        MonthEndExpenseCategorySnapshot(
+            category_id=category["id"],
+            monthly_limit=category["monthly_limit"],
+            actual_spent=close.spent(category["id"]),
+            withholding_funded=close.withholding_funded(category["id"]),
+        )
+        for category in close.categories
+        if not category["is_archived"] and category["monthly_limit"] is not None
+    ]
+    withholding_snapshots = [
+        MonthEndWithholdingCategorySnapshot(
+            withholding_category_id=bucket["id"],
+            monthly_target=bucket["monthly_target"] or ZERO,
+            actual_contributed=close.bucket_contribution(bucket["id"]),
+            actual_paid_out=close.bucket_payout(bucket["id"]),
+            balance=bucket_balances.get(bucket["id"]) or ZERO,
+            target_amount=bucket["target_amount"],
+        )
+        for bucket in close.buckets
+    ]
+    income_snapshots = [
+        MonthEndIncomeCategorySnapshot(
+            income_category_id=inc_cat["id"],
+            monthly_target=inc_cat["monthly_target"] or ZERO,
+            actual_received=close.received(inc_cat["id"]),
+        )
+        for inc_cat in close.income_categories
+    ]
+    return expense_snapshots, withholding_snapshots, income_snapshots
+
+
+# ----------------------------------------------------------------------
+# Cache between wizard steps
+# ----------------------------------------------------------------------
+
+def _cache_key(month):
+    return f"month-close:{month:%Y-%m}"
+
+
+def month_fingerprint(month):
+    """
+    Digest of the month's rollup rows and of its "month:YYYY-MM" and "refdata"
+    DataVersion counters; changes whenever a transaction in the month does, or
+    a category limit, bucket or income target, or archived flag.
+    """
+    month = month_start(month)
+    rows = MonthlyCategoryRollup.objects.filter(month=month).order_by(
+        "dimension", "key_id"
+    ).values_list("dimension", "key_id", "total", "count")
+    keys = [month_key(month), REFDATA]
+    versions = current_versions(keys)
+    counters = [versions.get(key, (0, None))[0] for key in keys]
+    return hashlib.sha1(repr((list(rows), counters)).encode()).hexdigest()
+
+
+def get_month_close(month, refresh=False):
+    """
+    The MonthCloseCalculator for a month, from the cache when the month's
+    transactions haven't changed since it was computed.
+
+    refresh: always recompute (and re-cache), e.g. when the figures are first
+             shown for review
+    """
+    month = month_start(month)
+    fingerprint = month_fingerprint(month)
+    if not refresh:
+        cached = cache.get(_cache_key(month))
+        if cached and cached[0] == fingerprint:
+            return cached[1]
+
+    calculator = MonthCloseCalculator(month)
+    cache.set(_cache_key(month), (fingerprint, calculator), CACHE_TIMEOUT)
+    return calculator
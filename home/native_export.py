@@ -0,0 +1,218 @@
+"""
+Compact export/import of the home app (replaces dumpdata/loaddata for backups).
+
+Format: one gzip'd NDJSON stream.
+
+    {"format": "finch-export", "version": 1, "app": "home"}
+    {"model": "home.category", "fields": ["id", "name", ...]}
+    [1, "Groceries", ...]
+    [2, "Dining", ...]
+    {"model": "home.expense", "fields": [...]}
+    ...
+
+Each model section is a header line naming its columns, then one JSON array
+per row, read with values_list() in chunks; no model instances, no per-field
+keys and no indentation. Models come in dependency order (M2M tables included)
+so import_home_data() can insert each section as it streams past.
+"""
+
+import base64
+import gzip
+import io
+import json
+from datetime import date, datetime, time
+from decimal import Decimal
+from uuid import UUID
+
+from django.apps import apps
+from django.core.management.color import no_style
+from django.core.serializers import sort_dependencies
+from django.db import connection, transaction
+
+from .refdata import invalidate_reference_data
+from .versions import bump_all_month_versions
+
+
+FORMAT = "finch-export"
+VERSION = 1
+CHUNK_SIZE = 2000
+
+
+class ExportFormatError(ValueError):
+    pass
+
+
+def export_models():
+    """home models (and their M2M tables) in dependency order."""
+    skipped = {apps.get_model("home", "DataVersion")}  # cache counters, not data
+    app_config = apps.get_app_config("home")
+    models = sort_dependencies([(app_config, None)], allow_cycles=True)
+    through = [
+        field.remote_field.through
+        for model in models
+        for field in model._meta.local_many_to_many
+        if field.remote_field.through._meta.auto_created
+    ]
+    return [model for model in models if not model._meta.proxy and model not in skipped] + through
+
+
+def _columns(model):
+    return [field for field in model._meta.concrete_fields]
+
+
+def _encode(value):
+    if isinstance(value, Decimal):
+        return str(value)
+    if isinstance(value, (datetime, date, time)):
+        return value.isoformat()
+    if isinstance(value, (bytes, memoryview)):
+        return base64.b64encode(bytes(value)).decode("ascii")
+    if isinstance(value, UUID):
+        return str(value)
+    raise TypeError(f"Can't export {type(value).__name__}")
+
+
+def export_home_data(fileobj, compresslevel=6):
+    """
+    Write the home app to a binary file-like object.
+
+    Neither the gzip header nor the stream carries a timestamp, so unchanged
+    data exports to identical bytes (and dedupes in the backup store).
+
+    Returns:
+        {model label: row count}
+    """
+    counts = {}
+    with gzip.GzipFile(fileobj=fileobj, mode="wb", compresslevel=compresslevel, mtime=0) as raw:
+        out = io.TextIOWrapper(raw, encoding="utf-8", newline="\n")
+        dumps = json.JSONEncoder(default=_encode, separators=(",", ":"), ensure_ascii=False).encode
+
+        out.write(dumps({
+            "format": FORMAT,
+            "version": VERSION,
+            "app": "home",
+        }) + "\n")
+
+        for model in export_models():
+            columns = [field.attname for field in _columns(model)]
+            out.write(dumps({"model": model._meta.label_lower, "fields": columns}) + "\n")
+            count = 0
+            rows = model._base_manager.order_by("pk").values_list(*columns).iterator(chunk_size=CHUNK_SIZE)
+            for row in rows:
+                out.write(dumps(row))
+                out.write("\n")
+                count += 1
+            counts[model._meta.label_lower] = count
+
+        out.flush()
+        out.detach()
+    return counts
+
+
+def _insert_plan(model, columns):
+    """INSERT statement plus a per-column converter from exported JSON to a DB parameter."""
+    fields = {field.attname: field for field in _columns(model)}
+    unknown = [column for column in columns if column not in fields]
+    if unknown:
+        raise ExportFormatError(f"{model._meta.label_lower} has no column(s) {', '.join(unknown)}")
+
+    def converter(field):
+        def convert(value):
+            if value is None:
+                return None
+            return field.get_db_prep_save(field.to_python(value), connection)
+        return convert
+
+    quote = connection.ops.quote_name
+    sql = "INSERT INTO {} ({}) VALUES ({})".format(
+        quote(model._meta.db_table),
+        ", ".join(quote(fields[column].column) for column in columns),
+        ", ".join(["%s"] * len(columns)),
+    )
+    return sql, [converter(fields[column]) for column in columns]
+
+
+def import_home_data(fileobj, replace=False, batch_size=CHUNK_SIZE):
+    """
+    Load an export_home_data() stream in one transaction, inserting each
+    model's rows in batches with executemany().
+
+    No model code runs: signals don't fire and auto_now fields keep their
+    exported values, so balances, ledgers and timestamps come back exactly as
+    exported (like loaddata's raw saves).
+
+    Args:
+        replace: delete the existing home rows first; otherwise the home
+                 tables must be empty
+
+    Returns:
+        {model label: row count}
+
+    Raises:
+        ExportFormatError: not an export, or it doesn't match the current models
+    """
+    models = export_models()
+    counts = {}
+
+    with transaction.atomic():
+        if replace:
+            with connection.cursor() as cursor:
+                for model in reversed(models):
+                    cursor.execute(f"DELETE FROM {connection.ops.quote_name(model._meta.db_table)}")
+        else:
+            occupied = [model._meta.label_lower for model in models if model._base_manager.exists()]
+            if occupied:
+                raise ExportFormatError(
+                    f"The database already has data ({', '.join(occupied[:3])}...); use replace to overwrite it"
+                )
+
+        with gzip.GzipFile(fileobj=fileobj, mode="rb") as raw:
+            lines = io.TextIOWrapper(raw, encoding="utf-8")
+            try:
+                header = json.loads(next(lines))
+            except (StopIteration, ValueError, OSError):
+                raise ExportFormatError("Not a finch-export file")
+            if header.get("format") != FORMAT or header.get("version") != VERSION:
+                raise ExportFormatError("Not a finch-export file (or an unsupported version)")
+
+            label = sql = converters = None
+            batch = []
+
+            def flush():
+                if batch:
+                    with connection.cursor() as cursor:
+                        cursor.executemany(sql, batch)
+                    batch.clear()
+
+            for line in lines:
+                item = json.loads(line)
+                if isinstance(item, dict):
+                    flush()
+                    try:
+                        model = apps.get_model(item["model"])
+                    except LookupError:
+                        raise ExportFormatError(f"Unknown model {item['model']}")
+                    label = model._meta.label_lower
+                    sql, converters = _insert_plan(model, item["fields"])
+                    counts[label] = 0
+                    continue
+
+                batch.append([convert(value) for convert, value in zip(converters, item)])
+                counts[label] += 1
+                if len(batch) >= batch_size:
+                    flush()
+            flush()
+
+        # Next inserted ids continue after the restored ones (PostgreSQL)
+        reset_sql = connection.ops.sequence_reset_sql(no_style(), models)
+        if reset_sql:
+            with connection.cursor() as cursor:
+                for statement in reset_sql:
+                    cursor.execute(statement)
+
+        # No signals ran, so tell the caches the reference tables and every
+        # month's transactions changed
+        invalidate_reference_data()
+        bump_all_month_versions()
+
+    return counts
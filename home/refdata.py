@@ -0,0 +1,177 @@
+"""
+Reference data for dropdowns and lookups.
+
+Categories, bank accounts, rental units, CRA categories, withholding buckets
+and income categories are small and change rarely, but nearly every page and
+the add-transaction form list them, often several times per request.
+get_reference_data() returns them as one immutable ReferenceData snapshot:
+
+- Built once per process and reused across requests while the "refdata"
+  DataVersion counter (see home/versions.py) is unchanged; the post_save/post_delete handlers in
+  home/signals.py bump it (and drop this process's copy), so every worker
+  sees an edit on its next request. Checking costs one indexed lookup.
+- With settings.REFDATA_CACHE naming a CACHES alias, a newly started (or
+  invalidated) process takes the built snapshot from that cache instead of
+  re-running the queries.
+
+Changes made with queryset.update() bypass the signals; call
+invalidate_reference_data() after them.
+
+The snapshot is for choices and names only: BankAccount.current_balance is
+deferred, so reading a balance off a cached account still fetches the
+current value.
+"""
+
+import threading
+from dataclasses import dataclass, field
+
+from django.conf import settings
+from django.core.cache import caches
+from django.forms.models import ModelChoiceIterator
+
+from .models import (
+    BankAccount,
+    Category,
+    CRARentalExpenseCategory,
+    IncomeCategory,
+    RentalUnit,
+    WithholdingCategory,
+)
+from .versions import bump_version, current_version
+
+
+REFDATA = "refdata"
+SHARED_CACHE_TIMEOUT = 60 * 60 * 24
+
+
+@dataclass(frozen=True)
+class ReferenceData:
+    version: int
+    categories: tuple              # all expense categories, by name
+    active_categories: tuple       # not archived, by name
+    bank_accounts: tuple           # by institution, name
+    rental_units: tuple            # with property, by property name, name
+    cra_categories: tuple          # active, by sort order, name
+    withholding_categories: tuple  # with account, by account name, name
+    income_categories: tuple       # by name
+    _by_pk: dict = field(default=None, repr=False, compare=False)
+
+    def __post_init__(self):
+        object.__setattr__(self, "_by_pk", {
+            name: {obj.pk: obj for obj in getattr(self, name)}
+            for name in ("categories", "bank_accounts", "income_categories", "withholding_categories")
+        })
+
+    def category(self, pk):
+        return self._by_pk["categories"].get(_as_pk(pk))
+
+    def bank_account(self, pk):
+        return self._by_pk["bank_accounts"].get(_as_pk(pk))
+
+    def income_category(self, pk):
+        return self._by_pk["income_categories"].get(_as_pk(pk))
+
+    def withholding_category(self, pk):
+        return self._by_pk["withholding_categories"].get(_as_pk(pk))
+
+
+def _as_pk(value):
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+
+# ----------------------------------------------------------------------
+# Snapshot
+# ----------------------------------------------------------------------
+
+_lock = threading.Lock()
+_snapshot = None
+
+
+def _load(version):
+    categories = tuple(Category.objects.order_by("name"))
+    return ReferenceData(
+        version=version,
+        categories=categories,
+        active_categories=tuple(c for c in categories if not c.is_archived),
+        bank_accounts=tuple(
+            BankAccount.objects.defer("current_balance", "last_updated").order_by("institution", "name")
+        ),
+        rental_units=tuple(RentalUnit.objects.select_related("property").order_by("property__name", "name")),
+        cra_categories=tuple(CRARentalExpenseCategory.objects.filter(is_active=True).order_by("sort_order", "name")),
+        withholding_categories=tuple(
+            WithholdingCategory.objects.select_related("account").order_by("account__name", "name")
+        ),
+        income_categories=tuple(IncomeCategory.objects.order_by("name")),
+    )
+
+
+def _shared_cache():
+    alias = getattr(settings, "REFDATA_CACHE", "")
+    return caches[alias] if alias else None
+
+
+def get_reference_data():
+    """
+    The current ReferenceData. Costs one indexed query while nothing has
+    changed; fetch it once per request and pass it along (e.g. to
+    TransactionForm(refdata=...)).
+    """
+    global _snapshot
+
+    version = current_version(REFDATA)
+    with _lock:
+        if _snapshot is not None and _snapshot.version == version:
+            return _snapshot
+
+    shared = _shared_cache()
+    data = shared.get(f"{REFDATA}:{version}") if shared else None
+    if data is None:
+        data = _load(version)
+        if shared:
+            shared.set(f"{REFDATA}:{version}", data, SHARED_CACHE_TIMEOUT)
+
+    with _lock:
+        _snapshot = data
+    return data
+
+
+def invalidate_reference_data():
+    """Bump the version so every process rebuilds on its next request."""
+    global _snapshot
+
+    bump_version(REFDATA)
+    with _lock:
+        _snapshot = None
+
+
+# ----------------------------------------------------------------------
+# Forms
+# ----------------------------------------------------------------------
+
+class _SnapshotChoiceIterator(ModelChoiceIterator):
+    def __init__(self, field, objects):
+        super().__init__(field)
+        self.objects = objects
+
+    def __iter__(self):
+        if self.field.empty_label is not None:
+            yield ("", self.field.empty_label)
+        for obj in self.objects:
+            yield self.choice(obj)
+
+    def __len__(self):
+        return len(self.objects) + (self.field.empty_label is not None)
+
+    def __bool__(self):
+        return self.field.empty_label is not None or bool(self.objects)
+
+
+def use_snapshot_choices(form_field, objects):
+    """
+    Render a ModelChoiceField's options from snapshot objects instead of
+    querying. Submitted values are still validated against its queryset.
+    """
+    form_field.widget.choices = _SnapshotChoiceIterator(form_field, objects)
@@ -0,0 +1,354 @@
+"""
+Monthly rollup service.
+
+Month totals (spent per category, received per income category,
+withholding-funded spending per category, bucket contributions/payouts,
+account outflows and rental unit income/expenses) live in the
+MonthlyCategoryRollup table. The signal handlers in home/signals.py keep it
+current as transactions are created, edited and deleted, and
+rebuild_monthly_rollups() regenerates it from the raw rows.
+
+Views read a month with MonthlyRollup (one query) or a series of months with
+monthly_totals() (one query), regardless of how many categories, buckets or
+transactions exist.
+"""
+
+from calendar import monthrange
+from collections import defaultdict
+from datetime import date
+from decimal import Decimal
+
+from django.apps import apps as global_apps
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F, Sum
+from django.db.models.functions import TruncMonth
+
+from .models import MonthlyCategoryRollup, RollupDimension, WithholdingCategory, WithholdingTransaction
+
+
+ZERO = Decimal("0.00")
+
+# key_id used for income without an income category
+UNCATEGORISED = 0
+
+
+def month_bounds(year, month):
+    """Return (first_day, last_day) for the given calendar month."""
+    first_day = date(year, month, 1)
+    last_day = date(year, month, monthrange(year, month)[1])
+    return first_day, last_day
+
+
+def month_start(d):
+    return date(d.year, d.month, 1)
+
+
+class MonthlyRollup:
+    """
+    Totals for a single calendar month, read from MonthlyCategoryRollup.
+
+    All lookups are plain dicts keyed by primary key; missing keys mean
+    "no activity" and read as 0.00 through the helper methods.
+
+    Sign conventions match category_progress / withholding_overview:
+      - A transfer tagged to a bucket is a contribution when it lands in the
+        bucket's account, otherwise a payout when it leaves that account.
+      - An expense funded from a bucket is always a payout.
+    """
+
+    def __init__(self, month):
+        self.month = month_start(month)
+
+        self.spent_by_category = {}
+        self.withholding_funded_by_category = {}
+        self.received_by_income_category = {}
+        self.bucket_contributions = {}
+        self.bucket_payouts = {}
+        self.transfers_out_by_account = {}
+        self.counts = defaultdict(int)
+
+        self._bucket_ledger_balances = None
+
+        self._load()
+
+    @classmethod
+    def for_month(cls, year, month):
+        return cls(date(year, month, 1))
+
+    _DIMENSION_ATTRS = {
+        RollupDimension.EXPENSE_CATEGORY: "spent_by_category",
+        RollupDimension.EXPENSE_CATEGORY_WITHHOLDING: "withholding_funded_by_category",
+        RollupDimension.INCOME_CATEGORY: "received_by_income_category",
+        RollupDimension.BUCKET_CONTRIBUTION: "bucket_contributions",
+        RollupDimension.BUCKET_PAYOUT: "bucket_payouts",
+        RollupDimension.ACCOUNT_TRANSFER_OUT: "transfers_out_by_account",
+    }
+
+    def _load(self):
+        rows = MonthlyCategoryRollup.objects.filter(
+            month=self.month,
+            dimension__in=list(self._DIMENSION_ATTRS),
+        ).values_list("dimension", "key_id", "total", "count")
+
+        for dimension, key_id, total, count in rows:
+            getattr(self, self._DIMENSION_ATTRS[dimension])[key_id] = total
+            self.counts[dimension] += count
+
+    # ------------------------------------------------------------------
+    # Lookups
+    # ------------------------------------------------------------------
+
+    def spent(self, category_id):
+        return self.spent_by_category.get(category_id, ZERO)
+
+    def withholding_funded(self, category_id):
+        return self.withholding_funded_by_category.get(category_id, ZERO)
+
+    def received(self, income_category_id):
+        if income_category_id is None:
+            income_category_id = UNCATEGORISED
+        return self.received_by_income_category.get(income_category_id, ZERO)
+
+    def bucket_contribution(self, bucket_id):
+        return self.bucket_contributions.get(bucket_id, ZERO)
+
+    def bucket_payout(self, bucket_id):
+        return self.bucket_payouts.get(bucket_id, ZERO)
+
+    def transfers_out(self, account_id):
+        return self.transfers_out_by_account.get(account_id, ZERO)
+
+    @property
+    def total_spent(self):
+        return sum(self.spent_by_category.values(), ZERO)
+
+    def total_received(self, exclude_income_category_ids=()):
+        return sum(
+            (total for key, total in self.received_by_income_category.items()
+             if key not in exclude_income_category_ids),
+            ZERO,
+        )
+
+    def bucket_balance(self, bucket_id):
+        """Legacy ledger balance; same value as WithholdingCategory.balance."""
+        if self._bucket_ledger_balances is None:
+            # All-time WithholdingTransaction totals for every bucket at once
+            self._bucket_ledger_balances = dict(
+                WithholdingTransaction.objects.values("category_id")
+                .annotate(total=Sum("amount"))
+                .values_list("category_id", "total")
+            )
+        return self._bucket_ledger_balances.get(bucket_id) or Decimal("0")
+
+
+def monthly_totals(dimension, key_ids, first_month, last_month):
+    """
+    Return {month_start: total} for the given dimension, summed over key_ids,
+    for every month between first_month and last_month (inclusive) that had
+    activity. One indexed query.
+    """
+    rows = (
+        MonthlyCategoryRollup.objects.filter(
+            dimension=dimension,
+            key_id__in=list(key_ids),
+            month__range=(month_start(first_month), month_start(last_month)),
+        )
+        .values("month")
+        .annotate(total=Sum("total"))
+    )
+    return {row["month"]: row["total"] or ZERO for row in rows}
+
+
+# =============================================================================
+# INCREMENTAL MAINTENANCE (called from home/signals.py)
+# =============================================================================
+
+def _bucket_account_id(instance):
+    # Reuse the bucket if the caller already loaded it (imports, forms)
+    if instance._meta.get_field("withholding_category").is_cached(instance):
+        bucket = instance.withholding_category
+        return bucket.account_id if bucket else None
+    return (
+        WithholdingCategory.objects.filter(pk=instance.withholding_category_id)
+        .values_list("account_id", flat=True)
+        .first()
+    )
+
+
+def rollup_entries(instance):
+    """
+    List the (month, dimension, key_id, amount) rows a single Expense, Income
+    or Transfer contributes to.
+    """
+    model_name = instance._meta.model_name
+    month = month_start(instance.date)
+    amount = Decimal(str(instance.amount or 0))
+    entries = []
+
+    if model_name == "expense":
+        entries.append((month, RollupDimension.EXPENSE_CATEGORY, instance.category_id, amount))
+        if instance.withholding_category_id:
+            entries.append((month, RollupDimension.EXPENSE_CATEGORY_WITHHOLDING, instance.category_id, amount))
+            entries.append((month, RollupDimension.BUCKET_PAYOUT, instance.withholding_category_id, amount))
+        if instance.rental_unit_id:
+            entries.append((month, RollupDimension.RENTAL_UNIT_EXPENSE, instance.rental_unit_id, amount))
+
+    elif model_name == "income":
+        entries.append((month, RollupDimension.INCOME_CATEGORY, instance.income_category_id or UNCATEGORISED, amount))
+        if instance.rental_unit_id:
+            entries.append((month, RollupDimension.RENTAL_UNIT_INCOME, instance.rental_unit_id, amount))
+
+    elif model_name == "transfer":
+        if instance.from_account_id:
+            entries.append((month, RollupDimension.ACCOUNT_TRANSFER_OUT, instance.from_account_id, amount))
+        if instance.withholding_category_id:
+            bucket_account_id = _bucket_account_id(instance)
+            if bucket_account_id is not None:
+                if instance.to_account_id == bucket_account_id:
+                    entries.append((month, RollupDimension.BUCKET_CONTRIBUTION, instance.withholding_category_id, amount))
+                elif instance.from_account_id == bucket_account_id:
+                    entries.append((month, RollupDimension.BUCKET_PAYOUT, instance.withholding_category_id, amount))
+
+    return entries
+
+
+def collect_rollup_deltas(added=(), removed=(), deltas=None):
+    """
+    Net added/removed entries into {(month, dimension, key_id): [amount, count]}.
+    Entries that cancel out (e.g. an edit that only changed the notes) drop out.
+    """
+    if deltas is None:
+        deltas = defaultdict(lambda: [ZERO, 0])
+    for month, dimension, key_id, amount in added:
+        delta = deltas[(month, dimension, key_id)]
+        delta[0] += amount
+        delta[1] += 1
+    for month, dimension, key_id, amount in removed:
+        delta = deltas[(month, dimension, key_id)]
+        delta[0] -= amount
+        delta[1] -= 1
+    return deltas
+
+
+def apply_bulk_rollup_updates(instances):
+    """Add many new rows to the rollups at once (for bulk_create, which skips signals)."""
+    added = [entry for instance in instances for entry in rollup_entries(instance)]
+    apply_rollup_deltas(collect_rollup_deltas(added=added))
+
+
+def apply_rollup_deltas(deltas):
+    """Add each (amount, count) delta to its rollup row, creating rows as needed."""
+    for (month, dimension, key_id), (amount, count) in deltas.items():
+        if not amount and not count:
+            continue
+        with transaction.atomic():
+            row = MonthlyCategoryRollup.objects.filter(month=month, dimension=dimension, key_id=key_id)
+            if row.update(total=F("total") + amount, count=F("count") + count):
+                continue
+            try:
+                with transaction.atomic():
+                    MonthlyCategoryRollup.objects.create(
+                        month=month, dimension=dimension, key_id=key_id,
+                        total=amount, count=count,
+                    )
+            except IntegrityError:
+                # Another writer created the row first
+                row.update(total=F("total") + amount, count=F("count") + count)
+
+
+# =============================================================================
+# FULL REBUILD
+# =============================================================================
+
+def _grouped(queryset, key_field):
+    return (
+        queryset.annotate(rollup_month=TruncMonth("date"))
+        .values("rollup_month", key_field)
+        .annotate(total=Sum("amount"), row_count=Count("id"))
+        .values_list("rollup_month", key_field, "total", "row_count")
+    )
+
+
+def rebuild_monthly_rollups(apps=None, dimensions=None):
+    """
+    Regenerate MonthlyCategoryRollup from the raw Expense/Income/Transfer rows
+    with one grouped query per dimension.
+
+    Args:
+        apps: app registry to load models from (pass the migration's `apps`
+              when called from a data migration). Defaults to the live registry.
+        dimensions: optional iterable of RollupDimension values to rebuild;
+                    defaults to all of them.
+
+    Returns:
+        int: number of rollup rows written
+    """
+    apps = apps or global_apps
+    Expense = apps.get_model("home", "Expense")
+    Income = apps.get_model("home", "Income")
+    Transfer = apps.get_model("home", "Transfer")
+    Rollup = apps.get_model("home", "MonthlyCategoryRollup")
+
+    dimensions = set(dimensions or RollupDimension.values)
+    totals = defaultdict(lambda: [ZERO, 0])
+
+    def add(dimension, rows, default_key=None):
+        for month, key_id, total, row_count in rows:
+            if key_id is None:
+                if default_key is None:
+                    continue
+                key_id = default_key
+            bucket = totals[(month_start(month), dimension, key_id)]
+            bucket[0] += total or ZERO
+            bucket[1] += row_count
+
+    bucket_account = F("withholding_category__account_id")
+
+    if RollupDimension.EXPENSE_CATEGORY in dimensions:
+        add(RollupDimension.EXPENSE_CATEGORY, _grouped(Expense.objects.all(), "category_id"))
+    if RollupDimension.EXPENSE_CATEGORY_WITHHOLDING in dimensions:
+        add(
+            RollupDimension.EXPENSE_CATEGORY_WITHHOLDING,
+            _grouped(Expense.objects.filter(withholding_category__isnull=False), "category_id"),
+        )
+    if RollupDimension.RENTAL_UNIT_EXPENSE in dimensions:
+        add(RollupDimension.RENTAL_UNIT_EXPENSE, _grouped(Expense.objects.all(), "rental_unit_id"))
+    if RollupDimension.INCOME_CATEGORY in dimensions:
+        add(
+            RollupDimension.INCOME_CATEGORY,
+            _grouped(Income.objects.all(), "income_category_id"),
+            default_key=UNCATEGORISED,
+        )
+    if RollupDimension.RENTAL_UNIT_INCOME in dimensions:
+        add(RollupDimension.RENTAL_UNIT_INCOME, _grouped(Income.objects.all(), "rental_unit_id"))
+    if RollupDimension.ACCOUNT_TRANSFER_OUT in dimensions:
+        add(RollupDimension.ACCOUNT_TRANSFER_OUT, _grouped(Transfer.objects.all(), "from_account_id"))
+    if RollupDimension.BUCKET_CONTRIBUTION in dimensions:
+        add(
+            RollupDimension.BUCKET_CONTRIBUTION,
+            _grouped(Transfer.objects.filter(to_account_id=bucket_account), "withholding_category_id"),
+        )
+    if RollupDimension.BUCKET_PAYOUT in dimensions:
+        add(
+            RollupDimension.BUCKET_PAYOUT,
+            _grouped(
+                Transfer.objects.filter(from_account_id=bucket_account).exclude(to_account_id=bucket_account),
+                "withholding_category_id",
+            ),
+        )
+        add(
+            RollupDimension.BUCKET_PAYOUT,
+            _grouped(Expense.objects.all(), "withholding_category_id"),
+        )
+
+    with transaction.atomic():
+        Rollup.objects.filter(dimension__in=dimensions).delete()
+        Rollup.objects.bulk_create(
+            [
+                Rollup(month=month, dimension=dimension, key_id=key_id, total=total, count=row_count)
+                for (month, dimension, key_id), (total, row_count) in totals.items()
+            ],
+            batch_size=1000,
+        )
+
+    return len(totals)
@@ -1,20 +1,44 @@
 """
 Signal handlers for automatic bank account balance updates.
 
-These signals update account balances in real-time when transactions are created or deleted.
+These signals update account balances in real-time when transactions are created, edited
+or deleted.
+Bulk operations can wrap their work in balance_batch() so the per-row updates are
+coalesced into one UPDATE per account at commit.
 Only applies to accounts with balance_tracking_enabled=True and transactions on/after
 the balance_tracking_start_date.
+
+Each balance change is also journalled in BalanceLedgerEntry (see home/ledger.py).
+They also keep the MonthlyCategoryRollup table (see home/rollups.py) in step with
+every create, edit and delete of an Income, Expense or Transfer, bump the
+affected month's data version (see home/versions.py; also for balance
+adjustments, month-end closes and forecast worksheets), and invalidate the
+cached dropdown reference data (see home/refdata.py) when its tables change.
 """
 
+import threading
+from contextlib import contextmanager
+
 from django.db import transaction
-from django.db.models.signals import post_save, post_delete
+from django.db.models import F
+from django.db.models.signals import pre_save, post_save, post_delete, m2m_changed
 from django.dispatch import receiver
 from django.utils import timezone
 from decimal import Decimal
 from datetime import date as dt_date
 
 from django.contrib.auth.models import User
-from .models import Income, Expense, Transfer, BalanceAdjustment, BankAccount, UserProfile
+from .models import (
+    Income, Expense, Transfer, BalanceAdjustment, BankAccount, UserProfile,
+    IncomeCategory, WithholdingCategory, RollupDimension, VendorRule,
+    BalanceLedgerEntry, Category, RentalProperty, RentalUnit, CRARentalExpenseCategory,
+    MonthEndClose, ForecastWorksheet, PropertyMortgage, WithholdingTransaction,
+)
+from .ledger import append_ledger_entries, rebuild_balance_ledger
+from .rollups import rollup_entries, collect_rollup_deltas, apply_rollup_deltas, rebuild_monthly_rollups
+from .refdata import invalidate_reference_data
+from .versions import ALL_MONTHS, PROFILES, bump_month_versions, bump_version
+from .vendor_rules import invalidate_vendor_matcher
 
 
 @receiver(post_save, sender=User)
@@ -50,168 +74,463 @@ def should_update_balance(account, transaction_date):
     return True
 
 
+_batch_state = threading.local()
+
+
+@contextmanager
+def balance_batch():
+    """
+    Coalesce balance updates made inside the block into one UPDATE per account.
+
+    While a batch is open, update_account_balance() and record_ledger_legs()
+    only queue their deltas and ledger entries; when the surrounding
+    transaction commits, the deltas are summed into one UPDATE per account and
+    the entries are inserted with one append_ledger_entries() call. Each item
+    is queued with transaction.on_commit() where it's made, so work done in an
+    inner atomic() block that rolls back is dropped along with it (and
+    nothing is written if the whole transaction rolls back). The block runs
+    in transaction.atomic(), and nested batches join the outermost one.
+
+    BankAccount.current_balance and the ledger are therefore stale until
+    commit inside the block.
+
+    Usable as a decorator too:
+
+        @balance_batch()
+        def my_view(request): ...
+    """
+    if getattr(_batch_state, "pending", None) is not None:
+        with transaction.atomic():
+            yield
+        return
+
+    pending = _batch_state.pending = {"deltas": {}, "ledger": []}
+    try:
+        with transaction.atomic():
+            yield
+            # Registered last, so it runs after everything queued in the block
+            transaction.on_commit(lambda: _flush_balance_batch(pending))
+    finally:
+        _batch_state.pending = None
+
+
+def _add_delta(deltas, account_id, amount):
+    deltas[account_id] = deltas.get(account_id, Decimal("0.00")) + amount
+
+
+def _flush_balance_batch(pending):
+    deltas = {account_id: delta for account_id, delta in pending["deltas"].items() if delta}
+    with transaction.atomic():
+        # Journal entries go in with the balances they explain
+        append_ledger_entries(pending["ledger"])
+        _write_balance_deltas(deltas)
+
+
+def _write_balance_deltas(deltas):
+    today = dt_date.today()
+    for account_id, delta in deltas.items():
+        # Single atomic UPDATE; no read-modify-write, so no row lock needed
+        BankAccount.objects.filter(pk=account_id).update(
+            current_balance=F("current_balance") + delta,
+            last_updated=today,
+        )
+
+
 def update_account_balance(account_id, amount_delta):
     """
     Update an account's balance by the given delta amount.
 
-    Uses select_for_update() to prevent race conditions when multiple
-    transactions are being processed concurrently.
+    Inside balance_batch() the delta is queued and written at commit;
+    otherwise it's applied straight away with a single UPDATE.
 
     Args:
         account_id: ID of the BankAccount to update
         amount_delta: Amount to add to the current balance (can be negative)
     """
-    with transaction.atomic():
-        account = BankAccount.objects.select_for_update().get(pk=account_id)
-        account.current_balance += Decimal(str(amount_delta))
-        account.last_updated = dt_date.today()
-        account.save(update_fields=['current_balance', 'last_updated'])
+    amount_delta = Decimal(str(amount_delta))
 
+    pending = getattr(_batch_state, "pending", None)
+    if pending is not None:
+        # Queued per call so a rolled-back savepoint discards it (see balance_batch)
+        transaction.on_commit(lambda: _add_delta(pending["deltas"], account_id, amount_delta))
+        return
 
-# =============================================================================
-# INCOME SIGNALS
-# =============================================================================
+    _write_balance_deltas({account_id: amount_delta})
 
-@receiver(post_save, sender=Income)
-def income_post_save(sender, instance, created, **kwargs):
+
+def _balance_legs(instance):
+    """(account_id, signed amount) for each account a transaction moves money in or out of."""
+    if isinstance(instance, Income):
+        return [(instance.bank_account_id, instance.amount)]
+    if isinstance(instance, Expense):
+        # Includes withholding bucket expenses: the money really leaves the account
+        return [(instance.bank_account_id, -instance.amount)]
+    if isinstance(instance, Transfer):
+        return [(instance.from_account_id, -instance.amount), (instance.to_account_id, instance.amount)]
+    if isinstance(instance, BalanceAdjustment):
+        # Adjustments can be positive or negative
+        return [(instance.bank_account_id, instance.amount)]
+    return []
+
+
+def tracked_legs(instance, accounts=None):
+    """
+    The legs of one transaction that count toward tracked account balances.
+
+    Args:
+        instance: an Income, Expense, Transfer or BalanceAdjustment
+        accounts: optional {account_id: BankAccount}; fetched in one query if omitted
+
+    Returns:
+        list of (account_id, date, signed amount), skipping untracked accounts
+        and transactions before the account's balance_tracking_start_date
     """
-    When income is created, increase the account balance.
+    legs = [(account_id, amount) for account_id, amount in _balance_legs(instance) if account_id and amount]
+    if accounts is None:
+        accounts = BankAccount.objects.in_bulk({account_id for account_id, _ in legs})
+
+    return [
+        (account_id, instance.date, amount)
+        for account_id, amount in legs
+        if should_update_balance(accounts.get(account_id), instance.date)
+    ]
+
+
+def _sum_legs(legs):
+    totals = {}
+    for account_id, _, amount in legs:
+        totals[account_id] = totals.get(account_id, Decimal("0.00")) + amount
+    return totals
+
+
+def balance_effects(instances, accounts=None):
     """
-    if not created:
-        # Updates to existing income are not currently handled
-        # (would require tracking previous values)
-        return
+    What the given transactions contribute to tracked account balances.
 
-    account = instance.bank_account
-    if not should_update_balance(account, instance.date):
-        return
+    Returns:
+        dict: {account_id: total delta}
+    """
+    return _sum_legs([leg for instance in instances for leg in tracked_legs(instance, accounts)])
 
-    # Income increases the account balance
-    update_account_balance(account.id, instance.amount)
 
+def apply_balance_change(before, after):
+    """
+    Apply the difference between two balance_effects() results.
 
-@receiver(post_delete, sender=Income)
-def income_post_delete(sender, instance, **kwargs):
+    Returns:
+        dict: {account_id: delta applied}
     """
-    When income is deleted, decrease the account balance.
+    deltas = {}
+    for account_id in before.keys() | after.keys():
+        delta = after.get(account_id, Decimal("0.00")) - before.get(account_id, Decimal("0.00"))
+        if delta:
+            update_account_balance(account_id, delta)
+            deltas[account_id] = delta
+    return deltas
+
+
+def record_ledger_legs(instance, legs, reversal=False):
     """
-    account = instance.bank_account
-    if not should_update_balance(account, instance.date):
-        return
+    Journal a transaction's tracked legs in BalanceLedgerEntry (see home/ledger.py);
+    reversal=True negates them (the row was edited or deleted).
+    """
+    entries = [
+        BalanceLedgerEntry(
+            bank_account_id=account_id,
+            date=transaction_date,
+            amount=-amount if reversal else amount,
+            source_type=instance._meta.model_name,
+            source_id=instance.pk,
+            is_reversal=reversal,
+        )
+        for account_id, transaction_date, amount in legs
+    ]
+
+    pending = getattr(_batch_state, "pending", None)
+    if pending is not None:
+        transaction.on_commit(lambda: pending["ledger"].extend(entries))
+    else:
+        append_ledger_entries(entries)
+
+
+def apply_bulk_balance_updates(instances):
+    """
+    Apply the balance effect of many new transactions with one update per account.
+
+    Used where rows are inserted with bulk_create (which skips post_save), e.g. the
+    CSV import commit. Follows the same rules as the post_save handlers below.
+    Inside balance_batch() the totals join the batch.
+
+    Args:
+        instances: iterable of newly created Income, Expense and Transfer instances
 
-    # Reverse the income (decrease balance)
-    update_account_balance(account.id, -instance.amount)
+    Returns:
+        dict: {account_id: total delta applied}
+    """
+    instances = list(instances)
+    account_ids = {account_id for instance in instances for account_id, _ in _balance_legs(instance) if account_id}
+    accounts = BankAccount.objects.in_bulk(account_ids)
+
+    all_legs = []
+    for instance in instances:
+        legs = tracked_legs(instance, accounts)
+        record_ledger_legs(instance, legs)
+        all_legs.extend(legs)
+    return apply_balance_change({}, _sum_legs(all_legs))
 
 
 # =============================================================================
-# EXPENSE SIGNALS
+# BALANCE SIGNALS (Income, Expense, Transfer, BalanceAdjustment)
 # =============================================================================
 
-@receiver(post_save, sender=Expense)
-def expense_post_save(sender, instance, created, **kwargs):
-    """
-    When expense is created, decrease the account balance.
+ROLLUP_MODELS = (Income, Expense, Transfer)
+
 
-    Special handling for withholding bucket expenses:
-    - If an expense is tagged to a withholding_category, it decreases the account balance
-    - This represents money actually leaving the account to pay a bill
+@receiver(pre_save, sender=Income)
+@receiver(pre_save, sender=Expense)
+@receiver(pre_save, sender=Transfer)
+@receiver(pre_save, sender=BalanceAdjustment)
+def transaction_pre_save(sender, instance, **kwargs):
     """
-    if not created:
-        # Updates to existing expenses are not currently handled
-        return
+    Snapshot what an existing row contributed to balances (and rollups) before
+    it changes, so post_save can apply just the difference. Amount, date and
+    account edits (including moving a row across accounts or across
+    balance_tracking_start_date) then cost one UPDATE per affected account.
+    """
+    previous = None
+    if instance.pk:
+        previous = sender.objects.filter(pk=instance.pk).first()
 
-    account = instance.bank_account
-    if not should_update_balance(account, instance.date):
+    instance._balance_previous = tracked_legs(previous) if previous else []
+    instance._previous_date = previous.date if previous else None
+    if sender in ROLLUP_MODELS:
+        instance._rollup_previous = rollup_entries(previous) if previous else []
+
+
+@receiver(post_save, sender=Income)
+@receiver(post_save, sender=Expense)
+@receiver(post_save, sender=Transfer)
+@receiver(post_save, sender=BalanceAdjustment)
+def balance_post_save(sender, instance, **kwargs):
+    """
+    New rows apply their full effect; edits reverse the old legs and apply the
+    new ones (nothing happens if the balance-relevant fields didn't change).
+    """
+    previous = getattr(instance, "_balance_previous", [])
+    instance._balance_previous = []
+    current = tracked_legs(instance)
+    if current == previous:
         return
 
-    # Expenses decrease the account balance (including withholding bucket expenses)
-    update_account_balance(account.id, -instance.amount)
+    apply_balance_change(_sum_legs(previous), _sum_legs(current))
+    record_ledger_legs(instance, previous, reversal=True)
+    record_ledger_legs(instance, current)
 
 
+@receiver(post_delete, sender=Income)
 @receiver(post_delete, sender=Expense)
-def expense_post_delete(sender, instance, **kwargs):
+@receiver(post_delete, sender=Transfer)
+@receiver(post_delete, sender=BalanceAdjustment)
+def balance_post_delete(sender, instance, **kwargs):
     """
-    When expense is deleted, increase the account balance.
+    Reverse a deleted row's effect.
     """
-    account = instance.bank_account
-    if not should_update_balance(account, instance.date):
-        return
+    legs = tracked_legs(instance)
+    apply_balance_change(_sum_legs(legs), {})
+    record_ledger_legs(instance, legs, reversal=True)
 
-    # Reverse the expense (increase balance)
-    update_account_balance(account.id, instance.amount)
+
+@receiver(pre_save, sender=BankAccount)
+def bank_account_pre_save(sender, instance, update_fields=None, **kwargs):
+    """
+    Track the account's previous balance tracking settings.
+    """
+    instance._previous_tracking = None
+    if instance.pk and (update_fields is None or {"balance_tracking_enabled", "balance_tracking_start_date"} & set(update_fields)):
+        instance._previous_tracking = (
+            sender.objects.filter(pk=instance.pk)
+            .values_list("balance_tracking_enabled", "balance_tracking_start_date")
+            .first()
+        )
+
+
+@receiver(post_save, sender=BankAccount)
+def bank_account_post_save(sender, instance, created, **kwargs):
+    """
+    Turning tracking on/off or moving the start date changes which transactions
+    count, so rebuild the account's balance ledger.
+    """
+    previous = getattr(instance, "_previous_tracking", None)
+    current = (instance.balance_tracking_enabled, instance.balance_tracking_start_date)
+    if (created and instance.balance_tracking_enabled) or (previous is not None and previous != current):
+        rebuild_balance_ledger(account_ids=[instance.pk])
 
 
 # =============================================================================
-# TRANSFER SIGNALS
+# MONTHLY ROLLUP SIGNALS
 # =============================================================================
 
+@receiver(post_save, sender=Income)
+@receiver(post_save, sender=Expense)
 @receiver(post_save, sender=Transfer)
-def transfer_post_save(sender, instance, created, **kwargs):
+def rollup_post_save(sender, instance, **kwargs):
     """
-    When transfer is created:
-    - Decrease from_account balance
-    - Increase to_account balance
+    Add the new row's contribution and remove its previous one (edits, see
+    transaction_pre_save).
     """
-    if not created:
-        # Updates to existing transfers are not currently handled
-        return
+    removed = getattr(instance, "_rollup_previous", [])
+    apply_rollup_deltas(collect_rollup_deltas(added=rollup_entries(instance), removed=removed))
+    instance._rollup_previous = []
 
-    # Update from_account (decrease)
-    if instance.from_account:
-        if should_update_balance(instance.from_account, instance.date):
-            update_account_balance(instance.from_account.id, -instance.amount)
 
-    # Update to_account (increase)
-    if instance.to_account:
-        if should_update_balance(instance.to_account, instance.date):
-            update_account_balance(instance.to_account.id, instance.amount)
+@receiver(post_delete, sender=Income)
+@receiver(post_delete, sender=Expense)
+@receiver(post_delete, sender=Transfer)
+def rollup_post_delete(sender, instance, **kwargs):
+    """
+    Remove a deleted row's contribution.
+    """
+    apply_rollup_deltas(collect_rollup_deltas(removed=rollup_entries(instance)))
 
 
-@receiver(post_delete, sender=Transfer)
-def transfer_post_delete(sender, instance, **kwargs):
+@receiver(pre_save, sender=WithholdingCategory)
+def withholding_category_pre_save(sender, instance, **kwargs):
+    """
+    Track the bucket's previous account; contributions/payouts depend on it.
     """
-    When transfer is deleted, reverse both balance changes.
+    instance._previous_account_id = (
+        sender.objects.filter(pk=instance.pk).values_list("account_id", flat=True).first()
+        if instance.pk else None
+    )
+
+
+@receiver(post_save, sender=WithholdingCategory)
+def withholding_category_post_save(sender, instance, created, **kwargs):
     """
-    # Reverse from_account (increase)
-    if instance.from_account:
-        if should_update_balance(instance.from_account, instance.date):
-            update_account_balance(instance.from_account.id, instance.amount)
+    Moving a bucket to another account changes which of its transfers count as
+    contributions vs payouts, so rebuild the bucket dimensions.
+    """
+    previous_account_id = getattr(instance, "_previous_account_id", None)
+    if not created and previous_account_id is not None and previous_account_id != instance.account_id:
+        rebuild_monthly_rollups(dimensions=[
+            RollupDimension.BUCKET_CONTRIBUTION,
+            RollupDimension.BUCKET_PAYOUT,
+        ])
+
 
-    # Reverse to_account (decrease)
-    if instance.to_account:
-        if should_update_balance(instance.to_account, instance.date):
-            update_account_balance(instance.to_account.id, -instance.amount)
+@receiver(post_delete, sender=WithholdingCategory)
+def withholding_category_post_delete(sender, instance, **kwargs):
+    """
+    Deleting a bucket nulls it out on its expenses/transfers (SET_NULL, no
+    per-row signals), so rebuild the dimensions that depend on it.
+    """
+    rebuild_monthly_rollups(dimensions=[
+        RollupDimension.EXPENSE_CATEGORY_WITHHOLDING,
+        RollupDimension.BUCKET_CONTRIBUTION,
+        RollupDimension.BUCKET_PAYOUT,
+    ])
+
+
+@receiver(post_delete, sender=IncomeCategory)
+def income_category_post_delete(sender, instance, **kwargs):
+    """
+    Income from a deleted category becomes uncategorised (SET_NULL).
+    """
+    rebuild_monthly_rollups(dimensions=[RollupDimension.INCOME_CATEGORY])
 
 
 # =============================================================================
-# BALANCE ADJUSTMENT SIGNALS
+# VENDOR RULE SIGNALS
 # =============================================================================
 
-@receiver(post_save, sender=BalanceAdjustment)
-def balance_adjustment_post_save(sender, instance, created, **kwargs):
+@receiver(post_save, sender=VendorRule)
+@receiver(post_delete, sender=VendorRule)
+def vendor_rule_changed(sender, instance, **kwargs):
     """
-    When balance adjustment is created, apply the adjustment amount.
+    Drop the compiled import matcher so the next import recompiles it.
     """
-    if not created:
-        # Updates to existing adjustments are not currently handled
-        return
+    invalidate_vendor_matcher()
 
-    account = instance.bank_account
-    if not should_update_balance(account, instance.date):
-        return
 
-    # Apply the adjustment (can be positive or negative)
-    update_account_balance(account.id, instance.amount)
+# =============================================================================
+# MONTH DATA VERSION SIGNALS
+# =============================================================================
+
+@receiver(post_save, sender=Income)
+@receiver(post_save, sender=Expense)
+@receiver(post_save, sender=Transfer)
+@receiver(post_save, sender=BalanceAdjustment)
+def month_version_post_save(sender, instance, **kwargs):
+    """
+    Bump the month the row is in (and the month it moved out of, for date
+    edits) so cached month pages are re-rendered.
+    """
+    bump_month_versions([instance.date, getattr(instance, "_previous_date", None)])
+    instance._previous_date = None
 
 
+@receiver(post_delete, sender=Income)
+@receiver(post_delete, sender=Expense)
+@receiver(post_delete, sender=Transfer)
 @receiver(post_delete, sender=BalanceAdjustment)
-def balance_adjustment_post_delete(sender, instance, **kwargs):
+def month_version_post_delete(sender, instance, **kwargs):
+    bump_month_versions([instance.date])
+
+
+@receiver(post_save, sender=MonthEndClose)
+@receiver(post_delete, sender=MonthEndClose)
+@receiver(post_save, sender=ForecastWorksheet)
+@receiver(post_delete, sender=ForecastWorksheet)
+def month_record_changed(sender, instance, **kwargs):
+    """Closing/unlocking a month or saving its forecast changes that month's pages."""
+    bump_month_versions([instance.month])
+
+
+@receiver(post_save, sender=WithholdingTransaction)
+@receiver(post_delete, sender=WithholdingTransaction)
+def withholding_transaction_changed(sender, instance, **kwargs):
     """
-    When balance adjustment is deleted, reverse the adjustment.
+    Bucket balances sum every WithholdingTransaction up to the month shown, so
+    besides the row's own month this bumps "months" for the later ones.
     """
-    account = instance.bank_account
-    if not should_update_balance(account, instance.date):
-        return
+    bump_month_versions([instance.date])
+
+
+@receiver(post_save, sender=PropertyMortgage)
+@receiver(post_delete, sender=PropertyMortgage)
+def mortgage_changed(sender, instance, **kwargs):
+    bump_version(ALL_MONTHS)
 
-    # Reverse the adjustment
-    update_account_balance(account.id, -instance.amount)
+
+@receiver(post_save, sender=UserProfile)
+@receiver(m2m_changed, sender=UserProfile.pinned_categories.through)
+@receiver(m2m_changed, sender=UserProfile.pinned_income_categories.through)
+@receiver(m2m_changed, sender=UserProfile.pinned_withholding_categories.through)
+def profile_changed(sender, instance, **kwargs):
+    bump_version(PROFILES)
+
+
+# =============================================================================
+# REFERENCE DATA SIGNALS
+# =============================================================================
+
+@receiver(post_save, sender=Category)
+@receiver(post_delete, sender=Category)
+@receiver(post_save, sender=BankAccount)
+@receiver(post_delete, sender=BankAccount)
+@receiver(post_save, sender=RentalProperty)
+@receiver(post_delete, sender=RentalProperty)
+@receiver(post_save, sender=RentalUnit)
+@receiver(post_delete, sender=RentalUnit)
+@receiver(post_save, sender=CRARentalExpenseCategory)
+@receiver(post_delete, sender=CRARentalExpenseCategory)
+@receiver(post_save, sender=WithholdingCategory)
+@receiver(post_delete, sender=WithholdingCategory)
+@receiver(post_save, sender=IncomeCategory)
+@receiver(post_delete, sender=IncomeCategory)
+def reference_data_changed(sender, instance, **kwargs):
+    """
+    Bump the reference-data version so every process rebuilds its dropdown
+    snapshot on its next request.
+    """
+    invalidate_reference_data()
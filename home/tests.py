@@ -1,3 +1,1463 @@
-from django.test import TestCase
+from datetime import date, timedelta
+from decimal import Decimal
+from io import BytesIO, StringIO
+import gzip
+import json
+import os
+import sqlite3
+import tempfile
+import zipfile
 
-# Create your tests here.
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db import connection, transaction
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from .models import (
+    AccountSnapshot,
+    BackupJob,
+    BackupJobStatus,
+    BalanceAdjustment,
+    BankAccount,
+    Category,
+    CRARentalExpenseCategory,
+    Expense,
+    ExpenseAttachment,
+    ImportBatch,
+    ImportJob,
+    ImportJobStatus,
+    Income,
+    IncomeCategory,
+    MonthEndClose,
+    MonthEndExpenseCategorySnapshot,
+    MonthlyCategoryRollup,
+    RentalProperty,
+    RollupDimension,
+    RentalUnit,
+    Transfer,
+    UserProfile,
+    VendorRule,
+    WithholdingCategory,
+    WithholdingTransaction,
+)
+from .importers import parse_statement, UnsupportedStatementFormat
+from .jobs import requeue_stale_backup_jobs, run_backup_job
+from .account_ledger import ledger_page
+from .backups import BackupStore, create_backup, restore_backup, write_backup_archive
+from .import_preview import build_import_preview
+from .import_review import validate_review_rows
+from .ledger import balance_as_of, rebuild_balance_ledger
+from .month_close import MonthCloseCalculator, get_month_close
+from .native_export import ExportFormatError, export_home_data, import_home_data
+from . import refdata
+from .forms import TransactionForm
+from .refdata import get_reference_data
+from .versions import ALL_MONTHS, current_version, month_version
+from .rollups import rebuild_monthly_rollups
+from .signals import balance_batch
+from .vendor_model import VendorModel
+from .vendor_rules import VendorMatcher, get_vendor_matcher
+
+
+@override_settings(STATICFILES_STORAGE="django.contrib.staticfiles.storage.StaticFilesStorage")
+class CategoryProgressQueryCountTests(TestCase):
+    """category_progress must not issue per-category queries."""
+
+    month = "2025-03"
+
+    def setUp(self):
+        self.user = User.objects.create_user("finch", password="pw")
+        self.client.force_login(self.user)
+        self.chequing = BankAccount.objects.create(name="Chequing")
+        self.savings = BankAccount.objects.create(name="Savings", is_withholding_account=True)
+
+    def _add_categories(self, start, count):
+        for i in range(start, start + count):
+            category = Category.objects.create(name=f"Expense {i}", monthly_limit=Decimal("100.00"))
+            Expense.objects.create(
+                date=date(2025, 3, 5),
+                vendor_name=f"Vendor {i}",
+                category=category,
+                amount=Decimal("10.00"),
+            )
+
+            inc_cat = IncomeCategory.objects.create(name=f"Income {i}", monthly_target=Decimal("500.00"))
+            Income.objects.create(
+                date=date(2025, 3, 6),
+                amount=Decimal("50.00"),
+                income_category=inc_cat,
+            )
+
+            bucket = WithholdingCategory.objects.create(
+                account=self.savings,
+                name=f"Bucket {i}",
+                monthly_target=Decimal("25.00"),
+                target_amount=Decimal("1000.00"),
+            )
+            Transfer.objects.create(
+                date=date(2025, 3, 7),
+                amount=Decimal("25.00"),
+                from_account=self.chequing,
+                to_account=self.savings,
+                withholding_category=bucket,
+            )
+            Expense.objects.create(
+                date=date(2025, 3, 8),
+                vendor_name=f"Bucket vendor {i}",
+                category=category,
+                amount=Decimal("5.00"),
+                withholding_category=bucket,
+            )
+
+    def _count_queries(self):
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get("/", {"month": self.month})
+        self.assertEqual(response.status_code, 200)
+        return len(ctx.captured_queries), response
+
+    def _summary(self, response, key, name):
+        return next(s for s in response.context[key] if s["name"] == name)
+
+    def test_query_count_independent_of_category_count(self):
+        self._add_categories(0, 2)
+        few, _ = self._count_queries()
+
+        self._add_categories(2, 20)
+        many, response = self._count_queries()
+
+        self.assertEqual(few, many)
+        expense_names = [s["name"] for s in response.context["expense_summaries"]]
+        self.assertEqual(sum(name.startswith("Expense ") for name in expense_names), 22)
+        bucket_names = [s["name"] for s in response.context["withholding_summaries"]]
+        self.assertEqual(sum(name.startswith("Bucket ") for name in bucket_names), 22)
+
+    def test_rollup_totals(self):
+        self._add_categories(0, 1)
+        _, response = self._count_queries()
+
+        expense = self._summary(response, "expense_summaries", "Expense 0")
+        self.assertEqual(expense["actual"], Decimal("15.00"))
+
+        income = self._summary(response, "income_summaries", "Income 0")
+        self.assertEqual(income["actual"], Decimal("50.00"))
+
+        bucket = self._summary(response, "withholding_summaries", "Bucket 0")
+        self.assertEqual(bucket["month_contrib"], Decimal("25.00"))
+        self.assertEqual(bucket["month_payout"], Decimal("5.00"))
+        self.assertEqual(bucket["month_net"], Decimal("20.00"))
+
+
+@override_settings(STATICFILES_STORAGE="django.contrib.staticfiles.storage.StaticFilesStorage")
+class DashboardQueryCountTests(TestCase):
+    """The month view fetches each transaction list once, whatever the month holds."""
+
+    # session + user, ETag counters, reference-data version, month data
+    # version, 3 transaction lists + split prefetch, rollups, session save
+    # (dropdowns come from home/refdata.py)
+    QUERIES = 13
+    # ...and with the transaction tables served from the fragment cache
+    CACHED_QUERIES = 9
+
+    def tearDown(self):
+        cache.clear()
+
+    def setUp(self):
+        self.client.force_login(User.objects.create_user("finch", password="pw"))
+        self.chequing = BankAccount.objects.create(name="Chequing")
+        self.savings = BankAccount.objects.create(name="Savings", is_withholding_account=True)
+        self.bucket = WithholdingCategory.objects.create(account=self.savings, name="Dashboard bucket")
+        self.category = Category.objects.create(name="Dashboard category", monthly_limit=Decimal("100.00"))
+        self.salary = IncomeCategory.objects.create(name="Dashboard salary")
+        self.unit = RentalUnit.objects.create(property=RentalProperty.objects.create(name="Dashboard property"), name="Up")
+
+    def _add_month(self, count):
+        """count transactions in March 2025: expenses with receipts, income, and split transfers."""
+        expenses = Expense.objects.bulk_create(
+            Expense(
+                date=date(2025, 3, 1 + i % 28), vendor_name=f"Vendor {i}", category=self.category,
+                amount=Decimal("10.00"), bank_account=self.chequing, rental_unit=self.unit,
+            )
+            for i in range(count * 4 // 10)
+        )
+        ExpenseAttachment.objects.bulk_create(
+            ExpenseAttachment(expense=expense, file=f"receipts/{expense.pk}.pdf") for expense in expenses[::2]
+        )
+        Income.objects.bulk_create(
+            Income(
+                date=date(2025, 3, 1 + i % 28), amount=Decimal("50.00"), income_category=self.salary,
+                bank_account=self.chequing, rental_unit=self.unit,
+            )
+            for i in range(count * 3 // 10)
+        )
+        parents = Transfer.objects.bulk_create(
+            Transfer(
+                date=date(2025, 3, 1 + i % 28), amount=Decimal("20.00"), from_account=self.chequing,
+                to_account=self.savings, withholding_category=self.bucket, is_split_parent=True,
+            )
+            for i in range(count // 10)
+        )
+        Transfer.objects.bulk_create(
+            Transfer(
+                date=parent.date, amount=Decimal("10.00"), from_account=self.chequing, to_account=self.savings,
+                withholding_category=self.bucket, parent_transfer=parent, split_order=order,
+            )
+            for parent in parents
+            for order in (1, 2)
+        )
+
+    def _get(self, cached=False):
+        if not cached:
+            cache.clear()
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get("/activity/", {"month": "2025-03"})
+        self.assertEqual(response.status_code, 200)
+        return response, len(queries.captured_queries)
+
+    def test_query_count_for_a_thousand_transactions(self):
+        self._add_month(1000)
+        self._get()  # builds the reference-data snapshot
+        response, queries = self._get()
+
+        self.assertEqual(queries, self.QUERIES)
+        self.assertEqual(len(response.context["expense_entries"]), 400)
+        self.assertEqual(sum(e.attachment_count for e in response.context["expense_entries"]), 200)
+        self.assertEqual(len(response.context["transfer_entries"]), 100)
+        self.assertEqual(response.context["total_transfers"], Decimal("2000.00"))
+
+    def test_query_count_independent_of_month_size(self):
+        self._add_month(10)
+        self._get()
+        _, few = self._get()
+        self._add_month(200)
+        _, many = self._get()
+        self.assertEqual(few, many)
+
+    def test_unchanged_month_is_served_from_fragment_cache(self):
+        self._add_month(100)
+        self._get()
+        _, queries = self._get(cached=True)
+        self.assertEqual(queries, self.CACHED_QUERIES)
+
+        Expense.objects.create(
+            date=date(2025, 3, 5), vendor_name="Fresh vendor", category=self.category, amount=Decimal("5.00"),
+        )
+        response, queries = self._get(cached=True)
+        self.assertEqual(queries, self.QUERIES)
+        self.assertContains(response, "Fresh vendor")
+
+        # Other months keep their cached tables
+        self.assertEqual(month_version(date(2025, 4, 1)), 0)
+
+
+@override_settings(STATICFILES_STORAGE="django.contrib.staticfiles.storage.StaticFilesStorage")
+class ConditionalMonthPageTests(TestCase):
+    """Month pages answer a repeat GET with 304 until the month's data changes."""
+
+    def setUp(self):
+        self.client.force_login(User.objects.create_user("finch", password="pw"))
+        self.category = Category.objects.create(name="Conditional category", monthly_limit=Decimal("100.00"))
+
+    def _get(self, url, etag=None):
+        headers = {"HTTP_IF_NONE_MATCH": etag} if etag else {}
+        return self.client.get(url, {"month": "2025-03"}, **headers)
+
+    def _expense(self, day):
+        Expense.objects.create(date=day, vendor_name="Shop", category=self.category, amount=Decimal("5.00"))
+
+    def test_unchanged_page_is_not_modified(self):
+        self._get("/")  # sets the CSRF cookie, which is part of the ETag
+        response = self._get("/")
+        self.assertEqual(response.status_code, 200)
+        self.assertIn("no-cache", response["Cache-Control"])
+
+        with self.assertNumQueries(6):  # session, user, counters, session save (3)
+            cached = self._get("/", response["ETag"])
+        self.assertEqual(cached.status_code, 304)
+
+        self._expense(date(2025, 3, 4))
+        changed = self._get("/", response["ETag"])
+        self.assertEqual(changed.status_code, 200)
+        self.assertNotEqual(changed["ETag"], response["ETag"])
+
+    def test_dashboard_only_changes_with_its_own_month(self):
+        self._get("/activity/")
+        etag = self._get("/activity/")["ETag"]
+
+        self._expense(date(2025, 4, 4))
+        self.assertEqual(self._get("/activity/", etag).status_code, 304)
+
+        MonthEndClose.objects.create(month=date(2025, 3, 1), total_income=0, total_expenses=0, net_savings=0)
+        self.assertEqual(self._get("/activity/", etag).status_code, 200)
+
+    def test_withholding_edit_changes_bucket_pages(self):
+        bucket = WithholdingCategory.objects.create(
+            account=BankAccount.objects.create(name="Conditional savings", is_withholding_account=True),
+            name="Conditional bucket",
+        )
+        tx = WithholdingTransaction.objects.create(category=bucket, date=date(2025, 2, 10), amount=Decimal("50.00"))
+        self._get("/withholdings/")
+        etag = self._get("/withholdings/")["ETag"]
+        self.assertEqual(self._get("/withholdings/", etag).status_code, 304)
+
+        self.client.post(f"/withholdings/transaction/{tx.pk}/update/", {"date": "2025-02-10", "amount": "75.00"})
+        self.assertEqual(self._get("/withholdings/", etag).status_code, 200)
+
+    def test_imported_withholding_payouts_change_bucket_pages(self):
+        account = BankAccount.objects.create(name="Conditional import savings", is_withholding_account=True)
+        bucket = WithholdingCategory.objects.create(account=account, name="Conditional import bucket")
+        self._get("/withholdings/")
+        etag = self._get("/withholdings/")["ETag"]
+
+        # An import of payouts only: bulk_create skips the WithholdingTransaction signals
+        self.client.post("/import-transactions/", {
+            "step": "review",
+            "bank_account_id": account.pk,
+            "rows_json": json.dumps({"rows": [{
+                "entry_type": "expense", "date": "2025-02-15", "vendor_name": "INSURER", "amount": "40.00",
+                "is_withholding_payout": True, "withholding_category": bucket.pk,
+            }]}),
+        })
+        self.assertEqual(WithholdingTransaction.objects.get().amount, Decimal("-40.00"))
+        self._get("/import-transactions/")  # shows (and clears) the import's flash message
+        self.assertEqual(self._get("/withholdings/", etag).status_code, 200)
+
+
+class ReferenceDataTests(TestCase):
+    """Dropdown tables are built once per version and shared across requests."""
+
+    def test_reused_until_a_reference_table_changes(self):
+        first = get_reference_data()
+        with self.assertNumQueries(1):
+            self.assertIs(get_reference_data(), first)
+
+        Category.objects.create(name="Refdata new", monthly_limit=Decimal("10.00"))
+        second = get_reference_data()
+        self.assertGreater(second.version, first.version)
+        self.assertIn("Refdata new", [c.name for c in second.active_categories])
+
+    @override_settings(
+        REFDATA_CACHE="refdata",
+        CACHES={
+            "default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"},
+            "refdata": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache", "LOCATION": "refdata-tests"},
+        },
+    )
+    def test_new_process_takes_snapshot_from_shared_cache(self):
+        refdata._snapshot = None
+        built = get_reference_data()
+        refdata._snapshot = None  # as if another worker process
+        with self.assertNumQueries(1):
+            self.assertEqual(get_reference_data().categories, built.categories)
+
+    def test_form_options_render_without_queries(self):
+        data = get_reference_data()
+        form = TransactionForm(refdata=data)
+        with self.assertNumQueries(0):
+            html = str(form["category"]) + str(form["bank_account"]) + str(form["withholding_category"])
+        self.assertIn(data.categories[0].name, html)
+
+
+class MonthlyRollupSignalTests(TestCase):
+    """Signal-maintained rollups must match a full rebuild after edits and deletes."""
+
+    def _stored(self):
+        return {
+            (r.month, r.dimension, r.key_id): (r.total, r.count)
+            for r in MonthlyCategoryRollup.objects.all()
+            if r.count or r.total
+        }
+
+    def assertMatchesRebuild(self):
+        incremental = self._stored()
+        rebuild_monthly_rollups()
+        self.assertEqual(incremental, self._stored())
+
+    def test_create_edit_delete(self):
+        chequing = BankAccount.objects.create(name="Chequing")
+        savings = BankAccount.objects.create(name="Savings", is_withholding_account=True)
+        groceries = Category.objects.create(name="Rollup groceries", monthly_limit=Decimal("500.00"))
+        dining = Category.objects.create(name="Rollup dining", monthly_limit=Decimal("200.00"))
+        bucket = WithholdingCategory.objects.create(account=savings, name="Insurance")
+        salary = IncomeCategory.objects.create(name="Rollup salary")
+
+        expense = Expense.objects.create(date=date(2025, 1, 31), category=groceries, amount=Decimal("40.00"))
+        income = Income.objects.create(date=date(2025, 1, 15), amount=Decimal("900.00"), income_category=salary)
+        transfer = Transfer.objects.create(
+            date=date(2025, 1, 20), amount=Decimal("100.00"),
+            from_account=chequing, to_account=savings, withholding_category=bucket,
+        )
+        self.assertMatchesRebuild()
+
+        # Move the expense to another category, month and bucket
+        expense.category = dining
+        expense.date = date(2025, 2, 1)
+        expense.withholding_category = bucket
+        expense.amount = Decimal("55.00")
+        expense.save()
+
+        income.income_category = None
+        income.save()
+
+        transfer.from_account, transfer.to_account = savings, chequing
+        transfer.save()
+        self.assertMatchesRebuild()
+
+        expense.delete()
+        income.delete()
+        transfer.delete()
+        self.assertMatchesRebuild()
+        self.assertEqual(self._stored(), {})
+
+    def test_rebuild_command_bumps_month_versions(self):
+        category = Category.objects.create(name="Rollup rebuild", monthly_limit=Decimal("100.00"))
+        Expense.objects.create(date=date(2025, 1, 31), category=category, amount=Decimal("40.00"))
+        MonthlyCategoryRollup.objects.filter(key_id=category.pk).update(total=Decimal("0.00"))
+        version = month_version(date(2025, 1, 1))
+
+        call_command("rebuild_rollups", stdout=StringIO())
+        self.assertMatchesRebuild()
+        self.assertGreater(month_version(date(2025, 1, 1)), version)
+
+
+class BalanceBatchTests(TestCase):
+    """balance_batch() turns per-row balance updates into one UPDATE per account at commit."""
+
+    def setUp(self):
+        self.chequing = BankAccount.objects.create(
+            name="Batch chequing", current_balance=Decimal("1000.00"),
+            balance_tracking_enabled=True, balance_tracking_start_date=date(2025, 1, 1),
+        )
+        self.savings = BankAccount.objects.create(
+            name="Batch savings", current_balance=Decimal("0.00"),
+            balance_tracking_enabled=True, balance_tracking_start_date=date(2025, 1, 1),
+        )
+        self.category = Category.objects.create(name="Batch groceries", monthly_limit=Decimal("500.00"))
+
+    def balance_updates(self, queries):
+        return [q for q in queries if q["sql"].startswith('UPDATE "home_bankaccount"')]
+
+    def test_deltas_are_coalesced_until_commit(self):
+        with CaptureQueriesContext(connection) as ctx:
+            with self.captureOnCommitCallbacks(execute=True):
+                with balance_batch():
+                    for i in range(20):
+                        Expense.objects.create(
+                            date=date(2025, 3, 1), category=self.category,
+                            amount=Decimal("10.00"), bank_account=self.chequing,
+                        )
+                    Transfer.objects.create(
+                        date=date(2025, 3, 2), amount=Decimal("50.00"),
+                        from_account=self.chequing, to_account=self.savings,
+                    )
+                    self.chequing.refresh_from_db()
+                    self.assertEqual(self.chequing.current_balance, Decimal("1000.00"))
+
+        self.assertEqual(len(self.balance_updates(ctx.captured_queries)), 2)
+        self.chequing.refresh_from_db()
+        self.savings.refresh_from_db()
+        self.assertEqual(self.chequing.current_balance, Decimal("750.00"))
+        self.assertEqual(self.savings.current_balance, Decimal("50.00"))
+
+    def test_rollback_discards_deltas(self):
+        with self.captureOnCommitCallbacks(execute=True) as callbacks:
+            with self.assertRaises(RuntimeError):
+                with balance_batch():
+                    Income.objects.create(date=date(2025, 3, 1), amount=Decimal("5.00"), bank_account=self.chequing)
+                    raise RuntimeError
+
+        self.assertEqual(callbacks, [])
+        self.chequing.refresh_from_db()
+        self.assertEqual(self.chequing.current_balance, Decimal("1000.00"))
+        self.assertFalse(Income.objects.exists())
+
+    def test_rolled_back_savepoint_discards_its_deltas(self):
+        rebuild_balance_ledger()  # start the chequing ledger
+        with self.captureOnCommitCallbacks(execute=True):
+            with balance_batch():
+                Income.objects.create(date=date(2025, 3, 1), amount=Decimal("5.00"), bank_account=self.chequing)
+                with self.assertRaises(RuntimeError), transaction.atomic():
+                    Income.objects.create(date=date(2025, 3, 2), amount=Decimal("70.00"), bank_account=self.chequing)
+                    raise RuntimeError
+
+        self.chequing.refresh_from_db()
+        self.assertEqual(self.chequing.current_balance, Decimal("1005.00"))
+        self.assertEqual(balance_as_of(self.chequing.pk, date(2025, 3, 31)), Decimal("1005.00"))
+        self.assertEqual(Income.objects.count(), 1)
+
+
+class BalanceEditTests(TestCase):
+    """Editing a transaction moves account balances by the difference only."""
+
+    def setUp(self):
+        self.chequing = BankAccount.objects.create(
+            name="Edit chequing", current_balance=Decimal("1000.00"),
+            balance_tracking_enabled=True, balance_tracking_start_date=date(2025, 1, 1),
+        )
+        self.visa = BankAccount.objects.create(
+            name="Edit visa", current_balance=Decimal("0.00"),
+            balance_tracking_enabled=True, balance_tracking_start_date=date(2025, 1, 1),
+        )
+        self.category = Category.objects.create(name="Edit groceries", monthly_limit=Decimal("500.00"))
+
+    def assertBalances(self, chequing, visa):
+        self.chequing.refresh_from_db()
+        self.visa.refresh_from_db()
+        self.assertEqual((self.chequing.current_balance, self.visa.current_balance), (Decimal(chequing), Decimal(visa)))
+
+    def test_expense_edits(self):
+        expense = Expense.objects.create(
+            date=date(2025, 2, 1), category=self.category, amount=Decimal("40.00"), bank_account=self.chequing,
+        )
+        self.assertBalances("960.00", "0.00")
+
+        expense.amount = Decimal("55.00")
+        expense.save()
+        self.assertBalances("945.00", "0.00")
+
+        # Move to another account
+        expense.bank_account = self.visa
+        expense.save()
+        self.assertBalances("1000.00", "-55.00")
+
+        # Move before the tracking start date: no longer counted
+        expense.date = date(2024, 12, 31)
+        expense.save()
+        self.assertBalances("1000.00", "0.00")
+
+        expense.date = date(2025, 1, 1)
+        expense.save()
+        self.assertBalances("1000.00", "-55.00")
+
+        expense.delete()
+        self.assertBalances("1000.00", "0.00")
+
+    def test_transfer_and_adjustment_edits(self):
+        transfer = Transfer.objects.create(
+            date=date(2025, 2, 1), amount=Decimal("100.00"), from_account=self.chequing, to_account=self.visa,
+        )
+        self.assertBalances("900.00", "100.00")
+
+        transfer.from_account, transfer.to_account = self.visa, self.chequing
+        transfer.amount = Decimal("30.00")
+        transfer.save()
+        self.assertBalances("1030.00", "-30.00")
+
+        adjustment = BalanceAdjustment.objects.create(
+            bank_account=self.chequing, date=date(2025, 2, 2), amount=Decimal("-30.00"), reason="Fee",
+        )
+        self.assertBalances("1000.00", "-30.00")
+
+        adjustment.amount = Decimal("-10.00")
+        adjustment.save()
+        self.assertBalances("1020.00", "-30.00")
+
+        # Saving without changes is a no-op
+        with CaptureQueriesContext(connection) as ctx:
+            transfer.save()
+        self.assertFalse([q for q in ctx.captured_queries if q["sql"].startswith('UPDATE "home_bankaccount"')])
+        self.assertBalances("1020.00", "-30.00")
+
+
+@override_settings(STATICFILES_STORAGE="django.contrib.staticfiles.storage.StaticFilesStorage")
+class ExpenseEditViewTests(TestCase):
+    """The legacy expense edit endpoints must save parsed values so the signals can use them."""
+
+    def setUp(self):
+        self.client.force_login(User.objects.create_user("finch", password="pw"))
+        self.chequing = BankAccount.objects.create(
+            name="View chequing", current_balance=Decimal("1000.00"),
+            balance_tracking_enabled=True, balance_tracking_start_date=date(2025, 1, 1),
+        )
+        self.category = Category.objects.create(name="View groceries", monthly_limit=Decimal("500.00"))
+        self.expense = Expense.objects.create(
+            date=date(2025, 2, 1), category=self.category, amount=Decimal("40.00"), bank_account=self.chequing,
+        )
+
+    def assertBalance(self, amount):
+        self.chequing.refresh_from_db()
+        self.assertEqual(self.chequing.current_balance, Decimal(amount))
+
+    def assertMovedToMarch(self):
+        spent = dict(
+            MonthlyCategoryRollup.objects
+            .filter(dimension=RollupDimension.EXPENSE_CATEGORY, key_id=self.category.pk)
+            .values_list("month", "total")
+        )
+        self.assertEqual(spent.get(date(2025, 2, 1), Decimal("0")), Decimal("0"))
+        self.assertEqual(spent[date(2025, 3, 1)], Decimal("55.00"))
+        self.assertEqual(month_version(date(2025, 3, 1)), 1)
+
+    def test_update_expense(self):
+        response = self.client.post("/update-expense/", {
+            "id": self.expense.pk, "date": "2025-03-05", "amount": "55.00",
+            "vendor_name": "Market", "category_id": self.category.pk,
+        })
+        self.assertEqual(response.status_code, 302)
+        self.expense.refresh_from_db()
+        self.assertEqual((self.expense.date, self.expense.amount), (date(2025, 3, 5), Decimal("55.00")))
+        self.assertBalance("945.00")
+        self.assertMovedToMarch()
+
+        response = self.client.post("/update-expense/", {
+            "id": self.expense.pk, "date": "March 5", "amount": "55.00", "category_id": self.category.pk,
+        })
+        self.assertEqual(response.status_code, 400)
+
+    def test_rental_tax_category_edit(self):
+        unit = RentalUnit.objects.create(property=RentalProperty.objects.create(name="View duplex"), name="Upper")
+        cra_category = CRARentalExpenseCategory.objects.create(name="View repairs")
+        url = reverse("rental_tax_category_detail", args=[unit.property_id, cra_category.pk])
+
+        response = self.client.post(f"{url}?year=2025", {
+            "expense_id": self.expense.pk, "date": "2025-03-05", "amount": "55.00",
+            "bank_account": self.chequing.pk, "rental_unit": unit.pk, "cra_category": cra_category.pk,
+        })
+        self.assertEqual(response.status_code, 302)
+        self.expense.refresh_from_db()
+        self.assertEqual((self.expense.date, self.expense.amount), (date(2025, 3, 5), Decimal("55.00")))
+        self.assertBalance("945.00")
+        self.assertMovedToMarch()
+
+
+@override_settings(STATICFILES_STORAGE="django.contrib.staticfiles.storage.StaticFilesStorage")
+class BalanceLedgerTests(TestCase):
+    """The signal-maintained ledger must match a rebuild and give point-in-time balances."""
+
+    def setUp(self):
+        self.chequing = BankAccount.objects.create(
+            name="Ledger chequing", current_balance=Decimal("1000.00"),
+            balance_tracking_enabled=True, balance_tracking_start_date=date(2025, 1, 1),
+        )
+        self.savings = BankAccount.objects.create(
+            name="Ledger savings", current_balance=Decimal("0.00"),
+            balance_tracking_enabled=True, balance_tracking_start_date=date(2025, 1, 1),
+        )
+        self.category = Category.objects.create(name="Ledger groceries", monthly_limit=Decimal("500.00"))
+
+    def expense(self, day, amount):
+        return Expense.objects.create(
+            date=day, category=self.category, amount=Decimal(amount), bank_account=self.chequing,
+        )
+
+    def balances(self):
+        days = [date(2024, 12, 31), date(2025, 1, 10), date(2025, 2, 1), date(2025, 2, 15), date(2025, 3, 31)]
+        return [(account.pk, day, balance_as_of(account.pk, day)) for account in (self.chequing, self.savings) for day in days]
+
+    def test_incremental_matches_rebuild(self):
+        self.expense(date(2025, 2, 10), "40.00")
+        self.expense(date(2025, 3, 1), "60.00")
+        # Back-dated entries shift everything after them
+        early = self.expense(date(2025, 1, 5), "25.00")
+        transfer = Transfer.objects.create(
+            date=date(2025, 2, 1), amount=Decimal("100.00"), from_account=self.chequing, to_account=self.savings,
+        )
+        with self.captureOnCommitCallbacks(execute=True), balance_batch():
+            for day in (date(2025, 1, 20), date(2025, 3, 15)):
+                Income.objects.create(date=day, amount=Decimal("500.00"), bank_account=self.chequing)
+
+        early.amount = Decimal("30.00")
+        early.save()
+        transfer.date = date(2025, 2, 20)
+        transfer.save()
+        Expense.objects.filter(date=date(2025, 3, 1)).get().delete()
+
+        self.assertEqual(balance_as_of(self.chequing.pk, date(2024, 12, 31)), Decimal("1000.00"))
+        self.assertEqual(balance_as_of(self.chequing.pk, date(2025, 2, 15)), Decimal("1430.00"))
+        self.assertEqual(balance_as_of(self.chequing.pk, date(2025, 3, 31)), Decimal("1830.00"))
+        self.assertEqual(balance_as_of(self.savings.pk, date(2025, 2, 15)), Decimal("0.00"))
+        self.assertEqual(balance_as_of(self.savings.pk, date(2025, 3, 31)), Decimal("100.00"))
+        self.assertIsNone(balance_as_of(self.chequing.pk, date(2024, 12, 30)))
+
+        self.chequing.refresh_from_db()
+        self.assertEqual(self.chequing.current_balance, Decimal("1830.00"))
+
+        incremental = self.balances()
+        # Opening balances come from current_balance minus tracked activity
+        rebuild_balance_ledger()
+        self.assertEqual(incremental, self.balances())
+
+    def test_lookup_is_one_query(self):
+        for day in range(1, 29):
+            self.expense(date(2025, 2, day), "1.00")
+        with CaptureQueriesContext(connection) as ctx:
+            self.assertEqual(balance_as_of(self.chequing.pk, date(2025, 2, 14)), Decimal("986.00"))
+        self.assertEqual(len(ctx.captured_queries), 1)
+
+    def test_account_page_opens_at_ledger_balance(self):
+        self.client.force_login(User.objects.create_user("finch", password="pw"))
+        self.expense(date(2025, 1, 15), "200.00")
+        self.expense(date(2025, 2, 15), "50.00")
+
+        response = self.client.get(
+            f"/accounts/{self.chequing.pk}/", {"start_date": "2025-02-01", "end_date": "2025-02-28"},
+        )
+        self.assertEqual(response.context["starting_balance"], Decimal("800.00"))
+        self.assertEqual(response.context["ending_balance"], Decimal("750.00"))
+
+
+@override_settings(STATICFILES_STORAGE="django.contrib.staticfiles.storage.StaticFilesStorage")
+class AccountLedgerPageTests(TestCase):
+    """Keyset pages must add up to the whole ledger, with continuous running balances."""
+
+    def setUp(self):
+        self.account = BankAccount.objects.create(
+            name="Paged chequing", current_balance=Decimal("1000.00"),
+            balance_tracking_enabled=True, balance_tracking_start_date=date(2025, 1, 1),
+        )
+        other = BankAccount.objects.create(name="Paged savings", current_balance=Decimal("0.00"))
+        category = Category.objects.create(name="Paged groceries", monthly_limit=Decimal("500.00"))
+
+        # Several kinds on the same days so the (date, kind, id) tie-breaks matter
+        for day in range(1, 11):
+            when = date(2025, 1 + day % 3, day)
+            Income.objects.create(date=when, amount=Decimal("100.00"), bank_account=self.account)
+            Expense.objects.create(date=when, category=category, amount=Decimal("30.00"), bank_account=self.account)
+            Expense.objects.create(date=when, category=category, amount=Decimal("5.00"), bank_account=self.account)
+            Transfer.objects.create(date=when, amount=Decimal("20.00"), from_account=self.account, to_account=other)
+        BalanceAdjustment.objects.create(
+            bank_account=self.account, date=date(2025, 2, 2), amount=Decimal("-7.50"), reason="Fee",
+        )
+
+    def walk(self, page_size):
+        entries, cursor = [], None
+        while True:
+            page = ledger_page(
+                self.account, date(2025, 1, 1), date(2025, 12, 31), Decimal("1442.50"),
+                cursor=cursor, page_size=page_size,
+            )
+            entries.extend(page["entries"])
+            cursor = page["next_cursor"]
+            if not cursor:
+                return entries
+
+    def test_pages_match_full_walk(self):
+        whole = self.walk(page_size=1000)
+        self.assertEqual(len(whole), 41)
+        self.assertEqual(self.walk(page_size=7), whole)
+
+        # Newest first; balances chain back to the opening balance
+        self.assertEqual(whole[0]["balance"], Decimal("1442.50"))
+        for newer, older in zip(whole, whole[1:]):
+            self.assertLessEqual(older["date"], newer["date"])
+            self.assertEqual(older["balance"], newer["balance"] - newer["signed_amount"])
+        self.assertEqual(whole[-1]["balance"] - whole[-1]["signed_amount"], Decimal("1000.00"))
+
+    def test_page_query_count_is_constant(self):
+        with CaptureQueriesContext(connection) as ctx:
+            page = ledger_page(self.account, date(2025, 1, 1), date(2025, 12, 31), Decimal("0.00"), page_size=10)
+        # One UNION query plus one lookup for transfer counterparties
+        self.assertEqual(len(ctx.captured_queries), 2)
+        self.assertEqual(len(page["entries"]), 10)
+
+    def test_account_page_and_json_endpoint(self):
+        self.client.force_login(User.objects.create_user("finch", password="pw"))
+        params = {"start_date": "2025-01-01", "end_date": "2025-12-31"}
+
+        response = self.client.get(f"/accounts/{self.account.pk}/", params)
+        self.assertEqual(response.context["starting_balance"], Decimal("1000.00"))
+        self.assertEqual(response.context["ending_balance"], Decimal("1442.50"))
+        self.assertEqual(response.context["total_outflow"], Decimal("557.50"))
+        self.assertIsNone(response.context["ledger_data"]["next_cursor"])
+
+        data = self.client.get(f"/accounts/{self.account.pk}/ledger/", params).json()
+        self.assertEqual(data["entries"][0]["balance"], "1442.50")
+        self.assertEqual(len(data["entries"]), 41)
+
+        bad = self.client.get(f"/accounts/{self.account.pk}/ledger/", {**params, "cursor": "nonsense"})
+        self.assertEqual(bad.status_code, 400)
+
+
+class RecalculateBalancesTests(TestCase):
+    """The drift report must match what the signals maintain, from either baseline."""
+
+    def setUp(self):
+        self.account = BankAccount.objects.create(
+            name="Drift chequing", current_balance=Decimal("1000.00"),
+            balance_tracking_enabled=True, balance_tracking_start_date=date(2025, 1, 1),
+        )
+        self.category = Category.objects.create(name="Drift groceries", monthly_limit=Decimal("500.00"))
+        for month, day_balance in ((12, "1000.00"), (1, "1250.00")):
+            close = MonthEndClose.objects.create(
+                month=date(2024 if month == 12 else 2025, month, 1),
+                total_income=0, total_expenses=0, net_savings=0,
+            )
+            AccountSnapshot.objects.create(month_close=close, bank_account=self.account, balance=Decimal(day_balance))
+
+        Income.objects.create(date=date(2025, 1, 10), amount=Decimal("300.00"), bank_account=self.account)
+        Expense.objects.create(
+            date=date(2025, 1, 20), category=self.category, amount=Decimal("50.00"), bank_account=self.account,
+        )
+        Expense.objects.create(
+            date=date(2025, 2, 5), category=self.category, amount=Decimal("20.00"), bank_account=self.account,
+        )
+
+    def report(self, *args):
+        out = StringIO()
+        call_command("recalculate_balances", "--json", *args, stdout=out)
+        return json.loads(out.getvalue())
+
+    def test_no_drift_from_either_baseline(self):
+        for args in ((), ("--since-last-close",)):
+            report = self.report("--dry-run", *args)
+            [row] = report["accounts"]
+            self.assertEqual(row["calculated_balance"], "1230.00")
+            self.assertEqual(row["drift"], "0.00")
+        self.assertEqual(row["baseline_source"], "snapshot 2025-01")
+        self.assertEqual(row["net_change"], "-20.00")
+
+    def test_reports_and_fixes_drift(self):
+        BankAccount.objects.filter(pk=self.account.pk).update(current_balance=Decimal("1200.00"))
+
+        with CaptureQueriesContext(connection) as ctx:
+            report = self.report("--dry-run")
+        # Accounts, snapshots, one grouped UNION of transaction totals
+        self.assertEqual(len(ctx.captured_queries), 3)
+        self.assertEqual(report["drifted"], 1)
+        self.assertEqual(report["accounts"][0]["drift"], "30.00")
+
+        as_of = self.report("--as-of", "2025-01-31")["accounts"][0]
+        self.assertEqual(as_of["calculated_balance"], "1250.00")
+        self.assertEqual(as_of["recorded_balance"], "1250.00")
+
+        months = current_version(ALL_MONTHS)
+        self.assertEqual(self.report()["updated"], 1)
+        self.account.refresh_from_db()
+        self.assertEqual(self.account.current_balance, Decimal("1230.00"))
+        # Cached pages showing the old balance must be rebuilt
+        self.assertEqual(current_version(ALL_MONTHS), months + 1)
+
+
+class BackupStoreTests(TransactionTestCase):
+    """Backups are manifests over deduplicated blobs; repeat backups only add what changed."""
+
+    # No surrounding transaction: SQLite's backup API can't copy a database mid-write
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.media = os.path.join(self.tmp.name, "media")
+        os.makedirs(os.path.join(self.media, "receipts"))
+        for name, content in (("a.pdf", b"%PDF receipt a"), ("b.jpg", b"jpeg b"), ("copy.pdf", b"%PDF receipt a")):
+            with open(os.path.join(self.media, "receipts", name), "wb") as f:
+                f.write(content)
+        BankAccount.objects.create(name="Backed up", current_balance=Decimal("12.34"))
+
+    def test_incremental_backup_and_restore(self):
+        with override_settings(MEDIA_ROOT=self.media, BACKUP_ROOT=os.path.join(self.tmp.name, "backups")):
+            store = BackupStore()
+            first, first_info = create_backup("2025-01", store=store)
+            # Identical receipts share one blob
+            blobs = [path for path in store.blobs.rglob("*") if path.is_file()]
+            self.assertEqual(len(blobs), 4)  # data export, database, 2 distinct receipts
+
+            with open(os.path.join(self.media, "receipts", "c.png"), "wb") as f:
+                f.write(b"png c")
+            second, second_info = create_backup("2025-02", store=store)
+
+        media = next(c for c in second_info["components"] if c["filename"] == "media/")
+        self.assertEqual((media["count"], media["new_count"]), (4, 1))
+        self.assertLess(second_info["new_bytes"], first_info["new_bytes"] + len(b"png c"))
+
+        target = os.path.join(self.tmp.name, "restored")
+        manifest = restore_backup(second, target, store=store)
+        with open(os.path.join(target, "media", "receipts", "copy.pdf"), "rb") as f:
+            self.assertEqual(f.read(), b"%PDF receipt a")
+
+        db_name = next(name for name in manifest["files"] if name.endswith(".sqlite3"))
+        restored = sqlite3.connect(os.path.join(target, db_name))
+        self.addCleanup(restored.close)
+        self.assertEqual(
+            restored.execute("SELECT current_balance FROM home_bankaccount WHERE name = 'Backed up'").fetchone()[0],
+            12.34,
+        )
+
+    def test_archive_streams_to_unseekable_output(self):
+        class Pipe:
+            """Write-only, like stdout or a socket."""
+
+            def __init__(self):
+                self.buffer = BytesIO()
+
+            def write(self, data):
+                return self.buffer.write(data)
+
+            def flush(self):
+                pass
+
+        with override_settings(MEDIA_ROOT=self.media, BACKUP_ROOT=os.path.join(self.tmp.name, "backups")):
+            store = BackupStore()
+            name, _ = create_backup("2025-01", store=store)
+
+        pipe = Pipe()
+        write_backup_archive(name, pipe, compression="deflate", level=9, store=store)
+
+        with zipfile.ZipFile(BytesIO(pipe.buffer.getvalue())) as archive:
+            self.assertIsNone(archive.testzip())
+            types = {info.filename: info.compress_type for info in archive.infolist()}
+            self.assertEqual(types["media/receipts/a.pdf"], zipfile.ZIP_STORED)
+            self.assertEqual(types["README.txt"], zipfile.ZIP_DEFLATED)
+            self.assertEqual(archive.read("media/receipts/b.jpg"), b"jpeg b")
+
+
+@override_settings(BACKUP_JOB_RETRY_DELAY=0)
+class BackupJobTests(TransactionTestCase):
+    """Backup jobs fill in the close's backup_file, or fail after their retries."""
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.close = MonthEndClose.objects.create(
+            month=date(2025, 1, 1), total_income=0, total_expenses=0, net_savings=0,
+        )
+        self.job = BackupJob.objects.create(month_close=self.close, month="2025-01", description="January")
+
+    def test_success_records_manifest_on_close(self):
+        with override_settings(MEDIA_ROOT=self.tmp.name, BACKUP_ROOT=os.path.join(self.tmp.name, "backups")):
+            self.assertTrue(run_backup_job(self.job.pk))
+            self.assertFalse(run_backup_job(self.job.pk))  # already claimed
+
+        self.job.refresh_from_db()
+        self.close.refresh_from_db()
+        self.assertEqual(self.job.status, BackupJobStatus.DONE)
+        self.assertEqual(self.job.attempts, 1)
+        self.assertTrue(self.job.manifest.startswith("monthend_2025-01_"))
+        self.assertEqual(self.close.backup_file, self.job.manifest)
+
+    def test_failure_after_retries(self):
+        # The backup root is a file, so every attempt fails
+        blocker = os.path.join(self.tmp.name, "not-a-directory")
+        open(blocker, "w").close()
+        with override_settings(MEDIA_ROOT=self.tmp.name, BACKUP_ROOT=blocker), self.assertLogs("home.jobs", "ERROR"):
+            self.assertTrue(run_backup_job(self.job.pk))
+
+            # Back in the queue until the retry is due, not sleeping in a worker
+            self.job.refresh_from_db()
+            self.assertEqual((self.job.status, self.job.attempts), (BackupJobStatus.QUEUED, 1))
+            BackupJob.objects.filter(pk=self.job.pk).update(next_attempt_at=timezone.now() + timedelta(minutes=1))
+            self.assertFalse(run_backup_job(self.job.pk))
+            BackupJob.objects.filter(pk=self.job.pk).update(next_attempt_at=timezone.now())
+
+            while run_backup_job(self.job.pk):
+                pass
+
+        self.job.refresh_from_db()
+        self.assertEqual(self.job.status, BackupJobStatus.FAILED)
+        self.assertEqual(self.job.attempts, 3)
+        self.assertIn("Attempt 3:", self.job.error)
+
+        self.client.force_login(User.objects.create_user("finch", password="pw"))
+        status = self.client.get(f"/month-end-close/backups/{self.job.pk}/status/").json()
+        self.assertEqual((status["status"], status["finished"]), ("failed", True))
+        self.close.refresh_from_db()
+        self.assertEqual(self.close.backup_file, "")
+
+    def test_stale_requeue_skips_jobs_with_a_recent_heartbeat(self):
+        started = timezone.now() - timedelta(hours=2)
+        BackupJob.objects.filter(pk=self.job.pk).update(
+            status=BackupJobStatus.RUNNING, attempts=1, started_at=started, updated_at=started,
+            heartbeat_at=timezone.now(),
+        )
+        self.assertEqual(requeue_stale_backup_jobs(timezone.now() - timedelta(hours=1)), 0)
+
+        BackupJob.objects.filter(pk=self.job.pk).update(heartbeat_at=started)
+        self.assertEqual(requeue_stale_backup_jobs(timezone.now() - timedelta(hours=1)), 1)
+        self.job.refresh_from_db()
+        self.assertEqual((self.job.status, self.job.attempts), (BackupJobStatus.QUEUED, 1))
+
+
+class NativeExportTests(TestCase):
+    """export_data/import_data round-trip the home app exactly, timestamps and M2M rows included."""
+
+    def setUp(self):
+        self.category = Category.objects.create(name="Export groceries", monthly_limit=Decimal("400.00"))
+        self.account = BankAccount.objects.create(name="Chequing", current_balance=Decimal("1000.00"))
+        Expense.objects.create(
+            date=date(2025, 1, 5), vendor_name="Market épicerie", category=self.category,
+            amount=Decimal("12.34"), bank_account=self.account,
+        )
+        self.rule = VendorRule.objects.create(keyword="market", category=self.category)
+        VendorRule.objects.filter(pk=self.rule.pk).update(updated_at="2020-01-01T00:00:00Z")
+        User.objects.create_user("finch", password="pw").profile.pinned_categories.add(self.category)
+
+    def test_round_trip_replaces_current_data(self):
+        exported = BytesIO()
+        counts = export_home_data(exported)
+        self.assertEqual(counts["home.expense"], 1)
+        self.assertEqual(counts["home.userprofile_pinned_categories"], 1)
+        balance = BankAccount.objects.get(pk=self.account.pk).current_balance
+
+        Expense.objects.all().delete()
+        Category.objects.create(name="Added later", monthly_limit=Decimal("1.00"))
+
+        exported.seek(0)
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(import_home_data(exported, replace=True), counts)
+        # One executemany per non-empty table, never a query per row
+        inserts = [q["sql"] for q in queries.captured_queries if "INSERT INTO" in q["sql"]]
+        self.assertEqual(len(inserts), sum(1 for count in counts.values() if count))
+
+        expense = Expense.objects.get()
+        self.assertEqual((expense.vendor_name, expense.amount), ("Market épicerie", Decimal("12.34")))
+        self.assertFalse(Category.objects.filter(name="Added later").exists())
+        self.assertEqual(BankAccount.objects.get(pk=self.account.pk).current_balance, balance)
+        self.assertEqual(VendorRule.objects.get(pk=self.rule.pk).updated_at.year, 2020)
+        self.assertEqual(list(UserProfile.objects.get().pinned_categories.all()), [self.category])
+
+    def test_export_is_deterministic_and_import_refuses_to_merge(self):
+        first, second = BytesIO(), BytesIO()
+        export_home_data(first)
+        export_home_data(second)
+        self.assertEqual(first.getvalue(), second.getvalue())
+
+        first.seek(0)
+        with self.assertRaises(ExportFormatError):
+            import_home_data(first)
+        with self.assertRaises(ExportFormatError):
+            import_home_data(BytesIO(gzip.compress(b'{"format": "something-else"}\n')), replace=True)
+
+
+@override_settings(STATICFILES_STORAGE="django.contrib.staticfiles.storage.StaticFilesStorage")
+class MonthCloseCalculatorTests(TestCase):
+    """Wizard step 2, the close commit and the forecast worksheet share one calculation."""
+
+    def setUp(self):
+        cache.clear()
+        chequing = BankAccount.objects.create(name="Close chequing", current_balance=Decimal("1000.00"))
+        savings = BankAccount.objects.create(
+            name="Close savings", is_withholding_account=True, account_type="TFSA", current_balance=Decimal("2000.00"),
+        )
+        partner = BankAccount.objects.create(name="Jenna (EXT)")
+        self.groceries = Category.objects.create(name="Close groceries", monthly_limit=Decimal("400.00"))
+        repairs = Category.objects.create(name="Close repairs", monthly_limit=Decimal("0.00"))
+        business, _ = Category.objects.get_or_create(name="Business Expense", defaults={"monthly_limit": 0})
+        self.car_fund = WithholdingCategory.objects.create(account=savings, name="Car fund", monthly_target=Decimal("100.00"))
+        salary = IncomeCategory.objects.create(name="Close salary", monthly_target=Decimal("3000.00"))
+        reimbursement, _ = IncomeCategory.objects.get_or_create(name="Business Reimbursement")
+
+        for category, amount, bucket in (
+            (self.groceries, "150.00", None), (repairs, "200.00", self.car_fund), (repairs, "50.00", None),
+            (business, "75.00", None),
+        ):
+            Expense.objects.create(
+                date=date(2025, 1, 10), category=category, amount=Decimal(amount), withholding_category=bucket,
+            )
+        Income.objects.create(date=date(2025, 1, 15), amount=Decimal("3000.00"), income_category=salary)
+        Income.objects.create(date=date(2025, 1, 16), amount=Decimal("75.00"), income_category=reimbursement)
+        Transfer.objects.create(date=date(2025, 1, 20), amount=Decimal("500.00"), from_account=partner, to_account=chequing)
+        Transfer.objects.create(
+            date=date(2025, 1, 21), amount=Decimal("100.00"),
+            from_account=chequing, to_account=savings, withholding_category=self.car_fund,
+        )
+
+    def test_figures_from_one_pass(self):
+        with self.assertNumQueries(7):
+            close = MonthCloseCalculator(date(2025, 1, 1))
+
+        self.assertEqual(close.total_income, Decimal("3500.00"))  # reimbursement excluded, partner included
+        self.assertEqual(close.total_expenses, Decimal("475.00"))
+        self.assertEqual(close.business_reimbursement_total, Decimal("75.00"))
+        self.assertEqual(close.business_expense_total, Decimal("75.00"))
+        self.assertEqual(close.total_planned_spent, Decimal("150.00"))
+        self.assertEqual(close.total_true_unplanned_spent, Decimal("50.00"))
+        self.assertEqual(close.total_withholding_actual, Decimal("100.00"))
+        self.assertEqual(close.true_surplus, Decimal("3200.00"))
+        repairs = next(item for item in close.unplanned_breakdown if item["name"] == "Close repairs")
+        self.assertEqual((repairs["withholding_funded"], repairs["bucket_names"]), (Decimal("200.00"), ["Car fund"]))
+        self.assertEqual(close.transaction_count, 8)
+
+    def test_cached_between_steps_until_the_month_changes(self):
+        first = get_month_close(date(2025, 1, 1))
+        with self.assertNumQueries(2):
+            self.assertEqual(get_month_close(date(2025, 1, 1)).true_surplus, first.true_surplus)
+
+        Expense.objects.create(date=date(2025, 1, 30), category=self.groceries, amount=Decimal("25.00"))
+        self.assertEqual(get_month_close(date(2025, 1, 1)).total_planned_spent, Decimal("175.00"))
+
+        # Reference data changes don't touch the rollups but still recompute
+        self.groceries.monthly_limit = Decimal("100.00")
+        self.groceries.save()
+        self.assertEqual(get_month_close(date(2025, 1, 1)).total_planned_budget, first.total_planned_budget - 300)
+
+    def test_close_commits_the_reviewed_figures(self):
+        self.client.force_login(User.objects.create_user("finch", password="pw"))
+        response = self.client.get("/month-end-close/", {"step": "2", "month": "2025-01"})
+        self.assertEqual(response.context["true_surplus"], Decimal("3200.00"))
+
+        with CaptureQueriesContext(connection) as queries:
+            self.client.post("/month-end-close/?step=5&month=2025-01")
+        # Close, net worth, four bulk snapshot inserts and the backup job, however many rows
+        inserts = [q["sql"] for q in queries.captured_queries if q["sql"].startswith('INSERT INTO "home_')]
+        self.assertEqual(len(inserts), 7)
+
+        month_close = MonthEndClose.objects.get(month=date(2025, 1, 1))
+        self.assertEqual(month_close.account_snapshots.count(), 2)  # zero balances aren't snapshotted
+        net_worth = month_close.net_worth_snapshot.get()
+        self.assertEqual((net_worth.liquid_assets, net_worth.investment_assets), (Decimal("1000.00"), Decimal("2000.00")))
+        self.assertEqual(
+            (month_close.total_income, month_close.planned_spent_total, month_close.withholding_actual_total),
+            (Decimal("3500.00"), Decimal("150.00"), Decimal("100.00")),
+        )
+        self.assertEqual(month_close.expense_snapshots.get(category=self.groceries).actual_spent, Decimal("150.00"))
+
+        response = self.client.get("/month-forecast/", {"month": "2025-01"})
+        self.assertEqual(response.context["actual_surplus"], 3200.0)
+
+    def test_locked_month_pages_read_only_the_snapshot(self):
+        self.client.force_login(User.objects.create_user("finch", password="pw"))
+        shown = (
+            "expense_summaries", "income_summaries", "withholding_summaries", "jenna_transfers",
+            "total_income_actual", "total_expenses_actual", "total_withholding_actual", "cash_flow_balance",
+        )
+        live = self.client.get("/", {"month": "2025-01"}).context
+        self.client.post("/month-end-close/?step=5&month=2025-01")
+        self.assertTrue(MonthEndClose.objects.get(month=date(2025, 1, 1)).has_full_snapshot)
+
+        with CaptureQueriesContext(connection) as queries:
+            frozen = self.client.get("/", {"month": "2025-01"}).context
+        for key in shown:
+            self.assertEqual(frozen[key], live[key], key)
+        tables = ('"home_expense"', '"home_income"', '"home_transfer"', '"home_withholdingtransaction"',
+                  '"home_monthlycategoryrollup"')
+        self.assertFalse([q["sql"] for q in queries.captured_queries if any(t in q["sql"] for t in tables)])
+
+        overview = self.client.get("/withholdings/", {"month": "2025-01"}).context
+        bucket = next(b for a in overview["accounts"] for b in a.withholding_categories.all() if b.pk == self.car_fund.pk)
+        self.assertEqual((bucket.month_contrib, bucket.month_payout), (Decimal("100.00"), Decimal("200.00")))
+
+    def test_snapshot_month_closes_completes_older_closes(self):
+        month_close = MonthEndClose.objects.create(
+            month=date(2025, 1, 1), total_income=0, total_expenses=0, net_savings=0,
+        )
+        old = MonthEndExpenseCategorySnapshot.objects.create(
+            month_close=month_close, category=self.groceries, monthly_limit=Decimal("350.00"), actual_spent=Decimal("150.00"),
+        )
+
+        call_command("snapshot_month_closes", stdout=StringIO())
+
+        month_close.refresh_from_db()
+        self.assertTrue(month_close.has_full_snapshot)
+        self.assertEqual(month_close.partner_transfers, Decimal("500.00"))
+        old.refresh_from_db()
+        self.assertEqual(old.monthly_limit, Decimal("350.00"))  # limit at close time kept
+        bucket = month_close.withholding_snapshots.get(withholding_category=self.car_fund)
+        self.assertEqual((bucket.actual_contributed, bucket.actual_paid_out), (Decimal("100.00"), Decimal("200.00")))
+
+
+
+class StatementParserTests(TestCase):
+    """Format detection and row normalization for uploaded statements."""
+
+    def parse(self, content, format_key=None):
+        statement_format, rows = parse_statement(BytesIO(content), format_key)
+        return statement_format.key, list(rows)
+
+    def test_td_chequing(self):
+        key, rows = self.parse(
+            b'"2025-12-01","E-TRANSFER ***SgS",,"2,550.00","11049.78"\n'
+            b'2025-12-02,CAF\xe9 ROYAL,12.50,,11037.28\n'
+        )
+        self.assertEqual(key, "td_chequing")
+        self.assertEqual(
+            [(r.date, r.description, r.amount, r.entry_type) for r in rows],
+            [
+                (date(2025, 12, 1), "E-TRANSFER ***SgS", Decimal("2550.00"), "income"),
+                (date(2025, 12, 2), "CAF\xe9 ROYAL", Decimal("12.50"), "expense"),
+            ],
+        )
+
+    def test_td_visa(self):
+        key, rows = self.parse(b"12/22/2025,AMZN Mktp CA,74.37,,6964.70\n")
+        self.assertEqual(key, "td_aeroplan_visa")
+        self.assertEqual(rows[0].date, date(2025, 12, 22))
+
+    def test_generic_header_signed_amount(self):
+        key, rows = self.parse(
+            b"\xef\xbb\xbfPosted Date,Payee,Amount\n01/03/2025,Coffee,-4.50\n01/04/2025,Pay,100\n"
+        )
+        self.assertEqual(key, "generic_header")
+        self.assertEqual(
+            [(r.date, r.amount, r.entry_type) for r in rows],
+            [(date(2025, 1, 3), Decimal("4.50"), "expense"), (date(2025, 1, 4), Decimal("100"), "income")],
+        )
+
+    def test_generic_header_date_format_from_all_rows(self):
+        skipped = []
+        statement_format, rows = parse_statement(
+            BytesIO(b"Date,Description,Amount\n01/02/2025,Coffee,-4.50\n13/02/2025,Pay,100\nTotal,,95.50\n"),
+            skipped=skipped,
+        )
+        # 01/02 fits MM/DD and DD/MM; 13/02 settles it
+        self.assertEqual([r.date for r in rows], [date(2025, 2, 1), date(2025, 2, 13)])
+        self.assertEqual(skipped, [4])
+
+        preview = build_import_preview(BytesIO(b"Date,Description,Amount\n01/02/2025,Coffee,-4.50\nTotal,,95.50\n"))
+        self.assertEqual(len(preview["rows"]), 1)
+        self.assertIn("Skipped 1 line(s) whose date couldn't be read: 3.", [text for _, text in preview["messages"]])
+
+    def test_unrecognised_layout(self):
+        with self.assertRaises(UnsupportedStatementFormat):
+            self.parse(b"foo,bar\n")
+
+
+class VendorMatcherTests(TestCase):
+    """Aho–Corasick vendor matching and its cache invalidation."""
+
+    def test_overlapping_keywords(self):
+        matcher = VendorMatcher([
+            ("HE", 1, 0),
+            ("SHE", 2, 0),
+            ("HERS", 3, 0),
+            ("PIZZA", 4, 0),
+            ("PIZZA PIZZA", 5, 0),
+        ])
+        self.assertEqual(matcher.match("ushers"), 3)       # longest of HE/SHE/HERS
+        self.assertEqual(matcher.match("PIZZA PIZZA #12"), 5)
+        self.assertEqual(matcher.match("PIZZ"), None)
+        self.assertEqual(matcher.match(""), None)
+
+    def test_priority_beats_length_then_position(self):
+        matcher = VendorMatcher([("AMAZON", 1, 0), ("PRIME VIDEO", 2, 0), ("AMZN", 3, 5)])
+        self.assertEqual(matcher.match("AMAZON PRIME VIDEO"), 2)
+        self.assertEqual(matcher.match("AMAZON AMZN PRIME VIDEO"), 3)
+        self.assertEqual(VendorMatcher([("ABC", 1, 0), ("XYZ", 2, 0)]).match("XYZ ABC"), 2)
+
+    def test_rule_changes_recompile(self):
+        groceries = Category.objects.create(name="Rules groceries", monthly_limit=Decimal("100"))
+        dining = Category.objects.create(name="Rules dining", monthly_limit=Decimal("100"))
+
+        rule = VendorRule.objects.create(keyword="corner market", category=groceries)
+        self.assertEqual(rule.keyword, "CORNER MARKET")
+        self.assertEqual(get_vendor_matcher().match("THE CORNER MARKET 42"), groceries.pk)
+
+        rule.category = dining
+        rule.save()
+        self.assertEqual(get_vendor_matcher().match("THE CORNER MARKET 42"), dining.pk)
+
+        rule.is_active = False
+        rule.save()
+        self.assertIsNone(get_vendor_matcher().match("THE CORNER MARKET 42"))
+
+        rule.delete()
+        self.assertIsNone(get_vendor_matcher().match("THE CORNER MARKET 42"))
+
+
+class VendorModelTests(TestCase):
+    """Naive Bayes vendor suggestions: training, prediction and the artifact round trip."""
+
+    examples = [
+        ("LOBLAWS #1035", Decimal("84.10"), 1),
+        ("LOBLAWS 1114 OTTAWA", Decimal("132.45"), 1),
+        ("FRESHCO #77", Decimal("61.00"), 1),
+        ("FRESHCO 12 KANATA", Decimal("45.30"), 1),
+        ("SUBWAY 3321", Decimal("14.20"), 2),
+        ("SUBWAY #18 OTTAWA", Decimal("11.75"), 2),
+        ("THAI EXPRESS", Decimal("19.80"), 2),
+    ]
+    categories = {1: "Groceries", 2: "Restaurants"}
+
+    def test_predicts_from_partial_vendor_names(self):
+        model = VendorModel.train(self.examples, self.categories)
+        category_id, confidence = model.predict("LOBLAW 2001", Decimal("70"))
+        self.assertEqual(category_id, 1)
+        self.assertGreater(confidence, 0.5)
+        self.assertEqual(model.predict("SUBWAY 9", Decimal("12"))[0], 2)
+        self.assertEqual(model.predict("ZZZ 123", Decimal("70")), (None, 0.0))
+
+    def test_save_and_load(self):
+        model = VendorModel.train(self.examples, self.categories)
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "vendor_model.json.gz")
+            model.save(path)
+            loaded = VendorModel.load(path)
+
+        category_id, confidence = loaded.predict("FRESHCO 5", Decimal("50"))
+        expected_id, expected_confidence = model.predict("FRESHCO 5", Decimal("50"))
+        self.assertEqual(category_id, expected_id)
+        self.assertAlmostEqual(confidence, expected_confidence, places=3)
+
+
+@override_settings(
+    STATICFILES_STORAGE="django.contrib.staticfiles.storage.StaticFilesStorage",
+    MEDIA_ROOT=tempfile.mkdtemp(),
+)
+class ImportJobTests(TestCase):
+    """Uploads become background jobs; the job page turns into the review step."""
+
+    statement = (
+        b"2026-01-02,TIM HORTONS #12,4.50,,995.50\n"
+        b"2026-01-03,SEND E-TFR ***abc,120.00,,875.50\n"
+        b"2026-01-05,PAYROLL DEP,,1500.00,2375.50\n"
+    )
+
+    def setUp(self):
+        self.user = User.objects.create_user("finch", password="pw")
+        self.client.force_login(self.user)
+        self.account = BankAccount.objects.create(name="Jobs chequing")
+
+    def upload(self, content, name="activity.csv"):
+        return self.client.post("/import-transactions/", {
+            "step": "upload",
+            "csv_file": SimpleUploadedFile(name, content),
+            "bank_account": self.account.pk,
+        })
+
+    @override_settings(IMPORT_JOB_RUNNER="sync")
+    def test_upload_creates_job_and_review(self):
+        response = self.upload(self.statement)
+        job = ImportJob.objects.get()
+        self.assertRedirects(response, f"/import-transactions/jobs/{job.pk}/")
+        self.assertEqual(job.status, ImportJobStatus.READY)
+        self.assertEqual(len(job.result["rows"]), 3)
+        self.assertEqual(job.rows_total, 3)
+
+        status = self.client.get(f"/import-transactions/jobs/{job.pk}/status/").json()
+        self.assertEqual((status["status"], status["percent"]), ("ready", 100))
+
+        review = self.client.get(f"/import-transactions/jobs/{job.pk}/")
+        self.assertEqual(review.context["step"], "review")
+        self.assertEqual(len(review.context["review_data"]["rows"]), 3)
+
+    @override_settings(IMPORT_JOB_RUNNER="sync")
+    def test_unrecognised_file_fails_job(self):
+        self.upload(b"foo,bar\n")
+        job = ImportJob.objects.get()
+        self.assertEqual(job.status, ImportJobStatus.FAILED)
+        self.assertIn("Couldn't recognise", job.error)
+
+    @override_settings(IMPORT_JOB_RUNNER="queue")
+    def test_queue_runner_waits_for_command(self):
+        self.upload(self.statement)
+        job = ImportJob.objects.get()
+        self.assertEqual(job.status, ImportJobStatus.QUEUED)
+        self.assertEqual(self.client.get(f"/import-transactions/jobs/{job.pk}/").context["step"], "processing")
+
+        call_command("process_import_jobs", "--once", stdout=StringIO())
+        job.refresh_from_db()
+        self.assertEqual(job.status, ImportJobStatus.READY)
+
+
+@override_settings(STATICFILES_STORAGE="django.contrib.staticfiles.storage.StaticFilesStorage")
+class ImportReviewTests(TestCase):
+    """The review grid posts all rows as one JSON document."""
+
+    def setUp(self):
+        self.client.force_login(User.objects.create_user("finch", password="pw"))
+        self.account = BankAccount.objects.create(name="Review chequing")
+        self.category = Category.objects.create(name="Review coffee", monthly_limit=Decimal("50.00"))
+
+    def review(self, rows):
+        return self.client.post("/import-transactions/", {
+            "step": "review",
+            "bank_account_id": self.account.pk,
+            "rows_json": json.dumps({"rows": rows}),
+        })
+
+    def row(self, **overrides):
+        row = {
+            "entry_type": "expense",
+            "date": "2026-02-03",
+            "vendor_name": "BRIDGEHEAD",
+            "amount": "5.25",
+            "expense_category": self.category.pk,
+        }
+        row.update(overrides)
+        return row
+
+    def test_validation_is_one_query_per_table(self):
+        rows = [self.row(vendor_name=f"CAFE {i}") for i in range(200)]
+        with CaptureQueriesContext(connection) as ctx:
+            cleaned, errors = validate_review_rows(rows)
+        self.assertEqual(errors, [])
+        self.assertEqual(len(cleaned), 200)
+        self.assertEqual(cleaned[0]["expense_category"], self.category)
+        self.assertLessEqual(len(ctx.captured_queries), 5)
+
+    def test_invalid_rows_report_field_errors(self):
+        _, errors = validate_review_rows([
+            self.row(),
+            self.row(amount="1.234", expense_category=None),
+            self.row(entry_type="transfer", expense_category=None),
+            self.row(amount="oops", skip=True),
+        ])
+        self.assertEqual(
+            [(e["row"], e["field"]) for e in errors],
+            [(1, "amount"), (1, "expense_category"), (2, None)],
+        )
+
+    def test_commit_creates_rows_and_skips(self):
+        response = self.review([
+            self.row(),
+            self.row(vendor_name="SKIPPED", skip=True),
+            self.row(entry_type="transfer", expense_category=None, vendor_name="TFR", to_account=self.account.pk),
+        ])
+        self.assertEqual(response.status_code, 302)
+        self.assertEqual(list(Expense.objects.values_list("vendor_name", flat=True)), ["BRIDGEHEAD"])
+        self.assertEqual(Transfer.objects.filter(to_account=self.account).count(), 1)
+
+    def test_commit_skips_duplicates_and_updates_balances_ledger_and_rollups(self):
+        tracked = BankAccount.objects.create(
+            name="Review tracked", current_balance=Decimal("1000.00"),
+            balance_tracking_enabled=True, balance_tracking_start_date=date(2026, 1, 1),
+        )
+        savings = BankAccount.objects.create(name="Review savings")
+        salary = IncomeCategory.objects.create(name="Review salary")
+        rebuild_balance_ledger()  # opening entry for the tracked account
+        Expense.objects.create(
+            date=date(2026, 2, 3), vendor_name="BRIDGEHEAD", category=self.category,
+            amount=Decimal("5.25"), bank_account=tracked,
+        )
+        Transfer.objects.create(date=date(2026, 2, 6), amount=Decimal("200.00"), from_account=tracked, to_account=savings)
+
+        self.account = tracked
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.review([
+                self.row(),  # already imported
+                self.row(date="2026-02-04", vendor_name="CAFE", amount="10.00"),
+                self.row(entry_type="income", date="2026-02-05", vendor_name="PAY", amount="100.00",
+                         expense_category=None, income_source=salary.pk),
+                # Same date/amount out of the tracked account: matches the existing transfer's from side
+                self.row(entry_type="transfer", date="2026-02-06", vendor_name="TFR OUT", amount="200.00",
+                         expense_category=None, from_account=tracked.pk),
+                # Into the tracked account: only compared with transfers into it, so it's new
+                self.row(entry_type="transfer", date="2026-02-06", vendor_name="TFR IN", amount="200.00",
+                         expense_category=None, to_account=tracked.pk),
+            ])
+        self.assertEqual(response.status_code, 302)
+
+        self.assertEqual(Expense.objects.filter(vendor_name="BRIDGEHEAD").count(), 1)
+        self.assertEqual(Transfer.objects.filter(from_account=tracked).count(), 1)
+        self.assertEqual(Transfer.objects.filter(to_account=tracked, from_account=None).count(), 1)
+        self.assertEqual(ImportBatch.objects.get().total_transactions, 3)
+
+        # 1000 - 5.25 - 200 before; the import adds -10 + 100 + 200
+        tracked.refresh_from_db()
+        self.assertEqual(tracked.current_balance, Decimal("1084.75"))
+        self.assertEqual(balance_as_of(tracked.pk, date(2026, 2, 3)), Decimal("994.75"))
+        self.assertEqual(balance_as_of(tracked.pk, date(2026, 2, 28)), Decimal("1084.75"))
+
+        rollup = MonthlyCategoryRollup.objects.get(
+            month=date(2026, 2, 1), dimension=RollupDimension.EXPENSE_CATEGORY, key_id=self.category.pk,
+        )
+        self.assertEqual((rollup.total, rollup.count), (Decimal("15.25"), 2))
+        stored = set(MonthlyCategoryRollup.objects.values_list("month", "dimension", "key_id", "total", "count"))
+        rebuild_monthly_rollups()
+        self.assertEqual(
+            stored, set(MonthlyCategoryRollup.objects.values_list("month", "dimension", "key_id", "total", "count")),
+        )
+
+    def test_errors_rerender_submitted_rows(self):
+        response = self.review([self.row(), self.row(expense_category=999999)])
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(Expense.objects.count(), 0)
+        data = response.context["review_data"]
+        self.assertEqual(len(data["rows"]), 2)
+        self.assertEqual(data["errors"][0]["row"], 1)
+
+    def test_unreadable_payload_is_rejected(self):
+        response = self.client.post("/import-transactions/", {"step": "review", "rows_json": "{"})
+        self.assertRedirects(response, "/import-transactions/")
@@ -17,10 +17,15 @@ urlpatterns = [
     path("update-expense/", views.update_expense, name="update_expense"),
     path("bank-accounts/", views.bank_accounts, name="bank_accounts"),
     path("accounts/<int:account_id>/", views.bank_account_detail, name="bank_account_detail"),
+    path("accounts/<int:account_id>/ledger/", views.bank_account_ledger, name="bank_account_ledger"),
     path("accounts/<int:account_id>/adjust-balance/", views.create_balance_adjustment, name="create_balance_adjustment"),
 
     path("import-transactions/", views.import_transactions, name="import_transactions"),
     path("import-batch/<int:batch_id>/", views.import_batch_detail, name="import_batch_detail"),
+    path("import-transactions/jobs/<int:job_id>/", views.import_job_detail, name="import_job_detail"),
+    path("import-transactions/jobs/<int:job_id>/status/", views.import_job_status, name="import_job_status"),
+    path("import-transactions/jobs/<int:job_id>/delete/", views.import_job_delete, name="import_job_delete"),
+    path("import-transactions/vendor-rules/", views.vendor_rules, name="vendor_rules"),
 
     path("withholdings/", views.withholding_overview, name="withholding_overview"),
     path("withholdings/category/<int:pk>/", views.withholding_category_detail, name="withholding_category_detail"),
@@ -47,6 +52,8 @@ urlpatterns = [
 
     # Month-End Close Wizard
     path('month-end-close/', views.month_end_wizard, name='month_end_wizard'),
+    path('month-end-close/backups/<int:job_id>/', views.backup_job_detail, name='backup_job_detail'),
+    path('month-end-close/backups/<int:job_id>/status/', views.backup_job_status, name='backup_job_status'),
 
     # Month Forecast Worksheet
     path('month-forecast/save/', views.month_forecast_save, name='month_forecast_save'),
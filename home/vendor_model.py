@@ -0,0 +1,225 @@
+"""
+Learned vendor -> expense category suggestions for CSV imports.
+
+A multinomial naive Bayes model over bank descriptions, trained offline from
+existing Expense rows by `python manage.py train_vendor_model` and saved as a
+small gzipped JSON artifact (settings.VENDOR_MODEL_PATH). The importer loads it
+lazily and only consults it for expense rows no VendorRule matched.
+
+Features per description:
+- w:WORD     upper-cased alphabetic words (store numbers / card refs dropped)
+- b:W1 W2    adjacent word pairs
+- c:xyz      character trigrams of each word, so LOBLAW ~ LOBLAWS
+- a:N        amount bucket, so a $12 and a $1,200 charge at one vendor can differ
+
+Only the log-probability offsets of features a category has actually seen are
+stored, so prediction touches a handful of dict entries per row.
+"""
+
+import gzip
+import json
+import math
+import os
+import re
+import threading
+from bisect import bisect
+from collections import Counter, defaultdict
+
+from django.conf import settings
+from django.utils import timezone
+
+
+MODEL_FORMAT_VERSION = 1
+
+# Below this, the importer shows the guess but leaves the category blank
+MIN_CONFIDENCE = 0.6
+
+_WORD_RE = re.compile(r"[A-Z]{2,}")
+_AMOUNT_BUCKETS = (10, 25, 50, 100, 250, 500, 1000, 2500)
+
+
+def amount_bucket(amount):
+    return bisect(_AMOUNT_BUCKETS, abs(float(amount)))
+
+
+def extract_features(description, amount=None):
+    words = _WORD_RE.findall((description or "").upper())
+    features = [f"w:{word}" for word in words]
+    features.extend(f"b:{first} {second}" for first, second in zip(words, words[1:]))
+    for word in words:
+        padded = f"^{word}$"
+        features.extend(f"c:{padded[i:i + 3]}" for i in range(len(padded) - 2))
+    if amount is not None:
+        features.append(f"a:{amount_bucket(amount)}")
+    return features
+
+
+class VendorModel:
+    def __init__(self, categories, priors, defaults, weights, trained_at=None, n_examples=0):
+        self.category_ids = [category_id for category_id, _ in categories]
+        self.category_names = [name for _, name in categories]
+        self.priors = priors          # log P(category)
+        self.defaults = defaults      # log P(feature | category) for a feature the category never saw
+        self.weights = weights        # {feature: {class index: offset above default}}
+        self.trained_at = trained_at
+        self.n_examples = n_examples
+
+    # -------------------------------------------------------------------------
+    # Training
+    # -------------------------------------------------------------------------
+
+    @classmethod
+    def train(cls, examples, categories, alpha=0.5, min_feature_count=1):
+        """
+        Fit from (description, amount, category_id) examples.
+
+        Args:
+            examples: iterable of (description, amount, category_id)
+            categories: {category_id: name} for the categories to learn
+            alpha: additive smoothing
+            min_feature_count: drop features seen fewer times than this overall
+        """
+        class_docs = Counter()
+        class_features = defaultdict(Counter)
+        feature_totals = Counter()
+
+        for description, amount, category_id in examples:
+            if category_id not in categories:
+                continue
+            features = extract_features(description, amount)
+            if not features:
+                continue
+            class_docs[category_id] += 1
+            class_features[category_id].update(features)
+            feature_totals.update(features)
+
+        vocabulary = {f for f, count in feature_totals.items() if count >= min_feature_count}
+        category_ids = sorted(class_docs)
+        n_examples = sum(class_docs.values())
+        vocab_size = max(len(vocabulary), 1)
+
+        priors = []
+        defaults = []
+        weights = defaultdict(dict)
+        for index, category_id in enumerate(category_ids):
+            counts = class_features[category_id]
+            total = sum(count for f, count in counts.items() if f in vocabulary)
+            denominator = math.log(total + alpha * vocab_size)
+            default = math.log(alpha) - denominator
+
+            priors.append(math.log(class_docs[category_id] / n_examples))
+            defaults.append(default)
+            for feature, count in counts.items():
+                if feature in vocabulary:
+                    weights[feature][index] = math.log(count + alpha) - denominator - default
+
+        return cls(
+            categories=[(category_id, categories[category_id]) for category_id in category_ids],
+            priors=priors,
+            defaults=defaults,
+            weights=dict(weights),
+            trained_at=timezone.now().isoformat(timespec="seconds"),
+            n_examples=n_examples,
+        )
+
+    # -------------------------------------------------------------------------
+    # Prediction
+    # -------------------------------------------------------------------------
+
+    def predict(self, description, amount=None):
+        """
+        Return (category_id, confidence) for the most likely category, or
+        (None, 0.0) if nothing about the description was seen in training.
+        """
+        if not self.category_ids:
+            return None, 0.0
+
+        features = [f for f in extract_features(description, amount) if f in self.weights]
+        # The amount bucket alone says nothing about the vendor
+        if not any(not f.startswith("a:") for f in features):
+            return None, 0.0
+        known = [self.weights[f] for f in features]
+
+        scores = [prior + default * len(known) for prior, default in zip(self.priors, self.defaults)]
+        for offsets in known:
+            for index, offset in offsets.items():
+                scores[index] += offset
+
+        best = max(range(len(scores)), key=scores.__getitem__)
+        top = scores[best]
+        total = sum(math.exp(score - top) for score in scores)
+        return self.category_ids[best], 1.0 / total
+
+    # -------------------------------------------------------------------------
+    # Serialization
+    # -------------------------------------------------------------------------
+
+    def to_dict(self):
+        return {
+            "version": MODEL_FORMAT_VERSION,
+            "trained_at": self.trained_at,
+            "n_examples": self.n_examples,
+            "categories": [list(pair) for pair in zip(self.category_ids, self.category_names)],
+            "priors": [round(p, 5) for p in self.priors],
+            "defaults": [round(d, 5) for d in self.defaults],
+            "weights": {
+                feature: [[index, round(offset, 4)] for index, offset in offsets.items()]
+                for feature, offsets in self.weights.items()
+            },
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        if data.get("version") != MODEL_FORMAT_VERSION:
+            raise ValueError(f"Unsupported vendor model version {data.get('version')!r}")
+        return cls(
+            categories=[tuple(pair) for pair in data["categories"]],
+            priors=data["priors"],
+            defaults=data["defaults"],
+            weights={
+                feature: {index: offset for index, offset in offsets}
+                for feature, offsets in data["weights"].items()
+            },
+            trained_at=data.get("trained_at"),
+            n_examples=data.get("n_examples", 0),
+        )
+
+    def save(self, path):
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        tmp_path = f"{path}.tmp"
+        with gzip.open(tmp_path, "wt", encoding="utf-8") as fh:
+            json.dump(self.to_dict(), fh, separators=(",", ":"))
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path):
+        with gzip.open(path, "rt", encoding="utf-8") as fh:
+            return cls.from_dict(json.load(fh))
+
+
+_lock = threading.Lock()
+_model = None
+_model_mtime = None
+
+
+def get_vendor_model():
+    """
+    Return the trained model, loading it on first use and again whenever the
+    artifact on disk is replaced. Returns None if no model has been trained.
+    """
+    global _model, _model_mtime
+
+    path = settings.VENDOR_MODEL_PATH
+    try:
+        mtime = os.path.getmtime(path)
+    except OSError:
+        return None
+
+    with _lock:
+        if _model is None or mtime != _model_mtime:
+            try:
+                _model = VendorModel.load(path)
+            except (OSError, ValueError, KeyError):
+                _model = None
+            _model_mtime = mtime
+        return _model
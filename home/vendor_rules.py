@@ -0,0 +1,127 @@
+"""
+Vendor keyword -> expense category matching for CSV imports.
+
+All active VendorRule keywords are compiled into one Aho–Corasick automaton,
+so matching a description costs one pass over its characters no matter how
+many rules exist. The compiled matcher is cached per process and rebuilt when
+the rules change:
+
+- VendorRule save/delete signals drop this process's copy immediately
+- get_vendor_matcher() compares a cheap (count, latest updated_at) version
+  so other worker processes pick up edits on their next import
+"""
+
+import threading
+from collections import deque
+
+from django.db.models import Count, Max
+
+from .models import VendorRule
+
+
+class VendorMatcher:
+    """
+    Aho–Corasick automaton over upper-cased keywords.
+
+    Each keyword carries a payload (category_id, priority). match() returns the
+    category of the best keyword found in the text: highest priority, then the
+    longest (most specific) keyword, then the one that appears first.
+    """
+
+    def __init__(self, rules=()):
+        # State 0 is the root. goto[state] maps a character to the next state.
+        self.goto = [{}]
+        self.fail = [0]
+        self.outputs = [[]]   # per state: [(keyword_length, category_id, priority)]
+        self.size = 0
+
+        for keyword, category_id, priority in rules:
+            self._add(keyword.upper(), category_id, priority)
+        self._link()
+
+    def _add(self, keyword, category_id, priority):
+        if not keyword:
+            return
+        state = 0
+        for char in keyword:
+            next_state = self.goto[state].get(char)
+            if next_state is None:
+                next_state = len(self.goto)
+                self.goto[state][char] = next_state
+                self.goto.append({})
+                self.fail.append(0)
+                self.outputs.append([])
+            state = next_state
+        self.outputs[state].append((len(keyword), category_id, priority))
+        self.size += 1
+
+    def _link(self):
+        """Breadth-first pass to set failure links and merge suffix outputs."""
+        queue = deque(self.goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for char, next_state in self.goto[state].items():
+                queue.append(next_state)
+                fallback = self.fail[state]
+                while fallback and char not in self.goto[fallback]:
+                    fallback = self.fail[fallback]
+                target = self.goto[fallback].get(char, 0)
+                self.fail[next_state] = target if target != next_state else 0
+                self.outputs[next_state] = self.outputs[next_state] + self.outputs[self.fail[next_state]]
+
+    def match(self, text):
+        """Return the category_id for `text` (any case), or None."""
+        if not self.size or not text:
+            return None
+
+        goto, fail, outputs = self.goto, self.fail, self.outputs
+        best = None
+        best_rank = None
+        state = 0
+        for end, char in enumerate(text.upper()):
+            while state and char not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(char, 0)
+            for length, category_id, priority in outputs[state]:
+                rank = (priority, length, -(end - length))
+                if best_rank is None or rank > best_rank:
+                    best, best_rank = category_id, rank
+        return best
+
+    def __len__(self):
+        return self.size
+
+
+_lock = threading.Lock()
+_matcher = None
+_matcher_version = None
+
+
+def _rules_version():
+    stats = VendorRule.objects.aggregate(count=Count("id"), latest=Max("updated_at"))
+    return stats["count"], stats["latest"]
+
+
+def get_vendor_matcher():
+    """
+    Return the compiled matcher for the active rules, rebuilding it only if
+    the rules changed since it was built. Costs one aggregate query; call it
+    once per import rather than once per row.
+    """
+    global _matcher, _matcher_version
+
+    version = _rules_version()
+    with _lock:
+        if _matcher is None or version != _matcher_version:
+            rules = VendorRule.objects.filter(is_active=True).values_list("keyword", "category_id", "priority")
+            _matcher = VendorMatcher(rules)
+            _matcher_version = version
+        return _matcher
+
+
+def invalidate_vendor_matcher():
+    global _matcher, _matcher_version
+
+    with _lock:
+        _matcher = None
+        _matcher_version = None
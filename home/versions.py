@@ -0,0 +1,95 @@
+"""
+DataVersion counters for cache invalidation.
+
+Each counter is a row in DataVersion that is bumped whenever the data it
+covers changes. Caches put the current value in their keys, so a bump makes
+every cached copy unreachable at once, in every process, with nothing to
+delete.
+
+- "refdata": the dropdown reference tables (see home/refdata.py)
+- "month:YYYY-MM": everything shown for one month (its Income, Expense,
+  Transfer, BalanceAdjustment and WithholdingTransaction rows, its
+  MonthEndClose and its forecast worksheet), bumped by the signal handlers
+  in home/signals.py
+- "months": bumped along with every month counter, for pages built from all
+  months at once (balances, the month selector)
+- "profiles": user profile settings such as pinned categories
+
+Changes made with queryset.update() or bulk_create() bypass the signals;
+bump the affected counters after them.
+"""
+
+from django.db import IntegrityError, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .models import BalanceAdjustment, DataVersion, Expense, Income, Transfer
+
+
+MONTH_PREFIX = "month:"
+ALL_MONTHS = "months"
+PROFILES = "profiles"
+
+
+def current_version(key):
+    return DataVersion.objects.filter(key=key).values_list("version", flat=True).first() or 0
+
+
+def current_versions(keys):
+    """{key: (version, updated_at)} for the counters that exist, in one query."""
+    return {
+        key: (version, updated_at)
+        for key, version, updated_at in
+        DataVersion.objects.filter(key__in=keys).values_list("key", "version", "updated_at")
+    }
+
+
+def bump_version(key):
+    """Increment a DataVersion counter (creating it on first use)."""
+    # update() skips auto_now, so set updated_at explicitly
+    counter = DataVersion.objects.filter(key=key)
+    if counter.update(version=F("version") + 1, updated_at=timezone.now()):
+        return
+    try:
+        with transaction.atomic():
+            DataVersion.objects.create(key=key, version=1)
+    except IntegrityError:
+        # Another process created it first
+        counter.update(version=F("version") + 1, updated_at=timezone.now())
+
+
+# ----------------------------------------------------------------------
+# Per-month transaction data
+# ----------------------------------------------------------------------
+
+def month_key(month):
+    """The counter for the month containing `month` (a date)."""
+    return f"{MONTH_PREFIX}{month:%Y-%m}"
+
+
+def month_version(month):
+    return current_version(month_key(month))
+
+
+def bump_month_versions(dates):
+    """Bump the counter of every month any of `dates` falls in (and "months")."""
+    keys = sorted({month_key(d) for d in dates if d})
+    for key in keys:
+        bump_version(key)
+    if keys:
+        bump_version(ALL_MONTHS)
+
+
+def bump_all_month_versions():
+    """
+    Bump every month that has a counter or any transactions (after imports
+    that write rows without signals).
+    """
+    months = set()
+    for model in (Income, Expense, Transfer, BalanceAdjustment):
+        months.update(model.objects.dates("date", "month"))
+    keys = {month_key(m) for m in months}
+    keys.update(DataVersion.objects.filter(key__startswith=MONTH_PREFIX).values_list("key", flat=True))
+    for key in sorted(keys):
+        bump_version(key)
+    bump_version(ALL_MONTHS)
@@ -1,18 +1,17 @@
-import csv
-import io
 import json
 import calendar
 from calendar import monthrange
 from collections import defaultdict
 from datetime import datetime, date, timedelta
+from itertools import chain
 from decimal import Decimal, InvalidOperation
 from django.db import IntegrityError, transaction
 
 
 from django.contrib import messages
-from django.db.models import Sum, F, Value, DecimalField, ExpressionWrapper, Case, When, Count
+from django.db.models import Sum, F, Value, DecimalField, ExpressionWrapper, Case, When, Count, OuterRef, Prefetch, Subquery
 from django import forms
-from django.forms import ModelForm, formset_factory
+from django.forms import ModelForm
 from django.http import HttpResponseBadRequest, JsonResponse
 from django.shortcuts import render, redirect, get_object_or_404
 from django.views.decorators.csrf import csrf_exempt
@@ -20,8 +19,9 @@ from django.views.decorators.http import require_http_methods, require_POST
 from django.conf import settings
 from django.urls import reverse
 from django.db.models.functions import Coalesce
+from django.utils.functional import SimpleLazyObject
 
-from .forms import TransactionForm, CSVUploadForm, TransactionImportForm, ExpenseEditForm, ExpenseAttachmentUploadForm, WithholdingPayoutForm, IncomeEditForm, TransferEditForm, BalanceAdjustmentEditForm
+from .forms import TransactionForm, CSVUploadForm, ExpenseEditForm, ExpenseAttachmentUploadForm, WithholdingPayoutForm, IncomeEditForm, TransferEditForm, BalanceAdjustmentEditForm
 from .models import (
     Expense,
     ExpenseAttachment,
@@ -46,164 +46,34 @@ from .models import (
     MonthEndExpenseCategorySnapshot,
     MonthEndWithholdingCategorySnapshot,
     MonthEndIncomeCategorySnapshot,
+    BackupJob,
 
     # ✅ Forecast worksheet persistence
     ForecastWorksheet,
-)
-
-
-TransactionImportFormSet = formset_factory(TransactionImportForm, extra=0)
-
-# --- Auto-mapping rules ---
-
-EXPLICIT_EXPENSE_KEYWORD_CATEGORY_NAMES = {
-    "GORE MUTUAL": "Subaru Insurance",
-    "TD INS": "Arnprior Insurance",
-    "FIDO MOBILE": "Cell Phone",
-    "BELL CANADA": "Arnprior Internet",
-    "LOBLAWS": "Groceries",
-    "FOODLAND": "Groceries",
-    "COSTCO": "Groceries",
-    "ULTRAMAR": "Gas",
-    "TIM HORTONS": "Restaurants",
-    "STARBUCKS": "Restaurants",
-    "TST-HUNTERS": "Restaurants",
-    "WAL-MART": "Groceries",
-    "PIZZA": "Restaurants",
-    "MCDONALD": "Restaurants",
-    "NO GO COFFEE": "Restaurants",
-    "SHAWARMA": "Restaurants",
-    "STINSON": "Foxview Heat",      # covers "STINSON AND SON"
-    "FAT LES": "Restaurants",
-    "ENBRIDGE": "Arnprior Heat",
-
-    # New mappings requested
-    "NETFLIX": "Digital Subscriptions",
-    "CHATGPT": "Digital Subscriptions",
-    "SPOTIFY": "Digital Subscriptions",
-    "NOTION": "Digital Subscriptions",
-    "CARLETON": "Golf",
-    "FARM BOY": "Groceries",
-    "AMAZON": "Miscellaneous",
-}
-
-EXACT_ETFR_SNOW_REMOVAL_AMOUNT = Decimal("180.80")
-
-
-def get_category_cached(name, cache, missing_set):
-    if not name:
-        return None
-
-    if name in cache:
-        return cache[name]
-    if name in missing_set:
-        return None
-
-    try:
-        cat = Category.objects.get(name=name)
-        cache[name] = cat
-        return cat
-    except Category.DoesNotExist:
-        missing_set.add(name)
-        return None
-
 
-def apply_income_rules(desc_upper, amount, entry_type_default, parsed_date=None):
-    """
-    Income inference rules used only during import parsing.
+    # ✅ Precomputed monthly totals
+    RollupDimension,
 
-    Important safety constraints:
-    - Only runs when entry_type_default is already 'income' (deposit column)
-    - E-TRANSFER heuristic triggers only when 'E-TRANSFER' is in description
-    - GLOBALIZATION is always Employment Income
-    """
-    entry_type = entry_type_default
-    income_source = ""
-
-    # Employment income (explicit)
-    if "GLOBALIZATION" in desc_upper:
-        return "income", "Employment Income"
-
-    # Only infer rental income on deposits that contain E-TRANSFER (substring match; unique codes ok)
-    if "E-TRANSFER" in desc_upper and entry_type_default == "income":
-        # If we have a date, enforce "around the 1st of month" window (± ~1.5 weeks)
-        in_window = True
-        if parsed_date:
-            first_of_month = date(parsed_date.year, parsed_date.month, 1)
-            in_window = abs((parsed_date - first_of_month).days) <= 11  # ~1.5 weeks
-
-        if in_window:
-            # Amount heuristics (±5%)
-            main_target = Decimal("2500")
-            loft_target = Decimal("1600")
-
-            main_low = main_target * Decimal("0.95")
-            main_high = main_target * Decimal("1.05")
-
-            loft_low = loft_target * Decimal("0.95")
-            loft_high = loft_target * Decimal("1.05")
-
-            if main_low <= amount <= main_high:
-                return "income", "Arnprior Rental Income (MAIN)"
-            if loft_low <= amount <= loft_high:
-                return "income", "Arnprior Rental Income (LOFT)"
-
-        # Fallback (your existing loose thresholds) — still only for E-TRANSFER deposits
-        if Decimal("2000") <= amount <= Decimal("2700"):
-            return "income", "Arnprior Rental Income (MAIN)"
-        elif amount < Decimal("2000"):
-            return "income", "Arnprior Rental Income (LOFT)"
-
-    return entry_type, income_source
-
-def apply_expense_rules(desc_upper, amount, category_cache, missing_categories):
-    if "E-TFR" in desc_upper and amount == EXACT_ETFR_SNOW_REMOVAL_AMOUNT:
-        return get_category_cached("Arnprior Snow Removal", category_cache, missing_categories)
-
-    for keyword, cat_name in EXPLICIT_EXPENSE_KEYWORD_CATEGORY_NAMES.items():
-        if keyword in desc_upper:
-            cat = get_category_cached(cat_name, category_cache, missing_categories)
-            if cat:
-                return cat
-
-    return None
-
-def get_arnprior_shared_unit_id():
-    """
-    Best-effort lookup for the Arnprior shared/common unit.
-    Returns RentalUnit.id or None (never raises).
-    SQLite-safe: uses icontains instead of regex.
-    """
-    qs = RentalUnit.objects.select_related("property").filter(property__name__iexact="Arnprior")
-    unit = (
-        qs.filter(name__icontains="shared").order_by("name").first()
-        or qs.filter(name__icontains="common").order_by("name").first()
-    )
-    return unit.id if unit else None
+    # ✅ Import auto-categorisation + background parsing
+    VendorRule,
+    ImportJob,
+    ImportJobStatus,
+)
+from .rollups import MonthlyRollup, monthly_totals, apply_bulk_rollup_updates
+from .signals import apply_bulk_balance_updates, balance_batch
+from .ledger import balance_as_of
+from .account_ledger import InvalidCursor, ledger_month_totals, ledger_page
+from .vendor_rules import get_vendor_matcher
+from .jobs import enqueue_backup_job, enqueue_import_job
+from .month_close import close_snapshots, get_month_close
+from .conditional import month_page
+from .refdata import get_reference_data
+from .versions import bump_month_versions, month_version
+from .import_review import ReviewPayloadError, parse_review_payload, review_payload, validate_review_rows
 
-def get_foxview_shared_unit_id():
-    """
-    Best-effort lookup for the Foxview shared/common unit.
-    Returns RentalUnit.id or None (never raises).
-    """
-    qs = RentalUnit.objects.select_related("property").filter(property__name__iexact="Foxview")
-    unit = (
-        qs.filter(name__icontains="shared").order_by("name").first()
-        or qs.filter(name__icontains="common").order_by("name").first()
-    )
-    return unit.id if unit else None
 
-def build_income_rental_unit_map():
-    """
-    Used by import review UI to display inferred rental unit for an IncomeCategory.
-    Returns: { "<income_category_id>": "Property — Unit" }
-    """
-    m = {}
-    for ic in IncomeCategory.objects.select_related("default_rental_unit__property").all():
-        if ic.default_rental_unit_id:
-            m[str(ic.id)] = f"{ic.default_rental_unit.property.name} — {ic.default_rental_unit.name}"
-    return m
 
+@month_page()
 def dashboard(request):
     today = date.today()
     selected_month_str = request.GET.get("month", today.strftime("%Y-%m"))
@@ -234,6 +104,9 @@ def dashboard(request):
     # Check if this is an AJAX request
     is_ajax = request.headers.get('X-Requested-With') == 'XMLHttpRequest'
 
+    # Dropdown/lookup tables, shared by the form and the edit modals
+    refdata = get_reference_data()
+
     if request.method == "POST":
         # -------------------------
         # Expense modal edit/delete
@@ -445,7 +318,7 @@ def dashboard(request):
         # New transaction (Add Transaction form)
         # -------------------------
         else:
-            form = TransactionForm(request.POST, request.FILES)
+            form = TransactionForm(request.POST, request.FILES, refdata=refdata)
             if form.is_valid():
                 entry_type = form.cleaned_data["entry_type"]
                 entry_date = form.cleaned_data["date"]
@@ -572,56 +445,76 @@ def dashboard(request):
                     }
             except (Expense.DoesNotExist, Income.DoesNotExist, Transfer.DoesNotExist):
                 pass
-        form = TransactionForm(initial=initial)
+        form = TransactionForm(initial=initial, refdata=refdata)
 
     # -------------------------
     # Query transactions for month
     # -------------------------
-    income_entries = (
-        Income.objects
-        .filter(date__range=(first_day, last_day))
-        .select_related("income_category", "bank_account")
-    )
+    # The transaction tables are a template fragment cached on this month's
+    # data version, so the lists are only fetched (once each, with every
+    # relation the template touches) when that fragment is re-rendered.
+    def load_income():
+        return list(
+            Income.objects
+            .filter(date__range=(first_day, last_day))
+            .select_related("income_category", "bank_account", "rental_unit__property")
+        )
 
-    expense_entries = (
-        Expense.objects
-        .filter(date__range=(first_day, last_day))
-        .select_related("category", "bank_account", "rental_unit", "cra_category")
-        .annotate(attachment_count=Count("attachments", distinct=True))
-    )
+    def load_expenses():
+        # Receipt count per expense as a correlated subquery, so the expense
+        # rows aren't joined to attachments and grouped
+        attachment_counts = (
+            ExpenseAttachment.objects
+            .filter(expense=OuterRef("pk"))
+            .order_by()
+            .values("expense")
+            .annotate(count=Count("pk"))
+            .values("count")
+        )
+        return list(
+            Expense.objects
+            .filter(date__range=(first_day, last_day))
+            .select_related("category", "bank_account", "rental_unit__property", "cra_category")
+            .annotate(attachment_count=Coalesce(Subquery(attachment_counts), 0))
+        )
 
-    # Transfers for this month (exclude split children, only show parents and non-split transfers)
-    transfer_entries = (
-        Transfer.objects
-        .filter(date__range=(first_day, last_day))
-        .filter(parent_transfer__isnull=True)  # Exclude split children
-        .select_related("from_account", "to_account", "withholding_category")
-        .prefetch_related("splits")  # Eager load children for display
-    )
+    def load_transfers():
+        # Parents and non-split transfers only; children are shown under their parent
+        transfer_related = ("from_account", "to_account", "withholding_category__account")
+        return list(
+            Transfer.objects
+            .filter(date__range=(first_day, last_day))
+            .filter(parent_transfer__isnull=True)  # Exclude split children
+            .select_related(*transfer_related)
+            .prefetch_related(  # Eager load children for display
+                Prefetch("splits", queryset=Transfer.objects.select_related(*transfer_related))
+            )
+        )
+
+    income_entries = SimpleLazyObject(load_income)
+    expense_entries = SimpleLazyObject(load_expenses)
+    transfer_entries = SimpleLazyObject(load_transfers)
+
+    # Month totals come from the precomputed monthly rollups
+    rollup = MonthlyRollup(first_day)
+    income_categories = refdata.income_categories
 
     # Exclude Business Reimbursement from totals
-    total_income = sum(
-        i.amount for i in income_entries
-        if not i.income_category or i.income_category.name != 'Business Reimbursement'
-    )
-    total_expenses = sum(e.amount for e in expense_entries)
+    total_income = rollup.total_received(exclude_income_category_ids={
+        c.id for c in income_categories if c.name == 'Business Reimbursement'
+    })
+    total_expenses = rollup.total_spent
     net_savings = total_income - total_expenses
-    total_transfers = sum(t.amount for t in transfer_entries)
-
-    income_by_source = defaultdict(list)
-    for income in income_entries:
-        label = income.income_category.name if income.income_category else (income.category or "Uncategorized")
-        income_by_source[label].append(income)
+    total_transfers = SimpleLazyObject(lambda: sum((t.amount for t in transfer_entries), Decimal("0.00")))
 
-    expenses_by_category = defaultdict(Decimal)
+    expenses_by_category = {}
     targets_by_category = {}
 
-    for expense in expense_entries:
-        category_name = expense.category.name
-        expenses_by_category[category_name] += expense.amount
-
-        if category_name not in targets_by_category:
-            targets_by_category[category_name] = expense.category.monthly_limit or Decimal("0")
+    for category in refdata.categories:
+        if category.id not in rollup.spent_by_category:
+            continue
+        expenses_by_category[category.name] = rollup.spent(category.id)
+        targets_by_category[category.name] = category.monthly_limit or Decimal("0")
 
     category_summaries = []
     for cat_name, spent in expenses_by_category.items():
@@ -634,8 +527,6 @@ def dashboard(request):
 
     category_summaries.sort(key=lambda cs: cs["name"])
 
-    accounts = BankAccount.objects.all().order_by("institution", "name")
-
     context = {
         "form": form,
         "selected_month": f"{year:04d}-{month:02d}",
@@ -652,28 +543,31 @@ def dashboard(request):
         "total_expenses": total_expenses,
         "net_savings": net_savings,
         "total_transfers": total_transfers,
-        "income_by_source": dict(income_by_source),
-        "expenses_by_category": dict(expenses_by_category),
+        "expenses_by_category": expenses_by_category,
         "targets_by_category": targets_by_category,
-        "all_categories": Category.objects.filter(is_archived=False),
+        "all_categories": refdata.active_categories,
         "category_summaries": category_summaries,
-        "accounts": accounts,
-        "income_categories": IncomeCategory.objects.all().order_by("name"),
+        "accounts": refdata.bank_accounts,
+        "income_categories": income_categories,
 
         # Rental / CRA dropdowns for modals + add-transaction form
-        "all_rental_units": RentalUnit.objects.select_related("property").order_by("property__name", "name"),
-        "cra_categories": CRARentalExpenseCategory.objects.filter(is_active=True).order_by("sort_order", "name"),
+        "all_rental_units": refdata.rental_units,
+        "cra_categories": refdata.cra_categories,
         "income_source_default_unit_map": {
             str(c.id): (c.default_rental_unit_id or "")
-            for c in IncomeCategory.objects.all()
+            for c in income_categories
         },
         "income_source_taxable_map": {
             str(c.id): c.taxable_default
-            for c in IncomeCategory.objects.all()
+            for c in income_categories
         },
-        "withholding_categories": WithholdingCategory.objects.select_related("account").order_by("account__name", "name"),
+        "withholding_categories": refdata.withholding_categories,
         "added_id": request.GET.get("added", ""),
         "added_type": request.GET.get("added_type", ""),
+
+        # Template fragment cache keys
+        "refdata_version": refdata.version,
+        "month_version": month_version(first_day),
     }
 
     return render(request, "dashboard.html", context)
@@ -681,6 +575,7 @@ def dashboard(request):
 
 
 
+@month_page(all_months=True)
 def category_progress(request):
     today = date.today()
     selected_month_str = request.GET.get("month", today.strftime("%Y-%m"))
@@ -725,17 +620,14 @@ def category_progress(request):
 
     # Check if the selected month is a locked close — use snapshots when available
     month_close_record = MonthEndClose.objects.filter(month=first_day, is_locked=True).first()
+    # Closes with a full snapshot hold every figure below, so the page is
+    # built from the snapshot rows alone
+    frozen = month_close_record is not None and month_close_record.has_full_snapshot
 
-    # Pre-compute withholding-funded expense totals per category.
-    # These represent spending from pre-saved buckets, not current cash outflows,
-    # so they must be excluded from the cash flow health calculation.
-    _wf_funded_by_cat = {
-        row['category_id']: row['total']
-        for row in Expense.objects.filter(
-            date__range=(first_day, last_day),
-            withholding_category__isnull=False,
-        ).values('category_id').annotate(total=Sum('amount'))
-    }
+    # All month totals come from the precomputed monthly rollup table.
+    # Withholding-funded spending represents money from pre-saved buckets, not
+    # current cash outflows, so it is excluded from the cash flow health calculation.
+    rollup = None if frozen else MonthlyRollup(first_day)
 
     # ========= EXPENSE PROGRESS =========
     expense_summaries = []
@@ -746,14 +638,14 @@ def category_progress(request):
         month_close_record.expense_snapshots.select_related('category').all()
         if month_close_record else None
     )
-    if _expense_snaps and _expense_snaps.exists():
+    if frozen or (_expense_snaps and _expense_snaps.exists()):
         # Closed month: use frozen snapshot values
         for snap in _expense_snaps:
             monthly_limit = snap.monthly_limit
             total_spent = snap.actual_spent
             percent_used = float(total_spent / monthly_limit * 100) if monthly_limit > 0 else 0.0
             if snap.category.name != "Business Expense":
-                wf_funded = _wf_funded_by_cat.get(snap.category_id, Decimal("0.00"))
+                wf_funded = snap.withholding_funded if frozen else rollup.withholding_funded(snap.category_id)
                 cash_flow_spent = total_spent - wf_funded
                 total_expenses_actual += cash_flow_spent
                 if cash_flow_spent < monthly_limit:
@@ -768,11 +660,7 @@ def category_progress(request):
     else:
         # Open/current month: use live model values
         for category in Category.objects.filter(is_archived=False).exclude(monthly_limit__isnull=True):
-            total_spent = (
-                Expense.objects.filter(category=category, date__range=(first_day, last_day))
-                .aggregate(total=Sum("amount"))["total"]
-                or Decimal("0.00")
-            )
+            total_spent = rollup.spent(category.id)
             percent_used = (
                 total_spent / category.monthly_limit * 100
                 if category.monthly_limit and category.monthly_limit > 0
@@ -781,7 +669,7 @@ def category_progress(request):
 
             # Exclude "Business Expense" from cash flow totals (gets reimbursed)
             if category.name != "Business Expense":
-                wf_funded = _wf_funded_by_cat.get(category.id, Decimal("0.00"))
+                wf_funded = rollup.withholding_funded(category.id)
                 cash_flow_spent = total_spent - wf_funded
                 total_expenses_actual += cash_flow_spent
                 if cash_flow_spent < category.monthly_limit:
@@ -807,7 +695,7 @@ def category_progress(request):
         month_close_record.income_snapshots.select_related('income_category').all()
         if month_close_record else None
     )
-    if _income_snaps and _income_snaps.exists():
+    if frozen or (_income_snaps and _income_snaps.exists()):
         # Closed month: use frozen snapshot values
         for snap in _income_snaps:
             target = snap.monthly_target
@@ -829,11 +717,7 @@ def category_progress(request):
         # Open/current month: use live model values
         for inc_cat in IncomeCategory.objects.all():
             target = inc_cat.monthly_target or Decimal("0.00")
-            total_received = (
-                Income.objects.filter(income_category=inc_cat, date__range=(first_day, last_day))
-                .aggregate(total=Sum("amount"))["total"]
-                or Decimal("0.00")
-            )
+            total_received = rollup.received(inc_cat.id)
             if inc_cat.name != "Business Reimbursement":
                 total_income_actual += total_received
                 if target > 0 and total_received < target:
@@ -854,104 +738,74 @@ def category_progress(request):
     # ========= TRACK JENNA TRANSFERS AS INCOME =========
     jenna_transfers = Decimal("0.00")
     jenna_remaining = Decimal("0.00")
-    try:
-        jenna_account = BankAccount.objects.get(name="Jenna (EXT)")
-        # Outflows from Jenna's account = money she's sending
-        jenna_transfers = (
-            Transfer.objects.filter(
-                date__range=(first_day, last_day),
-                from_account=jenna_account
-            )
-            .aggregate(total=Sum("amount"))["total"]
-            or Decimal("0.00")
-        )
-        # Fixed expected monthly Jenna transfer amount
-        jenna_monthly_expected = Decimal("4000.00")
-        jenna_remaining = max(Decimal("0.00"), jenna_monthly_expected - jenna_transfers)
-    except BankAccount.DoesNotExist:
-        pass  # Account doesn't exist, leave at 0
+    # Fixed expected monthly Jenna transfer amount
+    jenna_monthly_expected = Decimal("4000.00")
+    if frozen:
+        if month_close_record.partner_transfers is not None:
+            jenna_transfers = month_close_record.partner_transfers
+            jenna_remaining = max(Decimal("0.00"), jenna_monthly_expected - jenna_transfers)
+    else:
+        try:
+            jenna_account = BankAccount.objects.get(name="Jenna (EXT)")
+            # Outflows from Jenna's account = money she's sending
+            jenna_transfers = rollup.transfers_out(jenna_account.id)
+            jenna_remaining = max(Decimal("0.00"), jenna_monthly_expected - jenna_transfers)
+        except BankAccount.DoesNotExist:
+            pass  # Account doesn't exist, leave at 0
 
     # ========= WITHHOLDING / TRANSFER PROGRESS (monthly-based) =========
 
-    buckets = WithholdingCategory.objects.select_related("account").order_by("name")
+    SAVINGS_BUCKETS = []  # No longer used — all withholding contributions are treated uniformly
 
-    # Track contributions and payouts separately for the selected month
-    month_contribs = defaultdict(Decimal)
-    month_payouts = defaultdict(Decimal)
+    # (id, name, monthly target, contributed, paid out, balance, overall target) per bucket
+    if frozen:
+        bucket_rows = [
+            (snap.withholding_category_id, snap.withholding_category.name, snap.monthly_target,
+             snap.actual_contributed, snap.actual_paid_out, snap.balance, snap.target_amount)
+            for snap in month_close_record.withholding_snapshots.select_related("withholding_category")
+        ]
+    else:
+        buckets = WithholdingCategory.objects.select_related("account").order_by("name")
 
-    # Transfers linked to a bucket
-    month_transfers = (
-        Transfer.objects.filter(
-            date__range=(first_day, last_day),
-            withholding_category__isnull=False,
+        # Build target overrides from snapshots for closed months
+        _withholding_snaps = (
+            month_close_record.withholding_snapshots.all()
+            if month_close_record else None
+        )
+        withholding_target_overrides = (
+            {snap.withholding_category_id: snap.monthly_target for snap in _withholding_snaps}
+            if _withholding_snaps and _withholding_snaps.exists()
+            else None
         )
-        .select_related("withholding_category", "from_account", "to_account")
-    )
-
-    for t in month_transfers:
-        bucket = t.withholding_category
-        if not bucket or not bucket.account:
-            continue
-
-        # Money going INTO the bucket's account = contribution
-        if t.to_account_id == bucket.account_id:
-            month_contribs[bucket.id] += t.amount
-        # Money leaving the bucket's account = payout
-        elif t.from_account_id == bucket.account_id:
-            month_payouts[bucket.id] += t.amount
-
-    # Expenses funded from a withholding bucket
-    month_bucket_expenses = (
-        Expense.objects.filter(
-            date__range=(first_day, last_day),
-            withholding_category__isnull=False,
-        ).select_related("withholding_category")
-    )
-
-    for e in month_bucket_expenses:
-        bucket = e.withholding_category
-        if not bucket:
-            continue
-        # Expense from a bucket always reduces it
-        month_payouts[bucket.id] += e.amount
-
-    SAVINGS_BUCKETS = []  # No longer used — all withholding contributions are treated uniformly
 
-    # Build target overrides from snapshots for closed months
-    _withholding_snaps = (
-        month_close_record.withholding_snapshots.all()
-        if month_close_record else None
-    )
-    withholding_target_overrides = (
-        {snap.withholding_category_id: snap.monthly_target for snap in _withholding_snaps}
-        if _withholding_snaps and _withholding_snaps.exists()
-        else None
-    )
+        bucket_rows = []
+        for bucket in buckets:
+            if withholding_target_overrides is not None:
+                # Closed month: only show buckets active at close time; use snapshot target
+                if bucket.id not in withholding_target_overrides:
+                    continue
+                monthly_target = withholding_target_overrides[bucket.id]
+            else:
+                monthly_target = bucket.monthly_target or Decimal("0.00")
+            bucket_rows.append((
+                bucket.id, bucket.name, monthly_target,
+                rollup.bucket_contribution(bucket.id),
+                rollup.bucket_payout(bucket.id),
+                rollup.bucket_balance(bucket.id),  # legacy ledger still used for now for balance
+                bucket.target_amount,               # yearly/overall target
+            ))
 
     withholding_summaries = []
     total_withholding_remaining = Decimal("0.00")
     total_withholding_actual = Decimal("0.00")
 
-    for bucket in buckets:
-        if withholding_target_overrides is not None:
-            # Closed month: only show buckets active at close time; use snapshot target
-            if bucket.id not in withholding_target_overrides:
-                continue
-            monthly_target = withholding_target_overrides[bucket.id]
-        else:
-            monthly_target = bucket.monthly_target or Decimal("0.00")
-
+    for bucket_id, bucket_name, monthly_target, contrib, payout, balance, overall_target in bucket_rows:
         # Only show buckets with a monthly target > 0
         if monthly_target <= 0:
             continue
 
-        contrib = month_contribs.get(bucket.id, Decimal("0.00"))
-        payout = month_payouts.get(bucket.id, Decimal("0.00"))
         net = contrib - payout
-
-        balance = bucket.balance                # legacy ledger still used for now for balance
-        overall_target = bucket.target_amount   # yearly/overall target
-        remaining = bucket.remaining_to_target()
+        remaining = overall_target - balance        # same as bucket.remaining_to_target()
 
         # Track realized contributions (money already set aside this month)
         total_withholding_actual += contrib
@@ -966,8 +820,8 @@ def category_progress(request):
 
         withholding_summaries.append(
             {
-                "id": bucket.id,
-                "name": bucket.name,
+                "id": bucket_id,
+                "name": bucket_name,
                 "balance": balance,
                 "overall_target": overall_target,
                 "remaining": remaining,
@@ -1116,6 +970,10 @@ def category_expense_list(request, category_name):
 
     month_starts_chrono = list(reversed(month_starts))
 
+    totals_by_month = monthly_totals(
+        RollupDimension.EXPENSE_CATEGORY, [category.id], first_day, last_day
+    )
+
     for m in month_starts_chrono:
         start = date(m.year, m.month, 1)
         end = date(m.year, m.month, monthrange(m.year, m.month)[1])
@@ -1127,7 +985,7 @@ def category_expense_list(request, category_name):
             .order_by("-date", "-id")
         )
 
-        total = expenses_qs.aggregate(total=Sum("amount"))["total"] or Decimal("0.00")
+        total = totals_by_month.get(m, Decimal("0.00"))
         percent = (total / monthly_limit * 100) if has_limit else 0
 
         month_rows.append({
@@ -1206,6 +1064,7 @@ def category_expense_list(request, category_name):
 
             return redirect("category_expense_list", category_name=category.name)
 
+    refdata = get_reference_data()
     context = {
         "category": category,
         "selected_range": selected_range,
@@ -1217,10 +1076,10 @@ def category_expense_list(request, category_name):
         "trend_values": trend_values,
         "range_total": range_total,
         # Modal dropdowns
-        "all_categories": Category.objects.filter(is_archived=False).order_by("name"),
-        "accounts": BankAccount.objects.all().order_by("institution", "name"),
-        "all_rental_units": RentalUnit.objects.select_related("property").order_by("property__name", "name"),
-        "cra_categories": CRARentalExpenseCategory.objects.filter(is_active=True).order_by("sort_order", "name"),
+        "all_categories": refdata.active_categories,
+        "accounts": refdata.bank_accounts,
+        "all_rental_units": refdata.rental_units,
+        "cra_categories": refdata.cra_categories,
     }
     return render(request, "category_expense_list.html", context)
 
@@ -1326,6 +1185,10 @@ def income_category_income_list(request, pk):
 
     month_starts_chrono = list(reversed(month_starts))
 
+    totals_by_month = monthly_totals(
+        RollupDimension.INCOME_CATEGORY, [inc_cat.id], first_day, last_day
+    )
+
     for m in month_starts_chrono:
         start = date(m.year, m.month, 1)
         end = date(m.year, m.month, monthrange(m.year, m.month)[1])
@@ -1337,7 +1200,7 @@ def income_category_income_list(request, pk):
             .order_by("-date", "-id")
         )
 
-        total = incomes_qs.aggregate(total=Sum("amount"))["total"] or Decimal("0.00")
+        total = totals_by_month.get(m, Decimal("0.00"))
         percent = (total / target * 100) if target > 0 else 0
 
         month_rows.append({
@@ -1598,6 +1461,17 @@ def rental_property_detail(request, property_id):
     trend_expenses = []
     trend_net = []
 
+    unit_ids = list(prop.units.values_list("id", flat=True))
+    income_by_month = {}
+    expense_by_month = {}
+    if month_starts_chrono:
+        income_by_month = monthly_totals(
+            RollupDimension.RENTAL_UNIT_INCOME, unit_ids, month_starts_chrono[0], month_starts_chrono[-1]
+        )
+        expense_by_month = monthly_totals(
+            RollupDimension.RENTAL_UNIT_EXPENSE, unit_ids, month_starts_chrono[0], month_starts_chrono[-1]
+        )
+
     for m_start in month_starts_chrono:
         start = date(m_start.year, m_start.month, 1)
         end = date(m_start.year, m_start.month, monthrange(m_start.year, m_start.month)[1])
@@ -1613,8 +1487,8 @@ def rental_property_detail(request, property_id):
             .order_by("-date", "-id")
         )
 
-        income_total = incomes_qs.aggregate(total=Sum("amount"))["total"] or Decimal("0.00")
-        expense_total = expenses_qs.aggregate(total=Sum("amount"))["total"] or Decimal("0.00")
+        income_total = income_by_month.get(m_start, Decimal("0.00"))
+        expense_total = expense_by_month.get(m_start, Decimal("0.00"))
         net_total = income_total - expense_total
 
         month_rows.append({
@@ -2558,7 +2432,12 @@ def rental_tax_category_detail(request, property_id, cra_category_id):
                 return redirect(f"{reverse('rental_tax_category_detail', args=[property_id, cra_category_id])}?year={year}")
 
             # Otherwise, update
-            exp_obj.date = request.POST.get("date") or exp_obj.date
+            date_str = request.POST.get("date")
+            if date_str:
+                try:
+                    exp_obj.date = datetime.strptime(date_str, "%Y-%m-%d").date()
+                except ValueError:
+                    pass
             exp_obj.vendor_name = request.POST.get("vendor_name") or ""
             exp_obj.location = request.POST.get("location") or ""
             exp_obj.notes = request.POST.get("notes") or ""
@@ -2771,6 +2650,57 @@ def category_list(request):
         "withholding_accounts": withholding_accounts,
     })
 
+class VendorRuleForm(ModelForm):
+    class Meta:
+        model = VendorRule
+        fields = ["keyword", "category", "priority", "is_active"]
+
+
+def vendor_rules(request):
+    """
+    Manage the keyword -> category rules applied to imported expenses.
+    Includes a tester that runs a sample description through the compiled matcher.
+    """
+    if request.method == "POST":
+        action = request.POST.get("action")
+
+        if action == "rule_delete":
+            rule = get_object_or_404(VendorRule, pk=request.POST.get("id"))
+            rule.delete()
+            return redirect("vendor_rules")
+
+        if action == "rule_save":
+            rule_id = request.POST.get("id") or ""
+            instance = get_object_or_404(VendorRule, pk=rule_id) if rule_id else None
+            form = VendorRuleForm(request.POST, instance=instance)
+
+            if form.is_valid():
+                try:
+                    form.save()
+                    return redirect("vendor_rules")
+                except IntegrityError:
+                    messages.error(request, "A rule for that keyword already exists.")
+            else:
+                messages.error(request, "Please correct the errors in the vendor rule form.")
+
+    rules = VendorRule.objects.select_related("category").all()
+    categories = Category.objects.filter(is_archived=False).order_by("name")
+
+    test_description = request.GET.get("test", "").strip()
+    test_category = None
+    if test_description:
+        category_id = get_vendor_matcher().match(test_description)
+        if category_id is not None:
+            test_category = Category.objects.filter(pk=category_id).first()
+
+    return render(request, "vendor_rules.html", {
+        "rules": rules,
+        "categories": categories,
+        "rule_form": VendorRuleForm(),
+        "test_description": test_description,
+        "test_category": test_category,
+    })
+
 class BankAccountForm(ModelForm):
     class Meta:
         model = BankAccount
@@ -2810,16 +2740,8 @@ def bank_accounts(request):
 
     return render(request, "bank_accounts.html", {"accounts": accounts, "form": form})
 
-def bank_account_detail(request, account_id):
-    """
-    Per-account ledger view.
-
-    Shows transactions for this account with running balance.
-    Defaults to last 12 months, grouped by month.
-    """
-    account = get_object_or_404(BankAccount, pk=account_id)
-
-    # --- Date range selection ---
+def _ledger_date_range(request):
+    """(first_day, last_day) from ?start_date/&end_date, defaulting to the last 12 months."""
     today = date.today()
 
     # Default to last 12 months
@@ -2832,277 +2754,144 @@ def bank_account_detail(request, account_id):
 
     if start_date_str and end_date_str:
         try:
-            first_day = datetime.strptime(start_date_str, "%Y-%m-%d").date()
-            last_day = datetime.strptime(end_date_str, "%Y-%m-%d").date()
+            return (
+                datetime.strptime(start_date_str, "%Y-%m-%d").date(),
+                datetime.strptime(end_date_str, "%Y-%m-%d").date(),
+            )
         except ValueError:
-            first_day = default_start
-            last_day = default_end
-    else:
-        first_day = default_start
-        last_day = default_end
-
-    date_range_display = f"{first_day.strftime('%b %Y')} - {last_day.strftime('%b %Y')}"
-
-    # --- Pull all transactions for this account in date range ---
-    income_qs = (
-        account.incomes.filter(date__range=(first_day, last_day))
-        .select_related("income_category", "rental_unit")
-        .order_by("date", "id")
-    )
-
-    expense_qs = (
-        account.expenses.filter(date__range=(first_day, last_day))
-        .select_related("category", "rental_unit")
-        .order_by("date", "id")
-    )
+            pass
+    return default_start, default_end
 
-    incoming_transfers = (
-        account.incoming_transfers.filter(date__range=(first_day, last_day))
-        .select_related("from_account", "to_account", "withholding_category")
-        .order_by("date", "id")
-    )
 
-    outgoing_transfers = (
-        account.outgoing_transfers.filter(date__range=(first_day, last_day))
-        .select_related("from_account", "to_account", "withholding_category")
-        .order_by("date", "id")
-    )
+def _ledger_starting_balance(account, first_day):
+    """Balance going into the ledger range."""
+    if not (account.balance_tracking_enabled and account.balance_tracking_start_date):
+        return account.current_balance
 
-    # Balance adjustments
-    balance_adjustments = (
-        account.balance_adjustments.filter(date__range=(first_day, last_day))
-        .order_by("date", "id")
+    # The balance ledger gives the balance going into the range in one lookup
+    # (the day before tracking starts is the opening balance)
+    ledger_opening = balance_as_of(
+        account.pk,
+        max(first_day, account.balance_tracking_start_date) - timedelta(days=1),
     )
+    if ledger_opening is not None:
+        return ledger_opening
 
-    # --- Normalize to a single list of ledger entries ---
-    entries = []
-
-    # Incomes (inflows)
-    for inc in income_qs:
-        desc = ""
-        if inc.income_category:
-            desc = inc.income_category.name
-        elif inc.category:
-            desc = inc.category
-        else:
-            desc = "Income"
-
-        if inc.rental_unit:
-            desc = f"{desc} – {inc.rental_unit.property.name} / {inc.rental_unit.name}"
-
-        entries.append(
-            {
-                "date": inc.date,
-                "kind": "income",
-                "is_inflow": True,
-                "raw_amount": inc.amount,
-                "signed_amount": inc.amount,  # inflow = +amount
-                "description": desc,
-                "notes": inc.notes,
-                "income_id": inc.id,
-                "expense_id": None,
-                "transfer_id": None,
-                "adjustment_id": None,
-            }
-        )
-
-    # Expenses (outflows)
-    for exp in expense_qs:
-        desc = exp.vendor_name or ""
-        if exp.category:
-            if desc:
-                desc = f"{desc} – {exp.category.name}"
-            else:
-                desc = exp.category.name
-
-        if exp.rental_unit:
-            tail = f"{exp.rental_unit.property.name} / {exp.rental_unit.name}"
-            desc = f"{desc} ({tail})" if desc else tail
-
-        entries.append(
-            {
-                "date": exp.date,
-                "kind": "expense",
-                "is_inflow": False,
-                "raw_amount": exp.amount,
-                "signed_amount": -exp.amount,  # outflow = -amount
-                "description": desc or "Expense",
-                "notes": exp.notes,
-                "income_id": None,
-                "expense_id": exp.id,
-                "transfer_id": None,
-                "adjustment_id": None,
-            }
-        )
+    # No ledger yet: use the snapshot for the month before tracking started as the baseline
+    from home.models import MonthEndClose, AccountSnapshot
+    prev_month = account.balance_tracking_start_date.replace(day=1) - timedelta(days=1)
+    prev_month_first = prev_month.replace(day=1)
 
-    # Transfers where this account is the *destination* (inflows)
-    for tr in incoming_transfers:
-        # If someone ever recorded from_account == to_account == this account, skip (no net effect)
-        if tr.from_account_id == account.id and tr.to_account_id == account.id:
-            continue
-
-        counterparty = tr.from_account or None
-        base_desc = tr.description or "Transfer in"
-
-        if counterparty:
-            desc = f"{base_desc} (from {counterparty})"
-        else:
-            desc = f"{base_desc} (from external)"
+    try:
+        month_close = MonthEndClose.objects.get(month=prev_month_first, is_locked=True)
+        snapshot = AccountSnapshot.objects.get(month_close=month_close, bank_account=account)
+        return snapshot.balance
+    except (MonthEndClose.DoesNotExist, AccountSnapshot.DoesNotExist):
+        # Fallback if no snapshot found
+        return account.current_balance
 
-        if tr.withholding_category:
-            desc = f"{desc} [Bucket: {tr.withholding_category.name}]"
 
-        entries.append(
-            {
-                "date": tr.date,
-                "kind": "transfer",
-                "is_inflow": True,
-                "raw_amount": tr.amount,
-                "signed_amount": tr.amount,  # inflow = +amount
-                "description": desc,
-                "notes": tr.notes,
-                "income_id": None,
-                "expense_id": None,
-                "transfer_id": tr.id,
-                "adjustment_id": None,
-            }
-        )
+def _ledger_summary(account, first_day, last_day):
+    """
+    Month subtotals (one grouped query) plus the balance going into the range
+    and how much the range moves it.
 
-    # Transfers where this account is the *source* (outflows)
-    for tr in outgoing_transfers:
-        # If someone ever recorded from_account == to_account == this account, skip (no net effect)
-        if tr.from_account_id == account.id and tr.to_account_id == account.id:
-            continue
+    Returns:
+        (months, starting_balance, balance_change)
+    """
+    tracking_start = None
+    if account.balance_tracking_enabled and account.balance_tracking_start_date:
+        tracking_start = account.balance_tracking_start_date
 
-        counterparty = tr.to_account or None
-        base_desc = tr.description or "Transfer out"
+    months = ledger_month_totals(account, first_day, last_day, tracked_since=tracking_start)
+
+    # Only transactions on/after the tracking start date move the balance
+    key = "tracked_net" if tracking_start else "net"
+    balance_change = sum((m[key] for m in months), Decimal("0.00"))
+    return months, _ledger_starting_balance(account, first_day), balance_change
+
+
+def _ledger_entry_json(entry):
+    return {
+        "date": entry["date"].isoformat(),
+        "month_key": entry["date"].strftime("%Y-%m"),
+        "kind": entry["kind"],
+        "is_inflow": entry["is_inflow"],
+        "signed_amount": str(entry["signed_amount"]),
+        "description": entry["description"],
+        "notes": entry["notes"],
+        "balance": None if entry["balance"] is None else str(entry["balance"]),
+        "edit_url": entry["edit_url"],
+    }
 
-        if counterparty:
-            desc = f"{base_desc} (to {counterparty})"
-        else:
-            desc = f"{base_desc} (to external)"
 
-        if tr.withholding_category:
-            desc = f"{desc} [Bucket: {tr.withholding_category.name}]"
+def bank_account_detail(request, account_id):
+    """
+    Per-account ledger view.
 
-        entries.append(
-            {
-                "date": tr.date,
-                "kind": "transfer",
-                "is_inflow": False,
-                "raw_amount": tr.amount,
-                "signed_amount": -tr.amount,  # outflow = -amount
-                "description": desc,
-                "notes": tr.notes,
-                "income_id": None,
-                "expense_id": None,
-                "transfer_id": tr.id,
-                "adjustment_id": None,
-            }
-        )
+    Shows transactions for this account with running balance, newest first.
+    Defaults to last 12 months, grouped by month. Only the first page of rows
+    is rendered here; the page fetches the rest from bank_account_ledger as
+    the user scrolls (see home/account_ledger.py).
+    """
+    account = get_object_or_404(BankAccount, pk=account_id)
 
-    # Balance adjustments
-    for adj in balance_adjustments:
-        entries.append(
-            {
-                "date": adj.date,
-                "kind": "adjustment",
-                "is_inflow": adj.amount >= 0,
-                "raw_amount": abs(adj.amount),
-                "signed_amount": adj.amount,
-                "description": f"Balance Adjustment: {adj.reason}",
-                "notes": adj.notes,
-                "income_id": None,
-                "expense_id": None,
-                "transfer_id": None,
-                "adjustment_id": adj.id,
-            }
-        )
+    # --- Date range selection ---
+    first_day, last_day = _ledger_date_range(request)
+    date_range_display = f"{first_day.strftime('%b %Y')} - {last_day.strftime('%b %Y')}"
 
-    # Sort chronologically (oldest first for balance calculation)
-    def sort_key(e):
-        kind_order = {"income": 0, "transfer": 1, "expense": 2, "adjustment": 3}
-        return (e["date"], kind_order.get(e["kind"], 99))
+    # --- Month subtotals, overall summaries and balances ---
+    months, starting_balance, balance_change = _ledger_summary(account, first_day, last_day)
 
-    entries.sort(key=sort_key)  # Oldest first for running balance
+    total_inflow = sum((m["inflow"] for m in months), Decimal("0.00"))
+    total_outflow = sum((m["outflow"] for m in months), Decimal("0.00"))
+    net_change = sum((m["net"] for m in months), Decimal("0.00"))
 
-    # --- Calculate running balance ---
-    # For balance tracking: use February 2026 snapshot as the baseline
-    if account.balance_tracking_enabled and account.balance_tracking_start_date:
-        # Get the February 2026 snapshot (the baseline for balance tracking)
-        from home.models import MonthEndClose, AccountSnapshot
-        tracking_start = account.balance_tracking_start_date
-        prev_month = tracking_start.replace(day=1) - timedelta(days=1)
-        prev_month_first = prev_month.replace(day=1)
+    # Ending balance is the balance after the last transaction in the period
+    ending_balance = starting_balance + balance_change if months else account.current_balance
 
-        try:
-            month_close = MonthEndClose.objects.get(month=prev_month_first, is_locked=True)
-            snapshot = AccountSnapshot.objects.get(month_close=month_close, bank_account=account)
-            baseline_balance = snapshot.balance
-        except (MonthEndClose.DoesNotExist, AccountSnapshot.DoesNotExist):
-            # Fallback if no snapshot found
-            baseline_balance = account.current_balance
-
-        # The baseline is the balance BEFORE the tracking start date
-        # So we use it as the starting point for all balance calculations
-        starting_balance = baseline_balance
-    else:
-        starting_balance = account.current_balance
-
-    # Calculate running balance for each entry (only for tracked period)
-    running_balance = starting_balance
-    for entry in entries:
-        if account.balance_tracking_enabled and account.balance_tracking_start_date:
-            if entry["date"] >= account.balance_tracking_start_date:
-                running_balance += entry["signed_amount"]
-                entry["balance"] = running_balance
-            else:
-                entry["balance"] = None  # No balance for pre-tracking transactions
-        else:
-            running_balance += entry["signed_amount"]
-            entry["balance"] = running_balance
+    # --- First page of entries, grouped by month for display ---
+    page = ledger_page(account, first_day, last_day, closing_balance=starting_balance + balance_change)
 
-    # Group entries by month for display (still in chronological order)
-    from itertools import groupby
+    month_totals = {m["month"].strftime("%Y-%m"): m for m in months}
     entries_by_month = []
-    for month_key, month_entries in groupby(entries, key=lambda e: e["date"].strftime("%Y-%m")):
-        month_entries_list = list(month_entries)
-        month_date = datetime.strptime(month_key, "%Y-%m").date()
-        entries_by_month.append({
-            "month": month_date.strftime("%B %Y"),
-            "month_key": month_key,
-            "entries": month_entries_list,
-            "month_inflow": sum(e["raw_amount"] for e in month_entries_list if e["is_inflow"]),
-            "month_outflow": sum(e["raw_amount"] for e in month_entries_list if not e["is_inflow"]),
-            "month_net": sum(e["signed_amount"] for e in month_entries_list),
-        })
-
-    # Now reverse everything to show most recent month first (with most recent transactions first within each month)
-    entries_by_month.reverse()
-    for month_group in entries_by_month:
-        month_group["entries"].reverse()
-
-    # --- Overall summaries ---
-    total_inflow = sum(e["raw_amount"] for e in entries if e["is_inflow"])
-    total_outflow = sum(e["raw_amount"] for e in entries if not e["is_inflow"])
-    net_change = sum(e["signed_amount"] for e in entries)
-
-    # Ensure Decimals for template math/formatting
-    total_inflow = total_inflow or Decimal("0.00")
-    total_outflow = total_outflow or Decimal("0.00")
-    net_change = net_change or Decimal("0.00")
-
-    # Ending balance is the balance after the last tracked transaction in the period
-    # Find the last entry with a balance (in reverse order since entries are now most recent first)
-    ending_balance = account.current_balance
-    for entry in entries:
-        if entry.get("balance") is not None:
-            ending_balance = entry["balance"]
-            break  # Found the most recent entry with a balance
+    for entry in page["entries"]:
+        month_key = entry["date"].strftime("%Y-%m")
+        if not entries_by_month or entries_by_month[-1]["month_key"] != month_key:
+            totals = month_totals[month_key]
+            entries_by_month.append({
+                "month": totals["month"].strftime("%B %Y"),
+                "month_key": month_key,
+                "entries": [],
+                "month_inflow": totals["inflow"],
+                "month_outflow": totals["outflow"],
+                "month_net": totals["net"],
+            })
+        entries_by_month[-1]["entries"].append(entry)
+
+    # For the infinite-scroll script: month headers for later pages and where to continue
+    ledger_data = {
+        "url": f"{reverse('bank_account_ledger', args=[account.pk])}?start_date={first_day:%Y-%m-%d}&end_date={last_day:%Y-%m-%d}",
+        "next_cursor": page["next_cursor"],
+        "tracking_start": (
+            account.balance_tracking_start_date.isoformat()
+            if account.balance_tracking_enabled and account.balance_tracking_start_date else None
+        ),
+        "months": {
+            key: {
+                "label": m["month"].strftime("%B %Y"),
+                "inflow": str(m["inflow"]),
+                "outflow": str(m["outflow"]),
+                "net": str(m["net"]),
+            }
+            for key, m in month_totals.items()
+        },
+    }
 
     context = {
         "account": account,
         "entries_by_month": entries_by_month,
+        "ledger_data": ledger_data,
         "start_date": first_day,
         "end_date": last_day,
         "date_range_display": date_range_display,
@@ -3116,6 +2905,35 @@ def bank_account_detail(request, account_id):
     return render(request, "bank_account_detail.html", context)
 
 
+@require_http_methods(["GET"])
+def bank_account_ledger(request, account_id):
+    """
+    JSON: the next page of an account's ledger, for infinite scroll.
+
+    ?cursor= is the "next_cursor" from the previous page (it carries the
+    running balance, so no totals are recomputed here); without one this is
+    the first page.
+    """
+    account = get_object_or_404(BankAccount, pk=account_id)
+    first_day, last_day = _ledger_date_range(request)
+
+    cursor = request.GET.get("cursor")
+    closing_balance = None
+    if not cursor:
+        _, starting_balance, balance_change = _ledger_summary(account, first_day, last_day)
+        closing_balance = starting_balance + balance_change
+
+    try:
+        page = ledger_page(account, first_day, last_day, closing_balance, cursor=cursor)
+    except InvalidCursor:
+        return HttpResponseBadRequest("Invalid cursor.")
+
+    return JsonResponse({
+        "entries": [_ledger_entry_json(entry) for entry in page["entries"]],
+        "next_cursor": page["next_cursor"],
+    })
+
+
 @require_POST
 def create_balance_adjustment(request, account_id):
     """
@@ -3176,6 +2994,7 @@ def create_balance_adjustment(request, account_id):
 
 
 @require_http_methods(["GET", "POST"])
+@balance_batch()
 def unassigned_transactions(request):
     """
     Helper page (not linked in main UI) to clean up:
@@ -3770,6 +3589,7 @@ def import_transactions(request):
             "step": "upload",
             "upload_form": upload_form,
             "recent_batches": recent_batches,
+            "pending_jobs": pending_import_jobs(),
         })
 
     step = request.POST.get("step", "upload")
@@ -3783,195 +3603,24 @@ def import_transactions(request):
                 "step": "upload",
                 "upload_form": upload_form,
                 "recent_batches": recent_batches,
+                "pending_jobs": pending_import_jobs(),
             })
 
         csv_file = upload_form.cleaned_data["csv_file"]
-        bank_account = upload_form.cleaned_data["bank_account"]
-        uploaded_filename = csv_file.name
-
-        try:
-            decoded = io.TextIOWrapper(csv_file.file, encoding="utf-8")
-        except Exception:
-            decoded = io.TextIOWrapper(csv_file.file, encoding="latin-1")
-
-        reader = csv.reader(decoded)
-
-        initial_rows = []
-        category_cache = {}
-        missing_categories = set()
-        hydro_candidates = []
-        earliest_date_in_file = None
-        latest_date_in_file = None
-
-        income_cat_cache = {c.name: c for c in IncomeCategory.objects.all()}
-        arnprior_shared_unit_id = get_arnprior_shared_unit_id()
-        foxview_shared_unit_id = get_foxview_shared_unit_id()
-
-        for row in reader:
-            if not row or all(not cell.strip() for cell in row):
-                continue
-
-            raw_date = row[0].strip() if len(row) > 0 else ""
-            raw_desc = row[1].strip() if len(row) > 1 else ""
-            raw_withdrawal = row[2].strip() if len(row) > 2 else ""
-            raw_deposit = row[3].strip() if len(row) > 3 else ""
-
-            desc_upper = (raw_desc or "").upper()
-
-            if "TFR-TO C/C" in desc_upper:
-                continue
-
-            if not raw_desc and not raw_withdrawal and not raw_deposit:
-                continue
-
-            parsed_date = None
-            for fmt in ("%Y-%m-%d", "%m/%d/%Y"):
-                try:
-                    parsed_date = datetime.strptime(raw_date, fmt).date()
-                    break
-                except Exception:
-                    continue
-
-            if parsed_date is None:
-                continue
-
-            if earliest_date_in_file is None or parsed_date < earliest_date_in_file:
-                earliest_date_in_file = parsed_date
-            if latest_date_in_file is None or parsed_date > latest_date_in_file:
-                latest_date_in_file = parsed_date
-
-            amount_str = None
-            entry_type_default = "expense"
-
-            if raw_withdrawal and not raw_deposit:
-                amount_str = raw_withdrawal
-                entry_type_default = "expense"
-            elif raw_deposit and not raw_withdrawal:
-                amount_str = raw_deposit
-                entry_type_default = "income"
-            elif raw_withdrawal and raw_deposit:
-                amount_str = raw_withdrawal
-                entry_type_default = "expense"
-            else:
-                continue
-
-            amount_str = amount_str.replace(",", "")
-            try:
-                amount = Decimal(amount_str)
-            except Exception:
-                continue
-
-            amount = abs(amount)
 
-            entry_type, income_source_name = apply_income_rules(desc_upper, amount, entry_type_default, parsed_date=parsed_date)
-
-
-            income_source_obj = None
-            if entry_type == "income" and income_source_name:
-                income_source_obj = income_cat_cache.get(income_source_name)
-                if income_source_obj is None:
-                    income_source_obj, _ = IncomeCategory.objects.get_or_create(name=income_source_name)
-                    income_cat_cache[income_source_name] = income_source_obj
-
-            expense_category = None
-            if entry_type == "expense":
-                expense_category = apply_expense_rules(desc_upper, amount, category_cache, missing_categories)
-
-            if "HYDRO ONE" in desc_upper and entry_type == "expense":
-                hydro_candidates.append((len(initial_rows), amount))
-
-            expense_rental_unit_id = None
-            if entry_type == "expense" and expense_category:
-                category_upper = (expense_category.name or "").upper()
-
-                if "ARNPRIOR" in category_upper:
-                    if arnprior_shared_unit_id:
-                        expense_rental_unit_id = arnprior_shared_unit_id
-
-                elif "FOXVIEW" in category_upper:
-                    if foxview_shared_unit_id:
-                        expense_rental_unit_id = foxview_shared_unit_id
-
-            initial_rows.append({
-                "entry_type": entry_type,
-                "date": parsed_date,
-                "vendor_name": raw_desc or "Unknown Vendor",
-                "amount": amount,
-                "location": "Ottawa",
-                "notes": "",
-                "expense_category": expense_category,
-                "income_source": income_source_obj,
-                "income_rental_unit": (
-                    income_source_obj.default_rental_unit_id if income_source_obj and income_source_obj.default_rental_unit_id else None),
-                "apply_to_withholding": False,
-                "is_withholding_payout": False,
-                "withholding_category": None,
-                "expense_rental_unit": expense_rental_unit_id,
-            })
-
-        if bank_account and earliest_date_in_file and latest_date_in_file:
-            overlapping = ImportBatch.objects.filter(
-                bank_account=bank_account,
-                earliest_date__lte=latest_date_in_file,
-                latest_date__gte=earliest_date_in_file,
-            )
-            if overlapping.exists():
-                ranges = "; ".join(f"{b.earliest_date} to {b.latest_date}" for b in overlapping)
-                messages.warning(
-                    request,
-                    f"This CSV covers {earliest_date_in_file} to {latest_date_in_file}, "
-                    f"which overlaps with existing imports for this account: {ranges}. "
-                    f"Duplicates will be skipped where detected."
-                )
-
-        if hydro_candidates:
-            if len(hydro_candidates) == 1:
-                idx, amt = hydro_candidates[0]
-                cat_name = "Foxview Hydro" if amt > Decimal("200.00") else "Arnprior Hydro"
-                cat = get_category_cached(cat_name, category_cache, missing_categories)
-                if cat:
-                    initial_rows[idx]["expense_category"] = cat
-            else:
-                sorted_by_amount = sorted(hydro_candidates, key=lambda x: x[1])
-                for idx, amt in sorted_by_amount:
-                    if len(sorted_by_amount) == 2:
-                        cat_name = "Arnprior Hydro" if (idx, amt) == sorted_by_amount[0] else "Foxview Hydro"
-                    else:
-                        cat_name = "Foxview Hydro" if amt > Decimal("200.00") else "Arnprior Hydro"
-                    cat = get_category_cached(cat_name, category_cache, missing_categories)
-                    if cat:
-                        initial_rows[idx]["expense_category"] = cat
-
-        if not initial_rows:
-            messages.warning(request, "No valid transactions were found in the CSV (check the file format).")
-            upload_form = CSVUploadForm()
-            return render(request, "import_transactions.html", {
-                "step": "upload",
-                "upload_form": upload_form,
-                "recent_batches": ImportBatch.objects.select_related("bank_account").all()[:10],
-            })
-
-        if missing_categories:
-            missing_list = ", ".join(sorted(missing_categories))
-            messages.warning(
-                request,
-                f"The following auto-mapped categories were not found in your database and were skipped: {missing_list}."
-            )
+        # Parsing happens in the background (home/jobs.py); the job page polls for progress
+        job = ImportJob.objects.create(
+            bank_account=upload_form.cleaned_data["bank_account"],
+            upload=csv_file,
+            filename=csv_file.name,
+            statement_format=upload_form.cleaned_data.get("statement_format") or "",
+            created_by=request.user if request.user.is_authenticated else None,
+        )
+        enqueue_import_job(job)
 
-        formset = TransactionImportFormSet(initial=initial_rows)
-        income_rental_unit_map = build_income_rental_unit_map()
-
-        return render(request, "import_transactions.html", {
-            "step": "review",
-            "formset": formset,
-            "selected_bank_account": bank_account,
-            "uploaded_filename": uploaded_filename,
-            "income_rental_unit_map": income_rental_unit_map,
-        })
+        return redirect("import_job_detail", job_id=job.pk)
 
     if step == "review":
-        formset = TransactionImportFormSet(request.POST)
-
         bank_account = None
         bank_account_id = request.POST.get("bank_account_id")
         if bank_account_id:
@@ -3981,18 +3630,28 @@ def import_transactions(request):
                 bank_account = None
 
         uploaded_filename = request.POST.get("uploaded_filename", "")
+        import_job = ImportJob.objects.filter(pk=request.POST.get("import_job_id") or None).first()
 
-        if not formset.is_valid():
-            messages.error(request, "There were errors in the form. Please correct them.")
-            income_rental_unit_map = build_income_rental_unit_map()
+        # The review grid posts every row as one JSON document (see import_review.py)
+        try:
+            submitted_rows = parse_review_payload(request.POST.get("rows_json"))
+        except ReviewPayloadError as e:
+            messages.error(request, str(e))
+            if import_job:
+                return redirect("import_job_detail", job_id=import_job.pk)
+            return redirect("import_transactions")
 
+        cleaned_rows, row_errors = validate_review_rows(submitted_rows)
+
+        if row_errors:
+            messages.error(request, "There were errors in the form. Please correct them.")
 
             return render(request, "import_transactions.html", {
                 "step": "review",
-                "formset": formset,
+                "review_data": review_payload(submitted_rows, row_errors),
                 "selected_bank_account": bank_account,
                 "uploaded_filename": uploaded_filename,
-                "income_rental_unit_map": income_rental_unit_map,  # ✅ add this
+                "import_job": import_job,
             })
 
         created_expenses = 0
@@ -4015,13 +3674,47 @@ def import_transactions(request):
         seen_income_keys = set()
         seen_transfer_keys = set()
 
-        for form in formset:
-            cd = form.cleaned_data
-            if not cd:
-                continue
+        rows = []
+        for cd in cleaned_rows:
             if cd.get("skip"):
                 continue
+            if not (cd.get("date") and cd.get("amount")):
+                continue
+            rows.append(cd)
+
+            date_val = cd["date"]
+            if earliest_date is None or date_val < earliest_date:
+                earliest_date = date_val
+            if latest_date is None or date_val > latest_date:
+                latest_date = date_val
 
+        # Prefetch everything that could be a duplicate in one range query per
+        # model, instead of an .exists() probe per row.
+        existing_expense_keys = set()
+        existing_income_keys = set()
+        existing_transfer_keys = set()
+        existing_transfer_from_keys = set()
+        existing_transfer_to_keys = set()
+
+        if rows:
+            window = (earliest_date, latest_date)
+            existing_expense_keys = set(
+                Expense.objects.filter(date__range=window)
+                .values_list("date", "vendor_name", "amount", "category_id")
+            )
+            existing_income_keys = set(
+                Income.objects.filter(date__range=window)
+                .values_list("date", "amount", "income_category_id")
+            )
+            for t_date, t_amount, t_from, t_to in (
+                Transfer.objects.filter(date__range=window)
+                .values_list("date", "amount", "from_account_id", "to_account_id")
+            ):
+                existing_transfer_keys.add((t_date, t_amount, t_from, t_to))
+                existing_transfer_from_keys.add((t_date, t_amount, t_from))
+                existing_transfer_to_keys.add((t_date, t_amount, t_to))
+
+        for cd in rows:
             entry_type = cd.get("entry_type")
             date_val = cd.get("date")
             vendor_name = cd.get("vendor_name")
@@ -4036,14 +3729,6 @@ def import_transactions(request):
             is_withholding_payout = cd.get("is_withholding_payout")
             withholding_category = cd.get("withholding_category")
 
-            if not (date_val and amount):
-                continue
-
-            if earliest_date is None or date_val < earliest_date:
-                earliest_date = date_val
-            if latest_date is None or date_val > latest_date:
-                latest_date = date_val
-
             if entry_type == "expense":
                 if is_withholding_payout and withholding_category:
                     payout_amount = -amount if amount > 0 else amount
@@ -4062,12 +3747,7 @@ def import_transactions(request):
 
                 exp_key = (date_val, vendor_name, amount, expense_category.id)
 
-                if exp_key in seen_expense_keys or Expense.objects.filter(
-                    date=date_val,
-                    vendor_name=vendor_name,
-                    amount=amount,
-                    category=expense_category,
-                ).exists():
+                if exp_key in seen_expense_keys or exp_key in existing_expense_keys:
                     skipped_duplicates += 1
                     continue
 
@@ -4103,11 +3783,7 @@ def import_transactions(request):
 
                 inc_key = (date_val, amount, income_source.id)
 
-                if inc_key in seen_income_keys or Income.objects.filter(
-                    date=date_val,
-                    amount=amount,
-                    income_category=income_source,
-                ).exists():
+                if inc_key in seen_income_keys or inc_key in existing_income_keys:
                     skipped_duplicates += 1
                     continue
 
@@ -4142,30 +3818,26 @@ def import_transactions(request):
                 if not from_account and not to_account:
                     continue
 
+                from_id = from_account.id if from_account else None
+                to_id = to_account.id if to_account else None
+
                 # Create duplicate detection key
-                transfer_key = (
-                    date_val,
-                    from_account.id if from_account else None,
-                    to_account.id if to_account else None,
-                    amount
-                )
+                transfer_key = (date_val, from_id, to_id, amount)
 
                 # Check for duplicates in current batch
                 if transfer_key in seen_transfer_keys:
                     skipped_duplicates += 1
                     continue
 
-                # Check database for existing transfer
-                transfer_exists = Transfer.objects.filter(
-                    date=date_val,
-                    amount=amount,
-                )
-                if from_account:
-                    transfer_exists = transfer_exists.filter(from_account=from_account)
-                if to_account:
-                    transfer_exists = transfer_exists.filter(to_account=to_account)
+                # Check database for existing transfer (only on the accounts given)
+                if from_account and to_account:
+                    transfer_exists = (date_val, amount, from_id, to_id) in existing_transfer_keys
+                elif from_account:
+                    transfer_exists = (date_val, amount, from_id) in existing_transfer_from_keys
+                else:
+                    transfer_exists = (date_val, amount, to_id) in existing_transfer_to_keys
 
-                if transfer_exists.exists():
+                if transfer_exists:
                     skipped_duplicates += 1
                     continue
 
@@ -4186,36 +3858,43 @@ def import_transactions(request):
 
         total_transactions = created_expenses + created_incomes + created_transfers
 
-        if total_transactions > 0 and earliest_date and latest_date:
-            batch = ImportBatch.objects.create(
-                bank_account=bank_account,
-                earliest_date=earliest_date,
-                latest_date=latest_date,
-                total_transactions=total_transactions,
-                total_income_amount=total_income_amount,
-                total_expense_amount=total_expense_amount,
-                filename=uploaded_filename or "",
-            )
-
-            for exp in expense_objs:
-                exp.import_batch = batch
-                exp.save()
-            for inc in income_objs:
-                inc.import_batch = batch
-                inc.save()
-            for transfer in transfer_objs:
-                transfer.import_batch = batch
-                transfer.save()
-        else:
-            for exp in expense_objs:
-                exp.save()
-            for inc in income_objs:
-                inc.save()
-            for transfer in transfer_objs:
-                transfer.save()
+        # bulk_create skips post_save, so account balances and monthly rollups
+        # are updated here in one pass (one UPDATE per account / rollup row).
+        batch = None
+        with balance_batch():
+            if total_transactions > 0 and earliest_date and latest_date:
+                batch = ImportBatch.objects.create(
+                    bank_account=bank_account,
+                    earliest_date=earliest_date,
+                    latest_date=latest_date,
+                    total_transactions=total_transactions,
+                    total_income_amount=total_income_amount,
+                    total_expense_amount=total_expense_amount,
+                    filename=uploaded_filename or "",
+                )
+                for obj in chain(expense_objs, income_objs, transfer_objs):
+                    obj.import_batch = batch
+
+            Expense.objects.bulk_create(expense_objs, batch_size=500)
+            Income.objects.bulk_create(income_objs, batch_size=500)
+            Transfer.objects.bulk_create(transfer_objs, batch_size=500)
+            WithholdingTransaction.objects.bulk_create(withholding_txns, batch_size=500)
+
+            new_transactions = expense_objs + income_objs + transfer_objs
+            apply_bulk_balance_updates(new_transactions)
+            apply_bulk_rollup_updates(new_transactions)
+            bump_month_versions(t.date for t in chain(new_transactions, withholding_txns))
+
+            if import_job is not None:
+                ImportJob.objects.filter(pk=import_job.pk, status=ImportJobStatus.READY).update(
+                    status=ImportJobStatus.IMPORTED,
+                    import_batch=batch,
+                    result={},
+                )
 
-        for wt in withholding_txns:
-            wt.save()
+        if import_job is not None:
+            # The review rows are committed; the uploaded file is no longer needed
+            import_job.upload.delete(save=False)
 
         msg = f"Imported {created_expenses} expense(s), {created_incomes} income, and {created_transfers} transfer transaction(s)."
         if created_withholding_transactions:
@@ -4232,8 +3911,76 @@ def import_transactions(request):
         "step": "upload",
         "upload_form": upload_form,
         "recent_batches": recent_batches,
+        "pending_jobs": pending_import_jobs(),
+    })
+
+def pending_import_jobs():
+    """Uploads still parsing or waiting for review, for the upload page."""
+    return (
+        ImportJob.objects.select_related("bank_account")
+        .exclude(status=ImportJobStatus.IMPORTED)
+        .order_by("-created_at")[:10]
+    )
+
+
+def import_job_detail(request, job_id):
+    """
+    Progress page for a background import; becomes the review step once the
+    job is READY.
+    """
+    job = get_object_or_404(ImportJob.objects.select_related("bank_account"), pk=job_id)
+
+    if job.status == ImportJobStatus.IMPORTED:
+        if job.import_batch_id:
+            return redirect("import_batch_detail", batch_id=job.import_batch_id)
+        messages.info(request, "This file has already been imported.")
+        return redirect("import_transactions")
+
+    if job.status == ImportJobStatus.READY:
+        for level, text in job.result.get("messages", []):
+            messages.add_message(request, level, text)
+
+        return render(request, "import_transactions.html", {
+            "step": "review",
+            "review_data": review_payload(job.result.get("rows", [])),
+            "selected_bank_account": job.bank_account,
+            "uploaded_filename": job.filename,
+            "import_job": job,
+        })
+
+    return render(request, "import_transactions.html", {
+        "step": "processing",
+        "import_job": job,
     })
 
+
+@require_http_methods(["GET"])
+def import_job_status(request, job_id):
+    """JSON progress for the processing page to poll."""
+    job = get_object_or_404(ImportJob, pk=job_id)
+    return JsonResponse({
+        "id": job.pk,
+        "status": job.status,
+        "status_display": job.get_status_display(),
+        "rows_done": job.rows_done,
+        "rows_total": job.rows_total,
+        "percent": job.progress_percent,
+        "finished": job.is_finished,
+        "error": job.error,
+        "url": reverse("import_job_detail", args=[job.pk]),
+    })
+
+
+@require_POST
+def import_job_delete(request, job_id):
+    """Discard an upload that won't be reviewed."""
+    job = get_object_or_404(ImportJob, pk=job_id)
+    if job.status != ImportJobStatus.RUNNING:
+        job.upload.delete(save=False)
+        job.delete()
+    return redirect("import_transactions")
+
+
 @csrf_exempt
 def update_expense(request):
     """
@@ -4252,11 +3999,14 @@ def update_expense(request):
     if "delete" in request.POST:
         expense.delete()
     else:
-        expense.date = request.POST.get("date")
+        try:
+            expense.date = datetime.strptime(request.POST.get("date", ""), "%Y-%m-%d").date()
+            expense.amount = Decimal(request.POST.get("amount", "").replace("$", "").replace(",", "").strip())
+        except (ValueError, InvalidOperation):
+            return HttpResponseBadRequest("Invalid date or amount")
         expense.vendor_name = request.POST.get("vendor_name")
         expense.category = get_object_or_404(Category, id=request.POST.get("category_id"))
         expense.location = request.POST.get("location", "Ottawa")
-        expense.amount = request.POST.get("amount")
         expense.notes = request.POST.get("notes", "")
 
         # ✅ Optional rental fields if caller sends them
@@ -4274,6 +4024,7 @@ def update_expense(request):
     selected_month = request.GET.get("month") or expense.date.strftime("%Y-%m")
     return redirect(f"/?month={selected_month}")
 
+@month_page(all_months=True)
 def withholding_overview(request):
     """
     Overview of withholding accounts and their buckets.
@@ -4408,42 +4159,6 @@ def withholding_overview(request):
         row["withholding_category_id"]: row for row in transfers_all
     }
 
-    # Transfers (this month)
-    transfers_month = (
-        Transfer.objects
-        .filter(
-            withholding_category_id__in=bucket_ids,
-            date__gte=month_start,
-            date__lte=month_end,
-        )
-        .values("withholding_category_id")
-        .annotate(
-            in_total=Sum(
-                Case(
-                    When(
-                        to_account_id=F("withholding_category__account_id"),
-                        then=F("amount"),
-                    ),
-                    default=Value(0),
-                    output_field=DecimalField(max_digits=12, decimal_places=2),
-                )
-            ),
-            out_total=Sum(
-                Case(
-                    When(
-                        from_account_id=F("withholding_category__account_id"),
-                        then=F("amount"),
-                    ),
-                    default=Value(0),
-                    output_field=DecimalField(max_digits=12, decimal_places=2),
-                )
-            ),
-        )
-    )
-    transfers_month_map = {
-        row["withholding_category_id"]: row for row in transfers_month
-    }
-
     # Expenses (all-time)
     expenses_all = (
         Expense.objects
@@ -4460,25 +4175,81 @@ def withholding_overview(request):
         row["withholding_category_id"]: row for row in expenses_all
     }
 
-    # Expenses (this month)
-    expenses_month = (
-        Expense.objects
-        .filter(
-            withholding_category_id__in=bucket_ids,
-            date__gte=month_start,
-            date__lte=month_end,
+    # This month's contributions and payouts per bucket. A locked month with a
+    # full close snapshot has them frozen; otherwise aggregate the month's rows.
+    month_close = MonthEndClose.objects.filter(
+        month=month_start, is_locked=True, has_full_snapshot=True
+    ).first()
+    if month_close:
+        month_activity = {
+            snap.withholding_category_id: (snap.actual_contributed, snap.actual_paid_out)
+            for snap in month_close.withholding_snapshots.all()
+        }
+    else:
+        # Transfers (this month)
+        transfers_month = (
+            Transfer.objects
+            .filter(
+                withholding_category_id__in=bucket_ids,
+                date__gte=month_start,
+                date__lte=month_end,
+            )
+            .values("withholding_category_id")
+            .annotate(
+                in_total=Sum(
+                    Case(
+                        When(
+                            to_account_id=F("withholding_category__account_id"),
+                            then=F("amount"),
+                        ),
+                        default=Value(0),
+                        output_field=DecimalField(max_digits=12, decimal_places=2),
+                    )
+                ),
+                out_total=Sum(
+                    Case(
+                        When(
+                            from_account_id=F("withholding_category__account_id"),
+                            then=F("amount"),
+                        ),
+                        default=Value(0),
+                        output_field=DecimalField(max_digits=12, decimal_places=2),
+                    )
+                ),
+            )
         )
-        .values("withholding_category_id")
-        .annotate(
-            exp_total=Sum(
-                "amount",
-                output_field=DecimalField(max_digits=12, decimal_places=2),
+        transfers_month_map = {
+            row["withholding_category_id"]: row for row in transfers_month
+        }
+
+        # Expenses (this month)
+        expenses_month = (
+            Expense.objects
+            .filter(
+                withholding_category_id__in=bucket_ids,
+                date__gte=month_start,
+                date__lte=month_end,
+            )
+            .values("withholding_category_id")
+            .annotate(
+                exp_total=Sum(
+                    "amount",
+                    output_field=DecimalField(max_digits=12, decimal_places=2),
+                )
             )
         )
-    )
-    expenses_month_map = {
-        row["withholding_category_id"]: row for row in expenses_month
-    }
+        expenses_month_map = {
+            row["withholding_category_id"]: row for row in expenses_month
+        }
+
+        month_activity = {}
+        for bucket_id in bucket_ids:
+            month_tr = transfers_month_map.get(bucket_id, {})
+            month_exp = expenses_month_map.get(bucket_id, {})
+            month_in = month_tr.get("in_total") or Decimal("0.00")
+            month_out = month_tr.get("out_total") or Decimal("0.00")
+            month_exp_total = month_exp.get("exp_total") or Decimal("0.00")
+            month_activity[bucket_id] = (month_in, month_out + month_exp_total)
 
     # Build per-bucket summaries and attach them to bucket objects
     for account in accounts:
@@ -4488,9 +4259,7 @@ def withholding_overview(request):
 
         for bucket in account.withholding_categories.all():
             all_tr = transfers_all_map.get(bucket.id, {})
-            month_tr = transfers_month_map.get(bucket.id, {})
             all_exp = expenses_all_map.get(bucket.id, {})
-            month_exp = expenses_month_map.get(bucket.id, {})
 
             in_total = all_tr.get("in_total") or Decimal("0.00")
             out_total = all_tr.get("out_total") or Decimal("0.00")
@@ -4499,12 +4268,7 @@ def withholding_overview(request):
             # All-time derived balance for this bucket
             balance = in_total - out_total - exp_total
 
-            month_in = month_tr.get("in_total") or Decimal("0.00")
-            month_out = month_tr.get("out_total") or Decimal("0.00")
-            month_exp_total = month_exp.get("exp_total") or Decimal("0.00")
-
-            month_contrib = month_in
-            month_payout = month_out + month_exp_total
+            month_contrib, month_payout = month_activity.get(bucket.id, (Decimal("0.00"), Decimal("0.00")))
             month_net = month_contrib - month_payout
 
             # Remaining to target (if target defined)
@@ -4837,12 +4601,13 @@ def withholding_category_detail(request, pk):
     range_total = sum(ev["signed_amount"] for ev in derived_events)
 
     # Context data for modals
-    all_categories = Category.objects.filter(is_archived=False).order_by("name")
-    accounts = BankAccount.objects.all().order_by("name")
-    all_rental_units = RentalUnit.objects.select_related("property").order_by("property__name", "name")
-    cra_categories = CRARentalExpenseCategory.objects.all().order_by("name")
-    withholding_categories = WithholdingCategory.objects.select_related("account").all().order_by("account__name", "name")
-    income_categories = IncomeCategory.objects.all().order_by("name")
+    refdata = get_reference_data()
+    all_categories = refdata.active_categories
+    accounts = refdata.bank_accounts
+    all_rental_units = refdata.rental_units
+    cra_categories = refdata.cra_categories
+    withholding_categories = refdata.withholding_categories
+    income_categories = refdata.income_categories
 
     context = {
         "category": category,
@@ -5187,7 +4952,7 @@ def get_transfer_api(request, transfer_id):
         return JsonResponse({'error': 'Not found'}, status=404)
 
 
-@transaction.atomic
+@balance_batch()
 def handle_transfer_edit(request, is_ajax=False):
     """Handle transfer editing including splits."""
     transfer_id = request.POST.get('transfer_id')
@@ -5214,7 +4979,7 @@ def handle_transfer_edit(request, is_ajax=False):
     return handle_transfer_update(request, transfer, is_ajax)
 
 
-@transaction.atomic
+@balance_batch()
 def handle_transfer_split(request, transfer, is_ajax=False):
     """Create or update splits for a transfer."""
 
@@ -5354,159 +5119,32 @@ def handle_transfer_update(request, transfer, is_ajax=False):
 # MONTH-END CLOSE WIZARD
 # ============================================
 
-def create_comprehensive_backup(month_str, description="Month-end close"):
-    """
-    Create a comprehensive backup including:
-    1. JSON data export
-    2. SQLite database file
-    3. Media files (receipts/attachments)
-    4. Zip everything together
-
-    Returns: (zip_filename, backup_info_dict)
-    """
-    import os
-    import shutil
-    import zipfile
-    from pathlib import Path
-    from django.core.management import call_command
-    from django.conf import settings
-    from datetime import datetime
-
-    timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-    backup_dir = os.path.join(settings.BASE_DIR, 'backups')
-    os.makedirs(backup_dir, exist_ok=True)
-
-    # Temporary directory for backup components
-    temp_backup_dir = os.path.join(backup_dir, f'temp_{timestamp}')
-    os.makedirs(temp_backup_dir, exist_ok=True)
-
-    backup_info = {
-        'timestamp': timestamp,
-        'month': month_str,
-        'description': description,
-        'components': []
-    }
-
-    try:
-        # 1. JSON Data Export
-        print(f"[BACKUP] Step 1/5: Creating JSON data export...")
-        json_filename = f'data_{month_str}_{timestamp}.json'
-        json_path = os.path.join(temp_backup_dir, json_filename)
-
-        with open(json_path, 'w') as f:
-            call_command('dumpdata', 'home', indent=2, stdout=f)
-
-        json_size = os.path.getsize(json_path)
-        print(f"[BACKUP] JSON export complete: {json_size/1024:.1f} KB")
-        backup_info['components'].append({
-            'name': 'JSON Data Export',
-            'filename': json_filename,
-            'size': json_size
-        })
-
-        # 2. SQLite Database File
-        print(f"[BACKUP] Step 2/5: Copying database file...")
-        db_path = os.path.join(settings.BASE_DIR, 'db.sqlite3')
-        if os.path.exists(db_path):
-            db_filename = f'database_{month_str}_{timestamp}.sqlite3'
-            db_backup_path = os.path.join(temp_backup_dir, db_filename)
-            shutil.copy2(db_path, db_backup_path)
-
-            db_size = os.path.getsize(db_backup_path)
-            print(f"[BACKUP] Database copied: {db_size/1024/1024:.1f} MB")
-            backup_info['components'].append({
-                'name': 'SQLite Database',
-                'filename': db_filename,
-                'size': db_size
-            })
-
-        # 3. Media Files (receipts/attachments)
-        print(f"[BACKUP] Step 3/5: Copying media files (receipts)...")
-        media_root = settings.MEDIA_ROOT
-        if os.path.exists(media_root) and os.listdir(media_root):
-            media_backup_dir = os.path.join(temp_backup_dir, 'media')
-            shutil.copytree(media_root, media_backup_dir)
-            print(f"[BACKUP] Media files copied to temp directory")
-
-            # Count media files
-            print(f"[BACKUP] Calculating media file statistics...")
-            media_files = sum(1 for _ in Path(media_backup_dir).rglob('*') if _.is_file())
-            media_size = sum(f.stat().st_size for f in Path(media_backup_dir).rglob('*') if f.is_file())
-            print(f"[BACKUP] Media files: {media_files} files, {media_size/1024/1024:.1f} MB")
-
-            backup_info['components'].append({
-                'name': 'Media Files (Receipts)',
-                'filename': 'media/',
-                'size': media_size,
-                'count': media_files
-            })
-
-        # 4. Create README
-        print(f"[BACKUP] Step 4/5: Creating README file...")
-        readme_path = os.path.join(temp_backup_dir, 'README.txt')
-        with open(readme_path, 'w') as f:
-            f.write(f"FinchFinance Backup - {month_str}\n")
-            f.write(f"Created: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n")
-            f.write(f"Description: {description}\n")
-            f.write(f"\n")
-            f.write(f"CONTENTS:\n")
-            f.write(f"-" * 60 + "\n")
-            for comp in backup_info['components']:
-                f.write(f"- {comp['name']}: {comp['filename']}\n")
-                f.write(f"  Size: {comp['size']:,} bytes ({comp['size']/1024/1024:.2f} MB)\n")
-                if 'count' in comp:
-                    f.write(f"  Files: {comp['count']}\n")
-            f.write(f"\n")
-            f.write(f"RESTORE INSTRUCTIONS:\n")
-            f.write(f"-" * 60 + "\n")
-            f.write(f"1. Extract this zip file\n")
-            f.write(f"2. Quick restore (database file):\n")
-            f.write(f"   - Copy {db_filename if 'db_filename' in locals() else 'database_*.sqlite3'} to project root as db.sqlite3\n")
-            f.write(f"   - Copy media/ folder to project root\n")
-            f.write(f"3. OR Data-only restore (JSON):\n")
-            f.write(f"   - python manage.py migrate\n")
-            f.write(f"   - python manage.py loaddata {json_filename}\n")
-            f.write(f"   - Copy media/ folder to project root\n")
-
-        # 5. Create ZIP file
-        print(f"[BACKUP] Step 5/5: Creating ZIP archive...")
-        zip_filename = f'monthend_{month_str}_{timestamp}.zip'
-        zip_path = os.path.join(backup_dir, zip_filename)
-
-        with zipfile.ZipFile(zip_path, 'w', zipfile.ZIP_DEFLATED) as zipf:
-            file_count = 0
-            for root, dirs, files in os.walk(temp_backup_dir):
-                for file in files:
-                    file_path = os.path.join(root, file)
-                    arcname = os.path.relpath(file_path, temp_backup_dir)
-                    zipf.write(file_path, arcname)
-                    file_count += 1
-                    if file_count % 10 == 0:
-                        print(f"[BACKUP] Compressed {file_count} files...")
-
-        print(f"[BACKUP] ZIP created: {zip_filename}")
-
-        # Clean up temp directory
-        print(f"[BACKUP] Cleaning up temporary files...")
-        shutil.rmtree(temp_backup_dir)
-
-        # Final backup info
-        backup_info['zip_filename'] = zip_filename
-        backup_info['zip_size'] = os.path.getsize(zip_path)
-        backup_info['zip_path'] = zip_path
-
-        print(f"[BACKUP] ✅ Backup complete: {backup_info['zip_size']/1024/1024:.1f} MB")
-        print(f"[BACKUP] Location: {zip_path}")
-
-        return zip_filename, backup_info
-
-    except Exception as e:
-        # Clean up on error
-        if os.path.exists(temp_backup_dir):
-            shutil.rmtree(temp_backup_dir)
-        raise e
+@require_http_methods(["GET"])
+def backup_job_detail(request, job_id):
+    """Progress page for a month-end backup; polls backup_job_status until it finishes."""
+    job = get_object_or_404(BackupJob.objects.select_related("month_close"), pk=job_id)
+    return render(request, "backup_job_detail.html", {"job": job})
+
+
+@require_http_methods(["GET"])
+def backup_job_status(request, job_id):
+    """JSON status for the backup progress page to poll."""
+    job = get_object_or_404(BackupJob, pk=job_id)
+    return JsonResponse({
+        "id": job.pk,
+        "status": job.status,
+        "status_display": job.get_status_display(),
+        "attempts": job.attempts,
+        "max_attempts": job.max_attempts,
+        "finished": job.is_finished,
+        "manifest": job.manifest,
+        "total_size": job.result.get("total_size"),
+        "new_bytes": job.result.get("new_bytes"),
+        "error": job.error,
+    })
 
 
+@month_page(all_months=True)
 def month_forecast_worksheet(request):
     """
     Month forecast worksheet.
@@ -5535,113 +5173,71 @@ def month_forecast_worksheet(request):
     prev_month_str = f"{year-1}-12" if month_num == 1 else f"{year}-{month_num-1:02d}"
     next_month_str = f"{year+1}-01" if month_num == 12 else f"{year}-{month_num+1:02d}"
 
-    # Querysets
-    income_entries = Income.objects.filter(
-        date__range=(month_first_day, month_last_day)
-    ).select_related('income_category').order_by('date', 'id')
-
-    expense_entries = Expense.objects.filter(
-        date__range=(month_first_day, month_last_day)
-    ).select_related('category', 'withholding_category').order_by('date', 'id')
-
-    transfer_entries = Transfer.objects.filter(
-        date__range=(month_first_day, month_last_day),
-        parent_transfer__isnull=True,
-    ).select_related('withholding_category', 'to_account').order_by('date', 'id')
+    # Actuals and their rows come from the same calculator as the month-end close
+    close = get_month_close(month_first_day)
 
     # Serialize individual transactions for JS initialization
     income_data = []
-    for e in income_entries:
-        if e.income_category and e.income_category.name == 'Business Reimbursement':
+    for e in close.income:
+        inc_category = close.income_categories_by_id.get(e['income_category_id'])
+        if inc_category and inc_category['name'] == 'Business Reimbursement':
             continue
-        label = e.income_category.name if e.income_category else (e.category or 'Income')
-        if e.notes:
-            label = f"{label} — {e.notes[:50]}"
+        label = inc_category['name'] if inc_category else (e['category'] or 'Income')
+        if e['notes']:
+            label = f"{label} — {e['notes'][:50]}"
         income_data.append({
-            'id': e.id,
-            'date': e.date.strftime('%b %d'),
+            'id': e['id'],
+            'date': e['date'].strftime('%b %d'),
             'label': label,
-            'amount': float(e.amount),
+            'amount': float(e['amount']),
         })
 
     expense_data = []
-    for e in expense_entries:
-        if not e.category_id or e.category.name == 'Business Expense':
+    for e in close.expenses:
+        category = close.categories_by_id[e['category_id']]
+        if category['name'] == 'Business Expense':
             continue
-        label = f"{e.vendor_name} / {e.category.name}" if e.vendor_name else e.category.name
-        section = 'planned' if (e.category.monthly_limit and e.category.monthly_limit > 0) else 'unplanned'
+        label = f"{e['vendor_name']} / {category['name']}" if e['vendor_name'] else category['name']
+        section = 'planned' if (category['monthly_limit'] and category['monthly_limit'] > 0) else 'unplanned'
         expense_data.append({
-            'id': e.id,
-            'date': e.date.strftime('%b %d'),
+            'id': e['id'],
+            'date': e['date'].strftime('%b %d'),
             'label': label,
-            'category_name': e.category.name,
-            'budget': float(e.category.monthly_limit) if section == 'planned' and e.category.monthly_limit else 0,
-            'amount': float(e.amount),
+            'category_name': category['name'],
+            'budget': float(category['monthly_limit']) if section == 'planned' else 0,
+            'amount': float(e['amount']),
             'section': section,
-            'withholding_funded': e.withholding_category_id is not None,
+            'withholding_funded': e['withholding_category_id'] is not None,
         })
 
+    buckets_by_id = {b['id']: b for b in close.buckets}
     withholding_data = []
-    for t in transfer_entries:
-        if not t.withholding_category_id:
-            continue
-        if t.to_account_id != t.withholding_category.account_id:
+    for t in close.transfers:
+        bucket = buckets_by_id.get(t['withholding_category_id'])
+        if not bucket or t['to_account_id'] != bucket['account_id']:
             continue
         withholding_data.append({
-            'id': t.id,
-            'date': t.date.strftime('%b %d'),
-            'label': t.withholding_category.name,
-            'amount': float(t.amount),
+            'id': t['id'],
+            'date': t['date'].strftime('%b %d'),
+            'label': bucket['name'],
+            'amount': float(t['amount']),
         })
 
     # Jenna transfers count as income (same as category_progress dashboard).
     # Use string IDs prefixed 'jenna_<id>' to avoid collision with Income PKs.
-    jenna_forecast_total = Decimal('0.00')
-    try:
-        jenna_account = BankAccount.objects.get(name='Jenna (EXT)')
-        jenna_qs = Transfer.objects.filter(
-            date__range=(month_first_day, month_last_day),
-            from_account=jenna_account,
-            parent_transfer__isnull=True,
-        ).order_by('date', 'id')
-        for t in jenna_qs:
-            label = 'Jenna Transfer'
-            if t.description:
-                label += f' — {t.description}'
-            income_data.append({
-                'id': f'jenna_{t.id}',
-                'date': t.date.strftime('%b %d'),
-                'label': label,
-                'amount': float(t.amount),
-                'jenna': True,
-            })
-            jenna_forecast_total += t.amount
-    except BankAccount.DoesNotExist:
-        pass
-
-    # Calculate fixed actuals (same logic as wizard step 2)
-    total_income = Decimal('0.00')
-    for e in income_entries:
-        if not (e.income_category and e.income_category.name == 'Business Reimbursement'):
-            total_income += e.amount
-    total_income += jenna_forecast_total
-
-    total_planned_spent = Decimal('0.00')
-    total_true_unplanned_spent = Decimal('0.00')
-    for e in expense_entries:
-        if not e.category_id or e.category.name == 'Business Expense':
+    for t in close.transfers:
+        if not close.partner_account_id or t['from_account_id'] != close.partner_account_id:
             continue
-        if e.category.monthly_limit and e.category.monthly_limit > 0:
-            total_planned_spent += e.amount
-        elif not e.withholding_category_id:
-            total_true_unplanned_spent += e.amount
-
-    total_withholding_actual = Decimal('0.00')
-    for t in transfer_entries:
-        if t.withholding_category_id and t.to_account_id == t.withholding_category.account_id:
-            total_withholding_actual += t.amount
-
-    actual_surplus = total_income - total_planned_spent - total_true_unplanned_spent - total_withholding_actual
+        label = 'Jenna Transfer'
+        if t['description']:
+            label += f" — {t['description']}"
+        income_data.append({
+            'id': f"jenna_{t['id']}",
+            'date': t['date'].strftime('%b %d'),
+            'label': label,
+            'amount': float(t['amount']),
+            'jenna': True,
+        })
 
     # Load saved worksheet state for this month (if any)
     saved_ws = ForecastWorksheet.objects.filter(month=month_first_day).first()
@@ -5675,11 +5271,11 @@ def month_forecast_worksheet(request):
         'withholding_json': json.dumps(withholding_data),
 
         # Fixed actuals for the summary card
-        'actual_income': float(total_income),
-        'actual_planned': float(total_planned_spent),
-        'actual_true_unplanned': float(total_true_unplanned_spent),
-        'actual_withholding': float(total_withholding_actual),
-        'actual_surplus': float(actual_surplus),
+        'actual_income': float(close.total_income),
+        'actual_planned': float(close.total_planned_spent),
+        'actual_true_unplanned': float(close.total_true_unplanned_spent),
+        'actual_withholding': float(close.total_withholding_actual),
+        'actual_surplus': float(close.true_surplus),
 
         # Saved worksheet state
         'saved_state_json': saved_state_json,
@@ -5770,34 +5366,6 @@ def month_end_wizard(request):
         messages.warning(request, f'{month_display} is already closed')
         return redirect('month_end_wizard')
 
-    # Calculate data for all steps
-    income_entries = Income.objects.filter(date__range=(month_first_day, month_last_day))
-    expense_entries = Expense.objects.filter(date__range=(month_first_day, month_last_day))
-    transfer_entries = Transfer.objects.filter(date__range=(month_first_day, month_last_day))
-
-    # Exclude Business Reimbursement from income totals (similar to excluding Business Expense)
-    total_income = sum(
-        i.amount for i in income_entries
-        if not i.income_category or i.income_category.name != 'Business Reimbursement'
-    )
-    total_expenses = sum(e.amount for e in expense_entries)
-    total_transfers = sum(t.amount for t in transfer_entries)
-
-    # Jenna transfers count as income (same as category_progress dashboard)
-    _jenna_close_total = Decimal('0.00')
-    try:
-        _jenna_close_account = BankAccount.objects.get(name='Jenna (EXT)')
-        _jenna_close_total = Transfer.objects.filter(
-            date__range=(month_first_day, month_last_day),
-            from_account=_jenna_close_account,
-        ).aggregate(total=Sum('amount'))['total'] or Decimal('0.00')
-        total_income += _jenna_close_total
-    except BankAccount.DoesNotExist:
-        pass
-
-    net_savings = total_income - total_expenses
-    transaction_count = income_entries.count() + expense_entries.count() + transfer_entries.count()
-
     # Step 2 POST: Save excess and create/update bucket
     if step == '2' and request.method == 'POST':
         if request.POST.get('save_excess') == '1':
@@ -5845,159 +5413,8 @@ def month_end_wizard(request):
 
     # Step 2 GET: Review Enhanced Financial Summary
     if step == '2':
-        # Income breakdown by category (exclude Business Reimbursement)
-        income_breakdown = []
-        business_reimbursement_total = Decimal('0.00')
-
-        for inc_category in IncomeCategory.objects.all():
-            amount = income_entries.filter(income_category=inc_category).aggregate(
-                total=Sum('amount')
-            )['total'] or Decimal('0.00')
-
-            if amount > 0:
-                if inc_category.name == 'Business Reimbursement':
-                    business_reimbursement_total = amount
-                else:
-                    income_breakdown.append({
-                        'name': inc_category.name,
-                        'amount': amount
-                    })
-
-        # Jenna transfers shown as a separate income line
-        if _jenna_close_total > 0:
-            income_breakdown.append({
-                'name': 'Jenna Transfers',
-                'amount': _jenna_close_total,
-            })
-
-        # Planned expense analysis (categories with monthly_limit > 0, exclude Business Expense)
-        planned_categories = Category.objects.filter(is_archived=False, monthly_limit__gt=0).exclude(name='Business Expense')
-        planned_breakdown = []
-        total_planned_budget = Decimal('0.00')
-        total_planned_spent = Decimal('0.00')
-
-        for category in planned_categories:
-            spent = expense_entries.filter(category=category).aggregate(
-                total=Sum('amount')
-            )['total'] or Decimal('0.00')
-
-            budget = category.monthly_limit
-            variance = spent - budget
-
-            planned_breakdown.append({
-                'name': category.name,
-                'budget': budget,
-                'spent': spent,
-                'variance': variance,
-                'status': 'over' if variance > 0 else 'under' if variance < 0 else 'on_target'
-            })
-
-            total_planned_budget += budget
-            total_planned_spent += spent
-
-        planned_variance = total_planned_spent - total_planned_budget
-
-        # Unplanned expense analysis (categories with monthly_limit = 0 or NULL, exclude Business Expense)
-        from django.db.models import Q
-        unplanned_categories = Category.objects.filter(
-            is_archived=False
-        ).filter(
-            Q(monthly_limit__isnull=True) | Q(monthly_limit=0)
-        ).exclude(name='Business Expense')
-        unplanned_breakdown = []
-        total_unplanned_spent = Decimal('0.00')
-        total_true_unplanned_spent = Decimal('0.00')
-        total_withholding_funded_unplanned = Decimal('0.00')
-
-        for category in unplanned_categories:
-            spent = expense_entries.filter(category=category).aggregate(
-                total=Sum('amount')
-            )['total'] or Decimal('0.00')
-
-            if spent > 0:  # Only include if there was spending
-                withholding_funded = expense_entries.filter(
-                    category=category,
-                    withholding_category__isnull=False
-                ).aggregate(total=Sum('amount'))['total'] or Decimal('0.00')
-
-                out_of_pocket = spent - withholding_funded
-
-                bucket_names = list(
-                    expense_entries.filter(
-                        category=category,
-                        withholding_category__isnull=False
-                    ).values_list('withholding_category__name', flat=True).distinct()
-                )
-
-                unplanned_breakdown.append({
-                    'name': category.name,
-                    'spent': spent,
-                    'withholding_funded': withholding_funded,
-                    'out_of_pocket': out_of_pocket,
-                    'bucket_names': bucket_names,
-                    'has_withholding': withholding_funded > 0,
-                })
-                total_unplanned_spent += spent
-                total_true_unplanned_spent += out_of_pocket
-                total_withholding_funded_unplanned += withholding_funded
-
-        # Business Expense tracking (excluded from net calculations but shown for reference)
-        business_expense_cat = Category.objects.filter(name='Business Expense').first()
-        business_expense_total = Decimal('0.00')
-        if business_expense_cat:
-            business_expense_total = expense_entries.filter(category=business_expense_cat).aggregate(
-                total=Sum('amount')
-            )['total'] or Decimal('0.00')
-
-        # Withholding/Savings analysis (buckets with monthly_target)
-        withholding_buckets = WithholdingCategory.objects.exclude(monthly_target__isnull=True)
-        withholding_breakdown = []
-        total_withholding_target = Decimal('0.00')
-        total_withholding_actual = Decimal('0.00')
-
-        for bucket in withholding_buckets:
-            # Contributions this month (transfers INTO the bucket's account)
-            contributions = transfer_entries.filter(
-                withholding_category=bucket,
-                to_account=bucket.account
-            ).aggregate(total=Sum('amount'))['total'] or Decimal('0.00')
-
-            target = bucket.monthly_target
-            variance = contributions - target
-
-            withholding_breakdown.append({
-                'name': bucket.name,
-                'target': target,
-                'actual': contributions,
-                'variance': variance,
-                'status': 'over' if variance > 0 else 'under' if variance < 0 else 'on_target'
-            })
-
-            total_withholding_target += target
-            total_withholding_actual += contributions
-
-        withholding_variance = total_withholding_actual - total_withholding_target
-
-        # Excess calculation (excludes Business Expense, includes withholding contributions)
-        # Calculate true surplus: Income - (Planned + Unplanned + Withholding)
-        true_surplus = total_income - total_planned_spent - total_true_unplanned_spent - total_withholding_actual
-
-        # Keep net_savings for overall display (includes Business Expense)
-        net_surplus = total_income - total_expenses
-
-        if true_surplus > 0:
-            # Only calculate excess if we have actual surplus after all allocations
-            planned_under_spend = sum(
-                (item['budget'] - item['spent'])
-                for item in planned_breakdown
-                if item['variance'] < 0
-            )
-            excess_to_save = true_surplus
-            deficit_amount = Decimal('0.00')
-        else:
-            planned_under_spend = Decimal('0.00')
-            excess_to_save = Decimal('0.00')
-            deficit_amount = abs(true_surplus) if true_surplus < 0 else Decimal('0.00')
+        # Always fresh here; steps 3-5 reuse this result until the month's transactions change
+        close = get_month_close(month_first_day, refresh=True)
 
         # Get withholding accounts for excess bucket selection
         withholding_accounts = BankAccount.objects.filter(
@@ -6009,49 +5426,7 @@ def month_end_wizard(request):
             'step': 2,
             'month': month_str,
             'month_display': month_display,
-
-            # Existing totals
-            'total_income': total_income,
-            'total_expenses': total_expenses,
-            'net_savings': net_savings,
-            'total_transfers': total_transfers,
-            'transaction_count': transaction_count,
-            'income_count': income_entries.count(),
-            'expense_count': expense_entries.count(),
-            'transfer_count': transfer_entries.count(),
-
-            # NEW: Income breakdown
-            'income_breakdown': income_breakdown,
-            'business_reimbursement_total': business_reimbursement_total,
-
-            # NEW: Planned expense analysis
-            'planned_breakdown': planned_breakdown,
-            'total_planned_budget': total_planned_budget,
-            'total_planned_spent': total_planned_spent,
-            'planned_variance': planned_variance,
-
-            # NEW: Unplanned expense analysis
-            'unplanned_breakdown': unplanned_breakdown,
-            'total_unplanned_spent': total_unplanned_spent,
-            'total_true_unplanned_spent': total_true_unplanned_spent,
-            'total_withholding_funded_unplanned': total_withholding_funded_unplanned,
-
-            # NEW: Business Expense (excluded from net but shown for reference)
-            'business_expense_total': business_expense_total,
-
-            # NEW: Withholding analysis
-            'withholding_breakdown': withholding_breakdown,
-            'total_withholding_target': total_withholding_target,
-            'total_withholding_actual': total_withholding_actual,
-            'withholding_variance': withholding_variance,
-
-            # NEW: Excess savings
-            'net_surplus': net_surplus,
-            'true_surplus': true_surplus,
-            'has_surplus': true_surplus > 0,
-            'excess_to_save': excess_to_save,
-            'planned_under_spend': planned_under_spend,
-            'deficit_amount': deficit_amount,
+            **close.summary_context(),
             'withholding_accounts': withholding_accounts,
         }
         return render(request, 'month_end_wizard.html', context)
@@ -6173,202 +5548,105 @@ def month_end_wizard(request):
         print(f"[MONTH-END] Starting month-end close for {month_str}")
         print(f"{'='*60}\n")
         try:
-            # Get all transactions for the month
-            print(f"[MONTH-END] Loading transaction data...")
-            income_entries = Income.objects.filter(date__range=(month_first_day, month_last_day))
-            expense_entries = Expense.objects.filter(date__range=(month_first_day, month_last_day))
-            transfer_entries = Transfer.objects.filter(date__range=(month_first_day, month_last_day))
-
-            # Calculate totals (excluding Business Reimbursement from income)
-            total_income = sum(
-                i.amount for i in income_entries
-                if not i.income_category or i.income_category.name != 'Business Reimbursement'
-            )
-            total_expenses = sum(e.amount for e in expense_entries)
-            net_savings = total_income - total_expenses
-            transaction_count = len(income_entries) + len(expense_entries) + len(transfer_entries)
-            total_transfers = sum(t.amount for t in transfer_entries)
-            print(f"[MONTH-END] Processed {transaction_count} transactions")
-
-            # Recalculate enhanced summary data for storage
-            print(f"[MONTH-END] Calculating enhanced summary data...")
-            # Planned expense totals (monthly_limit > 0, exclude Business Expense)
-            from django.db.models import Q
-            planned_categories = Category.objects.filter(is_archived=False, monthly_limit__gt=0).exclude(name='Business Expense')
-            total_planned_budget = Decimal('0.00')
-            total_planned_spent = Decimal('0.00')
-            for category in planned_categories:
-                total_planned_budget += category.monthly_limit
-                spent = expense_entries.filter(category=category).aggregate(
-                    total=Sum('amount')
-                )['total'] or Decimal('0.00')
-                total_planned_spent += spent
-
-            # Unplanned expense totals (monthly_limit = 0 or NULL, exclude Business Expense)
-            unplanned_categories = Category.objects.filter(
-                is_archived=False
-            ).filter(
-                Q(monthly_limit__isnull=True) | Q(monthly_limit=0)
-            ).exclude(name='Business Expense')
-            total_unplanned_spent = Decimal('0.00')
-            total_true_unplanned_spent = Decimal('0.00')
-            for category in unplanned_categories:
-                spent = expense_entries.filter(category=category).aggregate(
-                    total=Sum('amount')
-                )['total'] or Decimal('0.00')
-                total_unplanned_spent += spent
-                withholding_funded = expense_entries.filter(
-                    category=category,
-                    withholding_category__isnull=False,
-                ).aggregate(total=Sum('amount'))['total'] or Decimal('0.00')
-                total_true_unplanned_spent += (spent - withholding_funded)
-
-            # Withholding totals
-            withholding_buckets = WithholdingCategory.objects.exclude(monthly_target__isnull=True)
-            total_withholding_target = Decimal('0.00')
-            total_withholding_actual = Decimal('0.00')
-            for bucket in withholding_buckets:
-                total_withholding_target += bucket.monthly_target
-                contributions = transfer_entries.filter(
-                    withholding_category=bucket,
-                    to_account=bucket.account
-                ).aggregate(total=Sum('amount'))['total'] or Decimal('0.00')
-                total_withholding_actual += contributions
-
-            # Excess saved (check if an excess transfer was created)
-            net_surplus = total_income - total_expenses
-            excess_saved = Decimal('0.00')
-            if net_surplus > 0:
-                # Look for excess transfer created during Step 2
-                excess_bucket = WithholdingCategory.objects.filter(name="Excess/Surplus").first()
-                if excess_bucket:
-                    excess_transfer = transfer_entries.filter(
-                        withholding_category=excess_bucket,
-                        description__icontains="Month-end excess savings"
-                    ).first()
-                    if excess_transfer:
-                        excess_saved = excess_transfer.amount
-
-            # Create comprehensive backup (JSON + DB + Media files, all zipped)
-            print(f"[MONTH-END] Starting comprehensive backup...")
-            backup_filename, backup_info = create_comprehensive_backup(
-                month_str,
-                description=f"Month-end close for {month_display}"
+            # Same figures the user reviewed in step 2 (recomputed if anything changed since)
+            print(f"[MONTH-END] Calculating month summary...")
+            close = get_month_close(month_first_day)
+            print(f"[MONTH-END] Processed {close.transaction_count} transactions")
+
+            # Everything the snapshots need is read and computed up front, so the
+            # transaction below only writes (a handful of INSERTs, whatever the
+            # number of accounts and categories)
+            print(f"[MONTH-END] Preparing snapshots...")
+            account_snapshots = []
+            liquid_assets = Decimal('0')
+            investment_assets = Decimal('0')
+            for account_id, account_type, current_balance in BankAccount.objects.filter(
+                is_active=True
+            ).values_list('id', 'account_type', 'current_balance'):
+                balance = current_balance or Decimal('0')
+                if balance != 0:
+                    account_snapshots.append(AccountSnapshot(bank_account_id=account_id, balance=balance))
+                # Separate liquid assets from investment assets (TFSA, RETIREMENT)
+                if account_type in ['TFSA', 'RETIREMENT']:
+                    investment_assets += balance
+                else:
+                    liquid_assets += balance
+
+            property_equity = Decimal('0')
+            property_notes_list = []
+
+            arnprior = RentalProperty.objects.filter(name__icontains='Arnprior', is_active=True).first()
+            if arnprior and arnprior.equity:
+                property_equity += arnprior.equity
+                property_notes_list.append(f'Arnprior: ${arnprior.equity:,.2f}')
+
+            if month_first_day >= date(2026, 2, 1):
+                foxview = RentalProperty.objects.filter(name__icontains='Foxview', is_active=True).first()
+                if foxview and foxview.equity:
+                    property_equity += foxview.equity
+                    property_notes_list.append(f'Foxview: ${foxview.equity:,.2f}')
+            else:
+                property_notes_list.append('Foxview excluded (purchased Feb 1, 2026)')
+
+            net_worth_snapshot = NetWorthSnapshot(
+                total_net_worth=liquid_assets + investment_assets + property_equity,
+                liquid_assets=liquid_assets,
+                investment_assets=investment_assets,
+                property_value=property_equity,
+                liabilities=Decimal('0'),
+                notes='; '.join(property_notes_list),
             )
 
+            # Category/bucket snapshots cover everything category_progress and
+            # withholding_overview show for the month, so once it's locked they
+            # read these rows instead of the transaction tables
+            expense_snapshots, withholding_snapshots, income_snapshots = close_snapshots(close)
+
             # Create month-end close with all snapshots
             print(f"[MONTH-END] Creating month-end close record and snapshots...")
             with transaction.atomic():
                 month_close = MonthEndClose.objects.create(
                     month=month_first_day,
                     closed_by=request.user.username if request.user.is_authenticated else 'System',
-                    backup_file=backup_filename,
-                    total_income=total_income,
-                    total_expenses=total_expenses,
-                    net_savings=net_savings,
-                    total_transfers=total_transfers,
-                    transaction_count=transaction_count,
+                    backup_file='',  # filled in by the backup job
+                    total_income=close.total_income,
+                    total_expenses=close.total_expenses,
+                    net_savings=close.net_savings,
+                    total_transfers=close.total_transfers,
+                    transaction_count=close.transaction_count,
                     is_locked=True,
 
                     # Enhanced summary fields
-                    planned_budget_total=total_planned_budget,
-                    planned_spent_total=total_planned_spent,
-                    unplanned_spent_total=total_true_unplanned_spent,
-                    withholding_target_total=total_withholding_target,
-                    withholding_actual_total=total_withholding_actual,
-                    excess_saved=excess_saved,
+                    planned_budget_total=close.total_planned_budget,
+                    planned_spent_total=close.total_planned_spent,
+                    unplanned_spent_total=close.total_true_unplanned_spent,
+                    withholding_target_total=close.total_withholding_target,
+                    withholding_actual_total=close.total_withholding_actual,
+                    excess_saved=close.excess_saved,
+                    partner_transfers=close.partner_transfers,
+                    has_full_snapshot=True,
                 )
 
-                # Account snapshots
-                for account in BankAccount.objects.filter(is_active=True):
-                    balance = account.current_balance or Decimal('0')
-                    if balance != 0:
-                        AccountSnapshot.objects.create(
-                            month_close=month_close,
-                            bank_account=account,
-                            balance=balance,
-                        )
-
-                # Net worth snapshot
-                # Separate liquid assets from investment assets (TFSA, RETIREMENT)
-                liquid_assets = Decimal('0')
-                investment_assets = Decimal('0')
-
-                for acc in BankAccount.objects.filter(is_active=True):
-                    balance = acc.current_balance or Decimal('0')
-                    if acc.account_type in ['TFSA', 'RETIREMENT']:
-                        investment_assets += balance
-                    else:
-                        liquid_assets += balance
-
-                property_equity = Decimal('0')
-                property_notes_list = []
-
-                arnprior = RentalProperty.objects.filter(name__icontains='Arnprior', is_active=True).first()
-                if arnprior and arnprior.equity:
-                    property_equity += arnprior.equity
-                    property_notes_list.append(f'Arnprior: ${arnprior.equity:,.2f}')
-
-                if month_first_day >= date(2026, 2, 1):
-                    foxview = RentalProperty.objects.filter(name__icontains='Foxview', is_active=True).first()
-                    if foxview and foxview.equity:
-                        property_equity += foxview.equity
-                        property_notes_list.append(f'Foxview: ${foxview.equity:,.2f}')
-                else:
-                    property_notes_list.append('Foxview excluded (purchased Feb 1, 2026)')
-
-                NetWorthSnapshot.objects.create(
+                net_worth_snapshot.month_close = month_close
+                net_worth_snapshot.save()
+                for model, snapshots in (
+                    (AccountSnapshot, account_snapshots),
+                    (MonthEndExpenseCategorySnapshot, expense_snapshots),
+                    (MonthEndWithholdingCategorySnapshot, withholding_snapshots),
+                    (MonthEndIncomeCategorySnapshot, income_snapshots),
+                ):
+                    for snapshot in snapshots:
+                        snapshot.month_close = month_close
+                    model.objects.bulk_create(snapshots)
+
+                # Backup (JSON + DB + media files) runs in the background once this commits
+                print(f"[MONTH-END] Queueing backup...")
+                backup_job = BackupJob.objects.create(
                     month_close=month_close,
-                    total_net_worth=liquid_assets + investment_assets + property_equity,
-                    liquid_assets=liquid_assets,
-                    investment_assets=investment_assets,
-                    property_value=property_equity,
-                    liabilities=Decimal('0'),
-                    notes='; '.join(property_notes_list),
+                    month=month_str,
+                    description=f"Month-end close for {month_display}",
                 )
-
-                # Expense category snapshots
-                print(f"[MONTH-END] Creating category snapshots...")
-                for category in planned_categories:
-                    spent = expense_entries.filter(category=category).aggregate(
-                        total=Sum('amount')
-                    )['total'] or Decimal('0')
-                    MonthEndExpenseCategorySnapshot.objects.create(
-                        month_close=month_close,
-                        category=category,
-                        monthly_limit=category.monthly_limit,
-                        actual_spent=spent,
-                    )
-
-                # Withholding bucket snapshots
-                for bucket in withholding_buckets:
-                    contrib = transfer_entries.filter(
-                        withholding_category=bucket,
-                        to_account=bucket.account,
-                    ).aggregate(total=Sum('amount'))['total'] or Decimal('0')
-                    MonthEndWithholdingCategorySnapshot.objects.create(
-                        month_close=month_close,
-                        withholding_category=bucket,
-                        monthly_target=bucket.monthly_target or Decimal('0'),
-                        actual_contributed=contrib,
-                    )
-
-                # Income category snapshots
-                for inc_cat in IncomeCategory.objects.filter(monthly_target__gt=0):
-                    received = income_entries.filter(
-                        income_category=inc_cat
-                    ).aggregate(total=Sum('amount'))['total'] or Decimal('0')
-                    MonthEndIncomeCategorySnapshot.objects.create(
-                        month_close=month_close,
-                        income_category=inc_cat,
-                        monthly_target=inc_cat.monthly_target,
-                        actual_received=received,
-                    )
-
-            # Success message with backup details
-            print(f"[MONTH-END] Saving account and net worth snapshots...")
-            backup_size_mb = backup_info['zip_size'] / 1024 / 1024
-            component_count = len(backup_info['components'])
+                enqueue_backup_job(backup_job)
 
             print(f"\n{'='*60}")
             print(f"[MONTH-END] ✅ Month-end close completed successfully!")
@@ -6377,10 +5655,9 @@ def month_end_wizard(request):
 
             messages.success(
                 request,
-                f'✅ {month_display} closed successfully! '
-                f'Backup: {backup_filename} ({backup_size_mb:.1f} MB, {component_count} components)'
+                f'✅ {month_display} closed successfully! The backup is running in the background.'
             )
-            return redirect('dashboard')
+            return redirect('backup_job_detail', job_id=backup_job.pk)
 
         except Exception as e:
             messages.error(request, f'Error closing month: {str(e)}')
@@ -6388,14 +5665,15 @@ def month_end_wizard(request):
 
     # Step 5 GET: Show confirmation
     elif step == '5':
+        close = get_month_close(month_first_day)
         context = {
             'step': 5,
             'month': month_str,
             'month_display': month_display,
-            'total_income': total_income,
-            'total_expenses': total_expenses,
-            'net_savings': net_savings,
-            'transaction_count': transaction_count,
+            'total_income': close.total_income,
+            'total_expenses': close.total_expenses,
+            'net_savings': close.net_savings,
+            'transaction_count': close.transaction_count,
         }
         return render(request, 'month_end_wizard.html', context)
 
@@ -6403,6 +5681,7 @@ def month_end_wizard(request):
     return redirect('month_end_wizard')
 
 
+@month_page(all_months=True)
 def net_worth_tracker(request):
     """
     Comprehensive Net Worth tracking page showing: